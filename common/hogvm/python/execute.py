@@ -2,8 +2,9 @@ from datetime import timedelta
 import re
 import time
 from copy import deepcopy
+from types import SimpleNamespace
 from typing import Any, Optional, TYPE_CHECKING
-from collections.abc import Callable
+from collections.abc import Callable, Iterable, Iterator
 
 from common.hogvm.python.debugger import debugger, color_bytecode
 from common.hogvm.python.objects import (
@@ -14,7 +15,8 @@ from common.hogvm.python.objects import (
     new_hog_callable,
     is_hog_upvalue,
 )
-from common.hogvm.python.operation import Operation, HOGQL_BYTECODE_IDENTIFIER, HOGQL_BYTECODE_IDENTIFIER_V0
+from common.hogvm.python.operation import Operation
+from common.hogvm.python.program import HogProgram, get_program
 from common.hogvm.python.stl import STL
 from common.hogvm.python.stl.bytecode import BYTECODE_STL
 from dataclasses import dataclass
@@ -24,8 +26,7 @@ from common.hogvm.python.utils import (
     HogVMException,
     get_nested_value,
     like,
-    set_nested_value,
-    calculate_cost,
+    CostCache,
     unify_comparison_types,
     HogVMRuntimeExceededException,
     HogVMMemoryExceededException,
@@ -38,6 +39,10 @@ MAX_MEMORY = 64 * 1024 * 1024  # 64 MB
 MAX_FUNCTION_ARGS_LENGTH = 300
 CALLSTACK_LENGTH = 1000
 
+# Plain int opcodes for the dispatch loop below. Matching against these is much cheaper than against `Operation`
+# enum members, as every enum attribute lookup goes through the enum metaclass.
+Op = SimpleNamespace(**{op.name: op.value for op in Operation})
+
 
 @dataclass
 class BytecodeResult:
@@ -54,77 +59,127 @@ def execute_bytecode(
     team: Optional["Team"] = None,
     debug=False,
 ) -> BytecodeResult:
-    bytecodes = input if isinstance(input, dict) else {"root": {"bytecode": input}}
-    root_bytecode = bytecodes.get("root", {}).get("bytecode", []) or []
-
-    if (
-        not root_bytecode
-        or len(root_bytecode) == 0
-        or (root_bytecode[0] != HOGQL_BYTECODE_IDENTIFIER and root_bytecode[0] != HOGQL_BYTECODE_IDENTIFIER_V0)
-    ):
-        raise HogVMException(f"Invalid bytecode. Must start with '{HOGQL_BYTECODE_IDENTIFIER}'")
-    version = root_bytecode[1] if len(root_bytecode) >= 2 and root_bytecode[0] == HOGQL_BYTECODE_IDENTIFIER else 0
+    return execute_program(
+        get_program(input), globals=globals, functions=functions, timeout=timeout, team=team, debug=debug
+    )
+
+
+def execute_program(
+    program: HogProgram,
+    globals: Optional[dict[str, Any]] = None,
+    functions: Optional[dict[str, Callable[..., Any]]] = None,
+    timeout=timedelta(seconds=5),
+    team: Optional["Team"] = None,
+    debug=False,
+) -> BytecodeResult:
+    return next(
+        _execute_program_batch(program, [globals], functions=functions, timeout=timeout, team=team, debug=debug)
+    )
+
+
+def execute_bytecode_batch(
+    input: list[Any] | dict | HogProgram,
+    globals_iter: Iterable[Optional[dict[str, Any]]],
+    functions: Optional[dict[str, Callable[..., Any]]] = None,
+    timeout=timedelta(seconds=5),
+    total_timeout: Optional[timedelta] = None,
+    team: Optional["Team"] = None,
+) -> Iterator[BytecodeResult | Exception]:
+    """
+    Run the same program once for every item in `globals_iter`, lazily yielding one result per item.
+
+    The interpreter is set up once and reused for all items. `timeout` and `MAX_MEMORY` apply to each item separately,
+    and `total_timeout` caps the runtime of the whole batch. No interpreter state is carried over between items, so
+    the batch never holds more than `MAX_MEMORY` at once either.
+
+    An item that fails, e.g. by exceeding its `timeout`, yields its exception instead of a result, and the batch goes on
+    with the next item. Exceeding `total_timeout` raises, ending the batch.
+    """
+    program = get_program(input)
+    globals_iter = iter(globals_iter)
+    batch_start_time = time.time()
+    while True:
+        try:
+            yield from _execute_program_batch(
+                program,
+                globals_iter,
+                functions=functions,
+                timeout=timeout,
+                total_timeout=total_timeout,
+                team=team,
+                batch_start_time=batch_start_time,
+            )
+            return
+        except HogVMRuntimeExceededException as e:
+            if total_timeout is not None and time.time() - batch_start_time > total_timeout.total_seconds():
+                raise
+            yield e
+        except Exception as e:
+            # The failed item was consumed from `globals_iter`, so the batch picks up from the next one
+            yield e
+
+
+def _execute_program_batch(
+    program: HogProgram,
+    globals_iter: Iterable[Optional[dict[str, Any]]],
+    functions: Optional[dict[str, Callable[..., Any]]] = None,
+    timeout=timedelta(seconds=5),
+    total_timeout: Optional[timedelta] = None,
+    team: Optional["Team"] = None,
+    debug=False,
+    batch_start_time: Optional[float] = None,
+) -> Iterator[BytecodeResult]:
+    bytecodes = program.bytecodes
+    version = program.version
     start_time = time.time()
-    last_op = len(root_bytecode) - 1
+    batch_started_at = start_time if batch_start_time is None else batch_start_time
     stack: list = []
     upvalues: list[dict] = []
     upvalues_by_id: dict[int, dict] = {}
     mem_stack: list = []
+    cost_cache = CostCache()
     call_stack: list[CallFrame] = []
     throw_stack: list[ThrowFrame] = []
     declared_functions: dict[str, tuple[int, int]] = {}
     mem_used = 0
     max_mem_used = 0
     ops = 0
+    batch_ops = 0
     stdout: list[str] = []
     debug_bytecode = []
     if isinstance(timeout, int):
         timeout = timedelta(seconds=timeout)
-
-    if len(call_stack) == 0:
-        call_stack.append(
-            CallFrame(
-                ip=0,
-                chunk="root",
-                stack_start=0,
-                arg_len=0,
-                closure=new_hog_closure(
-                    new_hog_callable(
-                        type="local",
-                        arg_count=0,
-                        upvalue_count=0,
-                        ip=0,
-                        chunk="root",
-                        name="",
-                    )
-                ),
-            )
+    timeout_seconds = timeout.total_seconds()
+    total_timeout_seconds = total_timeout.total_seconds() if total_timeout is not None else None
+
+    globals: Optional[dict[str, Any]] = None
+    root_closure = new_hog_closure(
+        new_hog_callable(
+            type="local",
+            arg_count=0,
+            upvalue_count=0,
+            ip=0,
+            chunk="root",
+            name="",
         )
-    frame = call_stack[-1]
-    chunk_bytecode: list[Any] = root_bytecode
+    )
+    frame = CallFrame(ip=0, chunk="root", stack_start=0, arg_len=0, closure=root_closure)
+    chunk = program.chunks["root"]
+    chunk_bytecode: list[Any] = chunk.bytecode
     chunk_globals = globals
+    last_op = chunk.last_op
 
     def set_chunk_bytecode():
-        nonlocal chunk_bytecode, chunk_globals, last_op, debug_bytecode
-        if not frame.chunk or frame.chunk == "root":
-            chunk_bytecode = root_bytecode
-            chunk_globals = globals
-        elif frame.chunk.startswith("stl/") and frame.chunk[4:] in BYTECODE_STL:
-            chunk_bytecode = BYTECODE_STL[frame.chunk[4:]][1]
-            chunk_globals = {}
-        elif bytecodes.get(frame.chunk):
-            chunk_bytecode = bytecodes[frame.chunk].get("bytecode", [])
-            chunk_globals = bytecodes[frame.chunk].get("globals", {})
-        else:
-            raise HogVMException(f"Unknown chunk: {frame.chunk}")
-        last_op = len(chunk_bytecode) - 1
+        nonlocal chunk, chunk_bytecode, chunk_globals, last_op, debug_bytecode
+        chunk = program.get_chunk(frame.chunk)
+        chunk_bytecode = chunk.bytecode
+        chunk_globals = globals if chunk.globals is None else chunk.globals
+        last_op = chunk.last_op
         if debug:
             debug_bytecode = color_bytecode(chunk_bytecode)
-        if frame.ip == 0 and (chunk_bytecode[0] == "_H" or chunk_bytecode[0] == "_h"):
+        if frame.ip == 0:
             # TODO: store chunk version
-            frame.ip += 2 if chunk_bytecode[0] == "_H" else 1
-
-    set_chunk_bytecode()
+            frame.ip = chunk.start_ip
 
     def stack_keep_first_elements(count: int) -> list[Any]:
         nonlocal stack, mem_stack, mem_used
@@ -143,13 +198,6 @@ def execute_bytecode(
         mem_stack = mem_stack[0:count]
         return removed
 
-    def next_token():
-        nonlocal frame, chunk_bytecode
-        if frame.ip >= last_op:
-            raise HogVMException("Unexpected end of bytecode")
-        frame.ip += 1
-        return chunk_bytecode[frame.ip]
-
     def pop_stack():
         if not stack:
             raise HogVMException("Stack underflow")
@@ -159,7 +207,7 @@ def execute_bytecode(
 
     def push_stack(value):
         stack.append(value)
-        mem_stack.append(calculate_cost(value))
+        mem_stack.append(cost_cache.cost(value))
         nonlocal mem_used
         mem_used += mem_stack[-1]
         nonlocal max_mem_used
@@ -168,8 +216,13 @@ def execute_bytecode(
             raise HogVMMemoryExceededException(memory_limit=MAX_MEMORY, attempted_memory=mem_used)
 
     def check_timeout():
-        if time.time() - start_time > timeout.total_seconds() and not debug:
-            raise HogVMRuntimeExceededException(timeout_seconds=timeout.total_seconds(), ops_performed=ops)
+        if debug:
+            return
+        now = time.time()
+        if now - start_time > timeout_seconds:
+            raise HogVMRuntimeExceededException(timeout_seconds=timeout_seconds, ops_performed=ops)
+        if total_timeout_seconds is not None and now - batch_started_at > total_timeout_seconds:
+            raise HogVMRuntimeExceededException(timeout_seconds=total_timeout_seconds, ops_performed=batch_ops + ops)
 
     def capture_upvalue(index) -> dict:
         nonlocal upvalues
@@ -191,383 +244,336 @@ def execute_bytecode(
         return created_upvalue
 
     symbol: Any = None
-    while True:
-        # Return or jump back to the previous call frame if ran out of bytecode to execute in this one, and return null
-        if frame.ip > last_op:
-            last_call_frame = call_stack.pop()
-            if len(call_stack) == 0 or last_call_frame is None:
-                if len(stack) > 1:
-                    raise HogVMException("Invalid bytecode. More than one value left on stack")
-                return BytecodeResult(
-                    result=pop_stack() if len(stack) > 0 else None, stdout=stdout, bytecodes=bytecodes
-                )
-            stack_start = last_call_frame.stack_start
-            stack_keep_first_elements(stack_start)
-            push_stack(None)
-            frame = call_stack[-1]
-            set_chunk_bytecode()
-
-        ops += 1
-        symbol = chunk_bytecode[frame.ip]
-        if (ops & 127) == 0:  # every 128th operation
-            check_timeout()
-        elif debug:
-            debugger(symbol, chunk_bytecode, debug_bytecode, frame.ip, stack, call_stack, throw_stack)
-        match symbol:
-            case None:
-                break
-            case Operation.STRING:
-                push_stack(next_token())
-            case Operation.INTEGER:
-                push_stack(next_token())
-            case Operation.FLOAT:
-                push_stack(next_token())
-            case Operation.TRUE:
-                push_stack(True)
-            case Operation.FALSE:
-                push_stack(False)
-            case Operation.NULL:
-                push_stack(None)
-            case Operation.NOT:
-                push_stack(not pop_stack())
-            case Operation.AND:
-                push_stack(all([pop_stack() for _ in range(next_token())]))  # noqa: C419
-            case Operation.OR:
-                push_stack(any([pop_stack() for _ in range(next_token())]))  # noqa: C419
-            case Operation.PLUS:
-                push_stack(pop_stack() + pop_stack())
-            case Operation.MINUS:
-                push_stack(pop_stack() - pop_stack())
-            case Operation.DIVIDE:
-                push_stack(pop_stack() / pop_stack())
-            case Operation.MULTIPLY:
-                push_stack(pop_stack() * pop_stack())
-            case Operation.MOD:
-                push_stack(pop_stack() % pop_stack())
-            case Operation.EQ:
-                var1, var2 = unify_comparison_types(pop_stack(), pop_stack())
-                push_stack(var1 == var2)
-            case Operation.NOT_EQ:
-                var1, var2 = unify_comparison_types(pop_stack(), pop_stack())
-                push_stack(var1 != var2)
-            case Operation.GT:
-                var1, var2 = unify_comparison_types(pop_stack(), pop_stack())
-                push_stack(var1 > var2)
-            case Operation.GT_EQ:
-                var1, var2 = unify_comparison_types(pop_stack(), pop_stack())
-                push_stack(var1 >= var2)
-            case Operation.LT:
-                var1, var2 = unify_comparison_types(pop_stack(), pop_stack())
-                push_stack(var1 < var2)
-            case Operation.LT_EQ:
-                var1, var2 = unify_comparison_types(pop_stack(), pop_stack())
-                push_stack(var1 <= var2)
-            case Operation.LIKE:
-                push_stack(like(pop_stack(), pop_stack()))
-            case Operation.ILIKE:
-                push_stack(like(pop_stack(), pop_stack(), re.IGNORECASE))
-            case Operation.NOT_LIKE:
-                push_stack(not like(pop_stack(), pop_stack()))
-            case Operation.NOT_ILIKE:
-                push_stack(not like(pop_stack(), pop_stack(), re.IGNORECASE))
-            case Operation.IN:
-                push_stack(pop_stack() in pop_stack())
-            case Operation.NOT_IN:
-                push_stack(pop_stack() not in pop_stack())
-            case Operation.REGEX:
-                args = [pop_stack(), pop_stack()]
-                # TODO: swap this for re2, as used in HogQL/ClickHouse and in the NodeJS VM
-                push_stack(bool(re.search(re.compile(args[1]), args[0])) if args[0] and args[1] else False)
-            case Operation.NOT_REGEX:
-                args = [pop_stack(), pop_stack()]
-                # TODO: swap this for re2, as used in HogQL/ClickHouse and in the NodeJS VM
-                push_stack(not bool(re.search(re.compile(args[1]), args[0])) if args[0] and args[1] else False)
-            case Operation.IREGEX:
-                args = [pop_stack(), pop_stack()]
-                push_stack(
-                    bool(re.search(re.compile(args[1], re.RegexFlag.IGNORECASE), args[0]))
-                    if args[0] and args[1]
-                    else False
-                )
-            case Operation.NOT_IREGEX:
-                args = [pop_stack(), pop_stack()]
-                push_stack(
-                    not bool(re.search(re.compile(args[1], re.RegexFlag.IGNORECASE), args[0]))
-                    if args[0] and args[1]
-                    else False
-                )
-            case Operation.GET_GLOBAL:
-                chain = [pop_stack() for _ in range(next_token())]
-                if chunk_globals and chain[0] in chunk_globals:
-                    push_stack(deepcopy(get_nested_value(chunk_globals, chain, True)))
-                elif functions and chain[0] in functions:
-                    push_stack(
-                        new_hog_closure(
-                            new_hog_callable(
-                                type="stl",
-                                name=chain[0],
-                                arg_count=0,
-                                upvalue_count=0,
-                                ip=-1,
-                                chunk="stl",
-                            )
-                        )
-                    )
-                elif chain[0] in STL and len(chain) == 1:
-                    push_stack(
-                        new_hog_closure(
-                            new_hog_callable(
-                                type="stl",
-                                name=chain[0],
-                                arg_count=STL[chain[0]].maxArgs or 0,
-                                upvalue_count=0,
-                                ip=-1,
-                                chunk="stl",
-                            )
-                        )
-                    )
-                elif chain[0] in BYTECODE_STL and len(chain) == 1:
-                    push_stack(
-                        new_hog_closure(
-                            new_hog_callable(
-                                type="stl",
-                                name=chain[0],
-                                arg_count=len(BYTECODE_STL[chain[0]][0]),
-                                upvalue_count=0,
-                                ip=0,
-                                chunk=f"stl/{chain[0]}",
-                            )
-                        )
-                    )
-                else:
-                    raise HogVMException(f"Global variable not found: {chain[0]}")
-            case Operation.POP:
-                pop_stack()
-            case Operation.CLOSE_UPVALUE:
-                stack_keep_first_elements(len(stack) - 1)
-            case Operation.RETURN:
-                response = pop_stack()
+    for item_globals in globals_iter:
+        # Reset the interpreter for the next item
+        globals = item_globals
+        batch_ops += ops
+        start_time = time.time()
+        stack = []
+        mem_stack = []
+        cost_cache.clear()
+        upvalues = []
+        upvalues_by_id = {}
+        throw_stack = []
+        declared_functions = {}
+        mem_used = 0
+        max_mem_used = 0
+        ops = 0
+        stdout = []
+        frame = CallFrame(ip=0, chunk="root", stack_start=0, arg_len=0, closure=root_closure)
+        call_stack = [frame]
+        set_chunk_bytecode()
+
+        result: Optional[BytecodeResult] = None
+        while True:
+            # Return or jump back to the previous call frame if ran out of bytecode to execute in this one, and return null
+            if frame.ip > last_op:
                 last_call_frame = call_stack.pop()
                 if len(call_stack) == 0 or last_call_frame is None:
-                    return BytecodeResult(result=response, stdout=stdout, bytecodes=bytecodes)
+                    if len(stack) > 1:
+                        raise HogVMException("Invalid bytecode. More than one value left on stack")
+                    result = BytecodeResult(
+                        result=pop_stack() if len(stack) > 0 else None, stdout=stdout, bytecodes=bytecodes
+                    )
+                    break
                 stack_start = last_call_frame.stack_start
                 stack_keep_first_elements(stack_start)
-                push_stack(response)
+                push_stack(None)
                 frame = call_stack[-1]
                 set_chunk_bytecode()
-                continue  # resume the loop without incrementing frame.ip
-
-            case Operation.GET_LOCAL:
-                stack_start = 0 if not call_stack else call_stack[-1].stack_start
-                push_stack(stack[next_token() + stack_start])
-            case Operation.SET_LOCAL:
-                stack_start = 0 if not call_stack else call_stack[-1].stack_start
-                value = pop_stack()
-                index = next_token() + stack_start
-                stack[index] = value
-                last_cost = mem_stack[index]
-                mem_stack[index] = calculate_cost(value)
-                mem_used += mem_stack[index] - last_cost
-                max_mem_used = max(mem_used, max_mem_used)
-            case Operation.GET_PROPERTY:
-                property = pop_stack()
-                push_stack(get_nested_value(pop_stack(), [property]))
-            case Operation.GET_PROPERTY_NULLISH:
-                property = pop_stack()
-                push_stack(get_nested_value(pop_stack(), [property], nullish=True))
-            case Operation.SET_PROPERTY:
-                value = pop_stack()
-                field = pop_stack()
-                set_nested_value(pop_stack(), [field], value)
-            case Operation.DICT:
-                count = next_token()
-                if count > 0:
-                    elems = stack[-(count * 2) :]
-                    stack = stack[: -(count * 2)]
-                    mem_used -= sum(mem_stack[-(count * 2) :])
-                    mem_stack = mem_stack[: -(count * 2)]
-                    push_stack({elems[i]: elems[i + 1] for i in range(0, len(elems), 2)})
-                else:
-                    push_stack({})
-            case Operation.ARRAY:
-                count = next_token()
-                if count > 0:
-                    elems = stack[-count:]
-                    stack = stack[:-count]
-                    mem_used -= sum(mem_stack[-count:])
-                    mem_stack = mem_stack[:-count]
-                    push_stack(elems)
-                else:
-                    push_stack([])
-            case Operation.TUPLE:
-                count = next_token()
-                if count > 0:
-                    elems = stack[-count:]
-                    stack = stack[:-count]
-                    mem_used -= sum(mem_stack[-count:])
-                    mem_stack = mem_stack[:-count]
-                    push_stack(tuple(elems))
-                else:
-                    push_stack(())
-            case Operation.JUMP:
-                count = next_token()
-                frame.ip += count
-            case Operation.JUMP_IF_FALSE:
-                count = next_token()
-                if not pop_stack():
-                    frame.ip += count
-            case Operation.JUMP_IF_STACK_NOT_NULL:
-                count = next_token()
-                if len(stack) > 0 and stack[-1] is not None:
-                    frame.ip += count
-            case Operation.DECLARE_FN:
-                # DEPRECATED
-                name = next_token()
-                arg_len = next_token()
-                body_len = next_token()
-                declared_functions[name] = (frame.ip + 1, arg_len)
-                frame.ip += body_len
-            case Operation.CALLABLE:
-                name = next_token()  # TODO: do we need it? it could change as the variable is reassigned
-                arg_count = next_token()
-                upvalue_count = next_token()
-                body_length = next_token()
-                push_stack(
-                    new_hog_callable(
-                        type="local",
-                        name=name,
-                        chunk=frame.chunk,
-                        arg_count=arg_count,
-                        upvalue_count=upvalue_count,
-                        ip=frame.ip + 1,
-                    )
-                )
-                frame.ip += body_length
-            case Operation.CLOSURE:
-                closure_callable = pop_stack()
-                closure = new_hog_closure(closure_callable)
-                stack_start = frame.stack_start
-                upvalue_count = next_token()
-                if upvalue_count != closure_callable["upvalueCount"]:
-                    raise HogVMException(
-                        f"Invalid upvalue count. Expected {closure_callable['upvalueCount']}, got {upvalue_count}"
-                    )
-                for _ in range(closure_callable["upvalueCount"]):
-                    is_local, index = next_token(), next_token()
-                    if is_local:
-                        closure["upvalues"].append(capture_upvalue(stack_start + index)["id"])
-                    else:
-                        closure["upvalues"].append(frame.closure["upvalues"][index])
-                push_stack(closure)
-            case Operation.GET_UPVALUE:
-                index = next_token()
-                closure = frame.closure
-                if index >= len(closure["upvalues"]):
-                    raise HogVMException(f"Invalid upvalue index: {index}")
-                upvalue = upvalues_by_id[closure["upvalues"][index]]
-                if not is_hog_upvalue(upvalue):
-                    raise HogVMException(f"Invalid upvalue: {upvalue}")
-                if upvalue["closed"]:
-                    push_stack(upvalue["value"])
-                else:
-                    push_stack(stack[upvalue["location"]])
-            case Operation.SET_UPVALUE:
-                index = next_token()
-                closure = frame.closure
-                if index >= len(closure["upvalues"]):
-                    raise HogVMException(f"Invalid upvalue index: {index}")
-                upvalue = upvalues_by_id[closure["upvalues"][index]]
-                if not is_hog_upvalue(upvalue):
-                    raise HogVMException(f"Invalid upvalue: {upvalue}")
-                if upvalue["closed"]:
-                    upvalue["value"] = pop_stack()
-                else:
-                    stack[upvalue["location"]] = pop_stack()
-            case Operation.CALL_GLOBAL:
+
+            ops += 1
+            symbol, operands, next_ip = chunk.instructions[frame.ip] or chunk.instruction(frame.ip)
+            if (ops & 127) == 0:  # every 128th operation
                 check_timeout()
-                name = next_token()
-                arg_count = next_token()
-                # This is for backwards compatibility. We use a closure on the stack with local functions now.
-                if name in declared_functions:
-                    func_ip, arg_len = declared_functions[name]
-                    frame.ip += 1  # advance for when we return
-                    if arg_len > arg_count:
-                        for _ in range(arg_len - arg_count):
-                            push_stack(None)
-                    frame = CallFrame(
-                        ip=func_ip,
-                        chunk=frame.chunk,
-                        stack_start=len(stack) - arg_len,
-                        arg_len=arg_len,
-                        closure=new_hog_closure(
-                            new_hog_callable(
-                                type="local",
-                                name=name,
-                                arg_count=arg_len,
-                                upvalue_count=0,
-                                ip=func_ip,
-                                chunk=frame.chunk,
-                            )
-                        ),
+            elif debug:
+                debugger(symbol, chunk_bytecode, debug_bytecode, frame.ip, stack, call_stack, throw_stack)
+            match symbol:
+                case None:
+                    break
+                case Op.STRING:
+                    push_stack(operands[0])
+                case Op.INTEGER:
+                    push_stack(operands[0])
+                case Op.FLOAT:
+                    push_stack(operands[0])
+                case Op.TRUE:
+                    push_stack(True)
+                case Op.FALSE:
+                    push_stack(False)
+                case Op.NULL:
+                    push_stack(None)
+                case Op.NOT:
+                    push_stack(not pop_stack())
+                case Op.AND:
+                    push_stack(all([pop_stack() for _ in range(operands[0])]))  # noqa: C419
+                case Op.OR:
+                    push_stack(any([pop_stack() for _ in range(operands[0])]))  # noqa: C419
+                case Op.PLUS:
+                    push_stack(pop_stack() + pop_stack())
+                case Op.MINUS:
+                    push_stack(pop_stack() - pop_stack())
+                case Op.DIVIDE:
+                    push_stack(pop_stack() / pop_stack())
+                case Op.MULTIPLY:
+                    push_stack(pop_stack() * pop_stack())
+                case Op.MOD:
+                    push_stack(pop_stack() % pop_stack())
+                case Op.EQ:
+                    var1, var2 = unify_comparison_types(pop_stack(), pop_stack())
+                    push_stack(var1 == var2)
+                case Op.NOT_EQ:
+                    var1, var2 = unify_comparison_types(pop_stack(), pop_stack())
+                    push_stack(var1 != var2)
+                case Op.GT:
+                    var1, var2 = unify_comparison_types(pop_stack(), pop_stack())
+                    push_stack(var1 > var2)
+                case Op.GT_EQ:
+                    var1, var2 = unify_comparison_types(pop_stack(), pop_stack())
+                    push_stack(var1 >= var2)
+                case Op.LT:
+                    var1, var2 = unify_comparison_types(pop_stack(), pop_stack())
+                    push_stack(var1 < var2)
+                case Op.LT_EQ:
+                    var1, var2 = unify_comparison_types(pop_stack(), pop_stack())
+                    push_stack(var1 <= var2)
+                case Op.LIKE:
+                    push_stack(like(pop_stack(), pop_stack()))
+                case Op.ILIKE:
+                    push_stack(like(pop_stack(), pop_stack(), re.IGNORECASE))
+                case Op.NOT_LIKE:
+                    push_stack(not like(pop_stack(), pop_stack()))
+                case Op.NOT_ILIKE:
+                    push_stack(not like(pop_stack(), pop_stack(), re.IGNORECASE))
+                case Op.IN:
+                    push_stack(pop_stack() in pop_stack())
+                case Op.NOT_IN:
+                    push_stack(pop_stack() not in pop_stack())
+                case Op.REGEX:
+                    args = [pop_stack(), pop_stack()]
+                    # TODO: swap this for re2, as used in HogQL/ClickHouse and in the NodeJS VM
+                    push_stack(bool(re.search(re.compile(args[1]), args[0])) if args[0] and args[1] else False)
+                case Op.NOT_REGEX:
+                    args = [pop_stack(), pop_stack()]
+                    # TODO: swap this for re2, as used in HogQL/ClickHouse and in the NodeJS VM
+                    push_stack(not bool(re.search(re.compile(args[1]), args[0])) if args[0] and args[1] else False)
+                case Op.IREGEX:
+                    args = [pop_stack(), pop_stack()]
+                    push_stack(
+                        bool(re.search(re.compile(args[1], re.RegexFlag.IGNORECASE), args[0]))
+                        if args[0] and args[1]
+                        else False
                     )
-                    set_chunk_bytecode()
-                    call_stack.append(frame)
-                    continue  # resume the loop without incrementing frame.ip
-                else:
-                    if name == "import":
-                        if arg_count != 1:
-                            raise HogVMException("Function import requires exactly 1 argument")
-                        module_name = pop_stack()
-                        frame.ip += 1  # advance for when we return
-                        frame = CallFrame(
-                            ip=0,
-                            chunk=module_name,
-                            stack_start=len(stack),
-                            arg_len=0,
-                            closure=new_hog_closure(
+                case Op.NOT_IREGEX:
+                    args = [pop_stack(), pop_stack()]
+                    push_stack(
+                        not bool(re.search(re.compile(args[1], re.RegexFlag.IGNORECASE), args[0]))
+                        if args[0] and args[1]
+                        else False
+                    )
+                case Op.GET_GLOBAL:
+                    chain = [pop_stack() for _ in range(operands[0])]
+                    if chunk_globals and chain[0] in chunk_globals:
+                        push_stack(deepcopy(get_nested_value(chunk_globals, chain, True)))
+                    elif functions and chain[0] in functions:
+                        push_stack(
+                            new_hog_closure(
                                 new_hog_callable(
-                                    type="local",
-                                    name=module_name,
+                                    type="stl",
+                                    name=chain[0],
                                     arg_count=0,
                                     upvalue_count=0,
+                                    ip=-1,
+                                    chunk="stl",
+                                )
+                            )
+                        )
+                    elif chain[0] in STL and len(chain) == 1:
+                        push_stack(
+                            new_hog_closure(
+                                new_hog_callable(
+                                    type="stl",
+                                    name=chain[0],
+                                    arg_count=STL[chain[0]].maxArgs or 0,
+                                    upvalue_count=0,
+                                    ip=-1,
+                                    chunk="stl",
+                                )
+                            )
+                        )
+                    elif chain[0] in BYTECODE_STL and len(chain) == 1:
+                        push_stack(
+                            new_hog_closure(
+                                new_hog_callable(
+                                    type="stl",
+                                    name=chain[0],
+                                    arg_count=len(BYTECODE_STL[chain[0]][0]),
+                                    upvalue_count=0,
                                     ip=0,
-                                    chunk=module_name,
+                                    chunk=f"stl/{chain[0]}",
                                 )
-                            ),
+                            )
                         )
-                        set_chunk_bytecode()
-                        call_stack.append(frame)
-                        continue
-                    elif functions is not None and name in functions:
-                        if version == 0:
-                            args = [pop_stack() for _ in range(arg_count)]
-                        else:
-                            args = stack_keep_first_elements(len(stack) - arg_count)
-                        push_stack(functions[name](*args))
-                    elif name in STL:
-                        if version == 0:
-                            args = [pop_stack() for _ in range(arg_count)]
+                    else:
+                        raise HogVMException(f"Global variable not found: {chain[0]}")
+                case Op.POP:
+                    pop_stack()
+                case Op.CLOSE_UPVALUE:
+                    stack_keep_first_elements(len(stack) - 1)
+                case Op.RETURN:
+                    response = pop_stack()
+                    last_call_frame = call_stack.pop()
+                    if len(call_stack) == 0 or last_call_frame is None:
+                        result = BytecodeResult(result=response, stdout=stdout, bytecodes=bytecodes)
+                        break
+                    stack_start = last_call_frame.stack_start
+                    stack_keep_first_elements(stack_start)
+                    push_stack(response)
+                    frame = call_stack[-1]
+                    set_chunk_bytecode()
+                    continue  # resume the loop without incrementing frame.ip
+
+                case Op.GET_LOCAL:
+                    stack_start = 0 if not call_stack else call_stack[-1].stack_start
+                    push_stack(stack[operands[0] + stack_start])
+                case Op.SET_LOCAL:
+                    stack_start = 0 if not call_stack else call_stack[-1].stack_start
+                    value = pop_stack()
+                    index = operands[0] + stack_start
+                    stack[index] = value
+                    last_cost = mem_stack[index]
+                    mem_stack[index] = cost_cache.cost(value)
+                    mem_used += mem_stack[index] - last_cost
+                    max_mem_used = max(mem_used, max_mem_used)
+                case Op.GET_PROPERTY:
+                    property = pop_stack()
+                    push_stack(get_nested_value(pop_stack(), [property]))
+                case Op.GET_PROPERTY_NULLISH:
+                    property = pop_stack()
+                    push_stack(get_nested_value(pop_stack(), [property], nullish=True))
+                case Op.SET_PROPERTY:
+                    value = pop_stack()
+                    field = pop_stack()
+                    cost_cache.set_item(pop_stack(), field, value)
+                case Op.DICT:
+                    count = operands[0]
+                    if count > 0:
+                        elems = stack[-(count * 2) :]
+                        stack = stack[: -(count * 2)]
+                        mem_used -= sum(mem_stack[-(count * 2) :])
+                        mem_stack = mem_stack[: -(count * 2)]
+                        push_stack({elems[i]: elems[i + 1] for i in range(0, len(elems), 2)})
+                    else:
+                        push_stack({})
+                case Op.ARRAY:
+                    count = operands[0]
+                    if count > 0:
+                        elems = stack[-count:]
+                        stack = stack[:-count]
+                        mem_used -= sum(mem_stack[-count:])
+                        mem_stack = mem_stack[:-count]
+                        push_stack(elems)
+                    else:
+                        push_stack([])
+                case Op.TUPLE:
+                    count = operands[0]
+                    if count > 0:
+                        elems = stack[-count:]
+                        stack = stack[:-count]
+                        mem_used -= sum(mem_stack[-count:])
+                        mem_stack = mem_stack[:-count]
+                        push_stack(tuple(elems))
+                    else:
+                        push_stack(())
+                case Op.JUMP:
+                    next_ip = operands[0]
+                case Op.JUMP_IF_FALSE:
+                    if not pop_stack():
+                        next_ip = operands[0]
+                case Op.JUMP_IF_STACK_NOT_NULL:
+                    if len(stack) > 0 and stack[-1] is not None:
+                        next_ip = operands[0]
+                case Op.DECLARE_FN:
+                    # DEPRECATED
+                    name, arg_len, body_end = operands
+                    declared_functions[name] = (next_ip, arg_len)
+                    next_ip = body_end
+                case Op.CALLABLE:
+                    # TODO: do we need the name? it could change as the variable is reassigned
+                    name, arg_count, upvalue_count, body_end = operands
+                    push_stack(
+                        new_hog_callable(
+                            type="local",
+                            name=name,
+                            chunk=frame.chunk,
+                            arg_count=arg_count,
+                            upvalue_count=upvalue_count,
+                            ip=next_ip,
+                        )
+                    )
+                    next_ip = body_end
+                case Op.CLOSURE:
+                    closure_callable = pop_stack()
+                    closure = new_hog_closure(closure_callable)
+                    stack_start = frame.stack_start
+                    upvalue_count, upvalue_locations = operands
+                    if upvalue_count != closure_callable["upvalueCount"]:
+                        raise HogVMException(
+                            f"Invalid upvalue count. Expected {closure_callable['upvalueCount']}, got {upvalue_count}"
+                        )
+                    for is_local, index in upvalue_locations:
+                        if is_local:
+                            closure["upvalues"].append(capture_upvalue(stack_start + index)["id"])
                         else:
-                            args = stack_keep_first_elements(len(stack) - arg_count)
-                        push_stack(STL[name].fn(args, team, stdout, timeout.total_seconds()))
-                    elif name in BYTECODE_STL:
-                        arg_names = BYTECODE_STL[name][0]
-                        if len(arg_names) != arg_count:
-                            raise HogVMException(f"Function {name} requires exactly {len(arg_names)} arguments")
-                        frame.ip += 1  # advance for when we return
+                            closure["upvalues"].append(frame.closure["upvalues"][index])
+                    push_stack(closure)
+                case Op.GET_UPVALUE:
+                    index = operands[0]
+                    closure = frame.closure
+                    if index >= len(closure["upvalues"]):
+                        raise HogVMException(f"Invalid upvalue index: {index}")
+                    upvalue = upvalues_by_id[closure["upvalues"][index]]
+                    if not is_hog_upvalue(upvalue):
+                        raise HogVMException(f"Invalid upvalue: {upvalue}")
+                    if upvalue["closed"]:
+                        push_stack(upvalue["value"])
+                    else:
+                        push_stack(stack[upvalue["location"]])
+                case Op.SET_UPVALUE:
+                    index = operands[0]
+                    closure = frame.closure
+                    if index >= len(closure["upvalues"]):
+                        raise HogVMException(f"Invalid upvalue index: {index}")
+                    upvalue = upvalues_by_id[closure["upvalues"][index]]
+                    if not is_hog_upvalue(upvalue):
+                        raise HogVMException(f"Invalid upvalue: {upvalue}")
+                    if upvalue["closed"]:
+                        upvalue["value"] = pop_stack()
+                    else:
+                        stack[upvalue["location"]] = pop_stack()
+                case Op.CALL_GLOBAL:
+                    check_timeout()
+                    name, arg_count = operands
+                    # This is for backwards compatibility. We use a closure on the stack with local functions now.
+                    if name in declared_functions:
+                        func_ip, arg_len = declared_functions[name]
+                        frame.ip = next_ip  # advance for when we return
+                        if arg_len > arg_count:
+                            for _ in range(arg_len - arg_count):
+                                push_stack(None)
                         frame = CallFrame(
-                            ip=0,
-                            chunk=f"stl/{name}",
-                            stack_start=len(stack) - arg_count,
-                            arg_len=arg_count,
+                            ip=func_ip,
+                            chunk=frame.chunk,
+                            stack_start=len(stack) - arg_len,
+                            arg_len=arg_len,
                             closure=new_hog_closure(
                                 new_hog_callable(
-                                    type="stl",
+                                    type="local",
                                     name=name,
-                                    arg_count=arg_count,
+                                    arg_count=arg_len,
                                     upvalue_count=0,
-                                    ip=0,
-                                    chunk=f"stl/{name}",
+                                    ip=func_ip,
+                                    chunk=frame.chunk,
                                 )
                             ),
                         )
@@ -575,107 +581,173 @@ def execute_bytecode(
                         call_stack.append(frame)
                         continue  # resume the loop without incrementing frame.ip
                     else:
-                        raise HogVMException(f"Unsupported function call: {name}")
-            case Operation.CALL_LOCAL:
-                check_timeout()
-                closure = pop_stack()
-                if not isinstance(closure, dict) or closure.get("__hogClosure__") is None:
-                    raise HogVMException(f"Invalid closure: {closure}")
-                callable = closure.get("callable")
-                if not isinstance(callable, dict) or callable.get("__hogCallable__") is None:
-                    raise HogVMException(f"Invalid callable: {callable}")
-                args_length = next_token()
-                if args_length > MAX_FUNCTION_ARGS_LENGTH:
-                    raise HogVMException("Too many arguments")
-
-                if callable.get("__hogCallable__") == "local":
-                    if callable["argCount"] > args_length:
-                        # TODO: specify minimum required arguments somehow
-                        for _ in range(callable["argCount"] - args_length):
-                            push_stack(None)
-                    elif callable["argCount"] < args_length:
-                        raise HogVMException(
-                            f"Too many arguments. Passed {args_length}, expected {callable['argCount']}"
+                        if name == "import":
+                            if arg_count != 1:
+                                raise HogVMException("Function import requires exactly 1 argument")
+                            module_name = pop_stack()
+                            frame.ip = next_ip  # advance for when we return
+                            frame = CallFrame(
+                                ip=0,
+                                chunk=module_name,
+                                stack_start=len(stack),
+                                arg_len=0,
+                                closure=new_hog_closure(
+                                    new_hog_callable(
+                                        type="local",
+                                        name=module_name,
+                                        arg_count=0,
+                                        upvalue_count=0,
+                                        ip=0,
+                                        chunk=module_name,
+                                    )
+                                ),
+                            )
+                            set_chunk_bytecode()
+                            call_stack.append(frame)
+                            continue
+                        elif functions is not None and name in functions:
+                            if version == 0:
+                                args = [pop_stack() for _ in range(arg_count)]
+                            else:
+                                args = stack_keep_first_elements(len(stack) - arg_count)
+                            response = functions[name](*args)
+                            # Host functions may modify the containers passed to them
+                            cost_cache.clear()
+                            push_stack(response)
+                        elif name in STL:
+                            if version == 0:
+                                args = [pop_stack() for _ in range(arg_count)]
+                            else:
+                                args = stack_keep_first_elements(len(stack) - arg_count)
+                            push_stack(STL[name].fn(args, team, stdout, timeout_seconds))
+                        elif name in BYTECODE_STL:
+                            arg_names = BYTECODE_STL[name][0]
+                            if len(arg_names) != arg_count:
+                                raise HogVMException(f"Function {name} requires exactly {len(arg_names)} arguments")
+                            frame.ip = next_ip  # advance for when we return
+                            frame = CallFrame(
+                                ip=0,
+                                chunk=f"stl/{name}",
+                                stack_start=len(stack) - arg_count,
+                                arg_len=arg_count,
+                                closure=new_hog_closure(
+                                    new_hog_callable(
+                                        type="stl",
+                                        name=name,
+                                        arg_count=arg_count,
+                                        upvalue_count=0,
+                                        ip=0,
+                                        chunk=f"stl/{name}",
+                                    )
+                                ),
+                            )
+                            set_chunk_bytecode()
+                            call_stack.append(frame)
+                            continue  # resume the loop without incrementing frame.ip
+                        else:
+                            raise HogVMException(f"Unsupported function call: {name}")
+                case Op.CALL_LOCAL:
+                    check_timeout()
+                    closure = pop_stack()
+                    if not isinstance(closure, dict) or closure.get("__hogClosure__") is None:
+                        raise HogVMException(f"Invalid closure: {closure}")
+                    callable = closure.get("callable")
+                    if not isinstance(callable, dict) or callable.get("__hogCallable__") is None:
+                        raise HogVMException(f"Invalid callable: {callable}")
+                    args_length = operands[0]
+                    if args_length > MAX_FUNCTION_ARGS_LENGTH:
+                        raise HogVMException("Too many arguments")
+
+                    if callable.get("__hogCallable__") == "local":
+                        if callable["argCount"] > args_length:
+                            # TODO: specify minimum required arguments somehow
+                            for _ in range(callable["argCount"] - args_length):
+                                push_stack(None)
+                        elif callable["argCount"] < args_length:
+                            raise HogVMException(
+                                f"Too many arguments. Passed {args_length}, expected {callable['argCount']}"
+                            )
+                        frame.ip = next_ip  # advance for when we return
+                        frame = CallFrame(
+                            ip=callable["ip"],
+                            chunk=callable["chunk"],
+                            stack_start=len(stack) - callable["argCount"],
+                            arg_len=callable["argCount"],
+                            closure=closure,
                         )
-                    frame.ip += 1  # advance for when we return
-                    frame = CallFrame(
-                        ip=callable["ip"],
-                        chunk=callable["chunk"],
-                        stack_start=len(stack) - callable["argCount"],
-                        arg_len=callable["argCount"],
-                        closure=closure,
-                    )
-                    set_chunk_bytecode()
-                    call_stack.append(frame)
-                    continue  # resume the loop without incrementing frame.ip
+                        set_chunk_bytecode()
+                        call_stack.append(frame)
+                        continue  # resume the loop without incrementing frame.ip
 
-                elif callable.get("__hogCallable__") == "stl":
-                    if callable["name"] not in STL:
-                        raise HogVMException(f"Unsupported function call: {callable['name']}")
-                    stl_fn = STL[callable["name"]]
-                    if stl_fn.minArgs is not None and args_length < stl_fn.minArgs:
-                        raise HogVMException(
-                            f"Function {callable['name']} requires at least {stl_fn.minArgs} arguments"
-                        )
-                    if stl_fn.maxArgs is not None and args_length > stl_fn.maxArgs:
-                        raise HogVMException(f"Function {callable['name']} requires at most {stl_fn.maxArgs} arguments")
-                    if version == 0:
-                        args = [pop_stack() for _ in range(args_length)]
-                    else:
-                        args = list(reversed([pop_stack() for _ in range(args_length)]))
-                        if stl_fn.maxArgs is not None and len(args) < stl_fn.maxArgs:
-                            args = [*args, *([None] * (stl_fn.maxArgs - len(args)))]
-                    push_stack(stl_fn.fn(args, team, stdout, timeout.total_seconds()))
+                    elif callable.get("__hogCallable__") == "stl":
+                        if callable["name"] not in STL:
+                            raise HogVMException(f"Unsupported function call: {callable['name']}")
+                        stl_fn = STL[callable["name"]]
+                        if stl_fn.minArgs is not None and args_length < stl_fn.minArgs:
+                            raise HogVMException(
+                                f"Function {callable['name']} requires at least {stl_fn.minArgs} arguments"
+                            )
+                        if stl_fn.maxArgs is not None and args_length > stl_fn.maxArgs:
+                            raise HogVMException(
+                                f"Function {callable['name']} requires at most {stl_fn.maxArgs} arguments"
+                            )
+                        if version == 0:
+                            args = [pop_stack() for _ in range(args_length)]
+                        else:
+                            args = list(reversed([pop_stack() for _ in range(args_length)]))
+                            if stl_fn.maxArgs is not None and len(args) < stl_fn.maxArgs:
+                                args = [*args, *([None] * (stl_fn.maxArgs - len(args)))]
+                        push_stack(stl_fn.fn(args, team, stdout, timeout_seconds))
 
-                elif callable.get("__hogCallable__") == "async":
-                    raise HogVMException("Async functions are not supported")
+                    elif callable.get("__hogCallable__") == "async":
+                        raise HogVMException("Async functions are not supported")
 
-                else:
-                    raise HogVMException("Invalid callable")
+                    else:
+                        raise HogVMException("Invalid callable")
 
-            case Operation.TRY:
-                throw_stack.append(
-                    ThrowFrame(
-                        call_stack_len=len(call_stack), stack_len=len(stack), catch_ip=frame.ip + 1 + next_token()
+                case Op.TRY:
+                    throw_stack.append(
+                        ThrowFrame(call_stack_len=len(call_stack), stack_len=len(stack), catch_ip=operands[0])
                     )
-                )
-            case Operation.POP_TRY:
-                if throw_stack:
-                    throw_stack.pop()
-                else:
-                    raise HogVMException("Invalid operation POP_TRY: no try block to pop")
-            case Operation.THROW:
-                exception = pop_stack()
-                if not is_hog_error(exception):
-                    raise HogVMException("Can not throw: value is not of type Error")
-                if throw_stack:
-                    last_throw = throw_stack.pop()
-                    call_stack_len, stack_len, catch_ip = (
-                        last_throw.call_stack_len,
-                        last_throw.stack_len,
-                        last_throw.catch_ip,
-                    )
-                    stack_keep_first_elements(stack_len)
-                    call_stack = call_stack[0:call_stack_len]
-                    push_stack(exception)
-                    frame = call_stack[-1]
-                    set_chunk_bytecode()
-                    frame.ip = catch_ip
-                    continue
-                else:
-                    raise UncaughtHogVMException(
-                        type=exception.get("type"),
-                        message=exception.get("message"),
-                        payload=exception.get("payload"),
+                case Op.POP_TRY:
+                    if throw_stack:
+                        throw_stack.pop()
+                    else:
+                        raise HogVMException("Invalid operation POP_TRY: no try block to pop")
+                case Op.THROW:
+                    exception = pop_stack()
+                    if not is_hog_error(exception):
+                        raise HogVMException("Can not throw: value is not of type Error")
+                    if throw_stack:
+                        last_throw = throw_stack.pop()
+                        call_stack_len, stack_len, catch_ip = (
+                            last_throw.call_stack_len,
+                            last_throw.stack_len,
+                            last_throw.catch_ip,
+                        )
+                        stack_keep_first_elements(stack_len)
+                        call_stack = call_stack[0:call_stack_len]
+                        push_stack(exception)
+                        frame = call_stack[-1]
+                        set_chunk_bytecode()
+                        frame.ip = catch_ip
+                        continue
+                    else:
+                        raise UncaughtHogVMException(
+                            type=exception.get("type"),
+                            message=exception.get("message"),
+                            payload=exception.get("payload"),
+                        )
+                case _:
+                    raise HogVMException(
+                        f'Unexpected node while running bytecode in chunk "{frame.chunk}": {chunk_bytecode[frame.ip]}'
                     )
-            case _:
-                raise HogVMException(
-                    f'Unexpected node while running bytecode in chunk "{frame.chunk}": {chunk_bytecode[frame.ip]}'
-                )
 
-        frame.ip += 1
+            frame.ip = next_ip
 
-    return BytecodeResult(result=pop_stack() if len(stack) > 0 else None, stdout=stdout, bytecodes=bytecodes)
+        if result is None:
+            result = BytecodeResult(result=pop_stack() if len(stack) > 0 else None, stdout=stdout, bytecodes=bytecodes)
+        yield result
 
 
 def validate_bytecode(bytecode: list[Any] | dict, inputs: Optional[dict] = None) -> tuple[bool, Optional[str]]:
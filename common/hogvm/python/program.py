@@ -0,0 +1,239 @@
+import threading
+from collections import OrderedDict
+from copy import deepcopy
+from dataclasses import dataclass, field
+from hashlib import sha256
+from typing import Any, Optional
+
+import orjson
+
+from common.hogvm.python.operation import Operation, HOGQL_BYTECODE_IDENTIFIER, HOGQL_BYTECODE_IDENTIFIER_V0
+from common.hogvm.python.stl.bytecode import BYTECODE_STL
+from common.hogvm.python.utils import HogVMException
+
+PROGRAM_CACHE_SIZE = 1000
+
+# A decoded instruction: (opcode, operands, ip of the next instruction)
+Instruction = tuple[Any, tuple, int]
+
+# Number of inline operands that follow each opcode in the raw bytecode. Opcodes not listed here take none.
+# CLOSURE is special: its operand is followed by two more operands for every captured upvalue.
+OPERAND_COUNTS: dict[int, int] = {
+    Operation.STRING: 1,
+    Operation.INTEGER: 1,
+    Operation.FLOAT: 1,
+    Operation.AND: 1,
+    Operation.OR: 1,
+    Operation.GET_GLOBAL: 1,
+    Operation.GET_LOCAL: 1,
+    Operation.SET_LOCAL: 1,
+    Operation.DICT: 1,
+    Operation.ARRAY: 1,
+    Operation.TUPLE: 1,
+    Operation.JUMP: 1,
+    Operation.JUMP_IF_FALSE: 1,
+    Operation.JUMP_IF_STACK_NOT_NULL: 1,
+    Operation.DECLARE_FN: 3,
+    Operation.CALLABLE: 4,
+    Operation.CLOSURE: 1,
+    Operation.GET_UPVALUE: 1,
+    Operation.SET_UPVALUE: 1,
+    Operation.CALL_GLOBAL: 2,
+    Operation.CALL_LOCAL: 1,
+    Operation.TRY: 1,
+}
+KNOWN_OPERATIONS = {op.value for op in Operation}
+
+
+def decode_instruction(bytecode: list[Any], ip: int, chunk: str = "root") -> Instruction:
+    """Decode the instruction at `ip`, resolving relative jumps into absolute instruction pointers."""
+    op = bytecode[ip]
+    if op is None:
+        return (None, (), ip + 1)
+    try:
+        known = op in KNOWN_OPERATIONS
+    except TypeError:
+        known = False
+    if not known:
+        raise HogVMException(f'Unexpected node while running bytecode in chunk "{chunk}": {op}')
+
+    count = OPERAND_COUNTS.get(op, 0)
+    if op == Operation.CLOSURE and ip + 1 < len(bytecode) and isinstance(bytecode[ip + 1], int):
+        count += 2 * bytecode[ip + 1]
+    if ip + count > len(bytecode) - 1:
+        raise HogVMException("Unexpected end of bytecode")
+    operands = tuple(bytecode[ip + 1 : ip + 1 + count])
+    next_ip = ip + count + 1
+
+    if op in (Operation.JUMP, Operation.JUMP_IF_FALSE, Operation.JUMP_IF_STACK_NOT_NULL):
+        operands = (next_ip + operands[0],)
+    elif op == Operation.TRY:
+        # the catch offset is relative to the operand, not to the next instruction
+        operands = (ip + 1 + operands[0],)
+    elif op == Operation.DECLARE_FN:
+        # name, arg_len, end of body
+        operands = (operands[0], operands[1], next_ip + operands[2])
+    elif op == Operation.CALLABLE:
+        # name, arg_count, upvalue_count, end of body
+        operands = (operands[0], operands[1], operands[2], next_ip + operands[3])
+    elif op == Operation.CLOSURE:
+        # upvalue_count, ((is_local, index), ...)
+        pairs = tuple((operands[i], operands[i + 1]) for i in range(1, len(operands), 2))
+        operands = (operands[0], pairs)
+    return (op, operands, next_ip)
+
+
+@dataclass
+class ProgramChunk:
+    name: str
+    bytecode: list[Any]
+    globals: Optional[dict[str, Any]]
+    # ip of the first instruction, skipping the "_H", version header
+    start_ip: int
+    # decoded instructions, indexed by the ip of their opcode in `bytecode`
+    instructions: list[Optional[Instruction]]
+
+    @property
+    def last_op(self) -> int:
+        return len(self.bytecode) - 1
+
+    def instruction(self, ip: int) -> Instruction:
+        instruction = self.instructions[ip]
+        if instruction is None:
+            # Not reached by the linear decode pass (e.g. bytecode after an invalid opcode). Decode on demand,
+            # which raises the same errors the interpreter would have raised when reaching this point.
+            instruction = decode_instruction(self.bytecode, ip, self.name)
+            self.instructions[ip] = instruction
+        return instruction
+
+
+def compile_chunk(name: str, bytecode: list[Any], globals: Optional[dict[str, Any]]) -> ProgramChunk:
+    bytecode = list(bytecode)
+    start_ip = 0
+    if len(bytecode) > 0 and bytecode[0] == HOGQL_BYTECODE_IDENTIFIER:
+        start_ip = 2
+    elif len(bytecode) > 0 and bytecode[0] == HOGQL_BYTECODE_IDENTIFIER_V0:
+        start_ip = 1
+
+    instructions: list[Optional[Instruction]] = [None] * len(bytecode)
+    ip = start_ip
+    while ip < len(bytecode):
+        try:
+            instruction = decode_instruction(bytecode, ip, name)
+        except HogVMException:
+            # Leave the rest undecoded. Errors are raised at runtime, only if this code is ever reached.
+            break
+        instructions[ip] = instruction
+        ip = instruction[2]
+
+    return ProgramChunk(name=name, bytecode=bytecode, globals=globals, start_ip=start_ip, instructions=instructions)
+
+
+_stl_chunks: dict[str, ProgramChunk] = {}
+
+
+def get_stl_chunk(name: str) -> ProgramChunk:
+    chunk = _stl_chunks.get(name)
+    if chunk is None:
+        chunk = compile_chunk(f"stl/{name}", BYTECODE_STL[name][1], {})
+        _stl_chunks[name] = chunk
+    return chunk
+
+
+@dataclass
+class HogProgram:
+    """Bytecode that has been validated and decoded once, ready to be executed any number of times."""
+
+    bytecodes: dict[str, Any]
+    version: int
+    chunks: dict[str, ProgramChunk] = field(default_factory=dict)
+
+    def get_chunk(self, name: Optional[str]) -> ProgramChunk:
+        if not name or name == "root":
+            return self.chunks["root"]
+        if name.startswith("stl/") and name[4:] in BYTECODE_STL:
+            return get_stl_chunk(name[4:])
+        chunk = self.chunks.get(name)
+        if chunk is None:
+            raise HogVMException(f"Unknown chunk: {name}")
+        return chunk
+
+
+def compile_program(input: list[Any] | dict) -> HogProgram:
+    bytecodes = input if isinstance(input, dict) else {"root": {"bytecode": input}}
+    root_bytecode = bytecodes.get("root", {}).get("bytecode", []) or []
+
+    if (
+        not root_bytecode
+        or len(root_bytecode) == 0
+        or (root_bytecode[0] != HOGQL_BYTECODE_IDENTIFIER and root_bytecode[0] != HOGQL_BYTECODE_IDENTIFIER_V0)
+    ):
+        raise HogVMException(f"Invalid bytecode. Must start with '{HOGQL_BYTECODE_IDENTIFIER}'")
+    version = root_bytecode[1] if len(root_bytecode) >= 2 and root_bytecode[0] == HOGQL_BYTECODE_IDENTIFIER else 0
+
+    program = HogProgram(bytecodes=bytecodes, version=version)
+    # The root chunk uses the globals passed in at execution time
+    program.chunks["root"] = compile_chunk("root", root_bytecode, None)
+    for name, chunk in bytecodes.items():
+        if name == "root" or not chunk:
+            continue
+        program.chunks[name] = compile_chunk(name, chunk.get("bytecode", []), deepcopy(chunk.get("globals", {})))
+    return program
+
+
+def get_program_cache_key(input: list[Any] | dict) -> Optional[str]:
+    try:
+        return sha256(orjson.dumps(input, option=orjson.OPT_SORT_KEYS)).hexdigest()
+    except TypeError:
+        # Chunk globals that can't be serialized. Such programs are compiled on every call.
+        return None
+
+
+class ProgramCache:
+    """Thread safe LRU cache of compiled programs, keyed by the hash of their bytecode."""
+
+    def __init__(self, max_size: int = PROGRAM_CACHE_SIZE):
+        self.max_size = max_size
+        self._programs: OrderedDict[str, HogProgram] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, input: list[Any] | dict) -> HogProgram:
+        key = get_program_cache_key(input)
+        if key is None:
+            return compile_program(input)
+
+        with self._lock:
+            program = self._programs.get(key)
+            if program is not None:
+                self._programs.move_to_end(key)
+                self.hits += 1
+                return program
+            self.misses += 1
+
+        program = compile_program(input)
+        with self._lock:
+            self._programs[key] = program
+            self._programs.move_to_end(key)
+            while len(self._programs) > self.max_size:
+                self._programs.popitem(last=False)
+        return program
+
+    def clear(self) -> None:
+        with self._lock:
+            self._programs.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._programs)
+
+
+program_cache = ProgramCache()
+
+
+def get_program(input: "list[Any] | dict | HogProgram") -> HogProgram:
+    if isinstance(input, HogProgram):
+        return input
+    return program_cache.get(input)
@@ -1,15 +1,19 @@
 import json
+from datetime import timedelta
 from typing import Any, Optional
 from collections.abc import Callable
+from unittest.mock import patch
 
+import pytest
 
-from common.hogvm.python.execute import execute_bytecode, get_nested_value
+
+from common.hogvm.python.execute import execute_bytecode, execute_bytecode_batch, get_nested_value
 from common.hogvm.python.operation import (
     Operation as op,
     HOGQL_BYTECODE_IDENTIFIER as _H,
     HOGQL_BYTECODE_VERSION as VERSION,
 )
-from common.hogvm.python.utils import UncaughtHogVMException
+from common.hogvm.python.utils import CostCache, UncaughtHogVMException, HogVMRuntimeExceededException
 from posthog.hogql.compiler.bytecode import create_bytecode
 from posthog.hogql.parser import parse_expr, parse_program
 
@@ -1033,3 +1037,100 @@ class TestBytecodeExecute:
             }
         )
         assert res.result == "tomato"
+
+    def test_bytecode_batch(self):
+        bytecode = create_bytecode(parse_program("print(event.event); return event.properties.value * 2")).bytecode
+        events = [{"event": f"event {i}", "properties": {"value": i}} for i in range(5)]
+        results = list(execute_bytecode_batch(bytecode, ({"event": event} for event in events)))
+        assert [result.result for result in results] == [0, 2, 4, 6, 8]
+        assert [result.stdout for result in results] == [[f"event {i}"] for i in range(5)]
+
+    def test_bytecode_batch_is_lazy(self):
+        bytecode = create_bytecode(parse_expr("value + 1")).bytecode
+
+        def infinite_globals():
+            i = 0
+            while True:
+                yield {"value": i}
+                i += 1
+
+        results = execute_bytecode_batch(bytecode, infinite_globals())
+        assert [next(results).result for _ in range(3)] == [1, 2, 3]
+
+    def test_bytecode_batch_does_not_leak_state(self):
+        code = """
+            let counter := 0;
+            let increment := () -> { counter := counter + 1; return counter };
+            increment(); increment();
+            try { throw Error(properties.message) } catch (e) { print(e.message) }
+            return {'counter': counter, 'copy': properties}
+        """
+        bytecode = create_bytecode(parse_program(code)).bytecode
+        items = [{"properties": {"message": "one"}}, {"properties": {"message": "two"}}]
+        results = list(execute_bytecode_batch(bytecode, items))
+        assert [result.result for result in results] == [
+            {"counter": 2, "copy": {"message": "one"}},
+            {"counter": 2, "copy": {"message": "two"}},
+        ]
+        assert [result.stdout for result in results] == [["one"], ["two"]]
+
+    def test_bytecode_batch_continues_after_failed_items(self):
+        bytecode = create_bytecode(
+            parse_program("if (properties.fail) { throw Error('failed') } return properties.value")
+        ).bytecode
+        items = [
+            {"properties": {"value": 1}},
+            {"properties": {"fail": True}},
+            {"properties": {"value": 3}},
+        ]
+
+        results = list(execute_bytecode_batch(bytecode, items))
+
+        assert len(results) == 3
+        assert results[0].result == 1
+        assert isinstance(results[1], UncaughtHogVMException)
+        assert results[1].message == "failed"
+        assert results[2].result == 3
+
+    def test_bytecode_batch_timeouts(self):
+        bytecode = create_bytecode(
+            parse_program("let i := 0; while (i < properties.loops) { i := i + 1 } return i")
+        ).bytecode
+
+        # each item gets its own timeout
+        results = execute_bytecode_batch(
+            bytecode,
+            [{"properties": {"loops": 10}}, {"properties": {"loops": 100_000_000}}],
+            timeout=timedelta(milliseconds=100),
+        )
+        assert next(results).result == 10
+        assert isinstance(next(results), HogVMRuntimeExceededException)
+
+        # the whole batch is limited by total_timeout
+        results = execute_bytecode_batch(
+            bytecode,
+            ({"properties": {"loops": 10_000}} for _ in range(100_000)),
+            timeout=timedelta(seconds=5),
+            total_timeout=timedelta(milliseconds=100),
+        )
+        with pytest.raises(HogVMRuntimeExceededException) as e:
+            for result in results:
+                assert result.result == 10_000
+        assert e.value.timeout_seconds == 0.1
+
+    def test_bytecode_memory_accounting_is_linear(self):
+        size = 100
+        code = f"""
+            let arr := range({size});
+            for (let i := 1; i <= {size}; i := i + 1) {{
+                arr[i] := i * 2
+            }}
+            return arr[{size}]
+        """
+        bytecode = create_bytecode(parse_program(code)).bytecode
+
+        with patch.object(CostCache, "_walk", autospec=True, side_effect=CostCache._walk) as walk:
+            assert execute_bytecode(bytecode).result == size * 2
+
+        # the array and its elements are walked once when it's created, and its cost is updated in place afterwards
+        assert walk.call_count == size + 1
@@ -0,0 +1,91 @@
+import pytest
+
+from common.hogvm.python.execute import execute_bytecode, execute_program
+from common.hogvm.python.operation import (
+    Operation as op,
+    HOGQL_BYTECODE_IDENTIFIER as _H,
+    HOGQL_BYTECODE_VERSION as VERSION,
+)
+from common.hogvm.python.program import ProgramCache, compile_program, decode_instruction, get_program
+from common.hogvm.python.utils import HogVMException
+from posthog.hogql.compiler.bytecode import create_bytecode
+from posthog.hogql.parser import parse_expr, parse_program
+
+
+class TestProgram:
+    def test_decode_instruction(self):
+        bytecode = [_H, VERSION, op.STRING, "a", op.JUMP, 3, op.TRY, 4, op.CALL_GLOBAL, "concat", 2]
+        assert decode_instruction(bytecode, 2) == (op.STRING, ("a",), 4)
+        # jumps are resolved to absolute instruction pointers
+        assert decode_instruction(bytecode, 4) == (op.JUMP, (9,), 6)
+        assert decode_instruction(bytecode, 6) == (op.TRY, (11,), 8)
+        assert decode_instruction(bytecode, 8) == (op.CALL_GLOBAL, ("concat", 2), 11)
+
+    def test_decode_closure_upvalues(self):
+        bytecode = [op.CLOSURE, 2, True, 0, False, 1]
+        assert decode_instruction(bytecode, 0) == (op.CLOSURE, (2, ((True, 0), (False, 1))), 6)
+
+    def test_decode_errors(self):
+        with pytest.raises(HogVMException, match="Unexpected end of bytecode"):
+            decode_instruction([_H, VERSION, op.STRING], 2)
+        with pytest.raises(HogVMException, match='Unexpected node while running bytecode in chunk "root": 999'):
+            decode_instruction([_H, VERSION, 999], 2)
+
+    def test_invalid_bytecode_is_only_raised_when_reached(self):
+        program = compile_program([_H, VERSION, op.INTEGER, 1, op.RETURN, 999])
+        assert execute_program(program).result == 1
+
+        program = compile_program([_H, VERSION, op.INTEGER, 1, op.POP, 999])
+        with pytest.raises(HogVMException, match="Unexpected node"):
+            execute_program(program)
+
+    def test_compile_program_validates_header(self):
+        with pytest.raises(HogVMException, match="Invalid bytecode"):
+            compile_program([op.TRUE])
+        assert compile_program(["_h", op.TRUE]).version == 0
+        assert compile_program([_H, VERSION, op.TRUE]).version == VERSION
+
+    def test_program_can_be_executed_many_times(self):
+        bytecode = create_bytecode(
+            parse_program("let a := []; for (let i := 0; i < 5; i := i + 1) { a := arrayPushBack(a, i) } return a")
+        ).bytecode
+        program = compile_program(bytecode)
+        for _ in range(3):
+            assert execute_program(program).result == [0, 1, 2, 3, 4]
+
+    def test_program_globals(self):
+        program = compile_program(create_bytecode(parse_expr("properties.foo")).bytecode)
+        assert execute_program(program, {"properties": {"foo": "bar"}}).result == "bar"
+        assert execute_program(program, {"properties": {"foo": "baz"}}).result == "baz"
+
+    def test_program_cache(self):
+        cache = ProgramCache(max_size=2)
+        bytecode1 = [_H, VERSION, op.INTEGER, 1]
+        bytecode2 = [_H, VERSION, op.INTEGER, 2]
+        bytecode3 = [_H, VERSION, op.INTEGER, 3]
+
+        program1 = cache.get(bytecode1)
+        assert cache.get(list(bytecode1)) is program1
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        cache.get(bytecode2)
+        cache.get(bytecode1)  # bumps bytecode1, so bytecode2 is evicted next
+        cache.get(bytecode3)
+        assert len(cache) == 2
+        assert cache.get(bytecode1) is program1
+        assert cache.misses == 3
+        cache.get(bytecode2)
+        assert cache.misses == 4
+
+    def test_program_cache_distinguishes_types(self):
+        cache = ProgramCache()
+        assert execute_program(cache.get([_H, VERSION, op.INTEGER, 1])).result == 1
+        assert execute_program(cache.get([_H, VERSION, op.FLOAT, 1.0])).result == 1.0
+        assert len(cache) == 2
+
+    def test_get_program(self):
+        bytecode = [_H, VERSION, op.STRING, "cached"]
+        program = get_program(bytecode)
+        assert get_program(bytecode) is program
+        assert get_program(program) is program
+        assert execute_bytecode(bytecode).result == "cached"
@@ -0,0 +1,51 @@
+from common.hogvm.python.utils import CostCache, calculate_cost
+
+
+class TestCostCache:
+    def test_cost_matches_calculate_cost(self):
+        cache = CostCache()
+        values = [
+            None,
+            1,
+            "string",
+            [1, "two", [3, None]],
+            (1, 2),
+            {"a": [1, 2], "b": {"c": "d"}, None: True},
+        ]
+        for value in values:
+            assert cache.cost(value) == calculate_cost(value)
+            assert cache.cost(value) == calculate_cost(value)
+
+    def test_set_item_updates_parents(self):
+        cache = CostCache()
+        inner: list = [1, 2]
+        middle = {"inner": inner, "again": inner}
+        outer = [middle, "x"]
+        assert cache.cost(outer) == calculate_cost(outer)
+
+        cache.set_item(inner, 1, "a much longer string")
+        cache.set_item(middle, "new", [1, 2, 3])
+        cache.set_item(outer, 2, {"replaced": True})
+        for value in (inner, middle, outer):
+            assert cache.cost(value) == calculate_cost(value)
+
+    def test_cycles_are_not_cached(self):
+        cache = CostCache()
+        parent: dict = {"child": {"value": 1}}
+        child = parent["child"]
+        assert cache.cost(parent) == calculate_cost(parent)
+        assert len(cache) == 2
+
+        cache.set_item(child, "parent", parent)
+        assert cache.cost(parent) == calculate_cost(parent)
+        assert cache.cost(child) == calculate_cost(child)
+        assert len(cache) == 0
+
+    def test_sweep_drops_unreferenced_containers(self):
+        cache = CostCache()
+        kept = [1, 2, 3]
+        cache.cost(kept)
+        for i in range(CostCache.MIN_SWEEP_SIZE * 2):
+            cache.cost([i])
+        assert len(cache) < CostCache.MIN_SWEEP_SIZE
+        assert cache.cost(kept) == calculate_cost(kept)
@@ -1,4 +1,5 @@
 import re
+import sys
 from typing import Any
 
 
@@ -115,6 +116,166 @@ def calculate_cost(object, marked: set | None = None) -> int:
     return COST_PER_UNIT
 
 
+class CostCache:
+    """
+    Remembers the `calculate_cost` of containers, so pushing the same list or dict onto the stack again is O(1).
+
+    The cached costs are kept exact: `set_item` applies the change of a mutation to the container and to every cached
+    container that holds it. Containers that are part of a cycle are never cached, as their cost depends on where the
+    walk started. Cached containers are kept alive so their ids can't be reused. Those no longer referenced elsewhere
+    are swept out once the cache doubles in size.
+    """
+
+    MIN_SWEEP_SIZE = 1024
+
+    def __init__(self):
+        # id(container) -> [container, cost, {id(parent): number of references from parent}]
+        self._entries: dict[int, list] = {}
+        self._sweep_at = self.MIN_SWEEP_SIZE
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries = {}
+        self._sweep_at = self.MIN_SWEEP_SIZE
+
+    def cost(self, object) -> int:
+        if isinstance(object, str):
+            return COST_PER_UNIT + len(object)
+        if not isinstance(object, dict | list | tuple):
+            return COST_PER_UNIT
+        entry = self._entries.get(id(object))
+        if entry is not None:
+            return entry[1]
+        cost, _ = self._walk(object, set())
+        if len(self._entries) > self._sweep_at:
+            self._sweep()
+        return cost
+
+    def _walk(self, object, marked: set) -> tuple[int, bool]:
+        """Same as `calculate_cost`, but caching every acyclic container found. Returns (cost, is_acyclic)."""
+        if isinstance(object, str):
+            return COST_PER_UNIT + len(object), True
+        if not isinstance(object, dict | list | tuple):
+            return COST_PER_UNIT, True
+        object_id = id(object)
+        if object_id in marked:
+            return COST_PER_UNIT, False
+        entry = self._entries.get(object_id)
+        if entry is not None:
+            return entry[1], True
+
+        marked.add(object_id)
+        try:
+            cost = COST_PER_UNIT
+            acyclic = True
+            if isinstance(object, dict):
+                for key, value in object.items():
+                    key_cost, key_acyclic = self._walk(key, marked)
+                    value_cost, value_acyclic = self._walk(value, marked)
+                    cost += key_cost + value_cost
+                    acyclic = acyclic and key_acyclic and value_acyclic
+            else:
+                for value in object:
+                    value_cost, value_acyclic = self._walk(value, marked)
+                    cost += value_cost
+                    acyclic = acyclic and value_acyclic
+        finally:
+            marked.remove(object_id)
+
+        if acyclic:
+            self._entries[object_id] = [object, cost, {}]
+            for child in self._children(object):
+                self._add_parent(child, object_id)
+        return cost, acyclic
+
+    @staticmethod
+    def _children(object) -> list:
+        values = object.values() if isinstance(object, dict) else object
+        children = [value for value in values if isinstance(value, dict | list | tuple)]
+        if isinstance(object, dict):
+            children.extend(key for key in object if isinstance(key, tuple))
+        return children
+
+    def _add_parent(self, child, parent_id: int, count: int = 1) -> None:
+        parents = self._entries[id(child)][2]
+        parents[parent_id] = parents.get(parent_id, 0) + count
+        if parents[parent_id] == 0:
+            del parents[parent_id]
+
+    def _apply_delta(self, object_id: int, delta: int) -> None:
+        entry = self._entries[object_id]
+        entry[1] += delta
+        for parent_id, count in entry[2].items():
+            self._apply_delta(parent_id, delta * count)
+
+    def _invalidate(self, object_id: int) -> None:
+        entry = self._entries.pop(object_id, None)
+        if entry is None:
+            return
+        for child in self._children(entry[0]):
+            child_entry = self._entries.get(id(child))
+            if child_entry is not None:
+                child_entry[2].pop(object_id, None)
+        for parent_id in list(entry[2]):
+            self._invalidate(parent_id)
+
+    def _ancestors(self, object_id: int, found: set[int]) -> set[int]:
+        if object_id not in found:
+            found.add(object_id)
+            for parent_id in self._entries[object_id][2]:
+                self._ancestors(parent_id, found)
+        return found
+
+    def set_item(self, object, key, value) -> None:
+        """Set `object[key] = value`, keeping the cached costs up to date. Hog arrays are indexed from 1."""
+        object_id = id(object)
+        if object_id not in self._entries:
+            set_nested_value(object, [key], value)
+            return
+
+        if isinstance(object, dict):
+            had_key = key in object
+            old_value = object.get(key)
+        else:
+            had_key = True
+            old_value = object[key - 1] if isinstance(key, int) and 0 < key <= len(object) else None
+        value_cost = self.cost(value)
+        if isinstance(value, dict | list | tuple) and (
+            id(value) not in self._entries or id(value) in self._ancestors(object_id, set())
+        ):
+            # The value is, or is about to become, part of a cycle
+            self._invalidate(object_id)
+            set_nested_value(object, [key], value)
+            return
+        set_nested_value(object, [key], value)
+
+        if isinstance(value, dict | list | tuple):
+            self._add_parent(value, object_id)
+        if isinstance(old_value, dict | list | tuple) and had_key:
+            self._add_parent(old_value, object_id, -1)
+
+        delta = value_cost - (self.cost(old_value) if had_key else 0)
+        if isinstance(object, dict) and not had_key:
+            delta += self.cost(key)
+        self._apply_delta(object_id, delta)
+
+    def _sweep(self) -> None:
+        # Drop cached containers that nothing but this cache refers to. Dropping one can free its children.
+        # References held: the entry, the loop variable and getrefcount's argument.
+        changed = True
+        while changed:
+            changed = False
+            for object_id, entry in list(self._entries.items()):
+                container = entry[0]
+                if sys.getrefcount(container) <= 3 and not entry[2]:
+                    self._invalidate(object_id)
+                    changed = True
+                del container
+        self._sweep_at = max(self.MIN_SWEEP_SIZE, 2 * len(self._entries))
+
+
 def unify_comparison_types(left, right):
     if isinstance(left, int | float) and isinstance(right, str):
         return left, float(right)
@@ -0,0 +1,104 @@
+# isort: skip_file
+# Needs to be first to set up django environment
+from . import helpers  # noqa: F401
+import asyncio
+import datetime as dt
+import json
+import time
+
+import pyarrow as pa
+
+from posthog.temporal.batch_exports.temporary_file import RedshiftInsertBatchExportWriter
+from posthog.temporal.batch_exports.utils import cast_record_batch_json_columns
+
+ROWS = 20_000
+REDSHIFT_COLUMNS = ["uuid", "event", "distinct_id", "team_id", "timestamp", "properties", "set"]
+
+
+def _events_record_batch(rows: int) -> pa.RecordBatch:
+    timestamp = dt.datetime(2024, 1, 1, tzinfo=dt.UTC)
+    return cast_record_batch_json_columns(
+        pa.RecordBatch.from_pydict(
+            {
+                "uuid": pa.array([f"018d3b2e-0000-7000-8000-{index:012d}" for index in range(rows)]),
+                "event": pa.array(["$pageview" if index % 3 else "it's a custom event" for index in range(rows)]),
+                "distinct_id": pa.array([f"user-{index % 1000}" for index in range(rows)]),
+                "team_id": pa.array([2] * rows),
+                "timestamp": pa.array(
+                    [timestamp + dt.timedelta(microseconds=index) for index in range(rows)],
+                    type=pa.timestamp("us", tz="UTC"),
+                ),
+                "properties": pa.array(
+                    [
+                        json.dumps(
+                            {
+                                "$browser": "Chrome",
+                                "$current_url": f"https://posthog.com/docs/{index}?q=a\\b",
+                                "$screen_width": 1920,
+                                "$set": {"email": f"user-{index}@posthog.com"},
+                                "nested": [{"key": "value", "flag": True}, None],
+                            }
+                        )
+                        for index in range(rows)
+                    ]
+                ),
+                "set": pa.array([json.dumps({"plan": "free"}) if index % 2 else None for index in range(rows)]),
+                "_inserted_at": pa.array(
+                    [timestamp] * rows,
+                    type=pa.timestamp("us", tz="UTC"),
+                ),
+            }
+        ),
+        json_columns=("properties", "set"),
+    )
+
+
+async def _discard_on_flush(*args):
+    pass
+
+
+class RedshiftInsertWriterSuite:
+    """
+    Writes a record batch of events as Redshift INSERT queries, like the batch export does, but the queries are
+    discarded instead of run, so these don't need a Redshift cluster. The track_ benchmark reports rows per second.
+    """
+
+    timeout = 300.0
+    version = "v001"
+    params = [False, True]
+    param_names = ["use_super"]
+
+    def setup(self, use_super):
+        self.record_batch = _events_record_batch(ROWS)
+
+    def _write(self, writer):
+        async def write():
+            async with writer.open_temporary_file():
+                await writer.write_record_batch(self.record_batch, flush=False)
+
+        asyncio.run(write())
+
+    def _redshift_writer(self, use_super):
+        return RedshiftInsertBatchExportWriter(
+            max_bytes=16 * 1024 * 1024,
+            flush_callable=_discard_on_flush,
+            schema=self.record_batch.schema,
+            redshift_table="events",
+            redshift_schema="public",
+            table_columns=REDSHIFT_COLUMNS,
+            known_json_columns=["properties", "set"],
+            use_super=use_super,
+        )
+
+    def _rows_per_second(self, writer):
+        started_at = time.perf_counter()
+        self._write(writer)
+        return ROWS / (time.perf_counter() - started_at)
+
+    def time_redshift_insert_writer(self, use_super):
+        self._write(self._redshift_writer(use_super))
+
+    def track_redshift_insert_writer_rows_per_second(self, use_super):
+        return self._rows_per_second(self._redshift_writer(use_super))
+
+    track_redshift_insert_writer_rows_per_second.unit = "rows/s"  # type: ignore
@@ -0,0 +1,77 @@
+# isort: skip_file
+# Needs to be first to set up django environment
+from . import helpers  # noqa: F401
+from posthog.hogql.context import HogQLContext
+from posthog.hogql.database.database import create_hogql_database
+from posthog.hogql.parser import parse_select
+from posthog.hogql.printer import print_ast, to_printed_hogql
+from posthog.hogql.visitor import clone_expr
+from posthog.hogql_queries.insights.funnels.funnels_query_runner import FunnelsQueryRunner
+from posthog.models import Organization, Team
+from posthog.schema import (
+    BreakdownFilter,
+    DateRange,
+    EventPropertyFilter,
+    EventsNode,
+    FunnelsFilter,
+    FunnelsQuery,
+    PersonPropertyFilter,
+    PropertyOperator,
+)
+
+FUNNEL_STEPS = 12
+
+FUNNEL_QUERY = FunnelsQuery(
+    series=[
+        EventsNode(
+            event=f"step {index}",
+            properties=[
+                EventPropertyFilter(key="$browser", value=["Chrome", "Safari"], operator=PropertyOperator.EXACT),
+                EventPropertyFilter(key="$current_url", value="posthog", operator=PropertyOperator.ICONTAINS),
+            ],
+        )
+        for index in range(FUNNEL_STEPS)
+    ],
+    properties=[PersonPropertyFilter(key="email", value="@posthog.com", operator=PropertyOperator.NOT_ICONTAINS)],
+    dateRange=DateRange(date_from="2021-01-01", date_to="2021-10-01"),
+    breakdownFilter=BreakdownFilter(breakdown="$browser", breakdown_type="event"),
+    funnelsFilter=FunnelsFilter(funnelWindowInterval=14),
+)
+
+
+class HogQLCompilerSuite:
+    """
+    Compiles a large funnel query without running it, so these don't need a ClickHouse node.
+    Every pass of the compiler walks all of the query's nodes, which adds up for big insights.
+    """
+
+    timeout = 300.0
+    version = "v001"
+
+    def setup(self):
+        # :TRICKY: Data in benchmark servers has ID=2
+        team = Team.objects.filter(id=2).first()
+        if team is None:
+            organization = Organization.objects.create()
+            team = Team.objects.create(id=2, organization=organization, name="The Bakery")
+        self.team = team
+
+        self.hogql = to_printed_hogql(FunnelsQueryRunner(query=FUNNEL_QUERY, team=team).to_query(), team)
+        self.select_query = parse_select(self.hogql)
+        self.database = create_hogql_database(team=team)
+
+    def _print(self, select_query):
+        context = HogQLContext(team_id=self.team.pk, team=self.team, enable_select_queries=True, database=self.database)
+        print_ast(select_query, context=context, dialect="clickhouse")
+
+    def time_parse_funnel(self):
+        parse_select(self.hogql)
+
+    def time_clone_funnel(self):
+        clone_expr(self.select_query)
+
+    def time_resolve_and_print_funnel(self):
+        self._print(clone_expr(self.select_query))
+
+    def time_parse_resolve_and_print_funnel(self):
+        self._print(parse_select(self.hogql))
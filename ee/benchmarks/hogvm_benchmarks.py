@@ -0,0 +1,100 @@
+# isort: skip_file
+# Needs to be first to set up django environment
+from . import helpers  # noqa: F401
+import time
+from datetime import timedelta
+
+from common.hogvm.python.execute import execute_bytecode, execute_program
+from common.hogvm.python.program import compile_program, program_cache
+from posthog.hogql.compiler.bytecode import create_bytecode
+from posthog.hogql.parser import parse_program
+
+ITERATIONS = 2_000
+
+FILTER_PROGRAM = """
+    let results := [];
+    if (event.event == '$pageview' and event.properties.$current_url ilike '%posthog.com%') {
+        results := arrayPushBack(results, concat(person.properties.email, ' - ', event.distinct_id))
+    }
+    return length(results) > 0
+"""
+
+FILTER_GLOBALS = {
+    "event": {
+        "event": "$pageview",
+        "distinct_id": "d1",
+        "properties": {"$current_url": "https://posthog.com/docs"},
+    },
+    "person": {"properties": {"email": "max@posthog.com"}},
+}
+
+
+class HogVMProgramSuite:
+    """
+    Runs a small filter program the way hog functions do, once decoding the raw bytecode on every call, as before
+    programs were cached, and once reusing the compiled program. The track_ benchmarks report calls per second.
+    """
+
+    timeout = 300.0
+    version = "v001"
+
+    def setup(self):
+        self.bytecode = create_bytecode(parse_program(FILTER_PROGRAM)).bytecode
+        self.program = compile_program(self.bytecode)
+
+    def _run_raw_bytecode(self):
+        for _ in range(ITERATIONS):
+            program_cache.clear()
+            execute_bytecode(self.bytecode, FILTER_GLOBALS)
+
+    def _run_compiled_program(self):
+        for _ in range(ITERATIONS):
+            execute_program(self.program, FILTER_GLOBALS)
+
+    def _ops_per_second(self, run):
+        started_at = time.perf_counter()
+        run()
+        return ITERATIONS / (time.perf_counter() - started_at)
+
+    def time_execute_raw_bytecode(self):
+        self._run_raw_bytecode()
+
+    def time_execute_compiled_program(self):
+        self._run_compiled_program()
+
+    def track_execute_raw_bytecode_ops_per_second(self):
+        return self._ops_per_second(self._run_raw_bytecode)
+
+    def track_execute_compiled_program_ops_per_second(self):
+        return self._ops_per_second(self._run_compiled_program)
+
+    track_execute_raw_bytecode_ops_per_second.unit = "ops/s"  # type: ignore
+    track_execute_compiled_program_ops_per_second.unit = "ops/s"  # type: ignore
+
+
+class HogVMMemoryAccountingSuite:
+    """
+    Builds a large array by index assignment. Every iteration reads the array, so the time grows quadratically with
+    its size unless the memory cost of the array is updated incrementally.
+    """
+
+    timeout = 300.0
+    version = "v001"
+    params = [25_000, 100_000]
+    param_names = ["size"]
+
+    def setup(self, size):
+        self.bytecode = create_bytecode(
+            parse_program(
+                f"""
+                    let arr := range({size});
+                    for (let i := 1; i <= {size}; i := i + 1) {{
+                        arr[i] := i * 2
+                    }}
+                    return arr[{size}]
+                """
+            )
+        ).bytecode
+
+    def time_fill_array(self, size):
+        execute_bytecode(self.bytecode, timeout=timedelta(seconds=120))
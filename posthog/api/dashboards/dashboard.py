@@ -1,8 +1,10 @@
 import json
+from collections.abc import Iterator
 from typing import Any, Optional, cast
 
 import structlog
 from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 from django.utils.timezone import now
 from rest_framework import exceptions, serializers, viewsets
 from rest_framework.permissions import SAFE_METHODS, BasePermission
@@ -25,14 +27,29 @@ from posthog.api.shared import UserBasicSerializer
 from posthog.api.tagged_item import TaggedItemSerializerMixin, TaggedItemViewSetMixin
 from posthog.api.utils import action
 from posthog.event_usage import report_user_action
+from posthog.caching.calculate_results import calculate_cache_key_for_query_based_insight
+from posthog.clickhouse.client.executor import get_query_executor
+from posthog.exceptions_capture import capture_exception
 from posthog.helpers import create_dashboard_from_template
 from posthog.helpers.dashboard_templates import create_from_template
-from posthog.models import Dashboard, DashboardTile, Insight, Text
+from posthog.hogql_queries.legacy_compatibility.flagged_conversion_manager import conversion_to_query_based
+from posthog.hogql_queries.query_cache import QueryCacheManager
+from posthog.hogql_queries.query_runner import (
+    ExecutionMode,
+    execution_mode_from_refresh,
+    shared_insights_execution_mode,
+)
+from posthog.models import Dashboard, DashboardTile, Insight, Team, Text
 from posthog.models.dashboard_templates import DashboardTemplate
 from posthog.models.tagged_item import TaggedItem
 from posthog.models.user import User
+from posthog.renderers import SafeJSONRenderer
 from posthog.user_permissions import UserPermissionsSerializerMixin
-from posthog.utils import filters_override_requested_by_client, variables_override_requested_by_client
+from posthog.utils import (
+    filters_override_requested_by_client,
+    refresh_requested_by_client,
+    variables_override_requested_by_client,
+)
 from posthog.clickhouse.client.async_task_chain import task_chain_context
 from contextlib import nullcontext
 import posthoganalytics
@@ -455,8 +472,13 @@ class DashboardSerializer(DashboardBasicSerializer):
                 tile.layouts.get("sm", {}).get("x", 100),
             ),
         )
+        self._sorted_tiles = sorted_tiles
 
-        with task_chain_context() if chained_tile_refresh_enabled else nullcontext():
+        with (
+            task_chain_context() if chained_tile_refresh_enabled else nullcontext(),
+            # Fetch the cached results of all tiles from Redis at once, rather than tile by tile
+            QueryCacheManager.batched(self._get_tile_cache_keys(sorted_tiles, dashboard, team)),
+        ):
             for order, tile in enumerate(sorted_tiles):
                 self.context.update(
                     {
@@ -473,6 +495,87 @@ class DashboardSerializer(DashboardBasicSerializer):
 
         return serialized_tiles
 
+    def stream_tile_results(self, dashboard: Dashboard) -> Iterator[tuple[str, dict]]:
+        """
+        Calculates the insights of the dashboard's tiles concurrently, yielding each tile whose results differ from the
+        cached ones as soon as it's done. Meant for a dashboard that was serialized with cached results only.
+
+        Tiles are started in layout order, and each one is yielded with its `order`, so the client can place it.
+        """
+        request = self.context["request"]
+        execution_mode = execution_mode_from_refresh(refresh_requested_by_client(request))
+        if self.context.get("is_shared", False):
+            execution_mode = shared_insights_execution_mode(execution_mode)
+        if execution_mode == ExecutionMode.CACHE_ONLY_NEVER_CALCULATE:
+            return
+
+        cached_tiles = {tile["id"]: tile for tile in self.data["tiles"] or []}
+        insight_tiles = [(order, tile) for order, tile in enumerate(self._sorted_tiles) if tile.insight is not None]
+        context = {key: value for key, value in self.context.items() if key != "execution_mode"}
+
+        def serialize_tile(order_and_tile: tuple[int, DashboardTile]) -> ReturnDict:
+            order, tile = order_and_tile
+            # Each tile gets its own context, as serializers keep the tile they're working on in it
+            tile_context = {**context, "dashboard_tile": tile, "order": order}
+            return DashboardTileSerializer(tile, many=False, context=tile_context).data
+
+        team = self.context["get_team"]()
+        for index, future in get_query_executor().as_completed(serialize_tile, insight_tiles, team_id=team.pk):
+            order, tile = insight_tiles[index]
+            error = future.exception()
+            if error is not None:
+                if not isinstance(error, exceptions.APIException):
+                    capture_exception(error)
+                yield (
+                    "tile_error",
+                    {
+                        "id": tile.id,
+                        "order": order,
+                        "error": error.detail if isinstance(error, exceptions.APIException) else "Calculation failed",
+                    },
+                )
+                continue
+
+            tile_data = future.result()
+            if tile_data != cached_tiles.get(tile.id):
+                yield "tile", tile_data
+
+    def _get_tile_cache_keys(self, tiles: list[DashboardTile], dashboard: Dashboard, team: Team) -> list[str]:
+        request = self.context.get("request")
+        if request is None:
+            return []
+
+        execution_mode = execution_mode_from_refresh(refresh_requested_by_client(request))
+        if self.context.get("is_shared", False):
+            execution_mode = shared_insights_execution_mode(execution_mode)
+        execution_mode = self.context.get("execution_mode", execution_mode)
+        if execution_mode in (ExecutionMode.CALCULATE_BLOCKING_ALWAYS, ExecutionMode.CALCULATE_ASYNC_ALWAYS):
+            return []  # The cache won't be read
+
+        filters_override = filters_override_requested_by_client(request)
+        variables_override = variables_override_requested_by_client(request)
+        cache_keys = []
+        for tile in tiles:
+            if tile.insight is None:
+                continue
+            try:
+                with conversion_to_query_based(tile.insight):
+                    if not tile.insight.query:
+                        continue
+                    cache_key = calculate_cache_key_for_query_based_insight(
+                        tile.insight,
+                        team=team,
+                        dashboard=dashboard,
+                        filters_override=filters_override,
+                        variables_override=variables_override,
+                    )
+            except Exception:
+                # Any errors are surfaced when calculating the tile itself
+                continue
+            if cache_key:
+                cache_keys.append(cache_key)
+        return cache_keys
+
     def get_filters(self, dashboard: Dashboard) -> dict:
         request = self.context.get("request")
         if request:
@@ -507,6 +610,10 @@ class DashboardSerializer(DashboardBasicSerializer):
         return {**validated_data, "creation_mode": "default"}
 
 
+def _server_sent_event(event: str, data: Any) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + SafeJSONRenderer().render(data) + b"\n\n"
+
+
 class DashboardsViewSet(
     TeamAndOrgViewSetMixin,
     AccessControlViewSetMixin,
@@ -581,6 +688,38 @@ class DashboardsViewSet(
         serializer = DashboardSerializer(dashboard, context=self.get_serializer_context())
         return Response(serializer.data)
 
+    @action(methods=["GET"], detail=True)
+    @monitor(feature=Feature.DASHBOARD, endpoint="dashboard_stream_tiles", method="GET")
+    def stream_tiles(self, request: Request, *args: Any, **kwargs: Any) -> StreamingHttpResponse:
+        """
+        Loads the dashboard as server-sent events. The first event is the dashboard with the cached results of its
+        tiles, followed by a "tile" or "tile_error" event for each tile calculated according to the `refresh` param,
+        and a final "done" event.
+        """
+        dashboard = self.get_object()
+        dashboard.last_accessed_at = now()
+        dashboard.save(update_fields=["last_accessed_at"])
+        serializer = DashboardSerializer(
+            dashboard,
+            context={**self.get_serializer_context(), "execution_mode": ExecutionMode.CACHE_ONLY_NEVER_CALCULATE},
+        )
+        dashboard_data = serializer.data
+
+        def events() -> Iterator[bytes]:
+            yield _server_sent_event("dashboard", dashboard_data)
+            for event, data in serializer.stream_tile_results(dashboard):
+                yield _server_sent_event(event, data)
+            yield _server_sent_event("done", {})
+
+        return StreamingHttpResponse(
+            events(),
+            content_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no",
+            },
+        )
+
     @action(methods=["PATCH"], detail=True)
     def move_tile(self, request: Request, *args: Any, **kwargs: Any) -> Response:
         # TODO could things be rearranged so this is  PATCH call on a resource and not a custom endpoint?
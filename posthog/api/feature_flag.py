@@ -6,6 +6,7 @@ from datetime import datetime
 from django.db import transaction
 from django.db.models import QuerySet, Q, deletion, Prefetch
 from django.conf import settings
+from django.http import StreamingHttpResponse
 from drf_spectacular.utils import OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 from rest_framework import (
@@ -58,6 +59,7 @@ from posthog.models.feature_flag import (
     FeatureFlagDashboards,
     can_user_edit_feature_flag,
     get_all_feature_flags,
+    get_feature_flags_for_distinct_ids,
     get_user_blast_radius,
 )
 from posthog.models.feature_flag.flag_analytics import increment_request_count
@@ -86,6 +88,8 @@ SURVEY_TARGETING_FLAG_PREFIX = "survey-targeting-"
 
 MAX_PROPERTY_VALUES = 1000
 
+MAX_BULK_EVALUATION_DISTINCT_IDS = 10_000
+
 
 class FeatureFlagThrottle(BurstRateThrottle):
     # Throttle class that's scoped just to the local evaluation endpoint.
@@ -1129,6 +1133,50 @@ class FeatureFlagViewSet(
 
         return Response(flags_with_evaluation_reasons)
 
+    @action(
+        methods=["POST"],
+        detail=False,
+        throttle_classes=[FeatureFlagThrottle],
+        required_scopes=["feature_flag:read"],
+    )
+    def bulk_evaluation(self, request: request.Request, **kwargs):
+        distinct_ids = request.data.get("distinct_ids")
+        groups = request.data.get("groups") or {}
+        flag_keys = request.data.get("flag_keys")
+
+        if not isinstance(distinct_ids, list) or not all(isinstance(distinct_id, str) for distinct_id in distinct_ids):
+            raise exceptions.ValidationError(detail="distinct_ids must be a list of strings")
+        if len(distinct_ids) > MAX_BULK_EVALUATION_DISTINCT_IDS:
+            raise exceptions.ValidationError(
+                detail=f"At most {MAX_BULK_EVALUATION_DISTINCT_IDS} distinct_ids can be evaluated at once"
+            )
+        if not isinstance(groups, dict):
+            raise exceptions.ValidationError(detail="groups must be an object")
+        if flag_keys is not None and (
+            not isinstance(flag_keys, list) or not all(isinstance(flag_key, str) for flag_key in flag_keys)
+        ):
+            raise exceptions.ValidationError(detail="flag_keys must be a list of strings")
+
+        # Evaluated lazily, so the first distinct_ids are sent while the next batches are being evaluated
+        results = get_feature_flags_for_distinct_ids(
+            self.team, list(dict.fromkeys(distinct_ids)), groups, flag_keys=flag_keys
+        )
+        return StreamingHttpResponse(
+            (
+                json.dumps(
+                    {
+                        "distinct_id": distinct_id,
+                        "featureFlags": flags,
+                        "featureFlagPayloads": payloads,
+                        "errorsWhileComputingFlags": errors,
+                    }
+                )
+                + "\n"
+                for distinct_id, flags, payloads, errors in results
+            ),
+            content_type="application/x-ndjson",
+        )
+
     @action(methods=["POST"], detail=False)
     def user_blast_radius(self, request: request.Request, **kwargs):
         if "condition" not in request.data:
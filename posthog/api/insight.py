@@ -679,6 +679,8 @@ class InsightSerializer(InsightBasicSerializer):
 
                 if self.context.get("is_shared", False):
                     execution_mode = shared_insights_execution_mode(execution_mode)
+                # Set when only the cached results are wanted, e.g. before streaming the calculated ones of a dashboard
+                execution_mode = self.context.get("execution_mode", execution_mode)
 
                 return calculate_for_query_based_insight(
                     insight,
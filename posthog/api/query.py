@@ -10,7 +10,6 @@ from rest_framework import status, viewsets
 from rest_framework.exceptions import NotAuthenticated, ValidationError, Throttled
 from rest_framework.request import Request
 from rest_framework.response import Response
-from concurrent.futures import ThreadPoolExecutor
 
 from posthog import settings
 from posthog.clickhouse.client.limit import ConcurrencyLimitExceeded
@@ -53,14 +52,6 @@ from posthog.schema import (
 )
 from posthog.hogql.constants import LimitContext
 
-# Create a dedicated thread pool for query processing
-# Setting max_workers to ensure we don't overwhelm the system
-# while still allowing concurrent queries
-QUERY_EXECUTOR = ThreadPoolExecutor(
-    max_workers=50,  # 50 should be enough to have 200 simultaneous queries across clickhouse
-    thread_name_prefix="query_processor",
-)
-
 
 def _process_query_request(
     request_data: QueryRequest, team, client_query_id: str | None = None, user=None
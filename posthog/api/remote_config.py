@@ -1,8 +1,39 @@
 import re
-from django.http import JsonResponse, Http404, HttpResponse
+from typing import Optional
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
 from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
-from posthog.models.remote_config import RemoteConfig
+from posthog.models.remote_config import ENCODINGS, RemoteConfig, RemoteConfigArtifact
+
+
+def preferred_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Returns the encoding out of br and gzip with the highest q-value in an Accept-Encoding header, preferring br on ties,
+    or None if the client accepts neither. A q-value of 0 means the client doesn't accept the encoding.
+    """
+    qvalues: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, *params = (value.strip() for value in part.split(";"))
+        qvalue = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    qvalue = float(value)
+                except ValueError:
+                    qvalue = 0.0
+        if coding:
+            qvalues[coding.lower()] = qvalue
+
+    encoding: Optional[str] = None
+    best_qvalue = 0.0
+    for candidate in ENCODINGS:
+        qvalue = qvalues.get(candidate, qvalues.get("*", 0.0))
+        if qvalue > best_qvalue:
+            encoding, best_qvalue = candidate, qvalue
+    return encoding
 
 
 def add_vary_headers(response):
@@ -13,6 +44,33 @@ def add_vary_headers(response):
     return response
 
 
+def artifact_response(request, artifact: RemoteConfigArtifact, content_type: str) -> HttpResponse:
+    """
+    Serves the body in the best encoding the client accepts, or a 304 if the client already has it.
+    """
+    encoding = preferred_encoding(request.headers.get("Accept-Encoding", ""))
+
+    # Each encoding is a different representation, so it needs its own ETag
+    etag = f'"{artifact.content_hash}-{encoding}"' if encoding else f'"{artifact.content_hash}"'
+    # If-None-Match uses the weak comparison, so validators weakened by a proxy, e.g. after recompressing, still match
+    if_none_match = {tag.removeprefix("W/") for tag in parse_etags(request.headers.get("If-None-Match", ""))}
+
+    response: HttpResponse
+    if etag in if_none_match or "*" in if_none_match:
+        response = HttpResponseNotModified()
+    else:
+        if encoding:
+            response = HttpResponse(artifact.encode(encoding), content_type=content_type)
+            response["Content-Encoding"] = encoding
+        else:
+            response = HttpResponse(artifact.content, content_type=content_type)
+    response["ETag"] = etag
+
+    add_vary_headers(response)
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
+
 class BaseRemoteConfigAPIView(APIView):
     """
     Base class for RemoteConfig API views.
@@ -31,28 +89,28 @@ class BaseRemoteConfigAPIView(APIView):
 class RemoteConfigAPIView(BaseRemoteConfigAPIView):
     def get(self, request, token: str, *args, **kwargs):
         try:
-            resource = RemoteConfig.get_config_via_token(self.check_token(token), request=request)
+            artifact = RemoteConfig.get_artifact_via_token(self.check_token(token), "config", request=request)
         except RemoteConfig.DoesNotExist:
             raise Http404()
 
-        return add_vary_headers(JsonResponse(resource))
+        return artifact_response(request, artifact, content_type="application/json")
 
 
 class RemoteConfigJSAPIView(BaseRemoteConfigAPIView):
     def get(self, request, token: str, *args, **kwargs):
         try:
-            script_content = RemoteConfig.get_config_js_via_token(self.check_token(token), request=request)
+            artifact = RemoteConfig.get_artifact_via_token(self.check_token(token), "config.js", request=request)
         except RemoteConfig.DoesNotExist:
             raise Http404()
 
-        return add_vary_headers(HttpResponse(script_content, content_type="application/javascript"))
+        return artifact_response(request, artifact, content_type="application/javascript")
 
 
 class RemoteConfigArrayJSAPIView(BaseRemoteConfigAPIView):
     def get(self, request, token: str, *args, **kwargs):
         try:
-            script_content = RemoteConfig.get_array_js_via_token(self.check_token(token), request=request)
+            artifact = RemoteConfig.get_artifact_via_token(self.check_token(token), "array.js", request=request)
         except RemoteConfig.DoesNotExist:
             raise Http404()
 
-        return add_vary_headers(HttpResponse(script_content, content_type="application/javascript"))
+        return artifact_response(request, artifact, content_type="application/javascript")
@@ -1,3 +1,5 @@
+import json
+from typing import Any
 from unittest import mock
 from unittest.mock import ANY, MagicMock, patch
 
@@ -10,9 +12,11 @@ from rest_framework import status
 
 from posthog.api.dashboards.dashboard import DashboardSerializer
 from posthog.api.test.dashboards import DashboardAPI
+from posthog.caching.calculate_results import calculate_for_query_based_insight
 from posthog.constants import AvailableFeature
 from posthog.helpers.dashboard_templates import create_group_type_mapping_detail_dashboard
 from posthog.hogql_queries.legacy_compatibility.filter_to_query import filter_to_query
+from posthog.hogql_queries.query_runner import ExecutionMode
 from posthog.models import Dashboard, DashboardTile, Filter, Insight, Team, User
 from posthog.models.group_type_mapping import GroupTypeMapping
 from posthog.models.insight_variable import InsightVariable
@@ -257,6 +261,91 @@ class TestDashboard(APIBaseTest, QueryMatchingTest):
         )
         self.assertEqual(response["tiles"][0]["insight"]["result"][0]["count"], 0)
 
+    def test_cached_results_of_all_tiles_are_fetched_at_once(self):
+        dashboard = Dashboard.objects.create(team=self.team, name="dashboard")
+        filter_dict = {"events": [{"id": "$pageview"}], "insight": "TRENDS"}
+        for short_id in ("item11", "item22"):
+            item = Insight.objects.create(filters=filter_dict, team=self.team, short_id=short_id)
+            DashboardTile.objects.create(dashboard=dashboard, insight=item)
+            self.client.get(f"/api/projects/{self.team.id}/insights/{item.pk}?refresh=true")
+
+        with patch("posthog.hogql_queries.query_cache.get_safe_cache") as mock_get_safe_cache:
+            response = self.dashboard_api.get_dashboard(dashboard.pk)
+
+        mock_get_safe_cache.assert_not_called()
+        self.assertEqual(response["tiles"][0]["insight"]["result"][0]["count"], 0)
+        self.assertEqual(response["tiles"][1]["insight"]["result"][0]["count"], 0)
+
+    def _stream_tiles(self, dashboard_id: int, query_params: str = "") -> list[tuple[str, Any]]:
+        response = self.client.get(f"/api/projects/{self.team.id}/dashboards/{dashboard_id}/stream_tiles{query_params}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        events = []
+        for message in response.getvalue().decode().split("\n\n")[:-1]:
+            event_line, data_line = message.split("\n")
+            events.append((event_line.removeprefix("event: "), json.loads(data_line.removeprefix("data: "))))
+        return events
+
+    def test_stream_tiles_sends_cached_tiles_then_calculated_tiles(self):
+        dashboard = Dashboard.objects.create(team=self.team, name="dashboard")
+        filter_dict = {"events": [{"id": "$pageview"}], "insight": "TRENDS"}
+        cached_item = Insight.objects.create(filters=filter_dict, team=self.team, short_id="item11")
+        cached_tile = DashboardTile.objects.create(
+            dashboard=dashboard, insight=cached_item, layouts={"sm": {"x": 0, "y": 0}}
+        )
+        self.client.get(f"/api/projects/{self.team.id}/insights/{cached_item.pk}?refresh=true")
+        stale_item = Insight.objects.create(
+            filters={**filter_dict, "interval": "week"}, team=self.team, short_id="item22"
+        )
+        stale_tile = DashboardTile.objects.create(
+            dashboard=dashboard, insight=stale_item, layouts={"sm": {"x": 0, "y": 1}}
+        )
+
+        events = self._stream_tiles(dashboard.pk, "?refresh=blocking")
+
+        self.assertEqual([event for event, _ in events], ["dashboard", "tile", "done"])
+        dashboard_data = events[0][1]
+        self.assertEqual([tile["id"] for tile in dashboard_data["tiles"]], [cached_tile.id, stale_tile.id])
+        self.assertEqual(dashboard_data["tiles"][0]["insight"]["result"][0]["count"], 0)
+        self.assertEqual(dashboard_data["tiles"][1]["insight"]["result"], None)
+
+        tile_data = events[1][1]
+        self.assertEqual(tile_data["id"], stale_tile.id)
+        self.assertEqual(tile_data["order"], 1)
+        self.assertEqual(tile_data["insight"]["result"][0]["count"], 0)
+
+    def test_stream_tiles_without_refresh_only_sends_cached_tiles(self):
+        dashboard = Dashboard.objects.create(team=self.team, name="dashboard")
+        item = Insight.objects.create(filters={"events": [{"id": "$pageview"}]}, team=self.team)
+        DashboardTile.objects.create(dashboard=dashboard, insight=item)
+
+        events = self._stream_tiles(dashboard.pk)
+
+        self.assertEqual([event for event, _ in events], ["dashboard", "done"])
+        self.assertEqual(events[0][1]["tiles"][0]["insight"]["result"], None)
+
+    def test_stream_tiles_sends_errors_of_tiles(self):
+        dashboard = Dashboard.objects.create(team=self.team, name="dashboard")
+        item = Insight.objects.create(filters={"events": [{"id": "$pageview"}]}, team=self.team)
+        tile = DashboardTile.objects.create(dashboard=dashboard, insight=item)
+
+        def calculate(insight, *, execution_mode, **kwargs):
+            if execution_mode != ExecutionMode.CACHE_ONLY_NEVER_CALCULATE:
+                raise Exception("boom")
+            return calculate_for_query_based_insight(insight, execution_mode=execution_mode, **kwargs)
+
+        with patch("posthog.caching.calculate_results.calculate_for_query_based_insight", side_effect=calculate):
+            events = self._stream_tiles(dashboard.pk, "?refresh=blocking")
+
+        self.assertEqual(
+            events[1:],
+            [
+                ("tile_error", {"id": tile.id, "order": 0, "error": "Calculation failed"}),
+                ("done", {}),
+            ],
+        )
+
     # :KLUDGE: avoid making extra queries that are explicitly not cached in tests. Avoids false N+1-s.
     @override_settings(PERSON_ON_EVENTS_OVERRIDE=False, PERSON_ON_EVENTS_V2_OVERRIDE=False)
     @snapshot_postgres_queries
@@ -4321,6 +4321,62 @@ class TestFeatureFlag(APIBaseTest, ClickhouseTestMixin):
             },
         )
 
+    def test_bulk_evaluation(self):
+        FeatureFlag.objects.all().delete()
+        Person.objects.create(team_id=self.team.pk, distinct_ids=["1", "2"], properties={"beta-property": "beta-value"})
+        FeatureFlag.objects.create(
+            team=self.team,
+            key="beta-feature",
+            created_by=self.user,
+            filters={"groups": [{"properties": [{"key": "beta-property", "value": "beta-value", "type": "person"}]}]},
+        )
+        FeatureFlag.objects.create(
+            team=self.team,
+            key="payload-feature",
+            created_by=self.user,
+            filters={"groups": [{"rollout_percentage": None}], "payloads": {"true": '{"color": "blue"}'}},
+        )
+
+        response = self.client.post(
+            f"/api/projects/{self.team.pk}/feature_flags/bulk_evaluation",
+            {"distinct_ids": ["1", "3", "2", "1"]},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+
+        lines = response.getvalue().decode().splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            [
+                {
+                    "distinct_id": distinct_id,
+                    "featureFlags": {"beta-feature": distinct_id != "3", "payload-feature": True},
+                    "featureFlagPayloads": {"payload-feature": '{"color": "blue"}'},
+                    "errorsWhileComputingFlags": False,
+                }
+                for distinct_id in ["1", "3", "2"]
+            ],
+        )
+
+        response = self.client.post(
+            f"/api/projects/{self.team.pk}/feature_flags/bulk_evaluation",
+            {"distinct_ids": ["1"], "flag_keys": ["beta-feature"]},
+        )
+        lines = response.getvalue().decode().splitlines()
+        self.assertEqual(json.loads(lines[0])["featureFlags"], {"beta-feature": True})
+
+    def test_bulk_evaluation_validates_the_request(self):
+        for data in [
+            {},
+            {"distinct_ids": "1"},
+            {"distinct_ids": [1]},
+            {"distinct_ids": ["1"], "groups": ["organization"]},
+            {"distinct_ids": ["1"], "flag_keys": "beta-feature"},
+            {"distinct_ids": [str(i) for i in range(10_001)]},
+        ]:
+            response = self.client.post(f"/api/projects/{self.team.pk}/feature_flags/bulk_evaluation", data)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, data)
+
     def test_validation_person_properties(self):
         person_request = self._create_flag_with_properties(
             "person-flag",
@@ -1,8 +1,14 @@
+import gzip
 from unittest.mock import patch
+
+import brotli
 from inline_snapshot import snapshot
+from parameterized import parameterized
 from rest_framework import status
 from django.core.cache import cache
+from django.test import SimpleTestCase
 
+from posthog.api.remote_config import preferred_encoding
 from posthog.test.base import APIBaseTest, FuzzyInt, QueryMatchingTest
 
 # The remote config stuff plus plugin and hog function queries
@@ -142,3 +148,91 @@ class TestRemoteConfig(APIBaseTest, QueryMatchingTest):
         with self.assertNumQueries(0):
             response = self.client.get(f"/array/{self.team.api_token}/array.js", HTTP_ORIGIN="https://foo.example.com")
         assert response.status_code == status.HTTP_200_OK
+
+    def test_serves_compressed_config(self):
+        uncompressed = self.client.get(f"/array/{self.team.api_token}/config.js")
+        assert "Content-Encoding" not in uncompressed.headers
+        assert "Accept-Encoding" in uncompressed.headers["Vary"]
+
+        response = self.client.get(f"/array/{self.team.api_token}/config.js", HTTP_ACCEPT_ENCODING="gzip, deflate")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(response.content) == uncompressed.content
+
+        response = self.client.get(f"/array/{self.team.api_token}/config.js", HTTP_ACCEPT_ENCODING="gzip, deflate, br")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["Content-Encoding"] == "br"
+        assert brotli.decompress(response.content) == uncompressed.content
+
+    def test_does_not_serve_encodings_the_client_refuses(self):
+        uncompressed = self.client.get(f"/array/{self.team.api_token}/config.js")
+
+        response = self.client.get(f"/array/{self.team.api_token}/config.js", HTTP_ACCEPT_ENCODING="br;q=0, gzip")
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(response.content) == uncompressed.content
+
+        response = self.client.get(f"/array/{self.team.api_token}/config.js", HTTP_ACCEPT_ENCODING="gzip;q=0")
+        assert "Content-Encoding" not in response.headers
+        assert response.content == uncompressed.content
+
+    def test_not_modified_when_the_client_has_the_config(self):
+        response = self.client.get(f"/array/{self.team.api_token}/config", HTTP_ORIGIN="https://foo.example.com")
+        etag = response.headers["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                f"/array/{self.team.api_token}/config",
+                HTTP_ORIGIN="https://foo.example.com",
+                HTTP_IF_NONE_MATCH=etag,
+            )
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers["ETag"] == etag
+        assert response.content == b""
+
+        # A weak validator, e.g. from a proxy that recompressed the body, matches too
+        response = self.client.get(
+            f"/array/{self.team.api_token}/config",
+            HTTP_ORIGIN="https://foo.example.com",
+            HTTP_IF_NONE_MATCH=f'"other", W/{etag}',
+        )
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        # The config without session recording is a different body
+        response = self.client.get(
+            f"/array/{self.team.api_token}/config", HTTP_ORIGIN="https://bar.other.com", HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ETag"] != etag
+
+        # As is the compressed one
+        response = self.client.get(
+            f"/array/{self.team.api_token}/config",
+            HTTP_ORIGIN="https://foo.example.com",
+            HTTP_IF_NONE_MATCH=etag,
+            HTTP_ACCEPT_ENCODING="gzip",
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ETag"] != etag
+
+
+class TestPreferredEncoding(SimpleTestCase):
+    @parameterized.expand(
+        [
+            ("", None),
+            ("identity", None),
+            ("deflate", None),
+            ("gzip, deflate", "gzip"),
+            ("gzip, deflate, br", "br"),
+            ("GZIP", "gzip"),
+            ("br;q=0, gzip", "gzip"),
+            ("br; q=0.0, gzip;q=0", None),
+            ("gzip;q=1.0, br;q=0.5", "gzip"),
+            ("gzip;q=0.5, br;q=0.5", "br"),
+            ("*", "br"),
+            ("*;q=0.5, gzip", "gzip"),
+            ("*, br;q=0", "gzip"),
+            ("gzip;q=nonsense", None),
+        ]
+    )
+    def test_preferred_encoding(self, accept_encoding, expected):
+        assert preferred_encoding(accept_encoding) == expected
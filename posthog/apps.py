@@ -59,6 +59,9 @@ class PostHogConfig(AppConfig):
         if not posthoganalytics.disabled and posthoganalytics.feature_flag_definitions() is None:
             posthoganalytics.load_feature_flags()
 
+        # Connects the signals that invalidate cached HogQL schemas and printed queries
+        import posthog.hogql.database.schema_version  # noqa: F401
+
         from posthog.async_migrations.setup import setup_async_migrations
 
         if settings.SKIP_ASYNC_MIGRATIONS_SETUP:
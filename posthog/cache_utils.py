@@ -1,4 +1,8 @@
+from array import array
 from dataclasses import dataclass, field
+import math
+import struct
+import sys
 import threading
 from collections.abc import Callable
 from datetime import datetime, timedelta
@@ -85,3 +89,134 @@ class OrjsonJsonSerializer(BaseSerializer):
 
     def loads(self, value: bytes) -> Any:
         return orjson.loads(value)
+
+
+class ColumnarJsonSerializer(OrjsonJsonSerializer):
+    """
+    Stores long numeric lists (e.g. the `data` of trends series) as packed typed arrays, and long lists of strings
+    (e.g. the `days` and `labels` repeated in every breakdown series) only once, next to a JSON skeleton of the rest
+    of the value. This makes cached insight results smaller and faster to decode than plain JSON.
+
+    Values not written by this serializer are read as plain JSON, so it can replace `OrjsonJsonSerializer` for reading
+    existing entries.
+
+    Layout: MAGIC, header length (uint32), JSON header, numeric column buffers (little endian). The header holds the
+    value with every extracted list replaced by null, the distinct string lists, and for every extracted list its path
+    and either its type and length, or the index of its string list.
+    """
+
+    MAGIC = b"\x00phcol1"
+    # Shorter lists aren't worth the bookkeeping
+    min_column_length = 16
+
+    _typecodes: dict[type, str] = {int: "q", float: "d"}
+    _int_typecodes: list[tuple[str, int]] = [(typecode, array(typecode).itemsize * 8) for typecode in "bhiq"]
+    _string_typecode = "s"
+
+    def dumps(self, value: Any) -> bytes:
+        columns: list[tuple[list[str | int], array]] = []
+        string_columns: dict[tuple[str, ...], int] = {}
+        string_refs: list[tuple[list[str | int], int]] = []
+        skeleton = self._extract_columns(value, [], columns, string_columns, string_refs)
+        header = super().dumps(
+            {
+                "value": skeleton,
+                "strings": list(string_columns),
+                "columns": [
+                    *([path, self._string_typecode, index] for path, index in string_refs),
+                    *([path, column.typecode, len(column)] for path, column in columns),
+                ],
+            }
+        )
+        buffers = []
+        for _, column in columns:
+            if sys.byteorder != "little":
+                column.byteswap()
+            buffers.append(column.tobytes())
+        return b"".join([self.MAGIC, struct.pack("<I", len(header)), header, *buffers])
+
+    def loads(self, value: bytes) -> Any:
+        if not value.startswith(self.MAGIC):
+            return super().loads(value)
+
+        offset = len(self.MAGIC)
+        (header_length,) = struct.unpack_from("<I", value, offset)
+        offset += 4
+        header = orjson.loads(value[offset : offset + header_length])
+        offset += header_length
+
+        result = header["value"]
+        strings = header["strings"]
+        buffer = memoryview(value)
+        for path, typecode, length_or_index in header["columns"]:
+            if typecode == self._string_typecode:
+                # Every occurrence gets its own list, so that changing one doesn't change the others
+                column_value = list(strings[length_or_index])
+            else:
+                column = array(typecode)
+                end = offset + length_or_index * column.itemsize
+                column.frombytes(buffer[offset:end])
+                if sys.byteorder != "little":
+                    column.byteswap()
+                offset = end
+                column_value = column.tolist()
+
+            if not path:
+                return column_value
+            container = result
+            for key in path[:-1]:
+                container = container[key]
+            container[path[-1]] = column_value
+        return result
+
+    def _extract_columns(
+        self,
+        value: Any,
+        path: list[str | int],
+        columns: list[tuple[list[str | int], array]],
+        string_columns: dict[tuple[str, ...], int],
+        string_refs: list[tuple[list[str | int], int]],
+    ) -> Any:
+        if isinstance(value, dict):
+            if not all(isinstance(key, str) for key in value):
+                # Non-string keys are converted to strings by orjson, so paths to them can't be followed on read
+                return value
+            return {
+                key: self._extract_columns(item, [*path, key], columns, string_columns, string_refs)
+                for key, item in value.items()
+            }
+        if isinstance(value, list | tuple):
+            if len(value) >= self.min_column_length:
+                if all(type(item) is str for item in value):
+                    index = string_columns.setdefault(tuple(value), len(string_columns))
+                    string_refs.append((path, index))
+                    return None
+                column = self._to_column(value)
+                if column is not None:
+                    columns.append((path, column))
+                    return None
+            return [
+                self._extract_columns(item, [*path, index], columns, string_columns, string_refs)
+                for index, item in enumerate(value)
+            ]
+        return value
+
+    def _to_column(self, value: list | tuple) -> array | None:
+        # Only lists of a single exact type, so that ints stay ints and bools stay bools when read back
+        item_type = type(value[0])
+        typecode = self._typecodes.get(item_type)
+        if typecode is None:
+            return None
+        if not all(type(item) is item_type for item in value):
+            return None
+        if item_type is float and not all(math.isfinite(item) for item in value):
+            # JSON has no NaN or infinity, and turns them into null
+            return None
+        if item_type is int:
+            # Use the narrowest type that fits, most counts are small
+            low, high = min(value), max(value)
+            for int_typecode, bits in self._int_typecodes:
+                if -(2 ** (bits - 1)) <= low and high < 2 ** (bits - 1):
+                    return array(int_typecode, value)
+            return None
+        return array(typecode, value)
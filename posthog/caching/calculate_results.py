@@ -16,7 +16,7 @@ from posthog.models import (
     User,
 )
 from posthog.models.insight import generate_insight_filters_hash
-from posthog.schema import CacheMissResponse, DashboardFilter
+from posthog.schema import CacheMissResponse, DashboardFilter, HogQLVariable, QuerySchemaRoot
 
 if TYPE_CHECKING:
     from posthog.caching.fetch_from_cache import InsightResult
@@ -45,6 +45,49 @@ def calculate_cache_key(target: Union[DashboardTile, Insight]) -> Optional[str]:
     return None
 
 
+def _dashboard_overrides(
+    dashboard: Optional[Dashboard], filters_override: Optional[dict], variables_override: Optional[dict]
+) -> tuple[Optional[dict], Optional[dict]]:
+    dashboard_filters_json = (
+        filters_override if filters_override is not None else dashboard.filters if dashboard is not None else None
+    )
+    variables_override_json = (
+        variables_override if variables_override is not None else dashboard.variables if dashboard is not None else None
+    )
+    return dashboard_filters_json, variables_override_json
+
+
+def calculate_cache_key_for_query_based_insight(
+    insight: Insight,
+    *,
+    team: Team,
+    dashboard: Optional[Dashboard] = None,
+    filters_override: Optional[dict] = None,
+    variables_override: Optional[dict] = None,
+) -> Optional[str]:
+    """The cache key `calculate_for_query_based_insight` will look up for this insight, without running the query."""
+    dashboard_filters_json, variables_override_json = _dashboard_overrides(
+        dashboard, filters_override, variables_override
+    )
+
+    query: BaseModel = QuerySchemaRoot.model_validate(insight.query).root
+    query_runner = get_query_runner_or_none(query, team)
+    # Same as in `process_query_model`, queries like InsightVizNode are run via their source
+    while query_runner is None and isinstance(getattr(query, "source", None), BaseModel):
+        query = query.source  # type: ignore[attr-defined]
+        query_runner = get_query_runner_or_none(query, team)
+    if query_runner is None:
+        return None
+
+    if dashboard_filters_json:
+        query_runner.apply_dashboard_filters(DashboardFilter.model_validate(dashboard_filters_json))
+    if variables_override_json:
+        query_runner.apply_variable_overrides(
+            [HogQLVariable.model_validate(n) for n in variables_override_json.values()]
+        )
+    return query_runner.get_cache_key()
+
+
 def calculate_for_query_based_insight(
     insight: Insight,
     *,
@@ -62,19 +105,15 @@ def calculate_for_query_based_insight(
     if dashboard:
         tag_queries(dashboard_id=dashboard.pk)
 
+    dashboard_filters_json, variables_override_json = _dashboard_overrides(
+        dashboard, filters_override, variables_override
+    )
+
     response = process_response = process_query_dict(
         team,
         insight.query,
-        dashboard_filters_json=(
-            filters_override if filters_override is not None else dashboard.filters if dashboard is not None else None
-        ),
-        variables_override_json=(
-            variables_override
-            if variables_override is not None
-            else dashboard.variables
-            if dashboard is not None
-            else None
-        ),
+        dashboard_filters_json=dashboard_filters_json,
+        variables_override_json=variables_override_json,
         execution_mode=execution_mode,
         user=user,
         insight_id=insight.pk,
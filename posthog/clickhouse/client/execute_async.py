@@ -10,6 +10,7 @@ from rest_framework.exceptions import APIException, NotFound
 
 from posthog import celery, redis
 from posthog.clickhouse.client.async_task_chain import add_task_to_on_commit
+from posthog.clickhouse.client.executor import mark_query_cancelled
 from posthog.clickhouse.query_tagging import tag_queries
 from posthog.errors import CHQueryErrorTooManySimultaneousQueries, ExposedCHQueryError
 from posthog.hogql.constants import LimitContext
@@ -288,6 +289,9 @@ def cancel_query(team_id: int, query_id: str, dequeue_only: bool = False) -> str
     manager = QueryStatusManager(query_id, team_id)
     message = "Query task revoked"
 
+    # Skip the queries of the request that haven't started yet, wherever it's running
+    mark_query_cancelled(team_id, query_id)
+
     try:
         query_status = manager.get_query_status()
 
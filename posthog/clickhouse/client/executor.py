@@ -0,0 +1,255 @@
+"""
+Shared thread pool for query runners that run several ClickHouse queries to answer a single request.
+
+Every task runs with the query tags of the request, and closes its Django database connections when it's done. The
+number of tasks running at a time is capped per request and per team, so one big insight can't take over the pool,
+and tasks that haven't started yet are skipped once the request's query is cancelled with `cancel_query`.
+"""
+
+import threading
+import time
+import weakref
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Optional, TypeVar
+
+from django.conf import settings
+from django.db import connections
+from prometheus_client import Counter, Gauge, Histogram
+
+from posthog import redis
+from posthog.clickhouse import query_tagging
+from posthog.exceptions import QueryCancelled
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+QUERY_EXECUTOR_QUEUE_DEPTH = Gauge(
+    "posthog_query_executor_queue_depth",
+    "Query executor tasks submitted, but not started yet",
+)
+QUERY_EXECUTOR_WAIT_TIME = Histogram(
+    "posthog_query_executor_wait_time_seconds",
+    "Time from asking for a query executor task to run, to it starting, including waiting for concurrency limits",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf")),
+)
+QUERY_EXECUTOR_TASKS_COUNTER = Counter(
+    "posthog_query_executor_tasks_total",
+    "Query executor tasks by how they finished",
+    labelnames=["result"],
+)
+
+QUERY_CANCELLED_KEY_PREFIX = "query_cancelled"
+QUERY_CANCELLED_TTL_SECONDS = 60 * 20  # 20 minutes, same as the status of async queries
+
+
+def _query_cancelled_key(team_id: int, query_id: str) -> str:
+    return f"{QUERY_CANCELLED_KEY_PREFIX}:{team_id}:{query_id}"
+
+
+def mark_query_cancelled(team_id: int, query_id: str) -> None:
+    redis.get_client().set(_query_cancelled_key(team_id, query_id), 1, ex=QUERY_CANCELLED_TTL_SECONDS)
+
+
+def is_query_cancelled(team_id: int, query_id: str) -> bool:
+    return bool(redis.get_client().exists(_query_cancelled_key(team_id, query_id)))
+
+
+_local = threading.local()
+
+
+class QueryExecutor:
+    """
+    Runs a function over a list of items in parallel, returning the results in the same order.
+
+    Tasks never wait for other tasks of the pool, so the pool can't deadlock: calls made from within a task, like a
+    runner calculating other runners, run their items one after another in the task's thread.
+    """
+
+    def __init__(self, max_workers: int, max_concurrency_per_request: int, max_concurrency_per_team: int):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="query_executor")
+        self.max_concurrency_per_request = max_concurrency_per_request
+        self.max_concurrency_per_team = max_concurrency_per_team
+        # Semaphores are dropped once no request of the team is using them
+        self._team_semaphores: weakref.WeakValueDictionary[int, threading.Semaphore] = weakref.WeakValueDictionary()
+        self._team_semaphores_lock = threading.Lock()
+
+    def map(
+        self,
+        fn: Callable[[T], R],
+        items: Sequence[T],
+        *,
+        team_id: int,
+        max_concurrency: Optional[int] = None,
+    ) -> list[R]:
+        """
+        Calls `fn` for each of `items`. If any of the calls fails, the items that haven't started yet are skipped,
+        and the first error is raised once the running ones are done.
+        """
+        query_tags = query_tagging.get_query_tags().copy()
+        client_query_id: Optional[str] = query_tags.get("client_query_id")
+
+        # This exists so that we're not spawning threads during unit tests. We can't do
+        # this right now due to the lack of multithreaded support of Django
+        if len(items) <= 1 or settings.IN_UNIT_TESTING or getattr(_local, "in_executor", False):
+            results: list[R] = []
+            for item in items:
+                self._check_cancelled(team_id, client_query_id)
+                results.append(fn(item))
+            return results
+
+        concurrency = min(max_concurrency or self.max_concurrency_per_request, self.max_concurrency_per_request)
+        team_semaphore = self._get_team_semaphore(team_id)
+        futures: list[Future[R]] = []
+        running: set[Future[R]] = set()
+
+        for item in items:
+            if any(future.done() and future.exception() is not None for future in futures):
+                break
+
+            requested_at = time.monotonic()
+            while len(running) >= concurrency:
+                _, running = wait(running, return_when=FIRST_COMPLETED)
+            team_semaphore.acquire()
+
+            future = self._submit(fn, item, query_tags, team_id, client_query_id, requested_at, team_semaphore)
+            futures.append(future)
+            running.add(future)
+
+        wait(futures)
+        for future in futures:
+            error = future.exception()
+            if error is not None:
+                raise error
+        return [future.result() for future in futures]
+
+    def as_completed(
+        self,
+        fn: Callable[[T], R],
+        items: Sequence[T],
+        *,
+        team_id: int,
+        max_concurrency: Optional[int] = None,
+    ) -> Iterator[tuple[int, Future[R]]]:
+        """
+        Calls `fn` for each of `items`, yielding the index of each item along with its future as soon as it's done.
+        Items are started in order, and unlike with `map`, a failed call doesn't stop the other items.
+        """
+        query_tags = query_tagging.get_query_tags().copy()
+        client_query_id: Optional[str] = query_tags.get("client_query_id")
+
+        if len(items) <= 1 or settings.IN_UNIT_TESTING or getattr(_local, "in_executor", False):
+            for index, item in enumerate(items):
+                future: Future[R] = Future()
+                try:
+                    self._check_cancelled(team_id, client_query_id)
+                    future.set_result(fn(item))
+                except Exception as e:
+                    future.set_exception(e)
+                yield index, future
+            return
+
+        concurrency = min(max_concurrency or self.max_concurrency_per_request, self.max_concurrency_per_request)
+        team_semaphore = self._get_team_semaphore(team_id)
+        indexes: dict[Future[R], int] = {}
+        running: set[Future[R]] = set()
+
+        for index, item in enumerate(items):
+            requested_at = time.monotonic()
+            while len(running) >= concurrency:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for done_future in sorted(done, key=indexes.__getitem__):
+                    yield indexes.pop(done_future), done_future
+            team_semaphore.acquire()
+
+            future = self._submit(fn, item, query_tags, team_id, client_query_id, requested_at, team_semaphore)
+            indexes[future] = index
+            running.add(future)
+
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for done_future in sorted(done, key=indexes.__getitem__):
+                yield indexes.pop(done_future), done_future
+
+    def _submit(
+        self,
+        fn: Callable[[T], R],
+        item: T,
+        query_tags: dict,
+        team_id: int,
+        client_query_id: Optional[str],
+        requested_at: float,
+        team_semaphore: threading.Semaphore,
+    ) -> Future[R]:
+        """Submits the task once the team semaphore has been acquired for it, releasing it if that fails"""
+        QUERY_EXECUTOR_QUEUE_DEPTH.inc()
+        try:
+            return self._executor.submit(
+                self._run_task, fn, item, query_tags, team_id, client_query_id, requested_at, team_semaphore
+            )
+        except BaseException:
+            QUERY_EXECUTOR_QUEUE_DEPTH.dec()
+            team_semaphore.release()
+            raise
+
+    def _run_task(
+        self,
+        fn: Callable[[T], R],
+        item: T,
+        query_tags: dict,
+        team_id: int,
+        client_query_id: Optional[str],
+        requested_at: float,
+        team_semaphore: threading.Semaphore,
+    ) -> R:
+        QUERY_EXECUTOR_QUEUE_DEPTH.dec()
+        QUERY_EXECUTOR_WAIT_TIME.observe(time.monotonic() - requested_at)
+        _local.in_executor = True
+        query_tagging.reset_query_tags()
+        query_tagging.tag_queries(**query_tags)
+        try:
+            self._check_cancelled(team_id, client_query_id)
+            result = fn(item)
+            QUERY_EXECUTOR_TASKS_COUNTER.labels(result="success").inc()
+            return result
+        except QueryCancelled:
+            QUERY_EXECUTOR_TASKS_COUNTER.labels(result="cancelled").inc()
+            raise
+        except Exception:
+            QUERY_EXECUTOR_TASKS_COUNTER.labels(result="error").inc()
+            raise
+        finally:
+            _local.in_executor = False
+            query_tagging.reset_query_tags()
+            team_semaphore.release()
+            # Threads of the pool are reused, so don't keep a connection open per thread
+            connections.close_all()
+
+    def _check_cancelled(self, team_id: int, client_query_id: Optional[str]) -> None:
+        if client_query_id is not None and is_query_cancelled(team_id, client_query_id):
+            raise QueryCancelled()
+
+    def _get_team_semaphore(self, team_id: int) -> threading.Semaphore:
+        with self._team_semaphores_lock:
+            semaphore = self._team_semaphores.get(team_id)
+            if semaphore is None:
+                semaphore = threading.Semaphore(self.max_concurrency_per_team)
+                self._team_semaphores[team_id] = semaphore
+            return semaphore
+
+
+_query_executor: Optional[QueryExecutor] = None
+_query_executor_lock = threading.Lock()
+
+
+def get_query_executor() -> QueryExecutor:
+    global _query_executor
+    if _query_executor is None:
+        with _query_executor_lock:
+            if _query_executor is None:
+                _query_executor = QueryExecutor(
+                    max_workers=settings.QUERY_EXECUTOR_MAX_WORKERS,
+                    max_concurrency_per_request=settings.QUERY_EXECUTOR_MAX_CONCURRENCY_PER_REQUEST,
+                    max_concurrency_per_team=settings.QUERY_EXECUTOR_MAX_CONCURRENCY_PER_TEAM,
+                )
+    return _query_executor
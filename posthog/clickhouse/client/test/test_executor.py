@@ -0,0 +1,140 @@
+import threading
+import time
+
+from django.test import SimpleTestCase, override_settings
+
+from posthog.clickhouse.client.executor import QueryExecutor, mark_query_cancelled
+from posthog.clickhouse.query_tagging import get_query_tag_value, reset_query_tags, tag_queries
+from posthog.exceptions import QueryCancelled
+
+
+@override_settings(IN_UNIT_TESTING=False)
+class TestQueryExecutor(SimpleTestCase):
+    def setUp(self):
+        self.executor = QueryExecutor(max_workers=8, max_concurrency_per_request=3, max_concurrency_per_team=4)
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+        self.barrier = threading.Barrier(1)
+        reset_query_tags()
+
+    def tearDown(self):
+        reset_query_tags()
+
+    def track(self, value):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        # Tasks only finish once as many as `self.barrier` expects are running at the same time
+        self.barrier.wait(timeout=10)
+        with self.lock:
+            self.running -= 1
+        return value
+
+    def test_map_returns_results_in_order(self):
+        self.assertEqual(self.executor.map(lambda x: x * 2, list(range(10)), team_id=1), [x * 2 for x in range(10)])
+
+    def test_map_caps_concurrency_per_request(self):
+        self.barrier = threading.Barrier(3)
+        self.executor.map(self.track, list(range(12)), team_id=1)
+        self.assertLessEqual(self.max_running, 3)
+
+        self.max_running = 0
+        self.barrier = threading.Barrier(2)
+        self.executor.map(self.track, list(range(12)), team_id=1, max_concurrency=2)
+        self.assertLessEqual(self.max_running, 2)
+
+    def test_map_caps_concurrency_per_team(self):
+        self.barrier = threading.Barrier(4)
+        errors: list[Exception] = []
+
+        def run_request():
+            try:
+                self.executor.map(self.track, list(range(4)), team_id=1)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run_request) for _ in range(3)]
+        [thread.start() for thread in threads]  # type: ignore
+        [thread.join() for thread in threads]  # type: ignore
+
+        self.assertEqual(errors, [])
+        self.assertLessEqual(self.max_running, 4)
+
+    def test_as_completed_yields_tasks_as_they_finish(self):
+        others_completed = threading.Event()
+
+        def run(value):
+            if value == 0:
+                others_completed.wait(timeout=10)
+            return value * 2
+
+        completed = []
+        for index, future in self.executor.as_completed(run, [0, 1, 2], team_id=1):
+            completed.append((index, future.result()))
+            if len(completed) == 2:
+                others_completed.set()
+
+        self.assertEqual(completed[-1], (0, 0))
+        self.assertEqual(sorted(completed), [(0, 0), (1, 2), (2, 4)])
+
+    def test_as_completed_caps_concurrency(self):
+        self.barrier = threading.Barrier(3)
+        futures = dict(self.executor.as_completed(self.track, list(range(12)), team_id=1))
+        self.assertEqual([futures[index].result() for index in range(12)], list(range(12)))
+        self.assertLessEqual(self.max_running, 3)
+
+    def test_as_completed_runs_all_tasks_when_some_fail(self):
+        def run(value):
+            if value % 2:
+                raise ValueError(value)
+            return value
+
+        for override in [False, True]:
+            with override_settings(IN_UNIT_TESTING=override):
+                futures = dict(self.executor.as_completed(run, list(range(6)), team_id=1))
+
+            self.assertEqual(sorted(futures), list(range(6)))
+            self.assertEqual([futures[index].result() for index in [0, 2, 4]], [0, 2, 4])
+            self.assertTrue(all(isinstance(futures[index].exception(), ValueError) for index in [1, 3, 5]))
+
+    def test_tasks_run_with_the_query_tags_of_the_request(self):
+        tag_queries(team_id=1, client_query_id="abc")
+
+        tags = self.executor.map(lambda _: get_query_tag_value("client_query_id"), [1, 2, 3], team_id=1)
+
+        self.assertEqual(tags, ["abc", "abc", "abc"])
+
+    def test_first_error_is_raised_and_later_tasks_are_skipped(self):
+        started = []
+
+        def run(value):
+            started.append(value)
+            if value == 0:
+                raise ValueError("first")
+            time.sleep(0.02)
+            return value
+
+        with self.assertRaisesMessage(ValueError, "first"):
+            self.executor.map(run, list(range(20)), team_id=1)
+
+        self.assertLess(len(started), 20)
+
+    def test_nested_calls_run_in_the_calling_task(self):
+        def run(value):
+            thread = threading.current_thread()
+            return self.executor.map(lambda _: threading.current_thread() is thread, [1, 2, 3], team_id=1)
+
+        self.assertEqual(self.executor.map(run, [1, 2], team_id=1), [[True, True, True], [True, True, True]])
+
+    def test_cancelled_queries_dont_start_tasks(self):
+        tag_queries(team_id=1, client_query_id="cancelled-query")
+        mark_query_cancelled(1, "cancelled-query")
+        started: list[int] = []
+
+        with self.assertRaises(QueryCancelled):
+            self.executor.map(started.append, [1, 2, 3], team_id=1)
+        with override_settings(IN_UNIT_TESTING=True), self.assertRaises(QueryCancelled):
+            self.executor.map(started.append, [1, 2, 3], team_id=1)
+
+        self.assertEqual(started, [])
@@ -57,6 +57,12 @@ class QuerySizeExceeded(APIException):
     default_detail = "Query size exceeded."
 
 
+class QueryCancelled(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_code = "query_cancelled"
+    default_detail = "The query was cancelled."
+
+
 class ExceptionContext(TypedDict):
     request: HttpRequest
 
@@ -1,7 +1,9 @@
 import re
-from dataclasses import dataclass, field
+from collections.abc import Callable
+from copy import deepcopy
+from dataclasses import dataclass, field, fields
 
-from typing import TYPE_CHECKING, Literal, Optional, TypeVar
+from typing import TYPE_CHECKING, Any, Literal, Optional, TypeVar
 
 from posthog.hogql.constants import ConstantDataType
 from posthog.hogql.errors import NotImplementedError
@@ -12,27 +14,87 @@ if TYPE_CHECKING:
 # Given a string like "CorrectHorseBS", match the "H" and "B", so that we can convert this to "correct_horse_bs"
 camel_case_pattern = re.compile(r"(?<!^)(?<![A-Z])(?=[A-Z])")
 
+# The visit function of every (visitor class, node class) pair that has been visited, see `AST.accept`
+_dispatch_table: dict[tuple[type, type], Callable[[Any, "AST"], Any]] = {}
 
-@dataclass(kw_only=True)
+
+def visit_method_name(node_class: type) -> str:
+    name = camel_case_pattern.sub("_", node_class.__name__).lower()
+
+    # NOTE: Sync with ./test/test_visitor.py#test_hogql_visitor_naming_exceptions
+    replacements = {"hog_qlxtag": "hogqlx_tag", "hog_qlxattribute": "hogqlx_attribute", "uuidtype": "uuid_type"}
+    for old, new in replacements.items():
+        name = name.replace(old, new)
+    return f"visit_{name}"
+
+
+def _find_visit_function(visitor_class: type, node_class: type) -> Callable[[Any, "AST"], Any]:
+    method_name = visit_method_name(node_class)
+    visit = getattr(visitor_class, method_name, None) or getattr(visitor_class, "visit_unknown", None)
+    if visit is not None:
+        return visit
+
+    def not_implemented(visitor, node):
+        raise NotImplementedError(f"{visitor_class.__name__} has no method {method_name}")
+
+    return not_implemented
+
+
+# The generated deep copy function of every node class that has been copied, see `AST.__deepcopy__`
+_deepcopy_functions: dict[type, Callable[[Any, dict], Any]] = {}
+_ATOMIC_TYPES = (type(None), bool, int, float, str)
+
+
+def _generate_deepcopy_function(node_class: type) -> Callable[[Any, dict], Any]:
+    """
+    Slotted nodes have no `__dict__`, so `copy.deepcopy` would fall back to pickling them field by field.
+    Generate a function that copies the fields directly instead, like `dataclasses` generates `__init__`.
+    """
+    lines = [
+        "def deepcopy_node(self, memo):",
+        "    new = object_new(node_class)",
+        "    memo[id(self)] = new",
+    ]
+    for node_field in fields(node_class):
+        lines.append(f"    value = self.{node_field.name}")
+        lines.append(
+            f"    object_setattr(new, {node_field.name!r}, value if value.__class__ in atomic_types else deepcopy(value, memo))"
+        )
+    if node_class.__dictoffset__:
+        # Subclasses that aren't slotted can have attributes outside of their fields
+        lines.append("    new.__dict__.update(deepcopy(self.__dict__, memo))")
+    lines.append("    return new")
+
+    namespace: dict[str, Any] = {
+        "node_class": node_class,
+        "object_new": object.__new__,
+        "object_setattr": object.__setattr__,
+        "atomic_types": _ATOMIC_TYPES,
+        "deepcopy": deepcopy,
+    }
+    exec("\n".join(lines), namespace)
+    return namespace["deepcopy_node"]
+
+
+@dataclass(kw_only=True, slots=True)
 class AST:
     start: Optional[int] = field(default=None)
     end: Optional[int] = field(default=None)
 
     # This is part of the visitor pattern from visitor.py.
     def accept(self, visitor):
-        name = camel_case_pattern.sub("_", self.__class__.__name__).lower()
-
-        # NOTE: Sync with ./test/test_visitor.py#test_hogql_visitor_naming_exceptions
-        replacements = {"hog_qlxtag": "hogqlx_tag", "hog_qlxattribute": "hogqlx_attribute", "uuidtype": "uuid_type"}
-        for old, new in replacements.items():
-            name = name.replace(old, new)
-        method_name = f"visit_{name}"
-        if hasattr(visitor, method_name):
-            visit = getattr(visitor, method_name)
-            return visit(self)
-        if hasattr(visitor, "visit_unknown"):
-            return visitor.visit_unknown(self)
-        raise NotImplementedError(f"{visitor.__class__.__name__} has no method {method_name}")
+        # Every pass visits every node, so the visit method is only looked up once per visitor and node class
+        key = (visitor.__class__, self.__class__)
+        visit = _dispatch_table.get(key)
+        if visit is None:
+            visit = _dispatch_table[key] = _find_visit_function(*key)
+        return visit(visitor, self)
+
+    def __deepcopy__(self, memo):
+        deepcopy_node = _deepcopy_functions.get(self.__class__)
+        if deepcopy_node is None:
+            deepcopy_node = _deepcopy_functions[self.__class__] = _generate_deepcopy_function(self.__class__)
+        return deepcopy_node(self, memo)
 
     def to_hogql(self):
         from posthog.hogql.printer import print_prepared_ast
@@ -46,14 +108,14 @@ class AST:
 
     def __str__(self):
         if isinstance(self, Type):
-            return super().__str__()
+            return repr(self)
         return f"sql({self.to_hogql()})"
 
 
 _T_AST = TypeVar("_T_AST", bound=AST)
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class Type(AST):
     def get_child(self, name: str, context: "HogQLContext") -> "Type":
         raise NotImplementedError("Type.get_child not overridden")
@@ -68,12 +130,12 @@ class Type(AST):
         raise NotImplementedError(f"{self.__class__.__name__}.resolve_column_constant_type not overridden")
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class Expr(AST):
     type: Optional[Type] = field(default=None)
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class CTE(Expr):
     """A common table expression."""
 
@@ -83,7 +145,7 @@ class CTE(Expr):
     cte_type: Literal["column", "subquery"]
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class ConstantType(Type):
     data_type: ConstantDataType
     nullable: bool = field(default=True)
@@ -95,7 +157,7 @@ class ConstantType(Type):
         raise NotImplementedError("ConstantType.print_type not implemented")
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class UnknownType(ConstantType):
     data_type: ConstantDataType = field(default="unknown", init=False)
 
@@ -0,0 +1,104 @@
+import dataclasses
+import hashlib
+import functools
+from typing import TYPE_CHECKING, Any, Optional, Union
+
+from django.conf import settings
+from django.core.cache import cache
+from prometheus_client import Counter
+
+from posthog.exceptions_capture import capture_exception
+from posthog.git import get_git_commit_full
+from posthog.hogql import ast
+from posthog.hogql.constants import HogQLGlobalSettings, LimitContext
+from posthog.hogql.context import HogQLContext
+from posthog.hogql.database.schema_version import get_group_types_key, get_schema_version
+from posthog.hogql.visitor import clone_expr
+from posthog.schema import HogQLQueryModifiers
+
+if TYPE_CHECKING:
+    from posthog.models import Team
+
+COMPILED_QUERY_CACHE_COUNTER = Counter(
+    "posthog_hogql_compiled_query_cache_total",
+    "Lookups of printed ClickHouse SQL in the compiled HogQL query cache",
+    labelnames=["result"],
+)
+
+
+@dataclasses.dataclass
+class CompiledQuery:
+    hogql: str
+    columns: list[str]
+    clickhouse_sql: str
+    values: dict[str, Any]
+
+
+@functools.cache
+def _code_version() -> str:
+    # Printed SQL depends on the code that printed it, so never reuse it across deploys
+    return get_git_commit_full() or ""
+
+
+def is_cacheable(context: HogQLContext, debug: bool) -> bool:
+    """
+    Only queries whose printed SQL depends solely on what goes into `get_compiled_query_cache_key` can be cached.
+    A custom database, pre-filled values or a property swapper are not part of the key.
+    """
+    return (
+        settings.HOGQL_COMPILED_QUERY_CACHE_ENABLED
+        and not debug
+        and context.database is None
+        and not context.values
+        and context.property_swapper is None
+    )
+
+
+def get_compiled_query_cache_key(
+    *,
+    select_query: Union[ast.SelectQuery, ast.SelectSetQuery],
+    team: "Team",
+    context: HogQLContext,
+    modifiers: HogQLQueryModifiers,
+    query_settings: HogQLGlobalSettings,
+    limit_context: Optional[LimitContext],
+    pretty: bool,
+) -> str:
+    query = clone_expr(select_query, clear_types=True, clear_locations=True)
+    payload = "\n".join(
+        [
+            _code_version(),
+            str(team.pk),
+            str(get_schema_version(team.project_id)),
+            get_group_types_key(team.project_id),
+            str(team.timezone),
+            str(team.week_start_day),
+            modifiers.model_dump_json(),
+            query_settings.model_dump_json(),
+            str(limit_context),
+            str(pretty),
+            str(context.within_non_hogql_query),
+            str(context.limit_top_select),
+            str(context.output_format),
+            repr(context.globals),
+            repr(query),
+        ]
+    )
+    return f"hogql_compiled_query:{team.pk}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+def get_compiled_query(key: str) -> Optional[CompiledQuery]:
+    try:
+        compiled_query = cache.get(key)
+    except Exception as e:
+        capture_exception(e)
+        compiled_query = None
+    COMPILED_QUERY_CACHE_COUNTER.labels(result="hit" if compiled_query is not None else "miss").inc()
+    return compiled_query
+
+
+def set_compiled_query(key: str, compiled_query: CompiledQuery) -> None:
+    try:
+        cache.set(key, compiled_query, settings.HOGQL_COMPILED_QUERY_CACHE_TTL)
+    except Exception as e:
+        capture_exception(e)
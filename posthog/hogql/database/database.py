@@ -18,6 +18,7 @@ from pydantic import BaseModel, ConfigDict
 from posthog.exceptions_capture import capture_exception
 from posthog.hogql import ast
 from posthog.hogql.context import HogQLContext
+from posthog.hogql.database.database_cache import DATABASE_CACHE_COUNTER, get_database_cache, get_database_cache_key
 from posthog.hogql.database.models import (
     BooleanDatabaseField,
     DatabaseField,
@@ -374,10 +375,8 @@ def create_hogql_database(
     modifiers: Optional[HogQLQueryModifiers] = None,
     timings: Optional[HogQLTimings] = None,
 ) -> Database:
-    from posthog.hogql.database.s3_table import S3Table
     from posthog.hogql.query import create_default_modifiers_for_team
     from posthog.models import Team
-    from posthog.warehouse.models import DataWarehouseJoin, DataWarehouseSavedQuery
 
     if timings is None:
         timings = HogQLTimings()
@@ -397,6 +396,28 @@ def create_hogql_database(
 
     with timings.measure("modifiers"):
         modifiers = create_default_modifiers_for_team(team, modifiers)
+
+    database_cache = get_database_cache()
+    if database_cache is None:
+        return _build_hogql_database(team, modifiers, timings)
+
+    with timings.measure("database_cache"):
+        cache_key = get_database_cache_key(team, modifiers)
+        database = database_cache.get(cache_key)
+    DATABASE_CACHE_COUNTER.labels(result="hit" if database is not None else "miss").inc()
+    if database is not None:
+        return database
+
+    database = _build_hogql_database(team, modifiers, timings)
+    database_cache.set(cache_key, database)
+    return database
+
+
+def _build_hogql_database(team: "Team", modifiers: HogQLQueryModifiers, timings: HogQLTimings) -> Database:
+    from posthog.hogql.database.s3_table import S3Table
+    from posthog.warehouse.models import DataWarehouseJoin, DataWarehouseSavedQuery
+
+    with timings.measure("database"):
         database = Database(timezone=team.timezone, week_start_day=team.week_start_day)
 
         if modifiers.personsOnEventsMode == PersonsOnEventsMode.DISABLED:
@@ -741,13 +762,13 @@ def create_hogql_database(
                         for chain in person_field.chain:
                             if isinstance(table_or_field, ast.LazyJoin):
                                 table_or_field = table_or_field.resolve_table(
-                                    HogQLContext(team_id=team_id, database=database)
+                                    HogQLContext(team_id=team.pk, database=database)
                                 )
                                 if table_or_field.has_field(chain):
                                     table_or_field = table_or_field.get_field(chain)
                                     if isinstance(table_or_field, ast.LazyJoin):
                                         table_or_field = table_or_field.resolve_table(
-                                            HogQLContext(team_id=team_id, database=database)
+                                            HogQLContext(team_id=team.pk, database=database)
                                         )
                             elif isinstance(table_or_field, ast.Table):
                                 table_or_field = table_or_field.get_field(chain)
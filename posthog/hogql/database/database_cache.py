@@ -0,0 +1,89 @@
+import copy
+import threading
+from typing import TYPE_CHECKING, Optional
+
+from cachetools import TTLCache
+from django.conf import settings
+from prometheus_client import Counter
+
+from posthog.exceptions_capture import capture_exception
+from posthog.hogql.database.schema_version import get_group_types_key, get_schema_version
+from posthog.schema import HogQLQueryModifiers
+
+if TYPE_CHECKING:
+    from posthog.hogql.database.database import Database
+    from posthog.models import Team
+
+DATABASE_CACHE_COUNTER = Counter(
+    "posthog_hogql_database_cache_total",
+    "Lookups of built HogQL databases in the in-process cache",
+    labelnames=["result"],
+)
+
+
+class DatabaseCache:
+    """
+    Thread safe in-process cache of built HogQL databases.
+
+    Tables are mutable, and callers are free to modify the database they get, so the cache never hands out the
+    instance it holds. Every `get` returns a deep copy, which is still much cheaper than building the database again.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self._databases: TTLCache[str, Database] = TTLCache(maxsize=max_size, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional["Database"]:
+        with self._lock:
+            database = self._databases.get(key)
+        if database is None:
+            return None
+        return copy.deepcopy(database)
+
+    def set(self, key: str, database: "Database") -> None:
+        try:
+            database = copy.deepcopy(database)
+        except Exception as e:
+            # Tables that can't be copied can't be shared either
+            capture_exception(e)
+            return
+        with self._lock:
+            self._databases[key] = database
+
+    def clear(self) -> None:
+        with self._lock:
+            self._databases.clear()
+
+    def __len__(self) -> int:
+        return len(self._databases)
+
+
+_database_cache: Optional[DatabaseCache] = None
+_database_cache_lock = threading.Lock()
+
+
+def get_database_cache() -> Optional[DatabaseCache]:
+    global _database_cache
+    if not settings.HOGQL_DATABASE_CACHE_ENABLED:
+        return None
+    if _database_cache is None:
+        with _database_cache_lock:
+            if _database_cache is None:
+                _database_cache = DatabaseCache(
+                    max_size=settings.HOGQL_DATABASE_CACHE_MAX_SIZE, ttl=settings.HOGQL_DATABASE_CACHE_TTL
+                )
+    return _database_cache
+
+
+def get_database_cache_key(team: "Team", modifiers: HogQLQueryModifiers) -> str:
+    # The schema version changes whenever a model that the database is built from is saved or deleted through Django
+    return ":".join(
+        [
+            str(team.pk),
+            str(get_schema_version(team.project_id)),
+            get_group_types_key(team.project_id),
+            str(team.timezone),
+            str(team.week_start_day),
+            modifiers.model_dump_json(),
+        ]
+    )
@@ -0,0 +1,101 @@
+import json
+import time
+from typing import Any, Optional
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+# Models that are read when creating the HogQL database or printing a query for a project
+SCHEMA_MODELS = [
+    "Team",
+    "GroupTypeMapping",
+    "PropertyDefinition",
+    "Cohort",
+    "Action",
+    "DataWarehouseTable",
+    "DataWarehouseSavedQuery",
+    "DataWarehouseJoin",
+    "DataWarehouseCredential",
+    "ExternalDataSource",
+    "ExternalDataSchema",
+    "TeamRevenueAnalyticsConfig",
+]
+
+SCHEMA_VERSION_TTL = 30 * 24 * 60 * 60
+
+
+def _schema_version_cache_key(project_id: int) -> str:
+    return f"hogql_schema_version:{project_id}"
+
+
+def _initial_version() -> int:
+    # Start from the current time rather than from 0, so that a version is never reused if the key gets evicted
+    return time.time_ns() // 1000
+
+
+def get_schema_version(project_id: int) -> int:
+    """
+    Version of everything besides the query itself that goes into printing a HogQL query for a project: its team
+    settings, group types, property definitions, cohorts, actions and data warehouse tables, views and joins.
+    """
+    key = _schema_version_cache_key(project_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), SCHEMA_VERSION_TTL)
+        version = cache.get(key)
+    if version is None:
+        # The cache isn't working, so never match a previous version
+        return _initial_version()
+    return version
+
+
+def bump_schema_version(project_id: int) -> None:
+    key = _schema_version_cache_key(project_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), SCHEMA_VERSION_TTL)
+
+
+def get_group_types_key(project_id: int) -> str:
+    """
+    The group types of a project, for cache keys. Group types are created by the plugin server as events come in,
+    without the signals that bump the schema version, so they have to be read for every lookup.
+    """
+    from posthog.models.group_type_mapping import GroupTypeMapping
+
+    group_types = (
+        GroupTypeMapping.objects.filter(project_id=project_id)
+        .order_by("group_type_index")
+        .values_list("group_type_index", "group_type")
+    )
+    return json.dumps(list(group_types))
+
+
+def _get_project_id(instance: Any) -> Optional[int]:
+    from posthog.models import Team
+
+    if isinstance(instance, Team):
+        return instance.project_id
+    project_id = getattr(instance, "project_id", None)
+    if project_id is not None:
+        return project_id
+    team_id = getattr(instance, "team_id", None)
+    if team_id is None:
+        return None
+    return Team.objects.filter(id=team_id).values_list("project_id", flat=True).first()
+
+
+def schema_model_changed(sender, instance, **kwargs) -> None:
+    project_id = _get_project_id(instance)
+    if project_id is not None:
+        bump_schema_version(project_id)
+
+
+for model_name in SCHEMA_MODELS:
+    post_save.connect(
+        schema_model_changed, sender=f"posthog.{model_name}", dispatch_uid=f"hogql_schema_version_saved_{model_name}"
+    )
+    post_delete.connect(
+        schema_model_changed, sender=f"posthog.{model_name}", dispatch_uid=f"hogql_schema_version_deleted_{model_name}"
+    )
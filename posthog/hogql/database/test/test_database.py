@@ -7,7 +7,7 @@ from django.test import override_settings
 from parameterized import parameterized
 
 from posthog.hogql.constants import MAX_SELECT_RETURNED_ROWS
-from posthog.hogql.database.database import create_hogql_database, serialize_database
+from posthog.hogql.database.database import _build_hogql_database, create_hogql_database, serialize_database
 from posthog.hogql.database.models import (
     FieldTraverser,
     LazyJoin,
@@ -28,6 +28,7 @@ from posthog.schema import (
     DatabaseSchemaDataWarehouseTable,
     HogQLQueryModifiers,
     PersonsOnEventsMode,
+    SessionTableVersion,
 )
 from posthog.test.base import BaseTest, QueryMatchingTest, FuzzyInt
 from posthog.warehouse.models import DataWarehouseTable, DataWarehouseCredential, DataWarehouseSavedQuery
@@ -991,3 +992,59 @@ class TestDatabase(BaseTest, QueryMatchingTest):
         )
 
         print_ast(parse_select("SELECT events.distinct_id FROM subscriptions"), context, dialect="clickhouse")
+
+    @override_settings(HOGQL_DATABASE_CACHE_ENABLED=True)
+    def test_database_is_cached_until_the_schema_changes(self):
+        credentials = DataWarehouseCredential.objects.create(access_key="blah", access_secret="blah", team=self.team)
+        DataWarehouseTable.objects.create(
+            name="table_1",
+            format="Parquet",
+            team=self.team,
+            credential=credentials,
+            url_pattern="https://bucket.s3/data/*",
+            columns={"id": {"hogql": "StringDatabaseField", "clickhouse": "Nullable(String)", "schema_valid": True}},
+        )
+
+        with patch("posthog.hogql.database.database._build_hogql_database", wraps=_build_hogql_database) as build_mock:
+            db = create_hogql_database(team=self.team)
+            cached_db = create_hogql_database(team=self.team)
+            assert build_mock.call_count == 1
+            assert cached_db is not db
+            assert cached_db.has_table("table_1")
+
+            # changes to a database don't leak into the next one
+            cached_db.events.fields["some_field"] = StringDatabaseField(name="some_field")
+            assert "some_field" not in create_hogql_database(team=self.team).events.fields
+
+            create_hogql_database(
+                team=self.team, modifiers=HogQLQueryModifiers(sessionTableVersion=SessionTableVersion.V1)
+            )
+            assert build_mock.call_count == 2
+
+            DataWarehouseTable.objects.create(
+                name="table_2",
+                format="Parquet",
+                team=self.team,
+                credential=credentials,
+                url_pattern="https://bucket.s3/data/*",
+                columns={
+                    "id": {"hogql": "StringDatabaseField", "clickhouse": "Nullable(String)", "schema_valid": True}
+                },
+            )
+            assert create_hogql_database(team=self.team).has_table("table_2")
+            assert build_mock.call_count == 3
+
+    @override_settings(HOGQL_DATABASE_CACHE_ENABLED=True)
+    def test_cached_database_has_group_types_created_outside_django(self):
+        create_hogql_database(team=self.team)
+
+        # The plugin server inserts group types directly, so no signals are sent
+        GroupTypeMapping.objects.bulk_create(
+            [
+                GroupTypeMapping(
+                    team=self.team, project_id=self.team.project_id, group_type="company", group_type_index=0
+                )
+            ]
+        )
+
+        assert "company" in create_hogql_database(team=self.team).events.fields
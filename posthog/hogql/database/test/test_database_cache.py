@@ -0,0 +1,54 @@
+from django.test import SimpleTestCase
+
+from posthog.hogql.database.database import Database
+from posthog.hogql.database.database_cache import DatabaseCache
+from posthog.hogql.database.models import StringDatabaseField
+from posthog.hogql.database.s3_table import S3Table
+
+
+class TestDatabaseCache(SimpleTestCase):
+    def test_get_returns_a_copy(self):
+        cache = DatabaseCache(max_size=10, ttl=60)
+        database = Database(timezone="Europe/Berlin")
+        database.add_warehouse_tables(
+            table_1=S3Table(
+                name="table_1",
+                url="https://bucket.s3/data/*",
+                format="Parquet",
+                fields={"id": StringDatabaseField(name="id")},
+            )
+        )
+        cache.set("key", database)
+
+        cached = cache.get("key")
+        assert cached is not None
+        assert cached is not database
+        assert cached.get_timezone() == "Europe/Berlin"
+        assert cached.get_warehouse_tables() == ["table_1"]
+
+        cached.events.fields["some_field"] = StringDatabaseField(name="some_field")
+        cached.get_table("table_1").fields["other_field"] = StringDatabaseField(name="other_field")
+        cached.add_warehouse_tables(table_2=S3Table(name="table_2", url="", format="Parquet", fields={}))
+
+        cached_again = cache.get("key")
+        assert cached_again is not None
+        assert "some_field" not in cached_again.events.fields
+        assert "other_field" not in cached_again.get_table("table_1").fields
+        assert cached_again.get_warehouse_tables() == ["table_1"]
+
+    def test_changes_after_set_are_not_cached(self):
+        cache = DatabaseCache(max_size=10, ttl=60)
+        database = Database()
+        cache.set("key", database)
+        database.events.fields["some_field"] = StringDatabaseField(name="some_field")
+
+        cached = cache.get("key")
+        assert cached is not None
+        assert "some_field" not in cached.events.fields
+
+    def test_miss(self):
+        cache = DatabaseCache(max_size=10, ttl=60)
+        assert cache.get("key") is None
+        cache.set("key", Database())
+        cache.clear()
+        assert cache.get("key") is None
@@ -0,0 +1,33 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from posthog.hogql.database.schema_version import bump_schema_version, get_schema_version
+
+
+class TestSchemaVersion(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_version_is_stable_until_bumped(self):
+        version = get_schema_version(1)
+        self.assertEqual(get_schema_version(1), version)
+
+        bump_schema_version(1)
+        self.assertNotEqual(get_schema_version(1), version)
+        self.assertEqual(get_schema_version(1), get_schema_version(1))
+
+    def test_versions_are_per_project(self):
+        version = get_schema_version(2)
+        bump_schema_version(1)
+        self.assertEqual(get_schema_version(2), version)
+
+    def test_bump_without_a_version(self):
+        bump_schema_version(1)
+        version = get_schema_version(1)
+        bump_schema_version(1)
+        self.assertNotEqual(get_schema_version(1), version)
+
+    def test_evicted_version_is_not_reused(self):
+        version = get_schema_version(1)
+        cache.clear()
+        self.assertGreater(get_schema_version(1), version)
@@ -6,6 +6,13 @@ from posthog.clickhouse.client.connection import Workload
 from posthog.clickhouse.query_tagging import tag_queries
 from posthog.errors import ExposedCHQueryError
 from posthog.hogql import ast
+from posthog.hogql.compiled_query_cache import (
+    CompiledQuery,
+    get_compiled_query,
+    get_compiled_query_cache_key,
+    is_cacheable,
+    set_compiled_query,
+)
 from posthog.hogql.constants import HogQLGlobalSettings, LimitContext, get_default_limit_for_context
 from posthog.hogql.errors import ExposedHogQLError
 from posthog.hogql.filters import replace_filters
@@ -168,7 +175,7 @@ class HogQLQueryExecutor:
                         )
                     )
 
-    def _generate_clickhouse_sql(self):
+    def _get_clickhouse_settings(self) -> HogQLGlobalSettings:
         settings = self.settings or HogQLGlobalSettings()
         if self.limit_context in (
             LimitContext.EXPORT,
@@ -180,6 +187,10 @@ class HogQLQueryExecutor:
 
         if self.query_modifiers.formatCsvAllowDoubleQuotes is not None:
             settings.format_csv_allow_double_quotes = self.query_modifiers.formatCsvAllowDoubleQuotes
+        return settings
+
+    def _generate_clickhouse_sql(self):
+        settings = self._get_clickhouse_settings()
 
         try:
             self.clickhouse_context = dataclasses.replace(
@@ -267,12 +278,57 @@ class HogQLQueryExecutor:
         self._process_variables()
         self._process_placeholders()
         self._apply_limit()
+
+        compiled_query_cache_key: Optional[str] = None
+        if is_cacheable(self.context, bool(self.debug)):
+            with self.timings.measure("compiled_query_cache"):
+                compiled_query_cache_key = get_compiled_query_cache_key(
+                    select_query=self.select_query,
+                    team=self.team,
+                    context=self.context,
+                    modifiers=self.query_modifiers,
+                    query_settings=self._get_clickhouse_settings(),
+                    limit_context=self.limit_context,
+                    pretty=self.pretty if self.pretty is not None else True,
+                )
+                compiled_query = get_compiled_query(compiled_query_cache_key)
+            if compiled_query is not None:
+                self._load_compiled_query(compiled_query)
+                return self.clickhouse_sql, self.clickhouse_context
+
         with self.timings.measure("_generate_hogql"):
             self._generate_hogql()
         with self.timings.measure("_generate_clickhouse_sql"):
             self._generate_clickhouse_sql()
+
+        if compiled_query_cache_key is not None and self.error is None:
+            set_compiled_query(
+                compiled_query_cache_key,
+                CompiledQuery(
+                    hogql=self.hogql,
+                    columns=self.print_columns,
+                    clickhouse_sql=self.clickhouse_sql,
+                    values=self.clickhouse_context.values,
+                ),
+            )
         return self.clickhouse_sql, self.clickhouse_context
 
+    def _load_compiled_query(self, compiled_query: CompiledQuery):
+        # Both contexts share the values dict with `self.context`, just like when the query is printed
+        self.context.values.update(compiled_query.values)
+        self.hogql_context = dataclasses.replace(
+            self.context,
+            team_id=self.team.pk,
+            team=self.team,
+            enable_select_queries=True,
+            timings=self.timings,
+            modifiers=self.query_modifiers,
+        )
+        self.clickhouse_context = dataclasses.replace(self.hogql_context)
+        self.hogql = compiled_query.hogql
+        self.print_columns = compiled_query.columns
+        self.clickhouse_sql = compiled_query.clickhouse_sql
+
     def execute(self) -> HogQLQueryResponse:
         self.generate_clickhouse_sql()
         if self.clickhouse_sql is not None:
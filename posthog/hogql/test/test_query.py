@@ -11,6 +11,7 @@ from freezegun import freeze_time
 from posthog.errors import InternalCHQueryError
 from posthog.hogql import ast
 from posthog.hogql.errors import QueryError
+from posthog.hogql.printer import print_ast
 from posthog.hogql.property import property_to_expr
 from posthog.hogql.query import execute_hogql_query
 from posthog.hogql.test.utils import pretty_print_in_tests, pretty_print_response_in_tests
@@ -78,6 +79,35 @@ class TestQuery(ClickhouseTestMixin, APIBaseTest):
             assert pretty_print_response_in_tests(response, self.team.pk) == self.snapshot
             self.assertEqual(response.results, [(2, "random event")])
 
+    @override_settings(HOGQL_COMPILED_QUERY_CACHE_ENABLED=True)
+    def test_compiled_query_cache(self):
+        with freeze_time("2020-01-10"):
+            random_uuid = self._create_random_events()
+            query = "select count(), event from events where properties.random_uuid = {random_uuid} group by event"
+            placeholders = {"random_uuid": ast.Constant(value=random_uuid)}
+
+            with patch("posthog.hogql.query.print_ast", wraps=print_ast) as print_ast_mock:
+                response = execute_hogql_query(query, placeholders=placeholders, team=self.team)
+                cached_response = execute_hogql_query(query, placeholders=placeholders, team=self.team)
+            self.assertEqual(print_ast_mock.call_count, 1)
+            self.assertEqual(cached_response.clickhouse, response.clickhouse)
+            self.assertEqual(cached_response.hogql, response.hogql)
+            self.assertEqual(cached_response.columns, response.columns)
+            self.assertEqual(cached_response.results, [(2, "random event")])
+
+            # a different value is a different query
+            other_response = execute_hogql_query(
+                query, placeholders={"random_uuid": ast.Constant(value="other")}, team=self.team
+            )
+            self.assertEqual(other_response.results, [])
+
+            # changing the schema of the project invalidates the printed queries
+            self.team.week_start_day = 1
+            self.team.save()
+            with patch("posthog.hogql.query.print_ast", wraps=print_ast) as print_ast_mock:
+                execute_hogql_query(query, placeholders=placeholders, team=self.team)
+            self.assertEqual(print_ast_mock.call_count, 1)
+
     @pytest.mark.usefixtures("unittest_snapshot")
     def test_subquery(self):
         with freeze_time("2020-01-10"):
@@ -1,3 +1,6 @@
+from copy import deepcopy
+from typing import cast
+
 from posthog.hogql import ast
 from posthog.hogql.ast import UUIDType, HogQLXTag, HogQLXAttribute
 from posthog.hogql.errors import InternalHogQLError
@@ -158,3 +161,31 @@ class TestVisitor(BaseTest):
     def test_visit_interval_type(self):
         # Just ensure ``IntervalType`` can be visited without throwing ``NotImplementedError``
         TraversingVisitor().visit(ast.IntervalType())
+
+    def test_visit_methods_are_dispatched_per_visitor_class(self):
+        class ConstantVisitor(Visitor):
+            def visit_constant(self, node: ast.Constant):
+                return "constant"
+
+        class OverridingVisitor(ConstantVisitor):
+            def visit_constant(self, node: ast.Constant):
+                return "overridden"
+
+        class InheritingVisitor(ConstantVisitor):
+            pass
+
+        for _ in range(2):
+            self.assertEqual(ConstantVisitor().visit(ast.Constant(value=1)), "constant")
+            self.assertEqual(OverridingVisitor().visit(ast.Constant(value=1)), "overridden")
+            self.assertEqual(InheritingVisitor().visit(ast.Constant(value=1)), "constant")
+
+    def test_deepcopy(self):
+        node = cast(ast.Alias, parse_expr("if(properties.$browser = 'Chrome', [1, 2.5, null], {'a': true}) AS test"))
+        node.type = ast.ConstantType(data_type="unknown")
+
+        copied = deepcopy(node)
+        self.assertEqual(copied, node)
+        self.assertIsNot(copied, node)
+        self.assertIsNot(copied.expr, node.expr)
+        self.assertIsNot(copied.type, node.type)
+        self.assertFalse(hasattr(copied, "__dict__"))
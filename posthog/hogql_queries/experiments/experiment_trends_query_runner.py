@@ -1,7 +1,7 @@
 import json
 from zoneinfo import ZoneInfo
-from django.conf import settings
 from posthog.constants import ExperimentNoResultsErrorKeys
+from posthog.clickhouse.client.executor import get_query_executor
 from posthog.clickhouse.query_tagging import tag_queries
 from posthog.hogql import ast
 from posthog.hogql_queries.experiments import CONTROL_VARIANT_KEY
@@ -46,8 +46,7 @@ from posthog.schema import (
     TrendsQuery,
     TrendsQueryResponse,
 )
-from typing import Any, Optional
-import threading
+from typing import Optional
 from datetime import datetime, timedelta, UTC
 
 
@@ -250,42 +249,11 @@ class ExperimentTrendsQueryRunner(QueryRunner):
             experiment_feature_flag_key=self.feature_flag.key,
         )
 
-        shared_results: dict[str, Optional[Any]] = {"count_result": None, "exposure_result": None}
-        errors = []
-
-        def run(query_runner: TrendsQueryRunner, result_key: str, is_parallel: bool):
-            try:
-                result = query_runner.calculate()
-                shared_results[result_key] = result
-            except Exception as e:
-                errors.append(e)
-            finally:
-                if is_parallel:
-                    from django.db import connection
-
-                    # This will only close the DB connection for the newly spawned thread and not the whole app
-                    connection.close()
-
-        # This exists so that we're not spawning threads during unit tests
-        if settings.IN_UNIT_TESTING:
-            run(self.count_query_runner, "count_result", False)
-            run(self.exposure_query_runner, "exposure_result", False)
-        else:
-            jobs = [
-                threading.Thread(target=run, args=(self.count_query_runner, "count_result", True)),
-                threading.Thread(target=run, args=(self.exposure_query_runner, "exposure_result", True)),
-            ]
-            [j.start() for j in jobs]  # type: ignore
-            [j.join() for j in jobs]  # type: ignore
-
-        # Raise any errors raised in a separate thread
-        if errors:
-            raise errors[0]
-
-        count_result = shared_results["count_result"]
-        exposure_result = shared_results["exposure_result"]
-        if count_result is None or exposure_result is None:
-            raise ValueError("One or both query runners failed to produce a response")
+        count_result, exposure_result = get_query_executor().map(
+            lambda query_runner: query_runner.calculate(),
+            [self.count_query_runner, self.exposure_query_runner],
+            team_id=self.team.pk,
+        )
 
         self._validate_event_variants(count_result, exposure_result)
 
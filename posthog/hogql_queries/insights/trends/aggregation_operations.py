@@ -89,6 +89,13 @@ class AggregationOperations(DataWarehouseInsightQueryMixin):
 
         return parse_expr("count()")  # All "count per actor" get replaced during query orchestration
 
+    def select_conditional_aggregation(self, condition: ast.Expr) -> Optional[ast.Expr]:
+        """
+        `select_aggregation`, over only the rows matching `condition`, so several series can be aggregated in a single
+        scan. Returns None for aggregations that can't be made conditional without changing their results.
+        """
+        return _aggregate_if(self.select_aggregation(), condition)
+
     def actor_id(self) -> ast.Expr:
         if self.series.math == "unique_group" and self.series.math_group_type_index is not None:
             return parse_expr(f'e."$group_{int(self.series.math_group_type_index)}"')
@@ -550,3 +557,38 @@ class AggregationOperations(DataWarehouseInsightQueryMixin):
                 return self.parent_query_builder.build()
 
         return QueryOrchestrator()
+
+
+CONDITIONAL_AGGREGATIONS = ("sum", "avg", "min", "max", "quantile")
+
+
+def _aggregate_if(aggregation: ast.Expr, condition: ast.Expr) -> Optional[ast.Expr]:
+    if not isinstance(aggregation, ast.Call):
+        return None
+
+    # count() -> countIf(condition)
+    if aggregation.name == "count" and not aggregation.distinct and len(aggregation.args) == 0:
+        return ast.Call(name="countIf", args=[condition])
+
+    # count(DISTINCT x) -> count(DISTINCT if(condition, x, NULL)), as NULLs are never counted
+    if aggregation.name == "count" and aggregation.distinct and len(aggregation.args) == 1:
+        return ast.Call(
+            name="count",
+            distinct=True,
+            args=[ast.Call(name="if", args=[condition, aggregation.args[0], ast.Constant(value=None)])],
+        )
+
+    # ifNull(sum(toFloat(x)), 0) -> ifNull(sumIf(toFloat(x), condition), 0)
+    # Only nullable aggregations are safe, as they're NULL when no rows match, same as when there are no events at all.
+    if aggregation.name == "ifNull" and len(aggregation.args) == 2:
+        inner = aggregation.args[0]
+        if isinstance(inner, ast.Call) and inner.name in CONDITIONAL_AGGREGATIONS and not inner.distinct:
+            return ast.Call(
+                name="ifNull",
+                args=[
+                    ast.Call(name=f"{inner.name}If", params=inner.params, args=[*inner.args, condition]),
+                    aggregation.args[1],
+                ],
+            )
+
+    return None
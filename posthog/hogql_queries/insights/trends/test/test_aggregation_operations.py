@@ -4,6 +4,8 @@ from typing import Literal, Union
 import pytest
 
 from posthog.hogql import ast
+from posthog.hogql.parser import parse_expr
+from posthog.hogql.visitor import clear_locations
 from posthog.hogql_queries.insights.trends.aggregation_operations import (
     AggregationOperations,
 )
@@ -113,3 +115,33 @@ def test_requiring_query_orchestration(
     agg_ops = AggregationOperations(team, series, ChartDisplayType.ACTIONS_LINE_GRAPH, query_date_range, False)
     res = agg_ops.requires_query_orchestration()
     assert res == result
+
+
+@pytest.mark.parametrize(
+    "math,math_property,result",
+    [
+        [BaseMathType.TOTAL, None, "countIf(condition)"],
+        [BaseMathType.DAU, None, "count(DISTINCT if(condition, e.person_id, NULL))"],
+        [BaseMathType.UNIQUE_SESSION, None, 'count(DISTINCT if(condition, e."$session_id", NULL))'],
+        [PropertyMathType.SUM, "prop", "ifNull(sumIf(toFloat(properties.prop), condition), 0)"],
+        [PropertyMathType.P90, "prop", "ifNull(quantileIf(0.9)(toFloat(properties.prop), condition), 0)"],
+        # aggregations that aren't NULL for no rows would return a value where there were no events
+        [PropertyMathType.AVG, "$time", None],
+        ["hogql", None, None],
+    ],
+)
+@pytest.mark.django_db
+def test_select_conditional_aggregation(
+    math: Union[BaseMathType, PropertyMathType, Literal["hogql"]],
+    math_property: str,
+    result: str | None,
+):
+    team = Team()
+    series = EventsNode(event="$pageview", math=math, math_property=math_property, math_hogql="sum(1)")
+    query_date_range = QueryDateRange(date_range=None, interval=None, now=datetime.now(), team=team)
+
+    agg_ops = AggregationOperations(team, series, ChartDisplayType.ACTIONS_LINE_GRAPH, query_date_range, False)
+    res = agg_ops.select_conditional_aggregation(ast.Field(chain=["condition"]))
+    assert (clear_locations(res) if res is not None else None) == (
+        clear_locations(parse_expr(result)) if result is not None else None
+    )
@@ -25,6 +25,7 @@ from posthog.hogql_queries.insights.trends.trends_query_runner import (
     BREAKDOWN_OTHER_DISPLAY,
     TrendsQueryRunner,
 )
+from posthog.hogql_queries.query_runner import ExecutionMode
 from posthog.models import GroupTypeMapping
 from posthog.models.action.action import Action
 from posthog.models.cohort.cohort import Cohort
@@ -38,6 +39,7 @@ from posthog.schema import (
     BreakdownFilter,
     BreakdownItem,
     BreakdownType,
+    CachedTrendsQueryResponse,
     ChartDisplayType,
     CompareFilter,
     CompareItem,
@@ -1150,6 +1152,125 @@ class TestTrendsQueryRunner(ClickhouseTestMixin, APIBaseTest):
             response.results[1]["labels"],
         )
 
+    def test_trends_combined_series(self):
+        self._create_test_events()
+
+        series: list[EventsNode | ActionsNode] = [
+            EventsNode(event="$pageview"),
+            EventsNode(event="$pageleave", math=BaseMathType.DAU),
+            EventsNode(event="$pageview", math=PropertyMathType.SUM, math_property="prop"),
+            EventsNode(
+                event="$pageview",
+                math=PropertyMathType.MEDIAN,
+                math_property="prop",
+                properties=[EventPropertyFilter(key="$browser", operator=PropertyOperator.EXACT, value="Chrome")],
+            ),
+            # Can't be combined, so it's calculated with its own query
+            EventsNode(event="$pageview", math=BaseMathType.WEEKLY_ACTIVE),
+        ]
+
+        for display in [ChartDisplayType.ACTIONS_LINE_GRAPH, ChartDisplayType.BOLD_NUMBER]:
+            with self.subTest(display=display):
+
+                def create_runner(display=display):
+                    return self._create_query_runner(
+                        "2020-01-15",
+                        "2020-01-19",
+                        IntervalType.DAY,
+                        series,
+                        TrendsFilter(display=display),
+                        compare_filters=CompareFilter(compare=True),
+                    )
+
+                response = create_runner().calculate()
+                with override_settings(TRENDS_COMBINED_SERIES_QUERIES_ENABLED=True):
+                    combined_runner = create_runner()
+                    combined_response = combined_runner.calculate()
+
+                    # one query for each period's combined series, and one for each weekly active series
+                    self.assertEqual(4, len(combined_runner.to_queries()))
+
+                self.assertEqual(10, len(combined_response.results))
+                for result, combined_result in zip(response.results, combined_response.results):
+                    self.assertEqual(result["label"], combined_result["label"])
+                    self.assertEqual(result["compare_label"], combined_result["compare_label"])
+                    self.assertEqual(result["days"], combined_result["days"])
+                    self.assertEqual(result["data"], combined_result["data"])
+                    self.assertEqual(result["count"], combined_result["count"])
+                    self.assertEqual(result.get("aggregated_value"), combined_result.get("aggregated_value"))
+
+    @patch("posthog.hogql_queries.query_runner.settings.QUERY_INCREMENTAL_CALCULATION_ENABLED", True)
+    def test_trends_incremental_calculation(self):
+        _create_person(team_id=self.team.pk, distinct_ids=["p1"], properties={})
+        for timestamp in ["2020-01-10T12:00:00Z", "2020-01-14T12:00:00Z", "2020-01-15T09:00:00Z"]:
+            _create_event(team=self.team, event="$pageview", distinct_id="p1", timestamp=timestamp)
+
+        with freeze_time("2020-01-15T10:00:00Z"):
+            runner = self._create_query_runner("-7d", None, IntervalType.DAY, [EventsNode(event="$pageview")])
+            self.assertTrue(runner.can_calculate_incrementally())
+            runner.run(execution_mode=ExecutionMode.CALCULATE_BLOCKING_ALWAYS)
+
+        # An event arriving for an interval that was over when the results were calculated, and a new event
+        for timestamp in ["2020-01-13T12:00:00Z", "2020-01-15T15:00:00Z"]:
+            _create_event(team=self.team, event="$pageview", distinct_id="p1", timestamp=timestamp)
+        flush_persons_and_events()
+
+        with freeze_time("2020-01-15T20:00:00Z"):
+            runner = self._create_query_runner("-7d", None, IntervalType.DAY, [EventsNode(event="$pageview")])
+            response = runner.run(execution_mode=ExecutionMode.CALCULATE_BLOCKING_ALWAYS)
+            full_response = runner.calculate()
+
+        assert isinstance(response, CachedTrendsQueryResponse)
+        self.assertEqual(response.results[0]["data"], [0, 0, 1, 0, 0, 0, 1, 2])
+        self.assertEqual(response.results[0]["count"], 4)
+        self.assertEqual(response.results[0]["days"], full_response.results[0]["days"])
+        self.assertEqual(response.results[0]["labels"], full_response.results[0]["labels"])
+        self.assertEqual(response.results[0]["filter"], full_response.results[0]["filter"])
+        self.assertEqual(response.results[0]["action"], full_response.results[0]["action"])
+        self.assertEqual(response.hogql, full_response.hogql)
+        self.assertEqual(full_response.results[0]["data"], [0, 0, 1, 0, 0, 1, 1, 2])
+
+    def test_trends_incremental_calculation_eligibility(self):
+        def create_runner(series=None, trends_filters=None, breakdown=None):
+            return self._create_query_runner(
+                "-7d",
+                None,
+                IntervalType.DAY,
+                series or [EventsNode(event="$pageview", math=BaseMathType.DAU)],
+                trends_filters,
+                breakdown,
+            )
+
+        self.assertTrue(create_runner().can_calculate_incrementally())
+        self.assertFalse(
+            create_runner(
+                [EventsNode(event="$pageview", math=BaseMathType.WEEKLY_ACTIVE)]
+            ).can_calculate_incrementally()
+        )
+        self.assertFalse(create_runner(breakdown=BreakdownFilter(breakdown="$browser")).can_calculate_incrementally())
+        self.assertFalse(
+            create_runner(
+                trends_filters=TrendsFilter(display=ChartDisplayType.BOLD_NUMBER)
+            ).can_calculate_incrementally()
+        )
+        self.assertFalse(create_runner(trends_filters=TrendsFilter(formula="A*2")).can_calculate_incrementally())
+
+    def test_trends_combined_series_with_breakdown(self):
+        self._create_test_events()
+
+        with override_settings(TRENDS_COMBINED_SERIES_QUERIES_ENABLED=True):
+            runner = self._create_query_runner(
+                self.default_date_from,
+                self.default_date_to,
+                IntervalType.DAY,
+                [EventsNode(event="$pageview"), EventsNode(event="$pageleave")],
+                None,
+                BreakdownFilter(breakdown="$browser"),
+            )
+
+            # series with breakdowns are always calculated separately
+            self.assertEqual(2, len(runner.to_queries()))
+
     def test_trends_compare_weeks(self):
         self._create_test_events()
 
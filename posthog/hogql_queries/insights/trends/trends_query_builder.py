@@ -5,6 +5,7 @@ from posthog.hogql.constants import LimitContext, get_breakdown_limit_for_contex
 from posthog.hogql.parser import parse_expr, parse_select
 from posthog.hogql.property import action_to_expr, property_to_expr
 from posthog.hogql.timings import HogQLTimings
+from posthog.hogql.visitor import clone_expr
 from posthog.hogql_queries.insights.data_warehouse_mixin import (
     DataWarehouseInsightQueryMixin,
 )
@@ -72,6 +73,96 @@ class TrendsQueryBuilder(DataWarehouseInsightQueryMixin):
         inner_select = self._inner_select_query(inner_query=events_query, breakdown=breakdown)
         return self._outer_select_query(inner_query=inner_select, breakdown=breakdown)
 
+    def can_combine_series(self) -> bool:
+        """Whether this series can be calculated together with other series, see `build_combined_query`."""
+        return (
+            not isinstance(self.series, DataWarehouseNode)
+            and not self.breakdown.enabled
+            and not self._aggregation_operation.requires_query_orchestration()
+            and not self._aggregation_operation.aggregating_on_session_duration()
+            and not self._trends_display.should_wrap_inner_query()
+            and self._aggregation_operation.select_conditional_aggregation(ast.Constant(value=True)) is not None
+        )
+
+    @staticmethod
+    def build_combined_query(query_builders: list["TrendsQueryBuilder"]) -> ast.SelectQuery:
+        """
+        Calculates several series with a single scan of the events table, instead of a query per series. Each series
+        gets its own conditional aggregation, and its results are in the `total_<index>` column, with `index` being the
+        position of its builder in `query_builders`.
+
+        All builders must be for the same query and date range, and `can_combine_series` must hold for each of them.
+        """
+        builder = query_builders[0]
+        series_filters = [query_builder._series_filter() for query_builder in query_builders]
+
+        events_query = ast.SelectQuery(
+            select=[
+                ast.Alias(
+                    alias=f"total_{index}",
+                    expr=cast(
+                        ast.Expr,
+                        query_builder._aggregation_operation.select_conditional_aggregation(
+                            clone_expr(series_filters[index])
+                        ),
+                    ),
+                )
+                for index, query_builder in enumerate(query_builders)
+            ],
+            select_from=ast.JoinExpr(
+                table=builder._table_expr,
+                alias="e",
+                sample=ast.SampleExpr(sample_value=builder._sample_value()),
+            ),
+            where=ast.And(
+                exprs=[
+                    builder._events_filter(is_actors_query=False, breakdown=None, ignore_series_filters=True),
+                    ast.Or(exprs=series_filters),
+                ]
+            ),
+        )
+
+        if builder._trends_display.is_total_value():
+            return events_query
+
+        events_query.select.append(
+            ast.Alias(
+                alias="day_start",
+                expr=ast.Call(
+                    name=f"toStartOf{builder.query_date_range.interval_name.title()}",
+                    args=[ast.Field(chain=["timestamp"])],
+                ),
+            )
+        )
+        events_query.group_by = [ast.Field(chain=["day_start"])]
+
+        inner_query = ast.SelectQuery(
+            select=[
+                *(
+                    ast.Alias(alias=f"count_{index}", expr=parse_expr(f"sum(total_{index})"))
+                    for index in range(len(query_builders))
+                ),
+                ast.Field(chain=["day_start"]),
+            ],
+            select_from=ast.JoinExpr(table=events_query),
+            group_by=[ast.Field(chain=["day_start"])],
+            order_by=[ast.OrderExpr(expr=ast.Field(chain=["day_start"]), order="ASC")],
+        )
+
+        return ast.SelectQuery(
+            select=[
+                builder._get_date_subqueries(),
+                *(
+                    expr
+                    for index, query_builder in enumerate(query_builders)
+                    for expr in query_builder._total_select(
+                        count=ast.Field(chain=[f"count_{index}"]), alias_suffix=f"_{index}"
+                    )
+                ),
+            ],
+            select_from=ast.JoinExpr(table=inner_query),
+        )
+
     def _get_wrapper_query(
         self, events_query: ast.SelectQuery, breakdown: Breakdown
     ) -> ast.SelectQuery | ast.SelectSetQuery:
@@ -145,6 +236,64 @@ class TrendsQueryBuilder(DataWarehouseInsightQueryMixin):
             },
         )
 
+    def _total_select(self, count: ast.Expr, alias_suffix: str = "") -> list[ast.Expr]:
+        """The series' totals for every date, from the `count` of each `day_start` in the inner query."""
+        total_array = parse_expr(
+            f"""
+            arrayMap(
+                _match_date ->
+                    arraySum(
+                        arraySlice(
+                            groupArray(ifNull({{count}}, 0)),
+                            indexOf(groupArray(day_start) as _days_for_count{alias_suffix}, _match_date) as _index{alias_suffix},
+                            arrayLastIndex(x -> x = _match_date, _days_for_count{alias_suffix}) - _index{alias_suffix} + 1
+                        )
+                    ),
+                date
+            )
+        """,
+            {"count": count},
+        )
+
+        if self._trends_display.display_type == ChartDisplayType.ACTIONS_LINE_GRAPH_CUMULATIVE:
+            # fill zeros in with the previous value
+            total_array = parse_expr(
+                """
+            arrayFill(x -> x > 0, {total_array} )
+            """,
+                {"total_array": total_array},
+            )
+
+        if (
+            self.query.trendsFilter is not None
+            and self.query.trendsFilter.smoothingIntervals is not None
+            and self.query.trendsFilter.smoothingIntervals > 1
+        ):
+            rolling_average = ast.Alias(
+                alias=f"total{alias_suffix}",
+                expr=parse_expr(
+                    f"""
+                    arrayMap(
+                        i -> floor(arrayAvg(
+                            arraySlice(
+                                total_array{alias_suffix},
+                                greatest(i-{{smoothing_interval}} + 1, 1),
+                                least(i, {{smoothing_interval}})
+                            )
+                        )),
+                        arrayEnumerate(total_array{alias_suffix})
+                    )
+                """,
+                    {
+                        "smoothing_interval": ast.Constant(value=int(self.query.trendsFilter.smoothingIntervals)),
+                        "total_array": total_array,
+                    },
+                ),
+            )
+            return [ast.Alias(alias=f"total_array{alias_suffix}", expr=total_array), rolling_average]
+
+        return [ast.Alias(alias=f"total{alias_suffix}", expr=total_array)]
+
     def _get_events_subquery(
         self,
         no_modifications: Optional[bool],
@@ -313,69 +462,11 @@ class TrendsQueryBuilder(DataWarehouseInsightQueryMixin):
     def _outer_select_query(
         self, breakdown: Breakdown, inner_query: ast.SelectQuery
     ) -> ast.SelectQuery | ast.SelectSetQuery:
-        total_array = parse_expr(
-            """
-            arrayMap(
-                _match_date ->
-                    arraySum(
-                        arraySlice(
-                            groupArray(ifNull(count, 0)),
-                            indexOf(groupArray(day_start) as _days_for_count, _match_date) as _index,
-                            arrayLastIndex(x -> x = _match_date, _days_for_count) - _index + 1
-                        )
-                    ),
-                date
-            )
-        """
-        )
-
-        if self._trends_display.display_type == ChartDisplayType.ACTIONS_LINE_GRAPH_CUMULATIVE:
-            # fill zeros in with the previous value
-            total_array = parse_expr(
-                """
-            arrayFill(x -> x > 0, {total_array} )
-            """,
-                {"total_array": total_array},
-            )
-
         select: list[ast.Expr] = [
             self._get_date_subqueries(),
+            *self._total_select(count=ast.Field(chain=["count"])),
         ]
 
-        if (
-            self.query.trendsFilter is not None
-            and self.query.trendsFilter.smoothingIntervals is not None
-            and self.query.trendsFilter.smoothingIntervals > 1
-        ):
-            rolling_average = ast.Alias(
-                alias="total",
-                expr=parse_expr(
-                    """
-                    arrayMap(
-                        i -> floor(arrayAvg(
-                            arraySlice(
-                                total_array,
-                                greatest(i-{smoothing_interval} + 1, 1),
-                                least(i, {smoothing_interval})
-                            )
-                        )),
-                        arrayEnumerate(total_array)
-                    )
-                """,
-                    {
-                        "smoothing_interval": ast.Constant(value=int(self.query.trendsFilter.smoothingIntervals)),
-                        "total_array": total_array,
-                    },
-                ),
-            )
-            select = [
-                *select,
-                ast.Alias(alias="total_array", expr=total_array),
-                rolling_average,
-            ]
-        else:
-            select.append(ast.Alias(alias="total", expr=total_array))
-
         query = ast.SelectQuery(
             select=select,
             select_from=ast.JoinExpr(table=inner_query),
@@ -666,6 +757,7 @@ class TrendsQueryBuilder(DataWarehouseInsightQueryMixin):
         breakdown: Breakdown | None,
         ignore_breakdowns: bool = False,
         actors_query_time_frame: Optional[str] = None,
+        ignore_series_filters: bool = False,
     ) -> ast.Expr:
         series = self.series
         filters: list[ast.Expr] = []
@@ -690,7 +782,7 @@ class TrendsQueryBuilder(DataWarehouseInsightQueryMixin):
             )
 
         # Filter by event or action name
-        if not self._aggregation_operation.is_first_time_ever_math():
+        if not ignore_series_filters and not self._aggregation_operation.is_first_time_ever_math():
             event_or_action = self._event_or_action_where_expr()
             if event_or_action is not None:
                 filters.append(event_or_action)
@@ -733,7 +825,7 @@ class TrendsQueryBuilder(DataWarehouseInsightQueryMixin):
                 filters.append(property_to_expr(self.query.properties, self.team))
 
         # Series Filters
-        if series.properties is not None and series.properties != []:
+        if not ignore_series_filters and series.properties is not None and series.properties != []:
             filters.append(property_to_expr(series.properties, self.team))
 
         # Breakdown
@@ -744,20 +836,46 @@ class TrendsQueryBuilder(DataWarehouseInsightQueryMixin):
                     filters.append(breakdown_filter)
 
         # Ignore empty groups
-        if series.math == "unique_group" and series.math_group_type_index is not None:
-            filters.append(
-                ast.CompareOperation(
-                    op=ast.CompareOperationOp.NotEq,
-                    left=ast.Field(chain=["e", f"$group_{int(series.math_group_type_index)}"]),
-                    right=ast.Constant(value=""),
-                )
-            )
+        empty_group_filter = self._empty_group_filter()
+        if not ignore_series_filters and empty_group_filter is not None:
+            filters.append(empty_group_filter)
 
         if len(filters) == 0:
             return ast.Constant(value=True)
 
         return ast.And(exprs=filters)
 
+    def _series_filter(self) -> ast.Expr:
+        """The filters that belong to the series itself, which `_events_filter` skips with `ignore_series_filters`."""
+        series = self.series
+        filters: list[ast.Expr] = []
+
+        event_or_action = self._event_or_action_where_expr()
+        if event_or_action is not None:
+            filters.append(event_or_action)
+
+        if series.properties is not None and series.properties != []:
+            filters.append(property_to_expr(series.properties, self.team))
+
+        empty_group_filter = self._empty_group_filter()
+        if empty_group_filter is not None:
+            filters.append(empty_group_filter)
+
+        if len(filters) == 0:
+            return ast.Constant(value=True)
+
+        return ast.And(exprs=filters)
+
+    def _empty_group_filter(self) -> ast.Expr | None:
+        if self.series.math == "unique_group" and self.series.math_group_type_index is not None:
+            return ast.CompareOperation(
+                op=ast.CompareOperationOp.NotEq,
+                left=ast.Field(chain=["e", f"$group_{int(self.series.math_group_type_index)}"]),
+                right=ast.Constant(value=""),
+            )
+
+        return None
+
     def _event_or_action_where_expr(self) -> ast.Expr | None:
         # Event name
         if series_event_name(self.series) is not None:
@@ -1,4 +1,3 @@
-import threading
 from copy import deepcopy
 from datetime import timedelta, datetime
 from math import ceil
@@ -15,7 +14,7 @@ from posthog.caching.insights_api import (
     REAL_TIME_INSIGHT_REFRESH_INTERVAL,
     REDUCED_MINIMUM_INSIGHT_REFRESH_INTERVAL,
 )
-from posthog.clickhouse import query_tagging
+from posthog.clickhouse.client.executor import get_query_executor
 from posthog.hogql import ast
 from posthog.hogql.constants import MAX_SELECT_RETURNED_ROWS, LimitContext
 from posthog.hogql.printer import to_printed_hogql
@@ -47,6 +46,7 @@ from posthog.models.property_definition import PropertyDefinition
 from posthog.queries.util import correct_result_for_sampling
 from posthog.schema import (
     ActionsNode,
+    BaseMathType,
     BreakdownItem,
     BreakdownType,
     CachedTrendsQueryResponse,
@@ -56,6 +56,7 @@ from posthog.schema import (
     DashboardFilter,
     DataWarehouseEventsModifier,
     DataWarehouseNode,
+    DateRange,
     DayItem,
     EventsNode,
     HogQLQueryModifiers,
@@ -74,6 +75,14 @@ from posthog.schema import (
 from posthog.utils import format_label_date, multisort
 from posthog.warehouse.models.util import get_view_or_table_by_name
 
+# Math counting actors over more than the interval they're in, or depending on events from earlier intervals
+NON_INCREMENTAL_MATH_TYPES = (
+    BaseMathType.WEEKLY_ACTIVE,
+    BaseMathType.MONTHLY_ACTIVE,
+    BaseMathType.FIRST_TIME_FOR_USER,
+    BaseMathType.FIRST_MATCHING_EVENT_FOR_USER,
+)
+
 
 class TrendsQueryRunner(QueryRunner):
     query: TrendsQuery
@@ -124,33 +133,64 @@ class TrendsQueryRunner(QueryRunner):
         return ast.SelectSetQuery.create_from_queries(self.to_queries(), "UNION ALL")
 
     def to_queries(self) -> list[ast.SelectQuery | ast.SelectSetQuery]:
-        queries = []
+        return [query for query, _ in self._to_queries_with_series_indexes()]
+
+    def _to_queries_with_series_indexes(self) -> list[tuple[ast.SelectQuery | ast.SelectSetQuery, list[int]]]:
+        """
+        The queries to run, each with the indexes of the series it calculates. That's a query per series, unless
+        TRENDS_COMBINED_SERIES_QUERIES_ENABLED is set, in which case the series of each period that can be combined
+        are calculated with a single query.
+        """
+        queries: list[tuple[ast.SelectQuery | ast.SelectSetQuery, list[int]]] = []
         with self.timings.measure("trends_to_query"):
-            for series in self.series:
-                if not series.is_previous_period_series:
-                    query_date_range = self.query_date_range
-                else:
-                    query_date_range = self.query_previous_date_range
+            query_builders = [self._get_query_builder(series) for series in self.series]
+
+            combined_series_indexes: dict[bool, list[int]] = {}
+            if settings.TRENDS_COMBINED_SERIES_QUERIES_ENABLED:
+                for index, series in enumerate(self.series):
+                    if series.overriden_query is None and query_builders[index].can_combine_series():
+                        combined_series_indexes.setdefault(bool(series.is_previous_period_series), []).append(index)
+                combined_series_indexes = {
+                    period: series_indexes
+                    for period, series_indexes in combined_series_indexes.items()
+                    if len(series_indexes) > 1
+                }
+            combined_indexes = {index for indexes in combined_series_indexes.values() for index in indexes}
+
+            for index, query_builder in enumerate(query_builders):
+                if index in combined_indexes:
+                    continue
 
-                query_builder = TrendsQueryBuilder(
-                    trends_query=series.overriden_query or self.query,
-                    team=self.team,
-                    query_date_range=query_date_range,
-                    series=series.series,
-                    timings=self.timings,
-                    modifiers=self.modifiers,
-                    limit_context=self.limit_context,
-                )
                 query = query_builder.build_query()
 
                 # Get around the default 100 limit, bump to the max 10000.
                 # This is useful for the world map view and other cases with a lot of breakdowns.
                 if isinstance(query, ast.SelectQuery) and query.limit is None:
                     query.limit = ast.Constant(value=MAX_SELECT_RETURNED_ROWS)
-                queries.append(query)
+                queries.append((query, [index]))
+
+            for series_indexes in combined_series_indexes.values():
+                query = TrendsQueryBuilder.build_combined_query([query_builders[index] for index in series_indexes])
+                queries.append((query, series_indexes))
 
         return queries
 
+    def _get_query_builder(self, series: SeriesWithExtras) -> TrendsQueryBuilder:
+        if not series.is_previous_period_series:
+            query_date_range = self.query_date_range
+        else:
+            query_date_range = self.query_previous_date_range
+
+        return TrendsQueryBuilder(
+            trends_query=series.overriden_query or self.query,
+            team=self.team,
+            query_date_range=query_date_range,
+            series=series.series,
+            timings=self.timings,
+            modifiers=self.modifiers,
+            limit_context=self.limit_context,
+        )
+
     def to_events_query(self, *args, **kwargs) -> ast.SelectQuery:
         with self.timings.measure("trends_to_events_query"):
             query_builder = self._get_trends_actors_query_builder(*args, **kwargs)
@@ -313,89 +353,62 @@ class TrendsQueryRunner(QueryRunner):
             compare=res_compare,
         )
 
-    def calculate(self):
-        queries = self.to_queries()
-
+    def _response_hogql(self, queries: list[ast.SelectQuery | ast.SelectSetQuery]) -> str:
         if len(queries) == 0:
-            response_hogql = ""
+            return ""
+
+        if len(queries) == 1:
+            response_hogql_query = queries[0]
         else:
-            if len(queries) == 1:
-                response_hogql_query = queries[0]
-            else:
-                response_hogql_query = ast.SelectSetQuery.create_from_queries(queries, "UNION ALL")
+            response_hogql_query = ast.SelectSetQuery.create_from_queries(queries, "UNION ALL")
+
+        with self.timings.measure("printing_hogql_for_response"):
+            return to_printed_hogql(response_hogql_query, self.team, self.modifiers)
 
-            with self.timings.measure("printing_hogql_for_response"):
-                response_hogql = to_printed_hogql(response_hogql_query, self.team, self.modifiers)
+    def calculate(self):
+        queries_with_series_indexes = self._to_queries_with_series_indexes()
+        queries = [query for query, _ in queries_with_series_indexes]
+        response_hogql = self._response_hogql(queries)
 
-        res_matrix: list[list[Any] | Any | None] = [None] * len(queries)
+        res_matrix: list[list[Any] | Any | None] = [None] * len(self.series)
         timings_matrix: list[list[QueryTiming] | None] = [None] * (2 + len(queries))
-        errors: list[Exception] = []
         debug_errors: list[str] = []
 
-        def run(
-            index: int,
-            query: ast.SelectQuery | ast.SelectSetQuery,
-            timings: HogQLTimings,
-            is_parallel: bool,
-            query_tags: Optional[dict] = None,
-        ):
-            try:
-                if query_tags:
-                    query_tagging.tag_queries(**query_tags)
-
-                series_with_extra = self.series[index]
+        def run(task: tuple[int, tuple[ast.SelectQuery | ast.SelectSetQuery, list[int]], HogQLTimings]):
+            index, (query, series_indexes), timings = task
+            response = execute_hogql_query(
+                query_type="TrendsQuery",
+                query=query,
+                team=self.team,
+                timings=timings,
+                modifiers=self.modifiers,
+                limit_context=self.limit_context,
+            )
 
-                response = execute_hogql_query(
-                    query_type="TrendsQuery",
-                    query=query,
-                    team=self.team,
-                    timings=timings,
-                    modifiers=self.modifiers,
-                    limit_context=self.limit_context,
+            timings_matrix[index + 1] = response.timings
+            if len(series_indexes) == 1:
+                series_responses = [response]
+            else:
+                series_responses = self._split_combined_response(response, len(series_indexes))
+            for series_index, series_response in zip(series_indexes, series_responses):
+                res_matrix[series_index] = self.build_series_response(
+                    series_response, self.series[series_index], len(self.series)
                 )
-
-                timings_matrix[index + 1] = response.timings
-                res_matrix[index] = self.build_series_response(response, series_with_extra, len(queries))
-                if response.error:
-                    debug_errors.append(response.error)
-            except Exception as e:
-                errors.append(e)
-            finally:
-                if is_parallel:
-                    from django.db import connection
-
-                    # This will only close the DB connection for the newly spawned thread and not the whole app
-                    connection.close()
+            if response.error:
+                debug_errors.append(response.error)
 
         with self.timings.measure("execute_queries"):
             timings_matrix[0] = self.timings.to_list(back_out_stack=False)
             self.timings.clear_timings()
 
-            # This exists so that we're not spawning threads during unit tests. We can't do
-            # this right now due to the lack of multithreaded support of Django
-            if len(queries) == 1 or settings.IN_UNIT_TESTING:
-                for index, query in enumerate(queries):
-                    run(index, query, self.timings.clone_for_subquery(index), False)
-            else:
-                jobs = [
-                    threading.Thread(
-                        target=run,
-                        args=(
-                            index,
-                            query,
-                            self.timings.clone_for_subquery(index),
-                            True,
-                            query_tagging.get_query_tags(),
-                        ),
-                    )
-                    for index, query in enumerate(queries)
-                ]
-                [j.start() for j in jobs]  # type:ignore
-                [j.join() for j in jobs]  # type:ignore
-
-        # Raise any errors raised in a seperate thread
-        if len(errors) > 0:
-            raise errors[0]
+            get_query_executor().map(
+                run,
+                [
+                    (index, query_with_series_indexes, self.timings.clone_for_subquery(index))
+                    for index, query_with_series_indexes in enumerate(queries_with_series_indexes)
+                ],
+                team_id=self.team.pk,
+            )
 
         # Flatten res and timings
         returned_results: list[list[dict[str, Any]]] = []
@@ -458,6 +471,121 @@ class TrendsQueryRunner(QueryRunner):
             error=". ".join(debug_errors),
         )
 
+    def can_calculate_incrementally(self) -> bool:
+        """
+        Only time series where each interval is calculated independently of the others can be updated incrementally.
+        That rules out cumulative and total value displays, smoothing, formulas, comparisons, breakdowns as their
+        values are picked over the whole date range, and math that counts users over several intervals.
+        """
+        return (
+            not self._trends_display.is_total_value()
+            and self._trends_display.display_type != ChartDisplayType.ACTIONS_LINE_GRAPH_CUMULATIVE
+            and not (self.query.trendsFilter and (self.query.trendsFilter.smoothingIntervals or 1) > 1)
+            and not self.formula_nodes
+            and not (self.query.compareFilter and self.query.compareFilter.compare)
+            and not self.breakdown_enabled
+            and all(series.series.math not in NON_INCREMENTAL_MATH_TYPES for series in self.series)
+        )
+
+    def calculate_incrementally(self, cached_response: CachedTrendsQueryResponse) -> Optional[TrendsQueryResponse]:
+        """
+        Recalculates the intervals from the one that was ongoing when the cached response was calculated, less the
+        ingestion lag, and takes the values of the earlier intervals from the cached response. The filter and HogQL of
+        the response are those of the full date range, as if it had been calculated in full.
+        """
+        changed_since = cached_response.last_refresh - timedelta(
+            seconds=settings.QUERY_INCREMENTAL_CALCULATION_LAG_SECONDS
+        )
+        interval_starts = self.query_date_range.all_values()
+        first_changed_index = next(
+            (index for index in reversed(range(len(interval_starts))) if interval_starts[index] <= changed_since), None
+        )
+        if not first_changed_index:
+            # All intervals may have changed
+            return None
+
+        date_range = self.query.dateRange or DateRange()
+        changed_intervals_runner = TrendsQueryRunner(
+            query=self.query.model_copy(
+                update={
+                    "dateRange": date_range.model_copy(
+                        update={"date_from": interval_starts[first_changed_index].isoformat()}
+                    )
+                }
+            ),
+            team=self.team,
+            timings=self.timings,
+            modifiers=self.modifiers,
+            limit_context=self.limit_context,
+        )
+        response = changed_intervals_runner.calculate()
+        if response.error:
+            return None
+
+        days = [self._format_date(interval_start) for interval_start in interval_starts]
+        unchanged_days = set(days[:first_changed_index])
+        cached_results = {result["action"]["order"]: result for result in cached_response.results}
+        if len(cached_results) != len(response.results):
+            return None
+
+        results = []
+        for result in response.results:
+            cached_result = cached_results.get(result["action"]["order"])
+            if cached_result is None:
+                return None
+            values = {
+                day: (value, label)
+                for day, value, label in zip(cached_result["days"], cached_result["data"], cached_result["labels"])
+                if day in unchanged_days
+            }
+            values.update(zip(result["days"], zip(result["data"], result["labels"])))
+            if any(day not in values for day in days):
+                return None
+
+            data = [values[day][0] for day in days]
+            results.append(
+                {
+                    **result,
+                    "data": data,
+                    "labels": [values[day][1] for day in days],
+                    "days": days,
+                    "count": float(sum(data)),
+                    "filter": self._query_to_filter(),
+                    "action": {**result["action"], "days": interval_starts},
+                }
+            )
+
+        return TrendsQueryResponse(
+            results=results,
+            hasMore=False,
+            timings=response.timings,
+            hogql=self._response_hogql([query for query, _ in self._to_queries_with_series_indexes()]),
+            modifiers=self.modifiers,
+            error=response.error,
+        )
+
+    @staticmethod
+    def _split_combined_response(response: HogQLQueryResponse, series_count: int) -> list[HogQLQueryResponse]:
+        """Splits the response of `TrendsQueryBuilder.build_combined_query` into the response of each series."""
+        columns = response.columns or []
+        date_index = columns.index("date") if "date" in columns else None
+
+        responses = []
+        for index in range(series_count):
+            total_index = columns.index(f"total_{index}")
+            responses.append(
+                response.model_copy(
+                    update={
+                        "columns": ["total"] if date_index is None else ["date", "total"],
+                        "results": [
+                            [row[total_index]] if date_index is None else [row[date_index], row[total_index]]
+                            for row in response.results
+                        ],
+                    }
+                )
+            )
+        return responses
+
     def build_series_response(self, response: HogQLQueryResponse, series: SeriesWithExtras, series_count: int):
         def get_value(name: str, val: Any):
             if name not in ["date", "total", "breakdown_value"]:
@@ -485,14 +613,7 @@ class TrendsQueryRunner(QueryRunner):
                 series_object = {
                     "data": [],
                     "days": (
-                        [
-                            item.strftime(
-                                "%Y-%m-%d{}".format(
-                                    " %H:%M:%S" if self.query_date_range.interval_name in ("hour", "minute") else ""
-                                )
-                            )
-                            for item in get_value("date", val)
-                        ]
+                        [self._format_date(item) for item in get_value("date", val)]
                         if response.columns and "date" in response.columns
                         else []
                     ),
@@ -525,14 +646,7 @@ class TrendsQueryRunner(QueryRunner):
                     "labels": [
                         format_label_date(item, self.query_date_range.interval_name) for item in get_value("date", val)
                     ],
-                    "days": [
-                        item.strftime(
-                            "%Y-%m-%d{}".format(
-                                " %H:%M:%S" if self.query_date_range.interval_name in ("hour", "minute") else ""
-                            )
-                        )
-                        for item in get_value("date", val)
-                    ],
+                    "days": [self._format_date(item) for item in get_value("date", val)],
                     "count": count,
                     "label": "All events" if series_label is None else series_label,
                     "filter": self._query_to_filter(),
@@ -621,6 +735,11 @@ class TrendsQueryRunner(QueryRunner):
             res.append(series_object)
         return res
 
+    def _format_date(self, date: datetime) -> str:
+        return date.strftime(
+            "%Y-%m-%d{}".format(" %H:%M:%S" if self.query_date_range.interval_name in ("hour", "minute") else "")
+        )
+
     @cached_property
     def query_date_range(self):
         interval = IntervalType.DAY if self._trends_display.is_total_value() else self.query.interval
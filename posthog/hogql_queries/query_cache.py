@@ -1,13 +1,145 @@
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
 from datetime import datetime, UTC
-from typing import Optional
+from typing import Any, Optional
 
+from cachetools import TTLCache
 from django.conf import settings
 from django.core.cache import cache
+from prometheus_client import Counter
+from redis.exceptions import LockError
+from redis.lock import Lock
+import structlog
 
 from posthog import redis
-from posthog.cache_utils import OrjsonJsonSerializer
+from posthog.cache_utils import ColumnarJsonSerializer, OrjsonJsonSerializer
 from posthog.utils import get_safe_cache
 
+logger = structlog.get_logger(__name__)
+
+QUERY_CACHE_L1_HIT_COUNTER = Counter(
+    "posthog_query_cache_l1_hit_total",
+    "Whether we could fetch the query from the in-process cache, without going to Redis.",
+    labelnames=["cache_hit"],
+)
+
+# Upper bound for how long a calculation lock is held, in case the process holding it dies
+QUERY_CALCULATION_LOCK_TIMEOUT_SECONDS = 10 * 60
+
+
+class InMemoryQueryResultCache:
+    """
+    Per-process LRU cache of deserialized query results, in front of Redis.
+
+    Entries are bounded by the size of their serialized payload and expire after `ttl` seconds, which bounds how long
+    a result written by another process can be shadowed by an older one held here.
+    """
+
+    def __init__(self, *, max_size_bytes: int, ttl: int, timer: Callable[[], float] = time.monotonic):
+        self.max_size_bytes = max_size_bytes
+        self._cache: TTLCache[str, tuple[int, Optional[str], dict]] = TTLCache(
+            maxsize=max_size_bytes, ttl=ttl, timer=timer, getsizeof=lambda entry: entry[0]
+        )
+        self._lock = threading.Lock()
+
+    def get(self, cache_key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._cache.get(cache_key)
+        if entry is None:
+            return None
+        # Callers update top-level fields like `is_cached` on the response, so never hand out the cached dict itself
+        return dict(entry[2])
+
+    def set(self, cache_key: str, response: dict, size: int) -> None:
+        if size > self.max_size_bytes:
+            return
+        last_refresh = response.get("last_refresh")
+        with self._lock:
+            existing = self._cache.get(cache_key)
+            if existing is not None and _is_newer(existing[1], last_refresh):
+                return
+            self._cache[cache_key] = (size, last_refresh, response)
+
+    def __contains__(self, cache_key: str) -> bool:
+        with self._lock:
+            return cache_key in self._cache
+
+    def invalidate(self, cache_key: str) -> None:
+        with self._lock:
+            self._cache.pop(cache_key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+def _is_newer(last_refresh: Any, other: Any) -> bool:
+    if not isinstance(last_refresh, str) or not isinstance(other, str):
+        return False
+    # `last_refresh` is an ISO 8601 timestamp in UTC, so comparing the strings compares the timestamps
+    return last_refresh > other
+
+
+_in_memory_cache: Optional[InMemoryQueryResultCache] = None
+_in_memory_cache_lock = threading.Lock()
+
+
+def get_in_memory_cache() -> Optional[InMemoryQueryResultCache]:
+    global _in_memory_cache
+    if not settings.QUERY_CACHE_L1_ENABLED:
+        return None
+    if _in_memory_cache is None:
+        with _in_memory_cache_lock:
+            if _in_memory_cache is None:
+                _in_memory_cache = InMemoryQueryResultCache(
+                    max_size_bytes=settings.QUERY_CACHE_L1_MAX_SIZE_BYTES, ttl=settings.QUERY_CACHE_L1_TTL_SECONDS
+                )
+    return _in_memory_cache
+
+
+class QueryCacheBatch:
+    """
+    Redis reads and writes of many `QueryCacheManager`s at once, e.g. for all tiles of a dashboard.
+    Cache entries are fetched upfront with a single MGET, and sorted set updates are sent in one pipeline at the end.
+    """
+
+    def __init__(self):
+        # cache_key -> serialized response, or None if it's not in the cache
+        self.cache_data: dict[str, Optional[bytes]] = {}
+        # (team_id, identifier) -> target age timestamp, or None to remove it
+        self.target_ages: dict[tuple[int, str], Optional[float]] = {}
+
+    def prefetch(self, cache_keys: Iterable[str]) -> None:
+        cache_keys = [cache_key for cache_key in set(cache_keys) if cache_key not in self.cache_data]
+        if not cache_keys:
+            return
+        try:
+            found = cache.get_many(cache_keys)
+        except Exception as e:
+            # Reading the entries one by one deletes any corrupted ones
+            logger.warning("query_cache_prefetch_failed", error=str(e))
+            return
+        for cache_key in cache_keys:
+            self.cache_data[cache_key] = found.get(cache_key)
+
+    def flush(self) -> None:
+        if not self.target_ages:
+            return
+        pipeline = redis.get_client().pipeline(transaction=False)
+        for (team_id, identifier), target_age in self.target_ages.items():
+            if target_age is None:
+                pipeline.zrem(f"cache_timestamps:{team_id}", identifier)
+            else:
+                pipeline.zadd(f"cache_timestamps:{team_id}", {identifier: target_age})
+        pipeline.execute()
+        self.target_ages.clear()
+
+
+_query_cache_batch: ContextVar[Optional[QueryCacheBatch]] = ContextVar("query_cache_batch", default=None)
+
 
 class QueryCacheManager:
     """
@@ -38,6 +170,49 @@ class QueryCacheManager:
     def identifier(self):
         return f"{self.insight_id}:{self.dashboard_id or ''}"
 
+    @property
+    def calculation_lock_key(self) -> str:
+        return f"query_calculation_lock:{self.cache_key}"
+
+    def acquire_calculation_lock(self) -> Optional[Lock]:
+        """
+        Try to become the only process calculating the results for this cache key.
+        Returns the held lock, or None if another process is already calculating.
+        """
+        lock = self.redis_client.lock(self.calculation_lock_key, timeout=QUERY_CALCULATION_LOCK_TIMEOUT_SECONDS)
+        if not lock.acquire(blocking=False):
+            return None
+        return lock
+
+    @staticmethod
+    def release_calculation_lock(lock: Lock) -> None:
+        with suppress(LockError):
+            # The lock may have expired in the meantime, in which case there is nothing to release
+            lock.release()
+
+    def wait_for_calculation(self, *, timeout: float) -> bool:
+        """
+        Wait for another process holding the calculation lock to finish.
+        Returns False if it's still calculating after `timeout` seconds.
+        """
+        # Whatever was prefetched or read into memory is outdated once the other calculation finishes
+        batch = _query_cache_batch.get()
+        if batch is not None:
+            batch.cache_data.pop(self.cache_key, None)
+        in_memory_cache = get_in_memory_cache()
+        if in_memory_cache is not None:
+            in_memory_cache.invalidate(self.cache_key)
+
+        deadline = time.monotonic() + timeout
+        interval = 0.05
+        while self.redis_client.exists(self.calculation_lock_key):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, 1.0)
+        return True
+
     @staticmethod
     def get_stale_insights(*, team_id: int, limit: Optional[int] = None) -> list[str]:
         """
@@ -77,10 +252,40 @@ class QueryCacheManager:
             threshold.timestamp(),
         )
 
+    @staticmethod
+    @contextmanager
+    def batched(cache_keys: Iterable[str] = ()) -> Iterator[QueryCacheBatch]:
+        """
+        Batch the Redis calls of all `QueryCacheManager`s used within this context, prefetching `cache_keys`.
+        Nested calls reuse the outer batch.
+        """
+        batch = _query_cache_batch.get()
+        if batch is not None:
+            batch.prefetch(cache_keys)
+            yield batch
+            return
+
+        batch = QueryCacheBatch()
+        in_memory_cache = get_in_memory_cache()
+        batch.prefetch(
+            cache_key for cache_key in cache_keys if in_memory_cache is None or cache_key not in in_memory_cache
+        )
+        token = _query_cache_batch.set(batch)
+        try:
+            yield batch
+        finally:
+            _query_cache_batch.reset(token)
+            batch.flush()
+
     def update_target_age(self, target_age: datetime) -> None:
         if not self.insight_id:
             return
 
+        batch = _query_cache_batch.get()
+        if batch is not None:
+            batch.target_ages[(self.team_id, self.identifier)] = target_age.timestamp()
+            return
+
         self.redis_client.zadd(
             f"cache_timestamps:{self.team_id}",
             {self.identifier: target_age.timestamp()},
@@ -90,11 +295,24 @@ class QueryCacheManager:
         if not self.insight_id:
             return
 
+        batch = _query_cache_batch.get()
+        if batch is not None:
+            batch.target_ages[(self.team_id, self.identifier)] = None
+            return
+
         self.redis_client.zrem(f"cache_timestamps:{self.team_id}", self.identifier)
 
     def set_cache_data(self, *, response: dict, target_age: Optional[datetime]) -> None:
-        fresh_response_serialized = OrjsonJsonSerializer({}).dumps(response)
+        serializer = ColumnarJsonSerializer({}) if settings.QUERY_CACHE_COLUMNAR_ENCODING else OrjsonJsonSerializer({})
+        fresh_response_serialized = serializer.dumps(response)
         cache.set(self.cache_key, fresh_response_serialized, settings.CACHED_RESULTS_TTL)
+        in_memory_cache = get_in_memory_cache()
+        if in_memory_cache is not None:
+            in_memory_cache.invalidate(self.cache_key)
+        batch = _query_cache_batch.get()
+        if batch is not None and self.cache_key in batch.cache_data:
+            # Later reads within the batch, e.g. by other tiles with the same query, get the fresh result
+            batch.cache_data[self.cache_key] = fresh_response_serialized
 
         if target_age:
             self.update_target_age(target_age)
@@ -102,8 +320,25 @@ class QueryCacheManager:
             self.remove_last_refresh()
 
     def get_cache_data(self) -> Optional[dict]:
-        cached_response_bytes: Optional[bytes] = get_safe_cache(self.cache_key)
+        in_memory_cache = get_in_memory_cache()
+        if in_memory_cache is not None:
+            cached_response = in_memory_cache.get(self.cache_key)
+            QUERY_CACHE_L1_HIT_COUNTER.labels(cache_hit="hit" if cached_response is not None else "miss").inc()
+            if cached_response is not None:
+                return cached_response
+
+        cached_response_bytes: Optional[bytes]
+        batch = _query_cache_batch.get()
+        if batch is not None and self.cache_key in batch.cache_data:
+            cached_response_bytes = batch.cache_data[self.cache_key]
+        else:
+            cached_response_bytes = get_safe_cache(self.cache_key)
         if not cached_response_bytes:
             return None
 
-        return OrjsonJsonSerializer({}).loads(cached_response_bytes)
+        # Reads both columnar and plain JSON entries
+        cached_response = ColumnarJsonSerializer({}).loads(cached_response_bytes)
+        if in_memory_cache is not None and isinstance(cached_response, dict):
+            in_memory_cache.set(self.cache_key, cached_response, len(cached_response_bytes))
+            return dict(cached_response)
+        return cached_response
@@ -87,6 +87,18 @@ QUERY_CACHE_HIT_COUNTER = Counter(
     labelnames=[LABEL_TEAM_ID, "cache_hit", "trigger"],
 )
 
+QUERY_CALCULATION_COALESCED_COUNTER = Counter(
+    "posthog_query_calculation_coalesced_total",
+    "When another process was already calculating the same query, and whether we could use its results.",
+    labelnames=[LABEL_TEAM_ID, "outcome"],
+)
+
+QUERY_INCREMENTAL_CALCULATION_COUNTER = Counter(
+    "posthog_query_incremental_calculation_total",
+    "When stale results could be updated incrementally, or had to be calculated in full.",
+    labelnames=[LABEL_TEAM_ID, "outcome"],
+)
+
 EXTENDED_CACHE_AGE = timedelta(days=1)
 
 
@@ -684,6 +696,45 @@ class QueryRunner(ABC, Generic[Q, R, CR]):
     def calculate(self) -> R:
         raise NotImplementedError()
 
+    def can_calculate_incrementally(self) -> bool:
+        """Whether stale cached results of this query may be updated with `calculate_incrementally`."""
+        return False
+
+    def calculate_incrementally(self, cached_response: CR) -> Optional[R]:
+        """
+        Updates stale cached results, by only querying what may have changed since they were calculated.
+        Returns None if that's not possible, in which case the query is calculated in full.
+        """
+        return None
+
+    def _calculate_incrementally_or_in_full(self, cache_manager: QueryCacheManager, now: datetime) -> R:
+        if settings.QUERY_INCREMENTAL_CALCULATION_ENABLED and self.can_calculate_incrementally():
+            cached_response = self._get_cached_response_to_update(cache_manager, now)
+            if cached_response is not None:
+                response = self.calculate_incrementally(cached_response)
+                QUERY_INCREMENTAL_CALCULATION_COUNTER.labels(
+                    team_id=self.team.pk, outcome="full" if response is None else "incremental"
+                ).inc()
+                if response is not None:
+                    return response
+        return self.calculate()
+
+    def _get_cached_response_to_update(self, cache_manager: QueryCacheManager, now: datetime) -> Optional[CR]:
+        cached_response_candidate = cache_manager.get_cache_data()
+        if not self.is_cached_response(cached_response_candidate):
+            return None
+        try:
+            cached_response = self.cached_response_type(**cached_response_candidate)
+        except Exception:
+            return None
+
+        last_refresh = last_refresh_from_cached_result(cached_response)
+        full_interval = settings.QUERY_INCREMENTAL_CALCULATION_FULL_INTERVAL_SECONDS
+        # Calculate in full whenever a new full interval starts, so that the results don't miss late events for long
+        if last_refresh is None or last_refresh.timestamp() // full_interval != now.timestamp() // full_interval:
+            return None
+        return cached_response
+
     def enqueue_async_calculation(
         self,
         *,
@@ -796,6 +847,40 @@ class QueryRunner(ABC, Generic[Q, R, CR]):
         # Nothing useful out of cache, nor async query status
         return None
 
+    def wait_for_concurrent_calculation(
+        self, execution_mode: ExecutionMode, cache_manager: QueryCacheManager, user: Optional[User] = None
+    ) -> Optional[CR | CacheMissResponse]:
+        """
+        Another process is already calculating this query, so wait for its results instead of calculating them again.
+        If it takes too long, fall back to stale results. Returns None if we have to calculate the query ourselves.
+        """
+        CachedResponse: type[CR] = self.cached_response_type
+
+        if cache_manager.wait_for_calculation(timeout=settings.QUERY_CALCULATION_SINGLE_FLIGHT_WAIT_SECONDS):
+            results = self.handle_cache_and_async_logic(
+                execution_mode=execution_mode, cache_manager=cache_manager, user=user
+            )
+            # No results means the other calculation failed, so we try ourselves
+            QUERY_CALCULATION_COALESCED_COUNTER.labels(
+                team_id=self.team.pk, outcome="result" if results else "failed"
+            ).inc()
+            return results
+
+        cached_response_candidate = cache_manager.get_cache_data()
+        if self.is_cached_response(cached_response_candidate):
+            cached_response_candidate["is_cached"] = True
+            try:
+                cached_response = CachedResponse(**cached_response_candidate)
+            except Exception:
+                cached_response = None
+            if cached_response is not None:
+                QUERY_CALCULATION_COALESCED_COUNTER.labels(team_id=self.team.pk, outcome="stale").inc()
+                cached_response.query_status = self.get_async_query_status(cache_key=cache_manager.cache_key)
+                return cached_response
+
+        QUERY_CALCULATION_COALESCED_COUNTER.labels(team_id=self.team.pk, outcome="timeout").inc()
+        return None
+
     def run(
         self,
         execution_mode: ExecutionMode = ExecutionMode.RECENT_CACHE_CALCULATE_BLOCKING_IF_STALE,
@@ -841,55 +926,74 @@ class QueryRunner(ABC, Generic[Q, R, CR]):
             if results:
                 return results
 
-        last_refresh = datetime.now(UTC)
-        target_age = self.cache_target_age(last_refresh=last_refresh)
-
-        # Avoid affecting cache key
-        # Add user based modifiers here, primarily for user specific feature flagging
-        if user:
-            self.modifiers = create_default_modifiers_for_user(user, self.team, self.modifiers)
-            self.modifiers.useMaterializedViews = True
-
-        concurrency_limit = self.get_api_queries_concurrency_limit()
-        with get_api_personal_rate_limiter().run(
-            is_api=self.is_query_service,
-            team_id=self.team.pk,
-            org_id=self.team.organization_id,
-            task_id=self.query_id,
-            limit=concurrency_limit,
+        calculation_lock = None
+        if (
+            execution_mode != ExecutionMode.CALCULATE_BLOCKING_ALWAYS
+            and settings.QUERY_CALCULATION_SINGLE_FLIGHT_WAIT_SECONDS > 0
         ):
-            if self.is_query_service:
-                tag_queries(chargeable=1)
+            # Make sure only one process at a time calculates the same query, e.g. when many users open the same
+            # dashboard right after its results went stale
+            calculation_lock = cache_manager.acquire_calculation_lock()
+            if calculation_lock is None:
+                results = self.wait_for_concurrent_calculation(
+                    execution_mode=execution_mode, cache_manager=cache_manager, user=user
+                )
+                if results:
+                    return results
 
-            with get_app_org_rate_limiter().run(
-                org_id=self.team.organization_id, task_id=self.query_id, team_id=self.team.id
+        try:
+            last_refresh = datetime.now(UTC)
+            target_age = self.cache_target_age(last_refresh=last_refresh)
+
+            # Avoid affecting cache key
+            # Add user based modifiers here, primarily for user specific feature flagging
+            if user:
+                self.modifiers = create_default_modifiers_for_user(user, self.team, self.modifiers)
+                self.modifiers.useMaterializedViews = True
+
+            concurrency_limit = self.get_api_queries_concurrency_limit()
+            with get_api_personal_rate_limiter().run(
+                is_api=self.is_query_service,
+                team_id=self.team.pk,
+                org_id=self.team.organization_id,
+                task_id=self.query_id,
+                limit=concurrency_limit,
             ):
-                fresh_response_dict = {
-                    **self.calculate().model_dump(),
-                    "is_cached": False,
-                    "last_refresh": last_refresh,
-                    "next_allowed_client_refresh": last_refresh + self._refresh_frequency(),
-                    "cache_key": cache_key,
-                    "timezone": self.team.timezone,
-                    "cache_target_age": target_age,
-                }
-        if get_query_tag_value("trigger"):
-            fresh_response_dict["calculation_trigger"] = get_query_tag_value("trigger")
-        fresh_response = CachedResponse(**fresh_response_dict)
-
-        # Don't cache debug queries with errors and export queries
-        has_error: Optional[list] = fresh_response_dict.get("error", None)
-        if (has_error is None or len(has_error) == 0) and self.limit_context != LimitContext.EXPORT:
-            cache_manager.set_cache_data(
-                response=fresh_response_dict,
-                # This would be a possible place to decide to not ever keep this cache warm
-                # Example: Not for super quickly calculated insights
-                # Set target_age to None in that case
-                target_age=target_age,
-            )
-            QUERY_CACHE_WRITE_COUNTER.labels(team_id=self.team.pk).inc()
+                if self.is_query_service:
+                    tag_queries(chargeable=1)
+
+                with get_app_org_rate_limiter().run(
+                    org_id=self.team.organization_id, task_id=self.query_id, team_id=self.team.id
+                ):
+                    fresh_response_dict = {
+                        **self._calculate_incrementally_or_in_full(cache_manager, now=last_refresh).model_dump(),
+                        "is_cached": False,
+                        "last_refresh": last_refresh,
+                        "next_allowed_client_refresh": last_refresh + self._refresh_frequency(),
+                        "cache_key": cache_key,
+                        "timezone": self.team.timezone,
+                        "cache_target_age": target_age,
+                    }
+            if get_query_tag_value("trigger"):
+                fresh_response_dict["calculation_trigger"] = get_query_tag_value("trigger")
+            fresh_response = CachedResponse(**fresh_response_dict)
+
+            # Don't cache debug queries with errors and export queries
+            has_error: Optional[list] = fresh_response_dict.get("error", None)
+            if (has_error is None or len(has_error) == 0) and self.limit_context != LimitContext.EXPORT:
+                cache_manager.set_cache_data(
+                    response=fresh_response_dict,
+                    # This would be a possible place to decide to not ever keep this cache warm
+                    # Example: Not for super quickly calculated insights
+                    # Set target_age to None in that case
+                    target_age=target_age,
+                )
+                QUERY_CACHE_WRITE_COUNTER.labels(team_id=self.team.pk).inc()
 
-        return fresh_response
+            return fresh_response
+        finally:
+            if calculation_lock is not None:
+                cache_manager.release_calculation_lock(calculation_lock)
 
     def get_api_queries_concurrency_limit(self):
         """
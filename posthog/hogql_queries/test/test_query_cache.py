@@ -0,0 +1,163 @@
+from datetime import UTC, datetime
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from posthog import redis
+from posthog.hogql_queries import query_cache
+from posthog.hogql_queries.query_cache import InMemoryQueryResultCache, QueryCacheManager
+from posthog.utils import get_safe_cache
+
+
+class TestInMemoryQueryResultCache(SimpleTestCase):
+    def test_get_returns_copy(self):
+        cache = InMemoryQueryResultCache(max_size_bytes=1000, ttl=60)
+        cache.set("key", {"results": [1], "is_cached": False}, 10)
+
+        response = cache.get("key")
+        assert response == {"results": [1], "is_cached": False}
+        assert response is not None
+        response["is_cached"] = True
+        assert cache.get("key") == {"results": [1], "is_cached": False}
+
+    def test_expires_after_ttl(self):
+        now = 0.0
+        cache = InMemoryQueryResultCache(max_size_bytes=1000, ttl=60, timer=lambda: now)
+        cache.set("key", {"results": [1]}, 10)
+        now = 59
+        assert cache.get("key") is not None
+        now = 61
+        assert cache.get("key") is None
+
+    def test_bounded_by_size(self):
+        cache = InMemoryQueryResultCache(max_size_bytes=100, ttl=60)
+        cache.set("too_big", {"results": [1]}, 101)
+        assert cache.get("too_big") is None
+
+        cache.set("a", {"results": [1]}, 60)
+        cache.set("b", {"results": [2]}, 30)
+        cache.get("a")  # bumps "a", so "b" is evicted first
+        cache.set("c", {"results": [3]}, 30)
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+
+    def test_does_not_replace_newer_result(self):
+        cache = InMemoryQueryResultCache(max_size_bytes=1000, ttl=60)
+        cache.set("key", {"results": [2], "last_refresh": "2024-01-01T00:10:00Z"}, 10)
+        cache.set("key", {"results": [1], "last_refresh": "2024-01-01T00:00:00Z"}, 10)
+        assert cache.get("key") == {"results": [2], "last_refresh": "2024-01-01T00:10:00Z"}
+
+        cache.set("key", {"results": [3], "last_refresh": "2024-01-01T00:20:00Z"}, 10)
+        assert cache.get("key") == {"results": [3], "last_refresh": "2024-01-01T00:20:00Z"}
+
+
+@override_settings(QUERY_CACHE_L1_ENABLED=True)
+class TestQueryCacheManagerInMemoryCache(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        query_cache._in_memory_cache = None
+
+    def tearDown(self):
+        query_cache._in_memory_cache = None
+        super().tearDown()
+
+    def test_reads_are_served_from_memory(self):
+        manager = QueryCacheManager(team_id=1, cache_key="cache_in_memory_reads")
+        manager.set_cache_data(response={"results": [1], "last_refresh": "2024-01-01T00:00:00Z"}, target_age=None)
+
+        with patch("posthog.hogql_queries.query_cache.get_safe_cache", wraps=get_safe_cache) as mock_get_safe_cache:
+            assert manager.get_cache_data() == {"results": [1], "last_refresh": "2024-01-01T00:00:00Z"}
+            assert manager.get_cache_data() == {"results": [1], "last_refresh": "2024-01-01T00:00:00Z"}
+        assert mock_get_safe_cache.call_count == 1
+
+    def test_write_invalidates(self):
+        manager = QueryCacheManager(team_id=1, cache_key="cache_in_memory_writes")
+        manager.set_cache_data(response={"results": [1], "last_refresh": "2024-01-01T00:00:00Z"}, target_age=None)
+        assert manager.get_cache_data() == {"results": [1], "last_refresh": "2024-01-01T00:00:00Z"}
+
+        manager.set_cache_data(response={"results": [2], "last_refresh": "2024-01-01T00:10:00Z"}, target_age=None)
+        assert manager.get_cache_data() == {"results": [2], "last_refresh": "2024-01-01T00:10:00Z"}
+
+    @override_settings(QUERY_CACHE_L1_ENABLED=False)
+    def test_columnar_encoding(self):
+        response = {"results": [{"data": list(range(100)), "label": "$pageview"}], "is_cached": False}
+        manager = QueryCacheManager(team_id=1, cache_key="cache_columnar_encoding")
+
+        with override_settings(QUERY_CACHE_COLUMNAR_ENCODING=True):
+            manager.set_cache_data(response=response, target_age=None)
+        assert manager.get_cache_data() == response
+
+        # Entries written before switching encodings can still be read
+        with override_settings(QUERY_CACHE_COLUMNAR_ENCODING=False):
+            manager.set_cache_data(response=response, target_age=None)
+        assert manager.get_cache_data() == response
+
+    @override_settings(QUERY_CACHE_L1_ENABLED=False)
+    def test_disabled(self):
+        manager = QueryCacheManager(team_id=1, cache_key="cache_in_memory_disabled")
+        manager.set_cache_data(response={"results": [1]}, target_age=None)
+        assert manager.get_cache_data() == {"results": [1]}
+        assert query_cache._in_memory_cache is None
+
+
+class TestQueryCalculationLock(SimpleTestCase):
+    def test_only_one_process_calculates(self):
+        manager = QueryCacheManager(team_id=1, cache_key="cache_calculation_lock")
+        other_manager = QueryCacheManager(team_id=1, cache_key="cache_calculation_lock")
+
+        lock = manager.acquire_calculation_lock()
+        assert lock is not None
+        try:
+            assert other_manager.acquire_calculation_lock() is None
+            assert other_manager.wait_for_calculation(timeout=0.1) is False
+        finally:
+            manager.release_calculation_lock(lock)
+
+        assert other_manager.wait_for_calculation(timeout=0.1) is True
+        other_lock = other_manager.acquire_calculation_lock()
+        assert other_lock is not None
+        other_manager.release_calculation_lock(other_lock)
+        # Releasing twice, e.g. after the lock expired, is fine
+        other_manager.release_calculation_lock(other_lock)
+
+
+class TestQueryCacheBatch(SimpleTestCase):
+    def test_prefetches_cache_data(self):
+        managers = [QueryCacheManager(team_id=1, cache_key=f"cache_batch_{i}") for i in range(3)]
+        for manager in managers[:2]:
+            manager.set_cache_data(response={"results": [manager.cache_key]}, target_age=None)
+
+        with patch("posthog.hogql_queries.query_cache.get_safe_cache", wraps=get_safe_cache) as mock_get_safe_cache:
+            with QueryCacheManager.batched([manager.cache_key for manager in managers]):
+                assert managers[0].get_cache_data() == {"results": ["cache_batch_0"]}
+                assert managers[1].get_cache_data() == {"results": ["cache_batch_1"]}
+                assert managers[2].get_cache_data() is None
+
+                # Writes within the batch are visible to later reads
+                managers[2].set_cache_data(response={"results": ["fresh"]}, target_age=None)
+                assert managers[2].get_cache_data() == {"results": ["fresh"]}
+
+                # Keys that weren't prefetched are read as usual
+                assert QueryCacheManager(team_id=1, cache_key="cache_batch_other").get_cache_data() is None
+        assert mock_get_safe_cache.call_count == 1
+
+        assert managers[2].get_cache_data() == {"results": ["fresh"]}
+
+    def test_pipelines_target_age_updates(self):
+        redis_client = redis.get_client()
+        redis_client.delete("cache_timestamps:1")
+        target_age = datetime(2024, 1, 1, tzinfo=UTC)
+        stale = QueryCacheManager(team_id=1, cache_key="cache_batch_stale", insight_id=1)
+        stale.update_target_age(target_age)
+
+        with QueryCacheManager.batched():
+            QueryCacheManager(team_id=1, cache_key="cache_batch_fresh", insight_id=2).set_cache_data(
+                response={"results": []}, target_age=target_age
+            )
+            stale.set_cache_data(response={"results": []}, target_age=None)
+            assert redis_client.zscore("cache_timestamps:1", "2:") is None
+            assert redis_client.zscore("cache_timestamps:1", "1:") == target_age.timestamp()
+
+        assert redis_client.zscore("cache_timestamps:1", "2:") == target_age.timestamp()
+        assert redis_client.zscore("cache_timestamps:1", "1:") is None
@@ -4,9 +4,13 @@ from unittest import mock
 from zoneinfo import ZoneInfo
 
 from django.core.cache import cache
+from django.test import override_settings
 from freezegun import freeze_time
 from pydantic import BaseModel
 
+from posthog.cache_utils import OrjsonJsonSerializer
+from posthog.hogql_queries import query_cache
+from posthog.hogql_queries.query_cache import QueryCacheManager
 from posthog.hogql_queries.query_runner import ExecutionMode, QueryRunner
 from posthog.models.team.team import Team
 from posthog.schema import (
@@ -34,7 +38,7 @@ class TestQueryRunner(BaseTest):
         super().tearDown()
         cache.clear()
 
-    def setup_test_query_runner_class(self):
+    def setup_test_query_runner_class(self, incremental: bool = False):
         """Setup required methods and attributes of the abstract base class."""
 
         class TestQueryRunner(QueryRunner):
@@ -61,6 +65,12 @@ class TestQueryRunner(BaseTest):
                     return last_refresh + timedelta(days=1) <= datetime.now(tz=ZoneInfo("UTC"))
                 return last_refresh + timedelta(minutes=10) <= datetime.now(tz=ZoneInfo("UTC"))
 
+            def can_calculate_incrementally(self) -> bool:
+                return incremental
+
+            def calculate_incrementally(self, cached_response):
+                return TestBasicQueryResponse(results=[*cached_response.results, ["updated"]])
+
         TestQueryRunner.__abstractmethods__ = frozenset()
 
         return TestQueryRunner
@@ -211,6 +221,122 @@ class TestQueryRunner(BaseTest):
             self.assertEqual(response.is_cached, True)
             mock_on_commit.assert_called_once()
 
+    @mock.patch("posthog.hogql_queries.query_runner.settings.QUERY_CALCULATION_SINGLE_FLIGHT_WAIT_SECONDS", 5)
+    def test_waits_for_concurrent_calculation(self):
+        TestQueryRunner = self.setup_test_query_runner_class()
+        runner = TestQueryRunner(query={"some_attr": "bla"}, team=self.team)
+        other_runner = TestQueryRunner(query={"some_attr": "bla"}, team=self.team)
+        cache_manager = QueryCacheManager(team_id=self.team.pk, cache_key=runner.get_cache_key())
+
+        lock = cache_manager.acquire_calculation_lock()
+        assert lock is not None
+
+        def finish_other_calculation(*, timeout):
+            # The other process finishes its calculation while we wait
+            other_runner.run(execution_mode=ExecutionMode.CALCULATE_BLOCKING_ALWAYS)
+            cache_manager.release_calculation_lock(lock)
+            return True
+
+        with (
+            freeze_time(datetime(2023, 2, 4, 13, 37, 42)),
+            mock.patch.object(QueryCacheManager, "wait_for_calculation", side_effect=finish_other_calculation),
+        ):
+            response = runner.run(execution_mode=ExecutionMode.RECENT_CACHE_CALCULATE_BLOCKING_IF_STALE)
+            self.assertIsInstance(response, TestCachedBasicQueryResponse)
+            self.assertEqual(response.is_cached, True)
+
+    @override_settings(QUERY_CACHE_L1_ENABLED=True)
+    @mock.patch("posthog.hogql_queries.query_runner.settings.QUERY_CALCULATION_SINGLE_FLIGHT_WAIT_SECONDS", 5)
+    def test_waits_for_concurrent_calculation_with_in_memory_cache(self):
+        TestQueryRunner = self.setup_test_query_runner_class()
+        runner = TestQueryRunner(query={"some_attr": "bla"}, team=self.team)
+        cache_manager = QueryCacheManager(team_id=self.team.pk, cache_key=runner.get_cache_key())
+        query_cache._in_memory_cache = None
+        self.addCleanup(setattr, query_cache, "_in_memory_cache", None)
+
+        with freeze_time(datetime(2023, 2, 4, 13, 37, 42)):
+            runner.run(execution_mode=ExecutionMode.RECENT_CACHE_CALCULATE_BLOCKING_IF_STALE)
+        stale_response = cache_manager.get_cache_data()
+        assert stale_response is not None
+
+        lock = cache_manager.acquire_calculation_lock()
+        assert lock is not None
+
+        def finish_other_calculation(seconds):
+            # Another process writes its results straight to redis, so this process' in-memory cache isn't updated
+            cache.set(
+                cache_manager.cache_key,
+                OrjsonJsonSerializer({}).dumps(
+                    {**stale_response, "results": [["leader"]], "last_refresh": "2023-02-04T13:48:40+00:00"}
+                ),
+            )
+            cache_manager.release_calculation_lock(lock)
+
+        with (
+            freeze_time(datetime(2023, 2, 4, 13, 37 + 11, 42)),
+            mock.patch("posthog.hogql_queries.query_cache.time.sleep", side_effect=finish_other_calculation),
+            mock.patch.object(runner, "calculate", wraps=runner.calculate) as mock_calculate,
+        ):
+            response = runner.run(execution_mode=ExecutionMode.RECENT_CACHE_CALCULATE_BLOCKING_IF_STALE)
+
+        mock_calculate.assert_not_called()
+        self.assertIsInstance(response, TestCachedBasicQueryResponse)
+        self.assertEqual(response.is_cached, True)
+        self.assertEqual(response.results, [["leader"]])
+
+    @mock.patch("posthog.hogql_queries.query_runner.settings.QUERY_CALCULATION_SINGLE_FLIGHT_WAIT_SECONDS", 5)
+    def test_falls_back_to_stale_results_when_concurrent_calculation_takes_too_long(self):
+        TestQueryRunner = self.setup_test_query_runner_class()
+        runner = TestQueryRunner(query={"some_attr": "bla"}, team=self.team)
+        cache_manager = QueryCacheManager(team_id=self.team.pk, cache_key=runner.get_cache_key())
+
+        with freeze_time(datetime(2023, 2, 4, 13, 37, 42)):
+            runner.run(execution_mode=ExecutionMode.RECENT_CACHE_CALCULATE_BLOCKING_IF_STALE)
+
+        lock = cache_manager.acquire_calculation_lock()
+        assert lock is not None
+        try:
+            with (
+                freeze_time(datetime(2023, 2, 4, 13, 37 + 11, 42)),
+                mock.patch.object(QueryCacheManager, "wait_for_calculation", return_value=False),
+            ):
+                response = runner.run(execution_mode=ExecutionMode.RECENT_CACHE_CALCULATE_BLOCKING_IF_STALE)
+                self.assertIsInstance(response, TestCachedBasicQueryResponse)
+                self.assertEqual(response.is_cached, True)
+                self.assertEqual(response.last_refresh.isoformat(), "2023-02-04T13:37:42+00:00")
+
+                # Without any results to fall back to, we calculate ourselves
+                cache.clear()
+                response = runner.run(execution_mode=ExecutionMode.RECENT_CACHE_CALCULATE_BLOCKING_IF_STALE)
+                self.assertIsInstance(response, TestCachedBasicQueryResponse)
+                self.assertEqual(response.is_cached, False)
+        finally:
+            cache_manager.release_calculation_lock(lock)
+
+    @mock.patch("posthog.hogql_queries.query_runner.settings.QUERY_INCREMENTAL_CALCULATION_ENABLED", True)
+    def test_updates_stale_results_incrementally(self):
+        TestQueryRunner = self.setup_test_query_runner_class(incremental=True)
+
+        runner = TestQueryRunner(query={"some_attr": "bla"}, team=self.team)
+
+        with freeze_time(datetime(2023, 2, 4, 13, 37, 42)):
+            response = runner.run(execution_mode=ExecutionMode.RECENT_CACHE_CALCULATE_BLOCKING_IF_STALE)
+            self.assertEqual(len(response.results), 2)
+
+        with freeze_time(datetime(2023, 2, 4, 13, 37 + 11, 42)):
+            # stale results are updated
+            response = runner.run(execution_mode=ExecutionMode.RECENT_CACHE_CALCULATE_BLOCKING_IF_STALE)
+            self.assertEqual(response.is_cached, False)
+            self.assertEqual(response.results[2:], [["updated"]])
+
+            response = runner.run(execution_mode=ExecutionMode.CALCULATE_BLOCKING_ALWAYS)
+            self.assertEqual(response.results[2:], [["updated"], ["updated"]])
+
+        with freeze_time(datetime(2023, 2, 5, 0, 0, 42)):
+            # results are calculated in full once a day
+            response = runner.run(execution_mode=ExecutionMode.RECENT_CACHE_CALCULATE_BLOCKING_IF_STALE)
+            self.assertEqual(len(response.results), 2)
+
     @mock.patch("django.db.transaction.on_commit")
     def test_recent_cache_calculate_async_if_stale_and_blocking_on_miss(self, mock_on_commit):
         TestQueryRunner = self.setup_test_query_runner_class()
@@ -13,6 +13,7 @@ from django.utils import timezone
 from posthog.exceptions_capture import capture_exception
 
 from posthog.constants import PropertyOperatorType
+from posthog.hogql.database.schema_version import bump_schema_version
 from posthog.models.file_system.file_system_mixin import FileSystemSyncMixin
 from posthog.models.filters.filter import Filter
 from posthog.models.person import Person
@@ -322,6 +323,8 @@ class Cohort(FileSystemSyncMixin, RootTeamMixin, models.Model):
             version=pending_version, count=count
         )
         self.refresh_from_db()
+        # Queries on this cohort are printed with its version, and the update above doesn't send any signals
+        bump_schema_version(self.team.project_id)
 
         logger.warn(
             "cohort_calculation_completed",
@@ -1,4 +1,5 @@
 import json
+import uuid
 from django.http import HttpRequest
 import structlog
 from typing import TYPE_CHECKING, Optional, cast
@@ -29,6 +30,7 @@ FIVE_DAYS = 60 * 60 * 24 * 5  # 5 days in seconds
 logger = structlog.get_logger(__name__)
 
 if TYPE_CHECKING:
+    from posthog.models.feature_flag.flag_compiler import CompiledFlag
     from posthog.models.team import Team
 
 
@@ -74,6 +76,9 @@ class FeatureFlag(FileSystemSyncMixin, ModelActivityMixin, RootTeamMixin, models
     is_remote_configuration = models.BooleanField(default=False, null=True, blank=True)
     has_encrypted_payloads = models.BooleanField(default=False, null=True, blank=True)
 
+    # Only set on the flags of the in-process flag definitions cache, which are shared between requests
+    compiled: Optional["CompiledFlag"] = None
+
     class Meta:
         constraints = [models.UniqueConstraint(fields=["team", "key"], name="unique key for team")]
 
@@ -457,7 +462,14 @@ def set_feature_flags_for_team_in_cache(
     serialized_flags = MinimalFeatureFlagSerializer(all_feature_flags, many=True).data
 
     try:
-        cache.set(f"team_feature_flags_{project_id}", json.dumps(serialized_flags), FIVE_DAYS)
+        # The version tells processes holding the flags in memory that they changed, so it's written along with them
+        cache.set_many(
+            {
+                f"team_feature_flags_{project_id}": json.dumps(serialized_flags),
+                f"team_feature_flags_version_{project_id}": uuid.uuid4().hex,
+            },
+            FIVE_DAYS,
+        )
     except Exception:
         # redis is unavailable
         logger.exception("Redis is unavailable")
@@ -467,8 +479,22 @@ def set_feature_flags_for_team_in_cache(
 
 
 def get_feature_flags_for_team_in_cache(project_id: int) -> Optional[list[FeatureFlag]]:
+    from posthog.models.feature_flag.flag_definitions_cache import get_flag_definitions_cache
+
+    flags_key = f"team_feature_flags_{project_id}"
+    version_key = f"team_feature_flags_version_{project_id}"
+    flag_definitions_cache = get_flag_definitions_cache()
+    version: Optional[str] = None
     try:
-        flag_data = cache.get(f"team_feature_flags_{project_id}")
+        if flag_definitions_cache is None:
+            flag_data = cache.get(flags_key)
+        else:
+            feature_flags = flag_definitions_cache.get(project_id, cache.get(version_key))
+            if feature_flags is not None:
+                return feature_flags
+            # Read both at once, so the flags are cached in memory with the version they were written with
+            cached = cache.get_many([flags_key, version_key])
+            flag_data, version = cached.get(flags_key), cached.get(version_key)
     except Exception:
         # redis is unavailable
         logger.exception("Redis is unavailable")
@@ -477,12 +503,16 @@ def get_feature_flags_for_team_in_cache(project_id: int) -> Optional[list[Featur
     if flag_data is not None:
         try:
             parsed_data = json.loads(flag_data)
-            return [FeatureFlag(**flag) for flag in parsed_data]
+            feature_flags = [FeatureFlag(**flag) for flag in parsed_data]
         except Exception as e:
             logger.exception("Error parsing flags from cache")
             capture_exception(e)
             return None
 
+        if flag_definitions_cache is not None and version is not None:
+            return flag_definitions_cache.set(project_id, version, feature_flags)
+        return feature_flags
+
     return None
 
 
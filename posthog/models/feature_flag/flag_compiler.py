@@ -0,0 +1,233 @@
+"""
+Flag conditions compiled once into parsed properties, and evaluated in memory against the properties sent with the
+request whenever those are enough to decide them.
+
+Parsing a condition with `Filter` is one of the most expensive parts of matching a flag, and the same flag definitions
+are matched on every request. Compiled conditions are kept in a process wide LRU cache, keyed by the content of the
+condition, so a team's flag set is only compiled again when a flag changes.
+
+Flags kept in the in-process flag definitions cache are compiled as a whole, see `compile_flag`, so matching them
+doesn't even need to look their conditions up in the cache.
+
+Evaluation is three-valued: True and False are final, and None means the stored person or group properties are
+needed, so the condition must go to the database.
+"""
+
+import hashlib
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Optional, Union, cast
+
+import orjson
+from cachetools import LRUCache
+
+from posthog.constants import PropertyOperatorType
+from posthog.models.cohort import Cohort, CohortOrEmpty
+from posthog.models.filters import Filter
+from posthog.models.property.property import Property, PropertyGroup
+from posthog.queries.base import match_property
+
+if TYPE_CHECKING:
+    from posthog.models.feature_flag.feature_flag import FeatureFlag
+
+COMPILED_CONDITIONS_CACHE_SIZE = 10_000
+
+# Property types that are matched against the person or group properties in `property_value_overrides`
+LOCAL_PROPERTY_TYPES = ("person", "group", "event")
+
+
+@dataclass(frozen=True)
+class CompiledCondition:
+    # The condition's properties, which are always AND-ed together
+    properties: list[Property]
+
+    @property
+    def uses_cohorts(self) -> bool:
+        return any(property.type == "cohort" for property in self.properties)
+
+
+@dataclass(frozen=True)
+class CompiledFlag:
+    # Compiled conditions by the id of the condition dicts of the flag, along with the dicts themselves, so that the ids
+    # can't be reused by other dicts
+    conditions: dict[int, tuple[dict, CompiledCondition]]
+    # Contiguous sub-domains of [0, 1] for each variant, see `FeatureFlagMatcher.variant_lookup_table`
+    variant_lookup_table: list[dict]
+    uses_cohorts: bool
+
+
+def _fingerprint(value: Any) -> Optional[bytes]:
+    try:
+        return hashlib.sha1(orjson.dumps(value, option=orjson.OPT_SORT_KEYS)).digest()
+    except TypeError:
+        return None
+
+
+class CompiledConditionsCache:
+    """Thread safe LRU cache of compiled flag conditions and cohort properties, keyed by their definition."""
+
+    def __init__(self, max_size: int = COMPILED_CONDITIONS_CACHE_SIZE):
+        self._compiled: LRUCache[tuple, Union[CompiledCondition, PropertyGroup]] = LRUCache(maxsize=max_size)
+        self._lock = threading.Lock()
+
+    def get_condition(self, condition: dict) -> CompiledCondition:
+        fingerprint = _fingerprint(condition)
+        if fingerprint is None:
+            return compile_condition(condition)
+        key = ("condition", fingerprint)
+        with self._lock:
+            compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = compile_condition(condition)
+            with self._lock:
+                self._compiled[key] = compiled
+        return cast(CompiledCondition, compiled)
+
+    def get_cohort_properties(self, cohort: Cohort) -> PropertyGroup:
+        fingerprint = _fingerprint([cohort.filters, cohort.groups])
+        if fingerprint is None:
+            return cohort.properties
+        key = ("cohort", cohort.pk, fingerprint)
+        with self._lock:
+            properties = self._compiled.get(key)
+        if properties is None:
+            properties = cohort.properties
+            with self._lock:
+                self._compiled[key] = properties
+        return cast(PropertyGroup, properties)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._compiled.clear()
+
+    def __len__(self) -> int:
+        return len(self._compiled)
+
+
+compiled_conditions_cache = CompiledConditionsCache()
+
+
+def compile_condition(condition: dict) -> CompiledCondition:
+    # Feature flags don't support OR filtering within a condition, so the property groups are always flat
+    return CompiledCondition(properties=Filter(data=condition).property_groups.flat)
+
+
+def compile_flag(feature_flag: "FeatureFlag") -> CompiledFlag:
+    conditions = [*feature_flag.conditions, *feature_flag.super_conditions, *feature_flag.holdout_conditions]
+    return CompiledFlag(
+        conditions={
+            id(condition): (condition, compiled_conditions_cache.get_condition(condition)) for condition in conditions
+        },
+        variant_lookup_table=build_variant_lookup_table(feature_flag.variants),
+        uses_cohorts=feature_flag.uses_cohorts,
+    )
+
+
+def get_compiled_condition(feature_flag: "FeatureFlag", condition: dict) -> CompiledCondition:
+    if feature_flag.compiled is not None:
+        compiled = feature_flag.compiled.conditions.get(id(condition))
+        if compiled is not None and compiled[0] is condition:
+            return compiled[1]
+    return compiled_conditions_cache.get_condition(condition)
+
+
+def build_variant_lookup_table(variants: list[dict]) -> list[dict]:
+    lookup_table = []
+    value_min: float = 0
+    for variant in variants:
+        value_max = value_min + variant["rollout_percentage"] / 100
+        lookup_table.append({"value_min": value_min, "value_max": value_max, "key": variant["key"]})
+        value_min = value_max
+    return lookup_table
+
+
+def _combine(operator: PropertyOperatorType, results: Iterable[Optional[bool]]) -> Optional[bool]:
+    """Three-valued AND/OR. A single False decides an AND and a single True decides an OR, even if others are unknown."""
+    is_or = operator == PropertyOperatorType.OR
+    unknown = False
+    for result in results:
+        if result is None:
+            unknown = True
+        elif result == is_or:
+            return is_or
+    return None if unknown else not is_or
+
+
+def evaluate_properties(
+    properties: list[Property],
+    override_property_values: dict[str, Any],
+    cohorts_cache: dict[int, CohortOrEmpty],
+) -> Optional[bool]:
+    return _combine(
+        PropertyOperatorType.AND,
+        (evaluate_property(property, override_property_values, cohorts_cache) for property in properties),
+    )
+
+
+def evaluate_property_group(
+    property_group: PropertyGroup,
+    override_property_values: dict[str, Any],
+    cohorts_cache: dict[int, CohortOrEmpty],
+) -> Optional[bool]:
+    if not property_group or len(property_group.values) == 0:
+        return True
+    if isinstance(property_group.values[0], PropertyGroup):
+        return _combine(
+            property_group.type,
+            (
+                evaluate_property_group(cast(PropertyGroup, group), override_property_values, cohorts_cache)
+                for group in property_group.values
+            ),
+        )
+    return _combine(
+        property_group.type,
+        (
+            evaluate_property(cast(Property, property), override_property_values, cohorts_cache)
+            for property in property_group.values
+        ),
+    )
+
+
+def evaluate_property(
+    property: Property,
+    override_property_values: dict[str, Any],
+    cohorts_cache: dict[int, CohortOrEmpty],
+) -> Optional[bool]:
+    """Mirrors `property_to_Q`, but returns None instead of a query whenever the stored properties are needed."""
+    result: Optional[bool]
+    if property.type == "cohort":
+        result = _evaluate_cohort(property, override_property_values, cohorts_cache)
+    elif property.type in LOCAL_PROPERTY_TYPES and property.key in override_property_values:
+        result = match_property(property, override_property_values)
+    else:
+        result = None
+
+    if result is not None and property.negation:
+        return not result
+    return result
+
+
+def _evaluate_cohort(
+    property: Property,
+    override_property_values: dict[str, Any],
+    cohorts_cache: dict[int, CohortOrEmpty],
+) -> Optional[bool]:
+    try:
+        cohort_id = int(cast(Union[str, int], property._parse_value(property.value)))
+    except (TypeError, ValueError):
+        return None
+    if cohort_id not in cohorts_cache:
+        return None
+
+    cohort = cohorts_cache[cohort_id]
+    if not cohort:
+        # Don't match anything if the cohort doesn't exist
+        return False
+    if cohort.is_static:
+        # Membership of static cohorts is only stored in the database
+        return None
+    # :TRICKY: Cohorts are checked for cycles on creation, so this can't recurse forever
+    return evaluate_property_group(
+        compiled_conditions_cache.get_cohort_properties(cohort), override_property_values, cohorts_cache
+    )
@@ -0,0 +1,82 @@
+"""
+Process wide cache of the feature flags of projects, compiled for matching.
+
+The flags of a project are cached in Redis as JSON, along with a version that changes whenever they're written. Reading
+them used to mean parsing the JSON and building a `FeatureFlag` for each flag on every `/decide` request. Instead, the
+flags are kept in memory with the version they were read with, so that most requests only read the version from Redis.
+
+Cached flags are shared between requests and threads, so they must not be modified. Each one carries its compiled
+conditions, variant lookup table and whether it uses cohorts, see `compile_flag`.
+"""
+
+import threading
+from typing import Optional
+
+from cachetools import LRUCache
+from django.conf import settings
+from prometheus_client import Counter
+
+from posthog.exceptions_capture import capture_exception
+from posthog.models.feature_flag.feature_flag import FeatureFlag
+from posthog.models.feature_flag.flag_compiler import compile_flag
+
+FLAG_DEFINITIONS_CACHE_COUNTER = Counter(
+    "posthog_flag_definitions_cache_total",
+    "Lookups of the feature flags of a project in the in-process cache",
+    labelnames=["result"],
+)
+
+
+class FlagDefinitionsCache:
+    """Thread safe LRU cache of the compiled feature flags of projects, along with the version they were cached with."""
+
+    def __init__(self, max_size: int):
+        self._flags: LRUCache[int, tuple[str, list[FeatureFlag]]] = LRUCache(maxsize=max_size)
+        self._lock = threading.Lock()
+
+    def get(self, project_id: int, version: Optional[str]) -> Optional[list[FeatureFlag]]:
+        with self._lock:
+            cached = self._flags.get(project_id)
+        if version is None or cached is None or cached[0] != version:
+            FLAG_DEFINITIONS_CACHE_COUNTER.labels(result="miss").inc()
+            return None
+        FLAG_DEFINITIONS_CACHE_COUNTER.labels(result="hit").inc()
+        # The flags are shared, but the list isn't
+        return list(cached[1])
+
+    def set(self, project_id: int, version: str, feature_flags: list[FeatureFlag]) -> list[FeatureFlag]:
+        try:
+            for feature_flag in feature_flags:
+                feature_flag.compiled = compile_flag(feature_flag)
+        except Exception as e:
+            # Flags that can't be compiled are still matched, they just aren't shared
+            capture_exception(e)
+            for feature_flag in feature_flags:
+                feature_flag.compiled = None
+            return feature_flags
+
+        with self._lock:
+            self._flags[project_id] = (version, feature_flags)
+        return list(feature_flags)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._flags.clear()
+
+    def __len__(self) -> int:
+        return len(self._flags)
+
+
+_flag_definitions_cache: Optional[FlagDefinitionsCache] = None
+_flag_definitions_cache_lock = threading.Lock()
+
+
+def get_flag_definitions_cache() -> Optional[FlagDefinitionsCache]:
+    global _flag_definitions_cache
+    if not settings.DECIDE_FLAG_DEFINITIONS_CACHE_ENABLED:
+        return None
+    if _flag_definitions_cache is None:
+        with _flag_definitions_cache_lock:
+            if _flag_definitions_cache is None:
+                _flag_definitions_cache = FlagDefinitionsCache(max_size=settings.DECIDE_FLAG_DEFINITIONS_CACHE_MAX_SIZE)
+    return _flag_definitions_cache
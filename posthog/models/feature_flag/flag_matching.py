@@ -3,6 +3,7 @@ from dataclasses import dataclass
 from enum import StrEnum
 import time
 import structlog
+from collections.abc import Iterator
 from typing import Literal, Optional, Union, cast
 
 from prometheus_client import Counter
@@ -28,13 +29,14 @@ from posthog.models.property.property import Property
 from posthog.models.cohort import Cohort, CohortOrEmpty
 from posthog.models.team.team import Team
 from posthog.models.utils import execute_with_timeout
-from posthog.queries.base import match_property, properties_to_Q, sanitize_property_key
+from posthog.queries.base import properties_to_Q, sanitize_property_key
 from posthog.database_healthcheck import (
     DATABASE_FOR_FLAG_MATCHING,
 )
 from posthog.utils import label_for_team_id_to_track
 from posthog.helpers.encrypted_flag_payloads import get_decrypted_flag_payload
 
+from .flag_compiler import build_variant_lookup_table, evaluate_properties, get_compiled_condition
 from .feature_flag import (
     FeatureFlag,
     FeatureFlagHashKeyOverride,
@@ -47,6 +49,9 @@ logger = structlog.get_logger(__name__)
 __LONG_SCALE__ = float(0xFFFFFFFFFFFFFFF)
 
 FLAG_MATCHING_QUERY_TIMEOUT_MS = 500  # 500 ms. Any longer and we'll just error out.
+# Bulk evaluation queries the conditions of a whole batch of distinct_ids at once
+BULK_FLAG_MATCHING_QUERY_TIMEOUT_MS = 10_000
+BULK_FLAG_EVALUATION_BATCH_SIZE = 500
 
 FLAG_EVALUATION_ERROR_COUNTER = Counter(
     "flag_evaluation_error_total",
@@ -172,6 +177,7 @@ class FeatureFlagMatcher:
         group_property_value_overrides: Optional[dict[str, dict[str, Union[str, int]]]] = None,
         skip_database_flags: bool = False,
         cohorts_cache: Optional[dict[int, CohortOrEmpty]] = None,
+        query_conditions: Optional[dict[str, bool]] = None,
     ):
         if group_property_value_overrides is None:
             group_property_value_overrides = {}
@@ -196,6 +202,9 @@ class FeatureFlagMatcher:
             self.cohorts_cache = {}
         else:
             self.cohorts_cache = cohorts_cache
+        self._cohorts_loaded = False
+        # Conditions that were already queried for this distinct_id, see `query_conditions_for_distinct_ids`
+        self._query_conditions = query_conditions
 
     def get_match(self, feature_flag: FeatureFlag) -> FeatureFlagMatch:
         # If aggregating flag by groups and relevant group type is not passed - flag is off!
@@ -390,9 +399,8 @@ class FeatureFlagMatcher:
         return False, None, FeatureFlagMatchReason.NO_CONDITION_MATCH
 
     def is_super_condition_match(self, feature_flag: FeatureFlag) -> tuple[bool, bool, FeatureFlagMatchReason]:
-        # TODO: Right now super conditions with property overrides bork when the database is down,
-        # because we're still going to the database in the line below. Ideally, we should not go to the database.
-        # Don't skip test: test_super_condition_with_override_properties_doesnt_make_database_requests when this is fixed.
+        # TODO: Super conditions that the property overrides are enough to decide don't make any database queries,
+        # but they still bork when the database is down, because `_get_query_condition` refuses to run without it.
         # This also doesn't handle the case when the super condition has a property & a non-100 percentage rollout; but
         # we don't support that with super conditions anyway.
         super_condition_value_is_set = self._super_condition_is_set(feature_flag)
@@ -428,19 +436,11 @@ class FeatureFlagMatcher:
     ) -> tuple[bool, FeatureFlagMatchReason]:
         rollout_percentage = condition.get("rollout_percentage")
         if len(condition.get("properties", [])) > 0:
-            properties = Filter(data=condition).property_groups.flat
-            if self.can_compute_locally(properties, feature_flag.aggregation_group_type_index):
-                # :TRICKY: If overrides are enough to determine if a condition is a match,
-                # we can skip checking the query.
-                # This ensures match even if the person hasn't been ingested yet.
-                target_properties = self.property_value_overrides
-                if feature_flag.aggregation_group_type_index is not None:
-                    target_properties = self.group_property_value_overrides.get(
-                        self.cache.group_type_index_to_name[feature_flag.aggregation_group_type_index],
-                        {},
-                    )
-                condition_match = all(match_property(property, target_properties) for property in properties)
-            else:
+            # :TRICKY: If overrides are enough to determine if a condition is a match,
+            # we can skip checking the query.
+            # This ensures match even if the person hasn't been ingested yet.
+            condition_match = self.evaluate_condition_locally(feature_flag, condition)
+            if condition_match is None:
                 match_if_entity_doesnt_exist = check_pure_is_not_operator_condition(condition)
                 condition_match = self._condition_matches(
                     feature_flag,
@@ -459,6 +459,49 @@ class FeatureFlagMatcher:
 
         return True, FeatureFlagMatchReason.CONDITION_MATCH
 
+    def evaluate_condition_locally(self, feature_flag: FeatureFlag, condition: dict) -> Optional[bool]:
+        """
+        Match the condition against the property overrides only.
+        Returns None if the stored person or group properties are needed to decide it.
+        """
+        compiled_condition = get_compiled_condition(feature_flag, condition)
+        target_properties = self._get_target_properties(feature_flag)
+        if not target_properties:
+            return None
+        if compiled_condition.uses_cohorts:
+            self._load_cohorts()
+        return evaluate_properties(compiled_condition.properties, target_properties, self.cohorts_cache)
+
+    def _get_target_properties(self, feature_flag: FeatureFlag) -> dict[str, Union[str, int]]:
+        if feature_flag.aggregation_group_type_index is None:
+            return self.property_value_overrides
+        if feature_flag.aggregation_group_type_index not in self.cache.group_type_index_to_name:
+            return {}
+        return self.group_property_value_overrides.get(
+            self.cache.group_type_index_to_name[feature_flag.aggregation_group_type_index],
+            {},
+        )
+
+    def _load_cohorts(self) -> None:
+        # only fetch all cohorts if not passed in any cached cohorts
+        if self.cohorts_cache or self._cohorts_loaded:
+            return
+        if self.failed_to_fetch_conditions or self.skip_database_flags:
+            return
+        try:
+            all_cohorts = {
+                cohort.pk: cohort
+                for cohort in Cohort.objects.db_manager(DATABASE_FOR_FLAG_MATCHING).filter(
+                    team__project_id=self.project_id, deleted=False
+                )
+            }
+        except DatabaseError as e:
+            logger.exception("load_cohorts database error", error=str(e), exc_info=True)
+            self.failed_to_fetch_conditions = True
+            raise
+        self.cohorts_cache.update(all_cohorts)
+        self._cohorts_loaded = True
+
     def _super_condition_matches(self, feature_flag: FeatureFlag) -> bool:
         return self._get_query_condition(f"flag_{feature_flag.pk}_super_condition")
 
@@ -500,16 +543,14 @@ class FeatureFlagMatcher:
     # e.g. the first of two variants with 50% rollout percentage will have value_max: 0.5
     # and the second will have value_min: 0.5 and value_max: 1.0
     def variant_lookup_table(self, feature_flag: FeatureFlag):
-        lookup_table = []
-        value_min = 0
-        for variant in feature_flag.variants:
-            value_max = value_min + variant["rollout_percentage"] / 100
-            lookup_table.append({"value_min": value_min, "value_max": value_max, "key": variant["key"]})
-            value_min = value_max
-        return lookup_table
+        if feature_flag.compiled is not None:
+            return feature_flag.compiled.variant_lookup_table
+        return build_variant_lookup_table(feature_flag.variants)
 
     @cached_property
     def query_conditions(self) -> dict[str, bool]:
+        if self._query_conditions is not None:
+            return self._query_conditions
         try:
             # Some extra wiggle room here for timeouts because this depends on the number of flags as well,
             # and not just the database query.
@@ -520,23 +561,7 @@ class FeatureFlagMatcher:
                     persondistinctid__distinct_id=self.distinct_id,
                     persondistinctid__team_id=self.team_id,
                 )
-                basic_group_query: QuerySet = Group.objects.db_manager(DATABASE_FOR_FLAG_MATCHING).filter(
-                    team_id=self.team_id
-                )
-                group_query_per_group_type_mapping: dict[GroupTypeIndex, tuple[QuerySet, list[str]]] = {}
-                # :TRICKY: Create a queryset for each group type that uniquely identifies a group, based on the groups passed in.
-                # If no groups for a group type are passed in, we can skip querying for that group type,
-                # since the result will always be `false`.
-                for group_type, group_key in self.groups.items():
-                    group_type_index = self.cache.group_types_to_indexes.get(group_type)
-                    if group_type_index is not None:
-                        # a tuple of querySet and field names
-                        group_query_per_group_type_mapping[group_type_index] = (
-                            basic_group_query.filter(group_type_index=group_type_index, group_key=group_key),
-                            [],
-                        )
-
-                person_fields: list[str] = []
+                group_query_per_group_type_mapping = self._group_query_per_group_type_mapping()
 
                 for existence_condition_key in self.has_pure_is_not_conditions:
                     if existence_condition_key == PERSON_KEY:
@@ -552,131 +577,9 @@ class FeatureFlagMatcher:
                         group_exists = group_query.exists()
                         all_conditions[f"{ENTITY_EXISTS_PREFIX}{existence_condition_key}"] = group_exists
 
-                def condition_eval(key, condition):
-                    expr = None
-                    annotate_query = True
-                    nonlocal person_query
-
-                    property_list = Filter(data=condition).property_groups.flat
-                    properties_with_math_operators = get_all_properties_with_math_operators(
-                        property_list, self.cohorts_cache, self.project_id
-                    )
-
-                    if len(condition.get("properties", {})) > 0:
-                        # Feature Flags don't support OR filtering yet
-                        target_properties = self.property_value_overrides
-                        if feature_flag.aggregation_group_type_index is not None:
-                            if feature_flag.aggregation_group_type_index not in self.cache.group_type_index_to_name:
-                                target_properties = {}
-                            else:
-                                target_properties = self.group_property_value_overrides.get(
-                                    self.cache.group_type_index_to_name[feature_flag.aggregation_group_type_index],
-                                    {},
-                                )
-
-                        expr = properties_to_Q(
-                            self.project_id,
-                            property_list,
-                            override_property_values=target_properties,
-                            cohorts_cache=self.cohorts_cache,
-                            using_database=DATABASE_FOR_FLAG_MATCHING,
-                        )
-
-                        # TRICKY: Due to property overrides for cohorts, we sometimes shortcircuit the condition check.
-                        # In that case, the expression is either an explicit True or explicit False, or multiple conditions.
-                        # We can skip going to the database in explicit True|False conditions. This is important
-                        # as it allows resolving flags correctly for non-ingested persons.
-                        # However, this doesn't work for the multiple condition case (when expr has multiple Q objects),
-                        # but it's better than nothing.
-                        # TODO: A proper fix would be to handle cohorts with property overrides before we get to this point.
-                        # Unskip test test_complex_cohort_filter_with_override_properties when we fix this.
-                        if expr == Q(pk__isnull=False):
-                            all_conditions[key] = True
-                            annotate_query = False
-                        elif expr == Q(pk__isnull=True):
-                            all_conditions[key] = False
-                            annotate_query = False
-
-                    if annotate_query:
-                        if feature_flag.aggregation_group_type_index is None:
-                            # :TRICKY: Flag matching depends on type of property when doing >, <, >=, <= comparisons.
-                            # This requires a generated field to query in Q objects, which sadly don't allow inlining fields,
-                            # hence we need to annotate the query here, even though these annotations are used much deeper,
-                            # in properties_to_q, in empty_or_null_with_value_q
-                            # These need to come in before the expr so they're available to use inside the expr.
-                            # Same holds for the group queries below.
-                            type_property_annotations = _get_property_type_annotations(properties_with_math_operators)
-                            person_query = person_query.annotate(
-                                **type_property_annotations,
-                                **{
-                                    key: ExpressionWrapper(
-                                        cast(Expression, expr if expr else RawSQL("true", [])),
-                                        output_field=BooleanField(),
-                                    ),
-                                },
-                            )
-                            person_fields.append(key)
-                        else:
-                            if feature_flag.aggregation_group_type_index not in group_query_per_group_type_mapping:
-                                # ignore flags that didn't have the right groups passed in
-                                return
-                            (
-                                group_query,
-                                group_fields,
-                            ) = group_query_per_group_type_mapping[feature_flag.aggregation_group_type_index]
-                            type_property_annotations = _get_property_type_annotations(properties_with_math_operators)
-                            group_query = group_query.annotate(
-                                **type_property_annotations,
-                                **{
-                                    key: ExpressionWrapper(
-                                        cast(Expression, expr if expr else RawSQL("true", [])),
-                                        output_field=BooleanField(),
-                                    ),
-                                },
-                            )
-                            group_fields.append(key)
-                            group_query_per_group_type_mapping[feature_flag.aggregation_group_type_index] = (
-                                group_query,
-                                group_fields,
-                            )
-
-                # only fetch all cohorts if not passed in any cached cohorts
-                if not self.cohorts_cache and any(feature_flag.uses_cohorts for feature_flag in self.feature_flags):
-                    all_cohorts = {
-                        cohort.pk: cohort
-                        for cohort in Cohort.objects.db_manager(DATABASE_FOR_FLAG_MATCHING).filter(
-                            team__project_id=self.project_id, deleted=False
-                        )
-                    }
-                    self.cohorts_cache.update(all_cohorts)
-                # release conditions
-                for feature_flag in self.feature_flags:
-                    # super release conditions
-                    if feature_flag.super_conditions and len(feature_flag.super_conditions) > 0:
-                        condition = feature_flag.super_conditions[0]
-                        prop_key = (condition.get("properties") or [{}])[0].get("key")
-                        if prop_key:
-                            key = f"flag_{feature_flag.pk}_super_condition"
-                            condition_eval(key, condition)
-
-                            is_set_key = f"flag_{feature_flag.pk}_super_condition_is_set"
-                            is_set_condition = {
-                                "properties": [
-                                    {
-                                        "key": prop_key,
-                                        "operator": "is_set",
-                                    }
-                                ]
-                            }
-                            condition_eval(is_set_key, is_set_condition)
-
-                    with start_span(
-                        op="parse_feature_flag_conditions",
-                        description=f"feature_flag={feature_flag.pk} key={feature_flag.key}",
-                    ):
-                        for index, condition in enumerate(feature_flag.conditions):
-                            key = f"flag_{feature_flag.pk}_condition_{index}"
-                            condition_eval(key, condition)
+                person_query, person_fields = self._annotate_condition_queries(
+                    person_query, group_query_per_group_type_mapping, all_conditions
+                )
 
                 if len(person_fields) > 0:
                     with start_span(op="execute_person_query"):
@@ -685,21 +588,10 @@ class FeatureFlagMatcher:
                             if len(person_query) > 0:
                                 all_conditions = {**all_conditions, **person_query[0]}
 
-                if len(group_query_per_group_type_mapping) > 0:
-                    with execute_with_timeout(FLAG_MATCHING_QUERY_TIMEOUT_MS * 2, DATABASE_FOR_FLAG_MATCHING):
-                        for (
-                            group_query,
-                            group_fields,
-                        ) in group_query_per_group_type_mapping.values():
-                            # Only query the group if there's a field to query
-                            if len(group_fields) > 0:
-                                with start_span(op="execute_group_query"):
-                                    group_query = group_query.values(*group_fields)
-                                    if len(group_query) > 0:
-                                        assert (
-                                            len(group_query) == 1
-                                        ), f"Expected 1 group query result, got {len(group_query)}"
-                                        all_conditions = {**all_conditions, **group_query[0]}
+                all_conditions = {
+                    **all_conditions,
+                    **self._query_group_conditions(group_query_per_group_type_mapping),
+                }
                 return all_conditions
         except DatabaseError as e:
             logger.exception("query_conditions database error", error=str(e), exc_info=True)
@@ -711,6 +603,231 @@ class FeatureFlagMatcher:
             # Covers all cases like invalid JSON, invalid operator, invalid property name, invalid group input format, etc.
             raise
 
+    def query_conditions_for_distinct_ids(self, distinct_ids: list[str]) -> dict[str, dict[str, bool]]:
+        """
+        Queries the conditions of all flags for many persons at once, returning the `query_conditions` of each of the
+        distinct_ids. Group conditions only depend on the groups passed in, so they're queried once and shared.
+
+        The matcher's person property overrides apply to every distinct_id, so this is meant to be used with a matcher
+        without them. Each distinct_id then gets its own matcher, created with its conditions.
+        """
+        try:
+            with start_span(op="query_conditions_for_distinct_ids"):
+                shared_conditions: dict = {}
+                person_query: QuerySet = Person.objects.db_manager(DATABASE_FOR_PERSONS).filter(
+                    team_id=self.team_id,
+                    persondistinctid__distinct_id__in=distinct_ids,
+                    persondistinctid__team_id=self.team_id,
+                )
+                group_query_per_group_type_mapping = self._group_query_per_group_type_mapping()
+
+                for existence_condition_key in self.has_pure_is_not_conditions:
+                    # Whether each person exists is known from the person query below
+                    if existence_condition_key == PERSON_KEY:
+                        continue
+                    if existence_condition_key not in group_query_per_group_type_mapping:
+                        continue
+                    group_query, _ = group_query_per_group_type_mapping[cast(GroupTypeIndex, existence_condition_key)]
+                    shared_conditions[f"{ENTITY_EXISTS_PREFIX}{existence_condition_key}"] = group_query.exists()
+
+                person_query, person_fields = self._annotate_condition_queries(
+                    person_query, group_query_per_group_type_mapping, shared_conditions, distinct_ids
+                )
+
+                check_person_exists = PERSON_KEY in self.has_pure_is_not_conditions
+                person_conditions: dict[str, dict] = {}
+                if len(person_fields) > 0 or check_person_exists:
+                    with start_span(op="execute_person_query"):
+                        with execute_with_timeout(BULK_FLAG_MATCHING_QUERY_TIMEOUT_MS, DATABASE_FOR_PERSONS):
+                            for row in person_query.values("persondistinctid__distinct_id", *person_fields):
+                                person_conditions[row.pop("persondistinctid__distinct_id")] = row
+
+                shared_conditions = {
+                    **shared_conditions,
+                    **self._query_group_conditions(group_query_per_group_type_mapping),
+                }
+
+                all_conditions: dict[str, dict[str, bool]] = {}
+                for distinct_id in distinct_ids:
+                    conditions = {**shared_conditions, **person_conditions.get(distinct_id, {})}
+                    if check_person_exists:
+                        conditions[f"{ENTITY_EXISTS_PREFIX}{PERSON_KEY}"] = distinct_id in person_conditions
+                    all_conditions[distinct_id] = conditions
+                return all_conditions
+        except DatabaseError as e:
+            logger.exception("query_conditions_for_distinct_ids database error", error=str(e), exc_info=True)
+            self.failed_to_fetch_conditions = True
+            raise
+
+    def _annotate_condition_queries(
+        self,
+        person_query: QuerySet,
+        group_query_per_group_type_mapping: dict[GroupTypeIndex, tuple[QuerySet, list[str]]],
+        all_conditions: dict,
+        distinct_ids: Optional[list[str]] = None,
+    ) -> tuple[QuerySet, list[str]]:
+        """
+        Annotates the person and group queries with a field for each flag condition that needs the database, and adds
+        the conditions that don't to `all_conditions`. Returns the person query and its condition fields.
+
+        When the person query has a row for each of many `distinct_ids`, person `distinct_id` properties are matched
+        against the distinct_id of each row, as the override of a single distinct_id would be.
+        """
+        person_fields: list[str] = []
+
+        def condition_eval(key, condition):
+            nonlocal person_query
+
+            # Conditions without properties never need the database
+            if len(condition.get("properties", {})) == 0:
+                return
+
+            # Neither do conditions that the overrides are enough to decide. This is important
+            # as it allows resolving flags correctly for non-ingested persons.
+            local_match = self.evaluate_condition_locally(feature_flag, condition)
+            if local_match is not None:
+                all_conditions[key] = local_match
+                return
+
+            property_list = get_compiled_condition(feature_flag, condition).properties
+            properties_with_math_operators = get_all_properties_with_math_operators(
+                property_list, self.cohorts_cache, self.project_id
+            )
+
+            # Feature Flags don't support OR filtering yet
+            expr = properties_to_Q(
+                self.project_id,
+                property_list,
+                override_property_values=self._get_target_properties(feature_flag),
+                cohorts_cache=self.cohorts_cache,
+                using_database=DATABASE_FOR_FLAG_MATCHING,
+                distinct_ids=distinct_ids if feature_flag.aggregation_group_type_index is None else None,
+            )
+
+            # TRICKY: Cohorts that aren't in the cohorts cache are only looked up by `properties_to_Q`,
+            # so a condition on a cohort that doesn't exist is only known to be false at this point.
+            annotate_query = True
+            if expr == Q(pk__isnull=False):
+                all_conditions[key] = True
+                annotate_query = False
+            elif expr == Q(pk__isnull=True):
+                all_conditions[key] = False
+                annotate_query = False
+
+            if annotate_query:
+                if feature_flag.aggregation_group_type_index is None:
+                    # :TRICKY: Flag matching depends on type of property when doing >, <, >=, <= comparisons.
+                    # This requires a generated field to query in Q objects, which sadly don't allow inlining fields,
+                    # hence we need to annotate the query here, even though these annotations are used much deeper,
+                    # in properties_to_q, in empty_or_null_with_value_q
+                    # These need to come in before the expr so they're available to use inside the expr.
+                    # Same holds for the group queries below.
+                    type_property_annotations = _get_property_type_annotations(properties_with_math_operators)
+                    person_query = person_query.annotate(
+                        **type_property_annotations,
+                        **{
+                            key: ExpressionWrapper(
+                                cast(Expression, expr if expr else RawSQL("true", [])),
+                                output_field=BooleanField(),
+                            ),
+                        },
+                    )
+                    person_fields.append(key)
+                else:
+                    if feature_flag.aggregation_group_type_index not in group_query_per_group_type_mapping:
+                        # ignore flags that didn't have the right groups passed in
+                        return
+                    (
+                        group_query,
+                        group_fields,
+                    ) = group_query_per_group_type_mapping[feature_flag.aggregation_group_type_index]
+                    type_property_annotations = _get_property_type_annotations(properties_with_math_operators)
+                    group_query = group_query.annotate(
+                        **type_property_annotations,
+                        **{
+                            key: ExpressionWrapper(
+                                cast(Expression, expr if expr else RawSQL("true", [])),
+                                output_field=BooleanField(),
+                            ),
+                        },
+                    )
+                    group_fields.append(key)
+                    group_query_per_group_type_mapping[feature_flag.aggregation_group_type_index] = (
+                        group_query,
+                        group_fields,
+                    )
+
+        if any(
+            feature_flag.compiled.uses_cohorts if feature_flag.compiled is not None else feature_flag.uses_cohorts
+            for feature_flag in self.feature_flags
+        ):
+            self._load_cohorts()
+        # release conditions
+        for feature_flag in self.feature_flags:
+            # super release conditions
+            if feature_flag.super_conditions and len(feature_flag.super_conditions) > 0:
+                condition = feature_flag.super_conditions[0]
+                prop_key = (condition.get("properties") or [{}])[0].get("key")
+                if prop_key:
+                    key = f"flag_{feature_flag.pk}_super_condition"
+                    condition_eval(key, condition)
+
+                    is_set_key = f"flag_{feature_flag.pk}_super_condition_is_set"
+                    is_set_condition = {
+                        "properties": [
+                            {
+                                "key": prop_key,
+                                "operator": "is_set",
+                            }
+                        ]
+                    }
+                    condition_eval(is_set_key, is_set_condition)
+
+            with start_span(
+                op="parse_feature_flag_conditions",
+                description=f"feature_flag={feature_flag.pk} key={feature_flag.key}",
+            ):
+                for index, condition in enumerate(feature_flag.conditions):
+                    key = f"flag_{feature_flag.pk}_condition_{index}"
+                    condition_eval(key, condition)
+
+        return person_query, person_fields
+
+    def _query_group_conditions(
+        self, group_query_per_group_type_mapping: dict[GroupTypeIndex, tuple[QuerySet, list[str]]]
+    ) -> dict:
+        group_conditions: dict = {}
+        if len(group_query_per_group_type_mapping) > 0:
+            with execute_with_timeout(FLAG_MATCHING_QUERY_TIMEOUT_MS * 2, DATABASE_FOR_FLAG_MATCHING):
+                for (
+                    group_query,
+                    group_fields,
+                ) in group_query_per_group_type_mapping.values():
+                    # Only query the group if there's a field to query
+                    if len(group_fields) > 0:
+                        with start_span(op="execute_group_query"):
+                            group_query = group_query.values(*group_fields)
+                            if len(group_query) > 0:
+                                assert len(group_query) == 1, f"Expected 1 group query result, got {len(group_query)}"
+                                group_conditions = {**group_conditions, **group_query[0]}
+        return group_conditions
+
+    def _group_query_per_group_type_mapping(self) -> dict[GroupTypeIndex, tuple[QuerySet, list[str]]]:
+        basic_group_query: QuerySet = Group.objects.db_manager(DATABASE_FOR_FLAG_MATCHING).filter(team_id=self.team_id)
+        group_query_per_group_type_mapping: dict[GroupTypeIndex, tuple[QuerySet, list[str]]] = {}
+        # :TRICKY: Create a queryset for each group type that uniquely identifies a group, based on the groups passed in.
+        # If no groups for a group type are passed in, we can skip querying for that group type,
+        # since the result will always be `false`.
+        for group_type, group_key in self.groups.items():
+            group_type_index = self.cache.group_types_to_indexes.get(group_type)
+            if group_type_index is not None:
+                # a tuple of querySet and field names
+                group_query_per_group_type_mapping[group_type_index] = (
+                    basic_group_query.filter(group_type_index=group_type_index, group_key=group_key),
+                    [],
+                )
+        return group_query_per_group_type_mapping
+
     def hashed_identifier(self, feature_flag: FeatureFlag) -> Optional[str]:
         """
         If aggregating by people, returns distinct_id.
@@ -759,25 +876,6 @@ class FeatureFlagMatcher:
         hash_val = int(hashlib.sha1(hash_key.encode("utf-8")).hexdigest()[:15], 16)
         return hash_val / __LONG_SCALE__
 
-    def can_compute_locally(
-        self,
-        properties: list[Property],
-        group_type_index: Optional[GroupTypeIndex] = None,
-    ) -> bool:
-        target_properties = self.property_value_overrides
-        if group_type_index is not None:
-            target_properties = self.group_property_value_overrides.get(
-                self.cache.group_type_index_to_name[group_type_index], {}
-            )
-        for property in properties:
-            # can't locally compute if property is a cohort
-            # need to atleast fetch the cohort
-            if property.type == "cohort":
-                return False
-            if property.key not in target_properties:
-                return False
-        return True
-
     def get_highest_priority_match_evaluation(
         self,
         current_match: FeatureFlagMatchReason,
@@ -838,6 +936,35 @@ def get_feature_flag_hash_key_overrides(
     return feature_flag_to_key_overrides
 
 
+def get_feature_flag_hash_key_overrides_for_distinct_ids(
+    team_id: int,
+    distinct_ids: list[str],
+    using_database: str = "default",
+) -> dict[str, dict[str, str]]:
+    """
+    Returns the hash key overrides of the person of each of the distinct_ids, like `get_feature_flag_hash_key_overrides`
+    does for a single distinct_id, with one query for the persons and one for their overrides.
+    """
+    distinct_ids_by_person_id: dict[int, list[str]] = {}
+    for person_id, distinct_id in (
+        PersonDistinctId.objects.db_manager(using_database)
+        .filter(distinct_id__in=distinct_ids, team_id=team_id)
+        .values_list("person_id", "distinct_id")
+    ):
+        distinct_ids_by_person_id.setdefault(person_id, []).append(distinct_id)
+
+    hash_key_overrides: dict[str, dict[str, str]] = {}
+    for feature_flag, override, person_id in (
+        FeatureFlagHashKeyOverride.objects.db_manager(using_database)
+        .filter(person_id__in=list(distinct_ids_by_person_id.keys()), team_id=team_id)
+        .values_list("feature_flag_key", "hash_key", "person_id")
+    ):
+        for distinct_id in distinct_ids_by_person_id[person_id]:
+            hash_key_overrides.setdefault(distinct_id, {})[feature_flag] = override
+
+    return hash_key_overrides
+
+
 # Return a Dict with all flags and their values
 def _get_all_feature_flags(
     feature_flags: list[FeatureFlag],
@@ -1071,6 +1198,122 @@ def get_all_feature_flags_with_details(
     )
 
 
+def get_feature_flags_for_distinct_ids(
+    team: Team,
+    distinct_ids: list[str],
+    groups: Optional[dict[GroupTypeName, str]] = None,
+    group_property_value_overrides: Optional[dict[str, dict[str, Union[str, int]]]] = None,
+    flag_keys: Optional[list[str]] = None,
+) -> Iterator[tuple[str, dict[str, Union[str, bool]], dict[str, object], bool]]:
+    """
+    Evaluates the flags of the team for many distinct_ids, yielding the flags, payloads and whether there were errors
+    computing them for each distinct_id in turn, like `get_all_feature_flags` does for one.
+
+    The distinct_ids are evaluated in batches. For each batch, the conditions of all persons and their hash key overrides
+    are fetched with one query each, while groups and cohorts are only fetched once for all batches.
+
+    Person property overrides aren't supported, other than the `distinct_id` of each person.
+    """
+    if groups is None:
+        groups = {}
+    group_properties: dict[str, dict[str, Union[str, int]]]
+    _, group_properties = add_local_person_and_group_properties(None, groups, {}, group_property_value_overrides or {})
+    all_feature_flags = get_feature_flags_for_team_in_cache(team.project_id)
+    cache_hit = True
+
+    if all_feature_flags is None:
+        cache_hit = False
+        all_feature_flags = set_feature_flags_for_team_in_cache(team.project_id)
+
+    if flag_keys is not None:
+        flag_keys_set = set(flag_keys)
+        all_feature_flags = [ff for ff in all_feature_flags if ff.key in flag_keys_set]
+
+    FLAG_CACHE_HIT_COUNTER.labels(team_id=label_for_team_id_to_track(team.id), cache_hit=cache_hit).inc()
+
+    if not all_feature_flags:
+        for distinct_id in distinct_ids:
+            yield distinct_id, {}, {}, False
+        return
+
+    cache = FlagsMatcherCache(team.project_id)
+    cohorts_cache: dict[int, CohortOrEmpty] = {}
+    for start in range(0, len(distinct_ids), BULK_FLAG_EVALUATION_BATCH_SIZE):
+        yield from _get_feature_flags_for_distinct_id_batch(
+            all_feature_flags,
+            team,
+            distinct_ids[start : start + BULK_FLAG_EVALUATION_BATCH_SIZE],
+            groups,
+            group_properties,
+            cache,
+            cohorts_cache,
+        )
+
+
+def _get_feature_flags_for_distinct_id_batch(
+    feature_flags: list[FeatureFlag],
+    team: Team,
+    distinct_ids: list[str],
+    groups: dict[GroupTypeName, str],
+    group_property_value_overrides: dict[str, dict[str, Union[str, int]]],
+    cache: FlagsMatcherCache,
+    cohorts_cache: dict[int, CohortOrEmpty],
+) -> list[tuple[str, dict[str, Union[str, bool]], dict[str, object], bool]]:
+    skip_database_flags = settings.DECIDE_SKIP_POSTGRES_FLAGS
+
+    hash_key_overrides: dict[str, dict[str, str]] = {}
+    if not skip_database_flags and any(feature_flag.ensure_experience_continuity for feature_flag in feature_flags):
+        with start_span(op="with_experience_continuity_read_path"):
+            try:
+                with execute_with_timeout(BULK_FLAG_MATCHING_QUERY_TIMEOUT_MS, DATABASE_FOR_FLAG_MATCHING):
+                    hash_key_overrides = get_feature_flag_hash_key_overrides_for_distinct_ids(
+                        team.id, distinct_ids, DATABASE_FOR_FLAG_MATCHING
+                    )
+            except Exception as e:
+                handle_feature_flag_exception(
+                    e, "[Feature Flags] Error fetching hash key overrides for distinct ids", set_healthcheck=False
+                )
+                skip_database_flags = True
+
+    query_conditions: dict[str, dict[str, bool]] = {}
+    if not skip_database_flags:
+        try:
+            query_conditions = FeatureFlagMatcher(
+                team.id,
+                team.project_id,
+                feature_flags,
+                "",
+                groups,
+                cache,
+                group_property_value_overrides=group_property_value_overrides,
+                cohorts_cache=cohorts_cache,
+            ).query_conditions_for_distinct_ids(distinct_ids)
+        except Exception as e:
+            handle_feature_flag_exception(
+                e, "[Feature Flags] Error querying flag conditions for distinct ids", set_healthcheck=False
+            )
+            skip_database_flags = True
+
+    results = []
+    for distinct_id in distinct_ids:
+        flag_values, _, flag_payloads, errors, _ = FeatureFlagMatcher(
+            team.id,
+            team.project_id,
+            feature_flags,
+            distinct_id,
+            groups,
+            cache,
+            hash_key_overrides.get(distinct_id, {}),
+            {"distinct_id": distinct_id},
+            group_property_value_overrides,
+            skip_database_flags,
+            cohorts_cache=cohorts_cache,
+            query_conditions=query_conditions.get(distinct_id),
+        ).get_matches_with_details()
+        results.append((distinct_id, flag_values, flag_payloads, errors))
+    return results
+
+
 def set_feature_flag_hash_key_overrides(team: Team, distinct_ids: list[str], hash_key_override: str) -> bool:
     # As a product decision, the first override wins, i.e consistency matters for the first walkthrough.
     # Thus, we don't need to do upserts here.
@@ -1,6 +1,14 @@
+import gzip
+import hashlib
 import json
 import os
+import threading
+from copy import deepcopy
+from dataclasses import dataclass
 from typing import Any, Optional
+
+import brotli
+from cachetools import LRUCache
 from django.conf import settings
 from django.db import models
 from django.http import HttpRequest
@@ -38,6 +46,12 @@ REMOTE_CONFIG_CACHE_COUNTER = Counter(
     labelnames=["result"],
 )
 
+REMOTE_CONFIG_ARTIFACTS_CACHE_COUNTER = Counter(
+    "posthog_remote_config_artifacts_via_cache",
+    "Metric tracking whether the response bodies of a remote config were fetched from cache or not",
+    labelnames=["result"],
+)
+
 REMOTE_CONFIG_CDN_PURGE_COUNTER = Counter(
     "posthog_remote_config_cdn_purge",
     "Number of times the remote config CDN purge task has been run",
@@ -72,24 +86,157 @@ def cache_key_for_team_token(team_token: str) -> str:
     return f"remote_config/{team_token}/config"
 
 
-def sanitize_config_for_public_cdn(config: dict, request: Optional[HttpRequest] = None) -> dict:
+def artifacts_cache_key_for_team_token(team_token: str) -> str:
+    return f"remote_config/{team_token}/artifacts"
+
+
+def _recording_domains(config: dict) -> list[str]:
+    session_recording = config.get("sessionRecording")
+    if not session_recording:
+        return []
+    return session_recording.get("domains") or []
+
+
+def is_recording_permitted(recording_domains: list[str], request: Optional[HttpRequest] = None) -> bool:
     from posthog.api.utils import on_permitted_recording_domain
 
+    # Empty list of domains means always permitted
+    if request and recording_domains:
+        return on_permitted_recording_domain(recording_domains, request=request)
+    return True
+
+
+def _sanitize_config(config: dict, recording_permitted: bool) -> dict:
     # Remove domains from session recording
     if config.get("sessionRecording"):
-        if "domains" in config["sessionRecording"]:
-            domains = config["sessionRecording"].pop("domains")
-
-            # Empty list of domains means always permitted
-            if request and domains:
-                if not on_permitted_recording_domain(domains, request=request):
-                    config["sessionRecording"] = False
+        config["sessionRecording"].pop("domains", None)
+        if not recording_permitted:
+            config["sessionRecording"] = False
 
     # Remove site apps JS
     config.pop("siteAppsJS", None)
     return config
 
 
+def sanitize_config_for_public_cdn(config: dict, request: Optional[HttpRequest] = None) -> dict:
+    return _sanitize_config(config, is_recording_permitted(_recording_domains(config), request=request))
+
+
+# Bodies are compressed on sync and, for array.js, while serving a request, so this trades a slightly larger body for
+# compressing in a few milliseconds rather than the hundreds brotli's default quality of 11 takes on the array.js bundle
+BROTLI_QUALITY = 5
+ENCODINGS = ("br", "gzip")
+
+
+class RemoteConfigArtifact:
+    """
+    A response body of the remote config endpoints, with its content hash. Each compressed encoding is built the first
+    time it's asked for and kept on the artifact.
+    """
+
+    def __init__(self, content: bytes, content_hash: str, encoded: Optional[dict[str, bytes]] = None):
+        self.content = content
+        self.content_hash = content_hash
+        self._encoded: dict[str, bytes] = dict(encoded or {})
+
+    @classmethod
+    def from_content(cls, content: str) -> "RemoteConfigArtifact":
+        data = content.encode("utf-8")
+        return cls(content=data, content_hash=hashlib.sha256(data).hexdigest()[:32])
+
+    def encode(self, encoding: str) -> bytes:
+        encoded = self._encoded.get(encoding)
+        if encoded is None:
+            if encoding == "br":
+                encoded = brotli.compress(self.content, quality=BROTLI_QUALITY)
+            elif encoding == "gzip":
+                encoded = gzip.compress(self.content, mtime=0)
+            else:
+                raise ValueError(f"Unsupported encoding: {encoding}")
+            self._encoded[encoding] = encoded
+        return encoded
+
+    @property
+    def gzip(self) -> bytes:
+        return self.encode("gzip")
+
+    @property
+    def br(self) -> bytes:
+        return self.encode("br")
+
+    @property
+    def size(self) -> int:
+        # The encodings may only be built after the artifact is cached, so they're counted as large as the content
+        return len(self.content) * (1 + len(ENCODINGS))
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"content": self.content, "content_hash": self.content_hash, "encoded": dict(self._encoded)}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "RemoteConfigArtifact":
+        return cls(content=data["content"], content_hash=data["content_hash"], encoded=data["encoded"])
+
+
+@dataclass(frozen=True)
+class RemoteConfigArtifacts:
+    """
+    The response bodies of a remote config, keyed by endpoint and whether session recording is permitted. Bodies for
+    origins that aren't permitted to record are only built when the recording is limited to some domains.
+    """
+
+    recording_domains: list[str]
+    artifacts: dict[tuple[str, bool], RemoteConfigArtifact]
+
+    def to_dict(self) -> dict[str, Any]:
+        """Plain lists, dicts and bytes, so what's stored in redis doesn't depend on these classes"""
+        return {
+            "recording_domains": self.recording_domains,
+            "artifacts": [
+                {"name": name, "recording_permitted": recording_permitted, **artifact.to_dict()}
+                for (name, recording_permitted), artifact in self.artifacts.items()
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "RemoteConfigArtifacts":
+        return cls(
+            recording_domains=data["recording_domains"],
+            artifacts={
+                (artifact["name"], artifact["recording_permitted"]): RemoteConfigArtifact.from_dict(artifact)
+                for artifact in data["artifacts"]
+            },
+        )
+
+
+# The array.js bodies include the whole array.js bundle, so rather than storing them for every team in redis,
+# they're built from the stored config.js body once per process
+_array_js_artifacts: Optional[LRUCache[tuple[str, str], RemoteConfigArtifact]] = None
+_array_js_artifacts_lock = threading.Lock()
+
+
+def get_array_js_artifact(config_js: RemoteConfigArtifact) -> RemoteConfigArtifact:
+    global _array_js_artifacts
+
+    array_js_content = get_array_js_content()
+    # The bundle only changes on deploys, but keying on it keeps the cache correct regardless. Its hash is cached by
+    # the string itself, so this is as cheap as keying on the config.js hash alone.
+    key = (config_js.content_hash, array_js_content)
+    with _array_js_artifacts_lock:
+        if _array_js_artifacts is None:
+            _array_js_artifacts = LRUCache(
+                maxsize=settings.REMOTE_CONFIG_ARRAY_JS_CACHE_MAX_SIZE_BYTES, getsizeof=lambda artifact: artifact.size
+            )
+        artifact = _array_js_artifacts.get(key)
+
+    if artifact is None:
+        artifact = RemoteConfigArtifact.from_content(f"""{array_js_content}\n\n{config_js.content.decode("utf-8")}""")
+        with _array_js_artifacts_lock:
+            if artifact.size <= _array_js_artifacts.maxsize:
+                _array_js_artifacts[key] = artifact
+
+    return artifact
+
+
 class RemoteConfig(UUIDModel):
     """
     RemoteConfig is a helper model. There is one per team and stores a highly cacheable JSON object
@@ -331,20 +478,46 @@ class RemoteConfig(UUIDModel):
         return data
 
     @classmethod
-    def get_config_via_token(cls, token: str, request: Optional[HttpRequest] = None) -> dict:
-        config = cls._get_config_via_cache(token)
-        config = sanitize_config_for_public_cdn(config, request=request)
+    def _get_artifacts_via_cache(cls, token: str) -> RemoteConfigArtifacts:
+        key = artifacts_cache_key_for_team_token(token)
 
-        return config
+        data = cache.get(key)
+        if isinstance(data, dict):
+            REMOTE_CONFIG_ARTIFACTS_CACHE_COUNTER.labels(result="hit").inc()
+            return RemoteConfigArtifacts.from_dict(data)
+
+        REMOTE_CONFIG_ARTIFACTS_CACHE_COUNTER.labels(result="miss").inc()
+        artifacts = cls._build_artifacts(token, cls._get_config_via_cache(token))
+        cache.set(key, artifacts.to_dict(), timeout=CACHE_TIMEOUT)
+
+        return artifacts
 
     @classmethod
-    def get_config_js_via_token(cls, token: str, request: Optional[HttpRequest] = None) -> str:
-        config = cls._get_config_via_cache(token)
+    def _build_artifacts(cls, token: str, config: dict) -> RemoteConfigArtifacts:
+        recording_domains = _recording_domains(config)
+        artifacts = {}
+        for recording_permitted in (True, False) if recording_domains else (True,):
+            artifacts[("config", recording_permitted)] = RemoteConfigArtifact.from_content(
+                json.dumps(_sanitize_config(deepcopy(config), recording_permitted))
+            )
+            artifacts[("config.js", recording_permitted)] = RemoteConfigArtifact.from_content(
+                cls._build_config_js(token, deepcopy(config), recording_permitted)
+            )
+
+        # These are stored in redis and read back on every request, so every encoding is built before they're stored
+        for artifact in artifacts.values():
+            for encoding in ENCODINGS:
+                artifact.encode(encoding)
+
+        return RemoteConfigArtifacts(recording_domains=recording_domains, artifacts=artifacts)
+
+    @classmethod
+    def _build_config_js(cls, token: str, config: dict, recording_permitted: bool) -> str:
         # Get the site apps JS so we can render it in the JS
         site_apps_js = config.pop("siteAppsJS", None)
         # We don't want to include the minimal site apps content as we have the JS now
         config.pop("siteApps", None)
-        config = sanitize_config_for_public_cdn(config, request=request)
+        config = _sanitize_config(config, recording_permitted)
 
         js_content = f"""(function() {{
   window._POSTHOG_REMOTE_CONFIG = window._POSTHOG_REMOTE_CONFIG || {{}};
@@ -358,11 +531,34 @@ class RemoteConfig(UUIDModel):
         return js_content
 
     @classmethod
-    def get_array_js_via_token(cls, token: str, request: Optional[HttpRequest] = None) -> str:
-        # NOTE: Unlike the other methods we dont store this in the cache as it is cheap to build at runtime
-        js_content = cls.get_config_js_via_token(token, request=request)
+    def get_config_via_token(cls, token: str, request: Optional[HttpRequest] = None) -> dict:
+        config = cls._get_config_via_cache(token)
+        config = sanitize_config_for_public_cdn(config, request=request)
+
+        return config
+
+    @classmethod
+    def get_artifact_via_token(
+        cls, token: str, name: str, request: Optional[HttpRequest] = None
+    ) -> RemoteConfigArtifact:
+        """
+        Returns the response body of the "config", "config.js" or "array.js" endpoint, as built when the config was
+        last synced.
+        """
+        artifacts = cls._get_artifacts_via_cache(token)
+        recording_permitted = is_recording_permitted(artifacts.recording_domains, request=request)
+
+        if name == "array.js":
+            return get_array_js_artifact(artifacts.artifacts[("config.js", recording_permitted)])
+        return artifacts.artifacts[(name, recording_permitted)]
+
+    @classmethod
+    def get_config_js_via_token(cls, token: str, request: Optional[HttpRequest] = None) -> str:
+        return cls.get_artifact_via_token(token, "config.js", request=request).content.decode("utf-8")
 
-        return f"""{get_array_js_content()}\n\n{js_content}"""
+    @classmethod
+    def get_array_js_via_token(cls, token: str, request: Optional[HttpRequest] = None) -> str:
+        return cls.get_artifact_via_token(token, "array.js", request=request).content.decode("utf-8")
 
     def sync(self, force: bool = False):
         """
@@ -383,8 +579,16 @@ class RemoteConfig(UUIDModel):
             self.synced_at = timezone.now()
             self.save()
 
-            # Update the redis cache key for the config
-            cache.set(cache_key_for_team_token(self.team.api_token), config, timeout=CACHE_TIMEOUT)
+            # Update the redis cache keys for the config and the response bodies built from it
+            cache.set_many(
+                {
+                    cache_key_for_team_token(self.team.api_token): config,
+                    artifacts_cache_key_for_team_token(self.team.api_token): self._build_artifacts(
+                        self.team.api_token, config
+                    ).to_dict(),
+                },
+                timeout=CACHE_TIMEOUT,
+            )
             # Invalidate Cloudflare CDN cache
             self._purge_cdn()
 
@@ -1,7 +1,10 @@
 from decimal import Decimal
+import gzip
+import json
 from unittest.mock import patch
 
 from parameterized import parameterized
+import brotli
 from django.test import RequestFactory
 from inline_snapshot import snapshot
 import pytest
@@ -11,7 +14,7 @@ from posthog.models.surveys.survey import Survey
 from posthog.models.hog_functions.hog_function import HogFunction, HogFunctionType
 from posthog.models.plugin import Plugin, PluginConfig, PluginSourceFile
 from posthog.models.project import Project
-from posthog.models.remote_config import RemoteConfig, cache_key_for_team_token
+from posthog.models.remote_config import RemoteConfig, artifacts_cache_key_for_team_token, cache_key_for_team_token
 from posthog.test.base import BaseTest
 from django.core.cache import cache
 from django.utils import timezone
@@ -318,6 +321,7 @@ class TestRemoteConfigCaching(_RemoteConfigBase):
         self.remote_config.refresh_from_db()
         # Clear the cache so we are properly testing each flow
         assert cache.delete(cache_key_for_team_token(self.team.api_token))
+        cache.delete(artifacts_cache_key_for_team_token(self.team.api_token))
 
     def _assert_matches_config(self, data):
         assert data == snapshot(
@@ -397,6 +401,55 @@ class TestRemoteConfigCaching(_RemoteConfigBase):
         self.remote_config.sync()
         assert cache.get(cache_key_for_team_token(self.team.api_token))
 
+    def test_persists_artifacts_to_redis_on_sync(self):
+        self.remote_config.config["surveys"] = True
+        self.remote_config.sync()
+
+        with self.assertNumQueries(0):
+            artifact = RemoteConfig.get_artifact_via_token(self.team.api_token, "config.js")
+
+        self._assert_matches_config_js(artifact.content.decode())
+        assert gzip.decompress(artifact.gzip) == artifact.content
+        assert brotli.decompress(artifact.br) == artifact.content
+
+    def test_stores_artifacts_in_redis_as_plain_data(self):
+        self.remote_config.sync()
+
+        data = cache.get(artifacts_cache_key_for_team_token(self.team.api_token))
+        assert isinstance(data, dict)
+        assert data["recording_domains"] == ["https://*.example.com"]
+        assert {(artifact["name"], artifact["recording_permitted"]) for artifact in data["artifacts"]} == {
+            ("config", True),
+            ("config", False),
+            ("config.js", True),
+            ("config.js", False),
+        }
+        for artifact in data["artifacts"]:
+            assert isinstance(artifact["content"], bytes)
+            assert set(artifact["encoded"]) == {"br", "gzip"}
+            assert brotli.decompress(artifact["encoded"]["br"]) == artifact["content"]
+
+    def test_rebuilds_artifacts_cached_in_another_format(self):
+        self.remote_config.sync()
+        cache.set(artifacts_cache_key_for_team_token(self.team.api_token), object())
+
+        artifact = RemoteConfig.get_artifact_via_token(self.team.api_token, "config.js")
+
+        self._assert_matches_config_js(artifact.content.decode())
+        assert isinstance(cache.get(artifacts_cache_key_for_team_token(self.team.api_token)), dict)
+
+    def test_artifacts_change_with_the_config(self):
+        artifact = RemoteConfig.get_artifact_via_token(self.team.api_token, "config")
+
+        self.team.surveys_opt_in = False
+        self.team.autocapture_exceptions_opt_in = True
+        self.team.save()
+        self.remote_config.sync()
+
+        new_artifact = RemoteConfig.get_artifact_via_token(self.team.api_token, "config")
+        assert new_artifact.content_hash != artifact.content_hash
+        assert json.loads(new_artifact.content)["autocaptureExceptions"]
+
     def test_gets_via_redis_cache(self):
         with self.assertNumQueries(CONFIG_REFRESH_QUERY_COUNT):
             data = RemoteConfig.get_config_via_token(self.team.api_token)
@@ -492,6 +545,22 @@ class TestRemoteConfigCaching(_RemoteConfigBase):
             config = self.remote_config.get_config_via_token(self.team.api_token, request=mock_request)
             assert not config["sessionRecording"]
 
+    @patch("posthog.models.remote_config.get_array_js_content", return_value="[MOCKED_ARRAY_JS_CONTENT]")
+    def test_only_includes_recording_in_artifacts_for_approved_domains(self, mock_get_array_js_content):
+        with self.assertNumQueries(CONFIG_REFRESH_QUERY_COUNT):
+            mock_request = RequestFactory().get("/")
+            mock_request.META["HTTP_ORIGIN"] = "https://my.example.com"
+            artifact = RemoteConfig.get_artifact_via_token(self.team.api_token, "config", request=mock_request)
+            assert json.loads(artifact.content)["sessionRecording"]
+
+        with self.assertNumQueries(0):
+            mock_request = RequestFactory().get("/")
+            mock_request.META["HTTP_ORIGIN"] = "https://other.com"
+            for name in ["config", "config.js", "array.js"]:
+                other_artifact = RemoteConfig.get_artifact_via_token(self.team.api_token, name, request=mock_request)
+                assert other_artifact.content_hash != artifact.content_hash
+                assert b'"sessionRecording": false' in other_artifact.content
+
     @patch("posthog.models.remote_config.requests.post")
     def test_purges_cdn_cache_on_sync(self, mock_post):
         with self.settings(
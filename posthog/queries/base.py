@@ -287,7 +287,13 @@ def property_to_Q(
     override_property_values: Optional[dict[str, Any]] = None,
     cohorts_cache: Optional[dict[int, CohortOrEmpty]] = None,
     using_database: str = "default",
+    distinct_ids: Optional[list[str]] = None,
 ) -> Q:
+    """
+    `distinct_ids` is for querying the persons of many distinct_ids at once, one row per distinct_id. Person
+    `distinct_id` properties are then matched against each of them, like an override would be, and filter on the
+    distinct_id of the row.
+    """
     if override_property_values is None:
         override_property_values = {}
     if property.type not in ["person", "group", "cohort", "event"]:
@@ -339,6 +345,7 @@ def property_to_Q(
                 override_property_values,
                 cohorts_cache,
                 using_database,
+                distinct_ids,
             )
 
     # short circuit query if key exists in override_property_values
@@ -355,6 +362,14 @@ def property_to_Q(
             # See https://code.djangoproject.com/ticket/32554 for gotcha explanation
             return Q(pk__isnull=False)
 
+    if distinct_ids is not None and property.key == "distinct_id" and property.type != "group":
+        matching_distinct_ids = [
+            distinct_id for distinct_id in distinct_ids if match_property(property, {"distinct_id": distinct_id})
+        ]
+        if not matching_distinct_ids:
+            return Q(pk__isnull=True)
+        return Q(persondistinctid__distinct_id__in=matching_distinct_ids)
+
     # if no override matches, return a true Q object
 
     column = "group_properties" if property.type == "group" else "properties"
@@ -399,6 +414,7 @@ def property_group_to_Q(
     override_property_values: Optional[dict[str, Any]] = None,
     cohorts_cache: Optional[dict[int, CohortOrEmpty]] = None,
     using_database: str = "default",
+    distinct_ids: Optional[list[str]] = None,
 ) -> Q:
     if override_property_values is None:
         override_property_values = {}
@@ -415,6 +431,7 @@ def property_group_to_Q(
                 override_property_values,
                 cohorts_cache,
                 using_database,
+                distinct_ids,
             )
             if property_group.type == PropertyOperatorType.OR:
                 filters |= group_filter
@@ -424,7 +441,7 @@ def property_group_to_Q(
         for property in property_group.values:
             property = cast(Property, property)
             property_filter = property_to_Q(
-                project_id, property, override_property_values, cohorts_cache, using_database
+                project_id, property, override_property_values, cohorts_cache, using_database, distinct_ids
             )
             if property_group.type == PropertyOperatorType.OR:
                 if property.negation:
@@ -446,6 +463,7 @@ def properties_to_Q(
     override_property_values: Optional[dict[str, Any]] = None,
     cohorts_cache: Optional[dict[int, CohortOrEmpty]] = None,
     using_database: str = "default",
+    distinct_ids: Optional[list[str]] = None,
 ) -> Q:
     """
     Converts a filter to Q, for use in Django ORM .filter()
@@ -464,6 +482,7 @@ def properties_to_Q(
         override_property_values,
         cohorts_cache,
         using_database,
+        distinct_ids,
     )
 
 
@@ -18,6 +18,7 @@ from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.core.cache import cache
 from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
 from drf_spectacular.utils import extend_schema
 from prometheus_client import Counter, Histogram
 from pydantic import ValidationError, BaseModel
@@ -71,8 +72,9 @@ from openai.types.chat import (
     ChatCompletionAssistantMessageParam,
 )
 from posthog.session_recordings.utils import clean_prompt_whitespace
+from posthog.session_recordings.session_recording_v2_block_cache import get_block_cache, list_blocks_cached
 from posthog.session_recordings.session_recording_v2_service import list_blocks
-from posthog.storage.session_recording_v2_object_storage import BlockFetchError
+from posthog.storage.session_recording_v2_object_storage import BlockFetchError, decompress_block
 from posthog.exceptions_capture import capture_exception
 
 SNAPSHOTS_BY_PERSONAL_API_KEY_COUNTER = Counter(
@@ -664,7 +666,9 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
             return self._stream_blob_to_client(recording, request, event_properties)
         elif source == "blob_v2":
             blob_key = request.GET.get("blob_key")
-            if blob_key:
+            if request.GET.get("start_blob_key") or request.GET.get("end_blob_key"):
+                return self._stream_blob_v2_range_to_client(recording, request, event_properties)
+            elif blob_key:
                 return self._stream_blob_v2_to_client(recording, request, event_properties)
             else:
                 return self._gather_session_recording_sources(recording, is_v2_enabled)
@@ -710,7 +714,8 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
         blob_prefix = ""
 
         if is_v2_enabled:
-            blocks = list_blocks(recording)
+            # The player asks for the blocks listed here next, so refresh the cached block list they'll be served from
+            blocks = list_blocks_cached(recording, refresh=True) if get_block_cache() else list_blocks(recording)
             for i, block in enumerate(blocks):
                 sources.append(
                     {
@@ -927,7 +932,11 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
         )
 
         with STREAM_RESPONSE_TO_CLIENT_HISTOGRAM.time():
-            blocks = list_blocks(recording)
+            block_cache = get_block_cache()
+            if block_cache:
+                blocks = list_blocks_cached(recording, min_blocks=block_index + 1)
+            else:
+                blocks = list_blocks(recording)
             if not blocks:
                 raise exceptions.NotFound("Session recording not found")
 
@@ -935,8 +944,18 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
                 raise exceptions.NotFound("Block index out of range")
 
             block = blocks[block_index]
+            storage = session_recording_v2_object_storage.client()
+            accepts_snappy = self._accepts_encoding(request, "snappy")
             try:
-                decompressed_block = session_recording_v2_object_storage.client().fetch_block(block["url"])
+                if block_cache:
+                    compressed_block = block_cache.get(storage, block["url"])
+                    next_blocks = blocks[
+                        block_index + 1 : block_index + 1 + settings.SESSION_RECORDING_V2_BLOCK_PREFETCH_COUNT
+                    ]
+                    block_cache.prefetch(storage, [next_block["url"] for next_block in next_blocks])
+                else:
+                    compressed_block = storage.fetch_compressed_block(block["url"])
+                content: bytes | str = compressed_block if accepts_snappy else decompress_block(compressed_block)
             except BlockFetchError:
                 logger.exception(
                     "Failed to fetch block",
@@ -947,9 +966,13 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
                 raise exceptions.APIException("Failed to load recording block")
 
             response = HttpResponse(
-                content=decompressed_block,
+                content=content,
                 content_type="application/jsonl",
             )
+            if accepts_snappy:
+                # Blocks are stored snappy compressed, so clients that can decompress them get them as stored
+                response["Content-Encoding"] = "snappy"
+            patch_vary_headers(response, ("Accept-Encoding",))
 
             # Set caching headers - blocks are immutable so we can cache for a while
             response["Cache-Control"] = "max-age=3600"
@@ -957,6 +980,91 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
 
             return response
 
+    def _stream_blob_v2_range_to_client(
+        self, recording: SessionRecording, request: request.Request, event_properties: dict
+    ) -> StreamingHttpResponse:
+        """Stream the v2 session recording blocks from start_blob_key to end_blob_key, inclusive, to the client.
+
+        Blocks stored next to each other are read from object storage together, and each block is sent on as soon as
+        it's decompressed.
+        """
+        try:
+            start_block_index = int(request.GET.get("start_blob_key", ""))
+            end_block_index = int(request.GET.get("end_blob_key", ""))
+        except ValueError:
+            raise exceptions.ValidationError("Blob keys must be integers")
+
+        if start_block_index < 0 or end_block_index < start_block_index:
+            raise exceptions.ValidationError("End blob key must not be before start blob key")
+
+        event_properties["source"] = "blob_v2"
+        event_properties["start_blob_key"] = start_block_index
+        event_properties["end_blob_key"] = end_block_index
+        posthoganalytics.capture(
+            self._distinct_id_from_request(request),
+            "session recording snapshots v2 loaded",
+            event_properties,
+        )
+
+        with STREAM_RESPONSE_TO_CLIENT_HISTOGRAM.time():
+            if get_block_cache():
+                blocks = list_blocks_cached(recording, min_blocks=end_block_index + 1)
+            else:
+                blocks = list_blocks(recording)
+            if not blocks:
+                raise exceptions.NotFound("Session recording not found")
+
+            if end_block_index >= len(blocks):
+                raise exceptions.NotFound("Block index out of range")
+
+            block_urls = [block["url"] for block in blocks[start_block_index : end_block_index + 1]]
+            try:
+                compressed_blocks = session_recording_v2_object_storage.client().fetch_compressed_blocks(block_urls)
+                # Read the first blocks before responding, so failing to load them is still an error response
+                first_block = decompress_block(next(compressed_blocks))
+            except BlockFetchError:
+                logger.exception(
+                    "Failed to fetch block",
+                    recording_id=recording.session_id,
+                    team_id=self.team.id,
+                    block_index=start_block_index,
+                )
+                raise exceptions.APIException("Failed to load recording block")
+
+        def stream_blocks() -> Generator[str, None, None]:
+            yield first_block
+            try:
+                for compressed_block in compressed_blocks:
+                    yield "\n"
+                    yield decompress_block(compressed_block)
+            except BlockFetchError:
+                # The response has started already, so let the server drop the connection, for the client not to take
+                # a truncated response as a complete one
+                logger.exception(
+                    "Failed to fetch block",
+                    recording_id=recording.session_id,
+                    team_id=self.team.id,
+                    start_block_index=start_block_index,
+                    end_block_index=end_block_index,
+                )
+                raise
+
+        response = StreamingHttpResponse(stream_blocks(), content_type="application/jsonl")
+
+        # Set caching headers - blocks are immutable so we can cache for a while
+        response["Cache-Control"] = "max-age=3600"
+        response["Content-Disposition"] = "inline"
+
+        return response
+
+    @staticmethod
+    def _accepts_encoding(request: request.Request, encoding: str) -> bool:
+        for accepted in request.headers.get("Accept-Encoding", "").split(","):
+            name, _, params = accepted.partition(";")
+            if name.strip().lower() == encoding:
+                return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+        return False
+
     def _send_realtime_snapshots_to_client(
         self, recording: SessionRecording, request: request.Request, event_properties: dict
     ) -> HttpResponse | Response:
@@ -0,0 +1,138 @@
+"""
+Caching of session recording v2 blocks for the snapshots API.
+
+Players load the blocks of a recording one after another, so the block list of a recording is kept in the Django cache
+for a short while, instead of being queried from ClickHouse for every block, and the next blocks are fetched in the
+background while the player is busy with the current one. Blocks are immutable, so they're kept in an in-process LRU
+cache keyed by their URL, snappy compressed as they're stored.
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+from cachetools import LRUCache
+from django.conf import settings
+from django.core.cache import cache
+from prometheus_client import Counter
+
+from posthog.session_recordings.models.session_recording import SessionRecording
+from posthog.session_recordings.session_recording_v2_service import RecordingBlock, list_blocks
+from posthog.storage.session_recording_v2_object_storage import BlockFetchError, SessionRecordingV2ObjectStorageBase
+
+BLOCK_MANIFEST_CACHE_COUNTER = Counter(
+    "posthog_session_recording_v2_block_manifest_cache_total",
+    "Lookups of the block list of session recordings in the cache",
+    labelnames=["result"],
+)
+BLOCK_CACHE_COUNTER = Counter(
+    "posthog_session_recording_v2_block_cache_total",
+    "Lookups of session recording v2 blocks in the in-process cache",
+    labelnames=["result"],
+)
+
+BLOCK_MANIFEST_CACHE_KEY_PREFIX = "session_recording_v2_blocks"
+
+
+def list_blocks_cached(recording: SessionRecording, min_blocks: int = 0, refresh: bool = False) -> list[RecordingBlock]:
+    """
+    Returns the blocks of the recording like `list_blocks`, from the cache if it holds at least `min_blocks` of them.
+    Ongoing recordings get new blocks, so a cached list that's too short for the block asked for is refreshed.
+    """
+    key = f"{BLOCK_MANIFEST_CACHE_KEY_PREFIX}:{recording.team.id}:{recording.session_id}"
+    if not refresh:
+        blocks: Optional[list[RecordingBlock]] = cache.get(key)
+        if blocks is not None and len(blocks) >= min_blocks:
+            BLOCK_MANIFEST_CACHE_COUNTER.labels(result="hit").inc()
+            return blocks
+        BLOCK_MANIFEST_CACHE_COUNTER.labels(result="miss").inc()
+
+    blocks = list_blocks(recording)
+    # Recordings without blocks may still be ingesting their first one
+    if blocks:
+        cache.set(key, blocks, timeout=settings.SESSION_RECORDING_V2_BLOCK_MANIFEST_CACHE_TTL)
+    return blocks
+
+
+class BlockCache:
+    """
+    Thread safe, size bounded LRU cache of compressed blocks, which can fetch blocks in the background.
+
+    A block that's requested while it's being prefetched is waited for instead of being fetched a second time.
+    """
+
+    def __init__(self, max_size_bytes: int, prefetch_workers: int):
+        self._blocks: LRUCache[str, bytes] = LRUCache(maxsize=max_size_bytes, getsizeof=len)
+        self._fetching: dict[str, Future[bytes]] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=prefetch_workers, thread_name_prefix="session_recording_v2_block_prefetch"
+        )
+        # Don't queue up more prefetches than the workers can get through while a player plays a block
+        self._max_pending_prefetches = prefetch_workers * 4
+
+    def get(self, storage: SessionRecordingV2ObjectStorageBase, block_url: str) -> bytes:
+        """Returns the compressed block, fetching it if it's not cached, or raises BlockFetchError"""
+        with self._lock:
+            block = self._blocks.get(block_url)
+            prefetch = self._fetching.get(block_url) if block is None else None
+
+        if block is not None:
+            BLOCK_CACHE_COUNTER.labels(result="hit").inc()
+            return block
+
+        if prefetch is not None:
+            BLOCK_CACHE_COUNTER.labels(result="prefetching").inc()
+            try:
+                return prefetch.result()
+            except BlockFetchError:
+                # The prefetch may have failed on a transient error, so try again like a miss would
+                pass
+
+        BLOCK_CACHE_COUNTER.labels(result="miss").inc()
+        return self._fetch(storage, block_url)
+
+    def prefetch(self, storage: SessionRecordingV2ObjectStorageBase, block_urls: list[str]) -> None:
+        for block_url in block_urls:
+            with self._lock:
+                if len(self._fetching) >= self._max_pending_prefetches:
+                    return
+                if block_url in self._blocks or block_url in self._fetching:
+                    continue
+                self._fetching[block_url] = self._executor.submit(self._prefetch, storage, block_url)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._blocks.clear()
+
+    def _fetch(self, storage: SessionRecordingV2ObjectStorageBase, block_url: str) -> bytes:
+        block = storage.fetch_compressed_block(block_url)
+        with self._lock:
+            if len(block) <= self._blocks.maxsize:
+                self._blocks[block_url] = block
+        return block
+
+    def _prefetch(self, storage: SessionRecordingV2ObjectStorageBase, block_url: str) -> bytes:
+        try:
+            return self._fetch(storage, block_url)
+        finally:
+            with self._lock:
+                self._fetching.pop(block_url, None)
+
+
+_block_cache: Optional[BlockCache] = None
+_block_cache_lock = threading.Lock()
+
+
+def get_block_cache() -> Optional[BlockCache]:
+    global _block_cache
+    if not settings.SESSION_RECORDING_V2_BLOCK_CACHE_ENABLED:
+        return None
+    if _block_cache is None:
+        with _block_cache_lock:
+            if _block_cache is None:
+                _block_cache = BlockCache(
+                    max_size_bytes=settings.SESSION_RECORDING_V2_BLOCK_CACHE_MAX_SIZE_BYTES,
+                    prefetch_workers=settings.SESSION_RECORDING_V2_BLOCK_PREFETCH_WORKERS,
+                )
+    return _block_cache
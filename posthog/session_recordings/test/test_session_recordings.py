@@ -12,6 +12,7 @@ from django.utils.timezone import now
 from freezegun import freeze_time
 from parameterized import parameterized
 import pytest
+import snappy
 from rest_framework import status
 
 from posthog.api.test.test_team import create_team
@@ -28,6 +29,10 @@ from posthog.session_recordings.queries.test.session_replay_sql import (
     produce_replay_summary,
 )
 from posthog.session_recordings.test import setup_stream_from
+from posthog.storage.session_recording_v2_object_storage import (
+    SessionRecordingV2ObjectStorage,
+    UnavailableSessionRecordingV2ObjectStorage,
+)
 from posthog.test.base import (
     APIBaseTest,
     ClickhouseTestMixin,
@@ -907,6 +912,74 @@ class TestSessionRecordings(APIBaseTest, ClickhouseTestMixin, QueryMatchingTest)
             }
         }
 
+    @patch(
+        "posthog.session_recordings.queries.session_replay_events.SessionReplayEvents.exists",
+        return_value=True,
+    )
+    @patch("posthog.session_recordings.session_recording_api.SessionRecording.get_or_build")
+    @patch("posthog.session_recordings.session_recording_api.list_blocks")
+    @patch("posthog.session_recordings.session_recording_api.session_recording_v2_object_storage.client")
+    def test_can_get_session_recording_v2_block_range(
+        self,
+        mock_v2_client,
+        mock_list_blocks,
+        mock_get_session_recording,
+        _mock_exists,
+    ) -> None:
+        session_id = str(uuid.uuid4())
+        mock_get_session_recording.return_value = SessionRecording(session_id=session_id, team=self.team, deleted=False)
+
+        compressed_blocks = [snappy.compress(f'{{"block": {i}}}\n'.encode()) for i in range(4)]
+        offsets = [sum(len(block) for block in compressed_blocks[:i]) for i in range(4)]
+        # The first blocks were written one after another to one file, and the last one to another file
+        block_ranges = [("file1", offsets[i], offsets[i + 1] - 1) for i in range(3)]
+        block_ranges.append(("file2", 0, len(compressed_blocks[3]) - 1))
+        mock_list_blocks.return_value = [
+            {
+                "start_time": datetime(2023, 1, 1, 0, i, tzinfo=UTC),
+                "end_time": datetime(2023, 1, 1, 0, i + 1, tzinfo=UTC),
+                "url": f"s3://bucket/{key}?range=bytes={first_byte}-{last_byte}",
+            }
+            for i, (key, first_byte, last_byte) in enumerate(block_ranges)
+        ]
+
+        def get_object(Bucket, Key, Range):
+            first_byte, last_byte = map(int, Range.replace("bytes=", "").split("-"))
+            data = b"".join(compressed_blocks[:3]) if Key == "file1" else compressed_blocks[3]
+            return {"Body": MagicMock(read=MagicMock(return_value=data[first_byte : last_byte + 1]))}
+
+        aws_client = MagicMock()
+        aws_client.get_object.side_effect = get_object
+        mock_v2_client.return_value = SessionRecordingV2ObjectStorage(aws_client, "bucket")
+
+        response = self.client.get(
+            f"/api/projects/{self.team.pk}/session_recordings/{session_id}/snapshots/?source=blob_v2&start_blob_key=1&end_blob_key=3"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.getvalue() == b'{"block": 1}\n{"block": 2}\n{"block": 3}'
+        assert [c.kwargs["Range"] for c in aws_client.get_object.call_args_list] == [
+            f"bytes={block_ranges[1][1]}-{block_ranges[2][2]}",
+            f"bytes=0-{block_ranges[3][2]}",
+        ]
+
+        response = self.client.get(
+            f"/api/projects/{self.team.pk}/session_recordings/{session_id}/snapshots/?source=blob_v2&start_blob_key=2&end_blob_key=4"
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+        response = self.client.get(
+            f"/api/projects/{self.team.pk}/session_recordings/{session_id}/snapshots/?source=blob_v2&start_blob_key=2&end_blob_key=1"
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        mock_v2_client.return_value = UnavailableSessionRecordingV2ObjectStorage()
+        response = self.client.get(
+            f"/api/projects/{self.team.pk}/session_recordings/{session_id}/snapshots/?source=blob_v2&start_blob_key=1&end_blob_key=3"
+        )
+        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+        assert response.json()["detail"] == "Failed to load recording block"
+
     @patch(
         "posthog.session_recordings.queries.session_replay_events.SessionReplayEvents.exists",
         return_value=True,
@@ -0,0 +1,120 @@
+import threading
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from posthog.session_recordings.models.session_recording import SessionRecording
+from posthog.session_recordings.session_recording_v2_block_cache import BlockCache, list_blocks_cached
+from posthog.storage.session_recording_v2_object_storage import BlockFetchError
+
+
+def make_blocks(count: int) -> list[dict]:
+    return [
+        {
+            "start_time": datetime(2024, 1, 1, 12, i),
+            "end_time": datetime(2024, 1, 1, 12, i + 1),
+            "url": f"s3://bucket/key{i}?range=bytes=0-9",
+        }
+        for i in range(count)
+    ]
+
+
+class TestListBlocksCached(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.recording = Mock(spec=SessionRecording)
+        self.recording.session_id = "test_id"
+        self.recording.team = Mock(id=1)
+
+    @patch("posthog.session_recordings.session_recording_v2_block_cache.list_blocks")
+    def test_blocks_are_listed_once(self, mock_list_blocks):
+        mock_list_blocks.return_value = make_blocks(3)
+
+        for block_index in range(3):
+            self.assertEqual(list_blocks_cached(self.recording, min_blocks=block_index + 1), make_blocks(3))
+
+        self.assertEqual(mock_list_blocks.call_count, 1)
+
+    @patch("posthog.session_recordings.session_recording_v2_block_cache.list_blocks")
+    def test_blocks_are_listed_again_when_the_recording_has_more_blocks(self, mock_list_blocks):
+        mock_list_blocks.return_value = make_blocks(2)
+        list_blocks_cached(self.recording)
+
+        mock_list_blocks.return_value = make_blocks(3)
+        self.assertEqual(list_blocks_cached(self.recording, min_blocks=3), make_blocks(3))
+        self.assertEqual(list_blocks_cached(self.recording, min_blocks=3), make_blocks(3))
+
+        self.assertEqual(mock_list_blocks.call_count, 2)
+
+    @patch("posthog.session_recordings.session_recording_v2_block_cache.list_blocks")
+    def test_refresh_lists_blocks_and_updates_the_cache(self, mock_list_blocks):
+        mock_list_blocks.return_value = make_blocks(1)
+        list_blocks_cached(self.recording)
+
+        mock_list_blocks.return_value = make_blocks(2)
+        self.assertEqual(list_blocks_cached(self.recording, refresh=True), make_blocks(2))
+        self.assertEqual(list_blocks_cached(self.recording), make_blocks(2))
+
+        self.assertEqual(mock_list_blocks.call_count, 2)
+
+    @patch("posthog.session_recordings.session_recording_v2_block_cache.list_blocks")
+    def test_empty_block_lists_are_not_cached(self, mock_list_blocks):
+        mock_list_blocks.return_value = []
+
+        list_blocks_cached(self.recording)
+        list_blocks_cached(self.recording)
+
+        self.assertEqual(mock_list_blocks.call_count, 2)
+
+
+class TestBlockCache(TestCase):
+    def setUp(self):
+        self.block_cache = BlockCache(max_size_bytes=20, prefetch_workers=2)
+        self.storage = Mock()
+        self.storage.fetch_compressed_block.side_effect = lambda url: url[-10:].encode()
+
+    def test_blocks_are_fetched_once(self):
+        self.assertEqual(self.block_cache.get(self.storage, "s3://bucket/key0_block"), b"key0_block")
+        self.assertEqual(self.block_cache.get(self.storage, "s3://bucket/key0_block"), b"key0_block")
+
+        self.storage.fetch_compressed_block.assert_called_once_with("s3://bucket/key0_block")
+
+    def test_least_recently_used_blocks_are_evicted(self):
+        for url in ["s3://bucket/key0_block", "s3://bucket/key1_block", "s3://bucket/key0_block"]:
+            self.block_cache.get(self.storage, url)
+        self.block_cache.get(self.storage, "s3://bucket/key2_block")
+        self.storage.fetch_compressed_block.reset_mock()
+
+        self.block_cache.get(self.storage, "s3://bucket/key0_block")
+        self.storage.fetch_compressed_block.assert_not_called()
+        self.block_cache.get(self.storage, "s3://bucket/key1_block")
+        self.storage.fetch_compressed_block.assert_called_once_with("s3://bucket/key1_block")
+
+    def test_prefetched_blocks_are_waited_for(self):
+        fetching = threading.Event()
+        release = threading.Event()
+
+        def fetch_compressed_block(url):
+            fetching.set()
+            release.wait(5)
+            return b"key0_block"
+
+        self.storage.fetch_compressed_block.side_effect = fetch_compressed_block
+        self.block_cache.prefetch(self.storage, ["s3://bucket/key0_block"])
+        fetching.wait(5)
+
+        threading.Timer(0.05, release.set).start()
+        self.assertEqual(self.block_cache.get(self.storage, "s3://bucket/key0_block"), b"key0_block")
+        self.storage.fetch_compressed_block.assert_called_once()
+
+    def test_failed_prefetches_are_fetched_again(self):
+        self.storage.fetch_compressed_block.side_effect = BlockFetchError("Block content not found")
+        self.block_cache.prefetch(self.storage, ["s3://bucket/key0_block"])
+        self.block_cache._executor.shutdown(wait=True)
+
+        self.storage.fetch_compressed_block.side_effect = None
+        self.storage.fetch_compressed_block.return_value = b"key0_block"
+        self.assertEqual(self.block_cache.get(self.storage, "s3://bucket/key0_block"), b"key0_block")
+        self.assertEqual(self.storage.fetch_compressed_block.call_count, 2)
@@ -111,6 +111,32 @@ PROM_PUSHGATEWAY_ADDRESS: str | None = os.getenv("PROM_PUSHGATEWAY_ADDRESS", Non
 
 HOGQL_INCREASED_MAX_EXECUTION_TIME: int = get_from_env("HOGQL_INCREASED_MAX_EXECUTION_TIME", 600, type_cast=int)
 
+# Reuse the ClickHouse SQL printed for identical HogQL queries, for up to HOGQL_COMPILED_QUERY_CACHE_TTL seconds
+HOGQL_COMPILED_QUERY_CACHE_ENABLED: bool = get_from_env(
+    "HOGQL_COMPILED_QUERY_CACHE_ENABLED", False, type_cast=str_to_bool
+)
+HOGQL_COMPILED_QUERY_CACHE_TTL: int = get_from_env("HOGQL_COMPILED_QUERY_CACHE_TTL", 10 * 60, type_cast=int)
+
+# Keep built HogQL databases in memory, until the project's schema changes or HOGQL_DATABASE_CACHE_TTL seconds pass
+HOGQL_DATABASE_CACHE_ENABLED: bool = get_from_env("HOGQL_DATABASE_CACHE_ENABLED", False, type_cast=str_to_bool)
+HOGQL_DATABASE_CACHE_TTL: int = get_from_env("HOGQL_DATABASE_CACHE_TTL", 5 * 60, type_cast=int)
+HOGQL_DATABASE_CACHE_MAX_SIZE: int = get_from_env("HOGQL_DATABASE_CACHE_MAX_SIZE", 200, type_cast=int)
+
+# Shared thread pool for query runners running several ClickHouse queries per request, see posthog.clickhouse.client.executor
+QUERY_EXECUTOR_MAX_WORKERS: int = get_from_env("QUERY_EXECUTOR_MAX_WORKERS", 50, type_cast=int)
+QUERY_EXECUTOR_MAX_CONCURRENCY_PER_REQUEST: int = get_from_env(
+    "QUERY_EXECUTOR_MAX_CONCURRENCY_PER_REQUEST", 10, type_cast=int
+)
+QUERY_EXECUTOR_MAX_CONCURRENCY_PER_TEAM: int = get_from_env(
+    "QUERY_EXECUTOR_MAX_CONCURRENCY_PER_TEAM", 20, type_cast=int
+)
+
+# Calculate the series of a trends insight that have no breakdown with a single scan of the events table, instead of
+# running a query per series
+TRENDS_COMBINED_SERIES_QUERIES_ENABLED: bool = get_from_env(
+    "TRENDS_COMBINED_SERIES_QUERIES_ENABLED", False, type_cast=str_to_bool
+)
+
 # Extend and override these settings with EE's ones
 if "ee.apps.EnterpriseConfig" in INSTALLED_APPS:
     from ee.settings import *  # noqa: F401, F403
@@ -1,5 +1,5 @@
 from posthog.settings.base_variables import TEST
-from posthog.settings.utils import get_from_env
+from posthog.settings.utils import get_from_env, str_to_bool
 
 USE_PRECALCULATED_CH_COHORT_PEOPLE = not TEST
 
@@ -37,6 +37,34 @@ COUNT_TILES_WITH_NO_FILTERS_HASH_INTERVAL_SECONDS = get_from_env(
 
 CACHED_RESULTS_TTL = 7 * 24 * 60 * 60  # how long to keep cached results for
 
+# Write cached query results in the compact columnar encoding, rather than as plain JSON. Both are always readable.
+QUERY_CACHE_COLUMNAR_ENCODING = get_from_env("QUERY_CACHE_COLUMNAR_ENCODING", False, type_cast=str_to_bool)
+
+# Per-process cache of deserialized query results in front of Redis. Results written by other processes are picked up
+# after at most QUERY_CACHE_L1_TTL_SECONDS, so keep it short.
+QUERY_CACHE_L1_ENABLED = get_from_env("QUERY_CACHE_L1_ENABLED", False, type_cast=str_to_bool)
+QUERY_CACHE_L1_TTL_SECONDS = get_from_env("QUERY_CACHE_L1_TTL_SECONDS", 15, type_cast=int)
+QUERY_CACHE_L1_MAX_SIZE_BYTES = get_from_env("QUERY_CACHE_L1_MAX_SIZE_BYTES", 64 * 1024 * 1024, type_cast=int)
+
+# How long to wait for another process already calculating the same query, before falling back to stale results or
+# calculating it ourselves. Waiting holds the web worker, so keep it short. 0 disables waiting.
+QUERY_CALCULATION_SINGLE_FLIGHT_WAIT_SECONDS = get_from_env(
+    "QUERY_CALCULATION_SINGLE_FLIGHT_WAIT_SECONDS", 0, type_cast=int
+)
+
+# Update stale results of queries that support it by recalculating only the intervals that may have changed since they
+# were cached, allowing QUERY_INCREMENTAL_CALCULATION_LAG_SECONDS for events to be ingested. Results are still calculated
+# in full once every QUERY_INCREMENTAL_CALCULATION_FULL_INTERVAL_SECONDS, to pick up events that arrive even later.
+QUERY_INCREMENTAL_CALCULATION_ENABLED = get_from_env(
+    "QUERY_INCREMENTAL_CALCULATION_ENABLED", False, type_cast=str_to_bool
+)
+QUERY_INCREMENTAL_CALCULATION_LAG_SECONDS = get_from_env(
+    "QUERY_INCREMENTAL_CALCULATION_LAG_SECONDS", 10 * 60, type_cast=int
+)
+QUERY_INCREMENTAL_CALCULATION_FULL_INTERVAL_SECONDS = get_from_env(
+    "QUERY_INCREMENTAL_CALCULATION_FULL_INTERVAL_SECONDS", 24 * 60 * 60, type_cast=int
+)
+
 # Schedule to run asynchronous data deletion on. Follows crontab syntax.
 # Use empty string to prevent this
 CLEAR_CLICKHOUSE_REMOVED_DATA_SCHEDULE_CRON = get_from_env(
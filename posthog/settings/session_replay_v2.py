@@ -28,3 +28,22 @@ SESSION_RECORDING_V2_S3_REGION = os.getenv("SESSION_RECORDING_V2_S3_REGION", "us
 SESSION_RECORDING_V2_S3_BUCKET = os.getenv("SESSION_RECORDING_V2_S3_BUCKET", "posthog")
 SESSION_RECORDING_V2_S3_PREFIX = os.getenv("SESSION_RECORDING_V2_S3_PREFIX", "session_recordings_v2")
 SESSION_RECORDING_V2_S3_LTS_PREFIX = os.getenv("SESSION_RECORDING_V2_S3_LTS_PREFIX", "session_recordings_v2_lts")
+
+# Cache the block list of recordings for SESSION_RECORDING_V2_BLOCK_MANIFEST_CACHE_TTL seconds, and keep up to
+# SESSION_RECORDING_V2_BLOCK_CACHE_MAX_SIZE_BYTES of compressed blocks in memory, fetching the next
+# SESSION_RECORDING_V2_BLOCK_PREFETCH_COUNT blocks in the background whenever a block is requested
+SESSION_RECORDING_V2_BLOCK_CACHE_ENABLED: bool = get_from_env(
+    "SESSION_RECORDING_V2_BLOCK_CACHE_ENABLED", False, type_cast=str_to_bool
+)
+SESSION_RECORDING_V2_BLOCK_MANIFEST_CACHE_TTL: int = get_from_env(
+    "SESSION_RECORDING_V2_BLOCK_MANIFEST_CACHE_TTL", 60, type_cast=int
+)
+SESSION_RECORDING_V2_BLOCK_CACHE_MAX_SIZE_BYTES: int = get_from_env(
+    "SESSION_RECORDING_V2_BLOCK_CACHE_MAX_SIZE_BYTES", 128 * 1024 * 1024, type_cast=int
+)
+SESSION_RECORDING_V2_BLOCK_PREFETCH_COUNT: int = get_from_env(
+    "SESSION_RECORDING_V2_BLOCK_PREFETCH_COUNT", 2, type_cast=int
+)
+SESSION_RECORDING_V2_BLOCK_PREFETCH_WORKERS: int = get_from_env(
+    "SESSION_RECORDING_V2_BLOCK_PREFETCH_WORKERS", 4, type_cast=int
+)
@@ -403,6 +403,13 @@ DECIDE_SHORT_CIRCUITED_TEAM_IDS = [0]
 # Decide db settings
 DECIDE_SKIP_POSTGRES_FLAGS = get_from_env("DECIDE_SKIP_POSTGRES_FLAGS", False, type_cast=str_to_bool)
 
+# Keep the flag definitions of up to DECIDE_FLAG_DEFINITIONS_CACHE_MAX_SIZE projects in memory, prepared for matching,
+# only reading them from Redis again when the version cached alongside them changes
+DECIDE_FLAG_DEFINITIONS_CACHE_ENABLED = get_from_env(
+    "DECIDE_FLAG_DEFINITIONS_CACHE_ENABLED", False, type_cast=str_to_bool
+)
+DECIDE_FLAG_DEFINITIONS_CACHE_MAX_SIZE = get_from_env("DECIDE_FLAG_DEFINITIONS_CACHE_MAX_SIZE", 1000, type_cast=int)
+
 # Decide billing analytics
 DECIDE_BILLING_SAMPLING_RATE = get_from_env("DECIDE_BILLING_SAMPLING_RATE", 0.1, type_cast=float)
 DECIDE_BILLING_ANALYTICS_TOKEN = get_from_env("DECIDE_BILLING_ANALYTICS_TOKEN", None, type_cast=str, optional=True)
@@ -436,6 +443,10 @@ if REMOTE_CONFIG_DECIDE_ROLLOUT_PERCENTAGE > 1:
 REMOTE_CONFIG_CDN_PURGE_ENDPOINT = get_from_env("REMOTE_CONFIG_CDN_PURGE_ENDPOINT", "")
 REMOTE_CONFIG_CDN_PURGE_TOKEN = get_from_env("REMOTE_CONFIG_CDN_PURGE_TOKEN", "")
 REMOTE_CONFIG_CDN_PURGE_DOMAINS = get_list(os.getenv("REMOTE_CONFIG_CDN_PURGE_DOMAINS", ""))
+# Memory each web process may use for the array.js bodies of remote configs, which include the whole array.js bundle
+REMOTE_CONFIG_ARRAY_JS_CACHE_MAX_SIZE_BYTES = get_from_env(
+    "REMOTE_CONFIG_ARRAY_JS_CACHE_MAX_SIZE_BYTES", 128 * 1024 * 1024, type_cast=int
+)
 
 ####
 # /capture
@@ -1,5 +1,5 @@
 import abc
-from typing import Optional, Union
+from typing import IO, Optional, Union
 
 import structlog
 from boto3 import client
@@ -42,7 +42,7 @@ class ObjectStorageClient(metaclass=abc.ABCMeta):
         pass
 
     @abc.abstractmethod
-    def write(self, bucket: str, key: str, content: Union[str, bytes], extras: dict | None) -> None:
+    def write(self, bucket: str, key: str, content: Union[str, bytes, IO[bytes]], extras: dict | None) -> None:
         pass
 
     @abc.abstractmethod
@@ -72,7 +72,7 @@ class UnavailableStorage(ObjectStorageClient):
     def tag(self, bucket: str, key: str, tags: dict[str, str]) -> None:
         pass
 
-    def write(self, bucket: str, key: str, content: Union[str, bytes], extras: dict | None) -> None:
+    def write(self, bucket: str, key: str, content: Union[str, bytes, IO[bytes]], extras: dict | None) -> None:
         pass
 
     def copy_objects(self, bucket: str, source_prefix: str, target_prefix: str) -> int | None:
@@ -155,10 +155,14 @@ class ObjectStorage(ObjectStorageClient):
             capture_exception(e)
             raise ObjectStorageError("tag failed") from e
 
-    def write(self, bucket: str, key: str, content: Union[str, bytes], extras: dict | None) -> None:
+    def write(self, bucket: str, key: str, content: Union[str, bytes, IO[bytes]], extras: dict | None) -> None:
         s3_response = {}
         try:
-            s3_response = self.aws_client.put_object(Bucket=bucket, Body=content, Key=key, **(extras or {}))
+            if isinstance(content, str | bytes):
+                s3_response = self.aws_client.put_object(Bucket=bucket, Body=content, Key=key, **(extras or {}))
+            else:
+                # Files over 8MB are uploaded in parts, so only a part at a time is read into memory
+                self.aws_client.upload_fileobj(content, bucket, key, ExtraArgs=extras)
         except Exception as e:
             logger.exception(
                 "object_storage.write_failed",
@@ -218,7 +222,9 @@ def object_storage_client() -> ObjectStorageClient:
     return _client
 
 
-def write(file_name: str, content: Union[str, bytes], extras: dict | None = None, bucket: str | None = None) -> None:
+def write(
+    file_name: str, content: Union[str, bytes, IO[bytes]], extras: dict | None = None, bucket: str | None = None
+) -> None:
     return object_storage_client().write(
         bucket=bucket or settings.OBJECT_STORAGE_BUCKET,
         key=file_name,
@@ -5,15 +5,45 @@ from botocore.client import Config
 from django.conf import settings
 from urllib.parse import urlparse, parse_qs
 import snappy
+from collections.abc import Iterator
 from typing import Optional
 
 logger = structlog.get_logger(__name__)
 
+# Blocks stored next to each other are read together, up to this many bytes per request
+MAX_COALESCED_READ_BYTES = 32 * 1024 * 1024
+
 
 class BlockFetchError(Exception):
     pass
 
 
+def decompress_block(compressed_block: bytes) -> str:
+    """Returns the decompressed block, without its trailing newlines, or raises BlockFetchError"""
+    try:
+        return snappy.decompress(compressed_block).decode("utf-8").rstrip("\n")
+    except Exception as e:
+        logger.exception("Failed to decompress block", error=e)
+        raise BlockFetchError(f"Failed to read and decompress block: {str(e)}")
+
+
+def parse_block_url(block_url: str) -> tuple[str, int, int]:
+    """Returns the key, first byte and last byte of the block, or raises BlockFetchError"""
+    parsed_url = urlparse(block_url)
+    key = parsed_url.path.lstrip("/")
+    query_params = parse_qs(parsed_url.query)
+    byte_range = query_params.get("range", [""])[0].replace("bytes=", "")
+    try:
+        start_byte, end_byte = map(int, byte_range.split("-")) if "-" in byte_range else (None, None)
+    except ValueError:
+        start_byte, end_byte = None, None
+
+    if start_byte is None or end_byte is None:
+        raise BlockFetchError("Invalid byte range in block URL")
+
+    return key, start_byte, end_byte
+
+
 class SessionRecordingV2ObjectStorageBase(metaclass=abc.ABCMeta):
     @abc.abstractmethod
     def read_bytes(self, key: str, first_byte: int, last_byte: int) -> bytes | None:
@@ -32,6 +62,16 @@ class SessionRecordingV2ObjectStorageBase(metaclass=abc.ABCMeta):
         """Returns the decompressed block or raises BlockFetchError"""
         pass
 
+    @abc.abstractmethod
+    def fetch_compressed_block(self, block_url: str) -> bytes:
+        """Returns the snappy compressed block or raises BlockFetchError"""
+        pass
+
+    @abc.abstractmethod
+    def fetch_compressed_blocks(self, block_urls: list[str]) -> Iterator[bytes]:
+        """Yields the snappy compressed blocks in order or raises BlockFetchError"""
+        pass
+
     @abc.abstractmethod
     def store_lts_recording(self, recording_id: str, recording_data: str) -> tuple[Optional[str], Optional[str]]:
         """Returns a tuple of (target_key, error_message)"""
@@ -55,6 +95,12 @@ class UnavailableSessionRecordingV2ObjectStorage(SessionRecordingV2ObjectStorage
     def fetch_block(self, block_url: str) -> str:
         raise BlockFetchError("Storage not available")
 
+    def fetch_compressed_block(self, block_url: str) -> bytes:
+        raise BlockFetchError("Storage not available")
+
+    def fetch_compressed_blocks(self, block_urls: list[str]) -> Iterator[bytes]:
+        raise BlockFetchError("Storage not available")
+
     def store_lts_recording(self, recording_id: str, recording_data: str) -> tuple[Optional[str], Optional[str]]:
         return None, "Storage not available"
 
@@ -109,39 +155,56 @@ class SessionRecordingV2ObjectStorage(SessionRecordingV2ObjectStorageBase):
         return True
 
     def fetch_block(self, block_url: str) -> str:
+        return decompress_block(self.fetch_compressed_block(block_url))
+
+    def fetch_compressed_block(self, block_url: str) -> bytes:
+        return next(self.fetch_compressed_blocks([block_url]))
+
+    def fetch_compressed_blocks(self, block_urls: list[str]) -> Iterator[bytes]:
+        """
+        Blocks are written one after another to the same file, so consecutive blocks are usually next to each other.
+        Those are read with a single ranged request, which is then split back into blocks.
+        """
+        block_ranges = [parse_block_url(block_url) for block_url in block_urls]
+
+        read: list[tuple[str, int, int]] = []
+        for key, start_byte, end_byte in block_ranges:
+            if read and (
+                key != read[-1][0]
+                or start_byte != read[-1][2] + 1
+                or end_byte - read[0][1] + 1 > MAX_COALESCED_READ_BYTES
+            ):
+                yield from self._read_blocks(read)
+                read = []
+            read.append((key, start_byte, end_byte))
+
+        if read:
+            yield from self._read_blocks(read)
+
+    def _read_blocks(self, block_ranges: list[tuple[str, int, int]]) -> Iterator[bytes]:
+        key, first_byte, _ = block_ranges[0]
+        last_byte = block_ranges[-1][2]
         try:
-            # Parse URL and extract key and byte range
-            parsed_url = urlparse(block_url)
-            key = parsed_url.path.lstrip("/")
-            query_params = parse_qs(parsed_url.query)
-            byte_range = query_params.get("range", [""])[0].replace("bytes=", "")
-            start_byte, end_byte = map(int, byte_range.split("-")) if "-" in byte_range else (None, None)
-
-            if start_byte is None or end_byte is None:
-                raise BlockFetchError("Invalid byte range in block URL")
-
-            expected_length = end_byte - start_byte + 1
-            compressed_block = self.read_bytes(key, first_byte=start_byte, last_byte=end_byte)
+            expected_length = last_byte - first_byte + 1
+            data = self.read_bytes(key, first_byte=first_byte, last_byte=last_byte)
 
-            if not compressed_block:
+            if not data:
                 raise BlockFetchError("Block content not found")
 
-            if len(compressed_block) != expected_length:
+            if len(data) != expected_length:
                 raise BlockFetchError(
-                    f"Unexpected data length. Expected {expected_length} bytes, got {len(compressed_block)} bytes"
+                    f"Unexpected data length. Expected {expected_length} bytes, got {len(data)} bytes"
                 )
 
-            decompressed_block = snappy.decompress(compressed_block).decode("utf-8")
-            # Strip any trailing newlines
-            decompressed_block = decompressed_block.rstrip("\n")
-            return decompressed_block
-
         except BlockFetchError:
             raise
         except Exception as e:
-            logger.exception("Failed to read and decompress block", error=e)
+            logger.exception("Failed to read block", error=e)
             raise BlockFetchError(f"Failed to read and decompress block: {str(e)}")
 
+        for _, start_byte, end_byte in block_ranges:
+            yield data[start_byte - first_byte : end_byte - first_byte + 1]
+
     def store_lts_recording(self, recording_id: str, recording_data: str) -> tuple[Optional[str], Optional[str]]:
         try:
             compressed_data = snappy.compress(recording_data.encode("utf-8"))
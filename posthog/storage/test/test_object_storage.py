@@ -1,4 +1,5 @@
 import re
+import tempfile
 import uuid
 from unittest.mock import patch
 from unittest.mock import MagicMock
@@ -63,6 +64,15 @@ class TestStorage(APIBaseTest):
             write(file_name, b"my content")
             assert read(file_name) == "my content"
 
+    def test_write_and_read_works_with_file_content(self) -> None:
+        with self.settings(OBJECT_STORAGE_ENABLED=True):
+            file_name = f"{TEST_BUCKET}/test_write_and_read_works_with_file_content/{uuid.uuid4()}"
+            with tempfile.TemporaryFile() as file:
+                file.write(b"my content")
+                file.seek(0)
+                write(file_name, file)
+            assert read(file_name) == "my content"
+
     def test_can_generate_presigned_url_for_existing_file(self) -> None:
         with self.settings(OBJECT_STORAGE_ENABLED=True):
             session_id = str(uuid.uuid4())
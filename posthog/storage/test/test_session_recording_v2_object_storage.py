@@ -15,6 +15,7 @@ from posthog.storage.session_recording_v2_object_storage import (
     client,
     SessionRecordingV2ObjectStorage,
     BlockFetchError,
+    decompress_block,
 )
 from posthog.test.base import APIBaseTest
 
@@ -122,6 +123,43 @@ class TestSessionRecordingV2Storage(APIBaseTest):
             Bucket=TEST_BUCKET, Key="key1", Range=f"bytes=0-{len(compressed_data) - 1}"
         )
 
+    def test_fetch_compressed_block_returns_the_block_as_stored(self):
+        mock_client = MagicMock()
+        compressed_data = snappy.compress(b"test data\n")
+        mock_client.get_object.return_value = {"Body": MagicMock(read=MagicMock(return_value=compressed_data))}
+        storage = SessionRecordingV2ObjectStorage(mock_client, TEST_BUCKET)
+
+        block_url = f"s3://bucket/key1?range=bytes=0-{len(compressed_data) - 1}"
+        result = storage.fetch_compressed_block(block_url)
+
+        assert result == compressed_data
+        assert decompress_block(result) == "test data"
+
+    def test_fetch_compressed_blocks_reads_adjacent_blocks_together(self):
+        mock_client = MagicMock()
+        mock_client.get_object.side_effect = lambda **kwargs: {
+            "Body": MagicMock(read=MagicMock(return_value=bytes(range(10))))
+        }
+        storage = SessionRecordingV2ObjectStorage(mock_client, TEST_BUCKET)
+
+        blocks = list(
+            storage.fetch_compressed_blocks(
+                [
+                    "s3://bucket/key1?range=bytes=0-3",
+                    "s3://bucket/key1?range=bytes=4-9",
+                    "s3://bucket/key1?range=bytes=20-29",
+                    "s3://bucket/key2?range=bytes=30-39",
+                ]
+            )
+        )
+
+        assert blocks == [bytes(range(4)), bytes(range(4, 10)), bytes(range(10)), bytes(range(10))]
+        assert [c.kwargs for c in mock_client.get_object.call_args_list] == [
+            {"Bucket": TEST_BUCKET, "Key": "key1", "Range": "bytes=0-9"},
+            {"Bucket": TEST_BUCKET, "Key": "key1", "Range": "bytes=20-29"},
+            {"Bucket": TEST_BUCKET, "Key": "key2", "Range": "bytes=30-39"},
+        ]
+
     def test_fetch_block_invalid_url(self):
         storage = SessionRecordingV2ObjectStorage(MagicMock(), TEST_BUCKET)
 
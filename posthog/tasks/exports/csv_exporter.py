@@ -1,23 +1,30 @@
+import csv
 import datetime
 import io
+import pickle
+import tempfile
 from typing import Any, Optional
-from collections.abc import Generator
+from collections.abc import Generator, Iterator
 from urllib.parse import parse_qsl, quote, urlencode, urlparse, urlunparse
 
 from pydantic import BaseModel
 import requests
 import structlog
 from openpyxl import Workbook
+from django.conf import settings
 from django.http import QueryDict
+from django.utils.timezone import now
 from sentry_sdk import push_scope
 from requests.exceptions import HTTPError
 
 from posthog.exceptions_capture import capture_exception
+from posthog.hogql.parser import parse_expr
+from posthog.hogql.property import has_aggregation
 from posthog.api.services.query import process_query_dict
 from posthog.hogql_queries.query_runner import ExecutionMode
 from posthog.jwt import PosthogJwtAudience, encode_jwt
 from posthog.models.exported_asset import ExportedAsset, save_content
-from posthog.utils import absolute_uri
+from posthog.utils import absolute_uri, relative_date_parse
 from .ordered_csv_renderer import OrderedCsvRenderer
 from ..exporter import (
     EXPORT_FAILED_COUNTER,
@@ -27,6 +34,7 @@ from ..exporter import (
 )
 from ...exceptions import QuerySizeExceeded
 from ...hogql.constants import CSV_EXPORT_LIMIT, CSV_EXPORT_BREAKDOWN_LIMIT_INITIAL, CSV_EXPORT_BREAKDOWN_LIMIT_LOW
+from ...hogql.constants import get_default_limit_for_context, get_max_limit_for_context
 from ...hogql.query import LimitContext
 
 logger = structlog.get_logger(__name__)
@@ -34,6 +42,12 @@ logger = structlog.get_logger(__name__)
 RESULT_LIMIT_KEYS = ("distinct_ids",)
 RESULT_LIMIT_LENGTH = 10
 
+# Queries that take a `limit` and an `offset`, which are exported a page at a time
+PAGINATED_QUERY_KINDS = ("EventsQuery", "ActorsQuery")
+EXPORT_PAGE_SIZE = 10000
+# Exports are written to temporary files, that are kept in memory until they reach this size
+EXPORT_SPOOL_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
+
 
 # SUPPORTED CSV TYPES
 
@@ -57,7 +71,8 @@ RESULT_LIMIT_LENGTH = 10
 # 2. We call the actual API to load the data with the given params so that we receive a paginateable response
 # 3. We save the response to a chunk in object storage and then load the `next` page of results
 # 4. Repeat until exhausted or limit reached
-# 5. We save the final blob output and update the ExportedAsset
+# 5. Rows are flattened and spooled to a temporary file as they come in, to work out the columns of the export
+# 6. We write the export to another temporary file, row by row, upload it and update the ExportedAsset
 
 
 def add_query_params(url: str, params: dict[str, str]) -> str:
@@ -274,6 +289,10 @@ def get_from_hogql_query(exported_asset: ExportedAsset, limit: int, resource: di
     query = resource.get("source")
     assert query is not None
 
+    if query.get("kind") in PAGINATED_QUERY_KINDS:
+        yield from _get_pages_from_hogql_query(exported_asset, query)
+        return
+
     while True:
         try:
             query_response = process_query_dict(
@@ -297,6 +316,112 @@ def get_from_hogql_query(exported_asset: ExportedAsset, limit: int, resource: di
         return
 
 
+def _get_pages_from_hogql_query(exported_asset: ExportedAsset, query: dict) -> Generator[Any, None, None]:
+    """
+    Runs the query a page at a time, up to the query's own limit or the export limit, so that only one page of
+    results is in memory at a time.
+    """
+    query = _pin_query_for_paging(exported_asset, query)
+    offset: int = query.get("offset") or 0
+    remaining: int = min(
+        query.get("limit") or get_default_limit_for_context(LimitContext.EXPORT),
+        get_max_limit_for_context(LimitContext.EXPORT),
+    )
+
+    while remaining > 0:
+        query_response = process_query_dict(
+            team=exported_asset.team,
+            query_json={**query, "limit": min(remaining, EXPORT_PAGE_SIZE), "offset": offset},
+            limit_context=LimitContext.EXPORT,
+            execution_mode=ExecutionMode.CALCULATE_BLOCKING_ALWAYS,
+        )
+        if isinstance(query_response, BaseModel):
+            query_response = query_response.model_dump(by_alias=True)
+
+        csv_rows = list(_convert_response_to_csv_data(query_response))
+        yield from csv_rows
+
+        if not query_response.get("hasMore") or not csv_rows:
+            return
+        offset += len(csv_rows)
+        remaining -= len(csv_rows)
+
+
+def _pin_query_for_paging(exported_asset: ExportedAsset, query: dict) -> dict:
+    """
+    Pages are separate queries, so resolve anything that could change between them once: relative dates are made
+    absolute, and events are also ordered by uuid, so that ties don't come back in a different order on each page.
+    """
+    if query.get("kind") != "EventsQuery":
+        return query
+
+    query = {**query}
+    timezone_info = exported_asset.team.timezone_info
+    query_started_at = now()
+    # Same defaults as the events query runner
+    before = query.get("before") or (query_started_at + datetime.timedelta(seconds=5)).isoformat()
+    query["before"] = relative_date_parse(before, timezone_info, now=query_started_at).isoformat()
+    after = query.get("after") or "-24h"
+    if after != "all":
+        after = relative_date_parse(after, timezone_info, now=query_started_at).isoformat()
+    query["after"] = after
+
+    select: list[str] = query.get("select") or []
+    if any(has_aggregation(parse_expr(column)) for column in select if column != "*"):
+        return query
+    order_by: Optional[list[str]] = query.get("orderBy")
+    if order_by is None:
+        if "timestamp" in select:
+            order_by = ["timestamp DESC"]
+        elif select:
+            order_by = [f"{select[0].split('--')[0].strip()} ASC"]
+        else:
+            order_by = []
+    query["orderBy"] = [*order_by, "uuid ASC"]
+    return query
+
+
+class SpooledRows:
+    """
+    Rows of an export, flattened by the renderer and kept in a temporary file, that's only written to disk once it
+    gets big. The renderer needs all the columns of the export before writing the first row, this way we can find
+    them without keeping every row in memory.
+    """
+
+    def __init__(self, renderer: OrderedCsvRenderer):
+        self.renderer = renderer
+        self.unique_fields: dict[str, None] = {}
+        self.first_row: Optional[dict] = None
+        self._file = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_MEMORY_SIZE)
+
+    def append(self, row: Any) -> None:
+        if self.first_row is None:
+            self.first_row = row
+        flat_row = self.renderer.flatten_item(row)
+        self.unique_fields.update(dict.fromkeys(flat_row))
+        pickle.dump(flat_row, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def __iter__(self) -> Iterator[dict]:
+        self._file.seek(0)
+        while True:
+            try:
+                yield pickle.load(self._file)
+            except EOFError:
+                return
+
+    def tablize(self, header: Any = None) -> Generator:
+        return self.renderer.tablize_flat_data(self, list(self.unique_fields), header=header)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "SpooledRows":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
 def _export_to_dict(exported_asset: ExportedAsset, limit: int) -> Any:
     resource = exported_asset.export_context
 
@@ -308,22 +433,27 @@ def _export_to_dict(exported_asset: ExportedAsset, limit: int) -> Any:
     else:
         returned_rows = get_from_insights_api(exported_asset, limit, resource)
 
-    all_csv_rows = list(returned_rows)
     renderer = OrderedCsvRenderer()
+    all_csv_rows = SpooledRows(renderer)
+    for row in returned_rows:
+        all_csv_rows.append(row)
+
     render_context = {}
     if columns:
         render_context["header"] = columns
 
-    if len(all_csv_rows):
+    if all_csv_rows.first_row is not None:
         # NOTE: This is not ideal as some rows _could_ have different keys
         # Ideally we would extend the csvrenderer to supported keeping the order in place
-        is_any_col_list_or_dict = [x for x in all_csv_rows[0].values() if isinstance(x, dict) or isinstance(x, list)]
+        is_any_col_list_or_dict = [
+            x for x in all_csv_rows.first_row.values() if isinstance(x, dict) or isinstance(x, list)
+        ]
         if not is_any_col_list_or_dict:
             # If values are serialised then keep the order of the keys, else allow it to be unordered
-            renderer.header = all_csv_rows[0].keys()
+            renderer.header = list(all_csv_rows.first_row.keys())
     else:
         # If we have no rows, that means we couldn't convert anything, so put something to avoid confusion
-        all_csv_rows = [{"error": "No data available or unable to format for export."}]
+        all_csv_rows.append({"error": "No data available or unable to format for export."})
 
     return renderer, all_csv_rows, render_context
 
@@ -331,27 +461,40 @@ def _export_to_dict(exported_asset: ExportedAsset, limit: int) -> Any:
 def _export_to_csv(exported_asset: ExportedAsset, limit: int) -> None:
     renderer, all_csv_rows, render_context = _export_to_dict(exported_asset, limit)
 
-    rendered_csv_content = renderer.render(all_csv_rows, renderer_context=render_context)
-    save_content(exported_asset, rendered_csv_content)
+    with all_csv_rows, tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_MEMORY_SIZE) as output:
+        # Same output as `renderer.render`, written a row at a time
+        csv_output = io.TextIOWrapper(
+            output, encoding=render_context.get("encoding", settings.DEFAULT_CHARSET), newline=""
+        )
+        csv_writer = csv.writer(csv_output, **(renderer.writer_opts or {}))
+        for row in all_csv_rows.tablize(header=render_context.get("header", renderer.header)):
+            csv_writer.writerow(row)
+        # Hand the file back without closing it
+        csv_output.detach()
 
+        output.seek(0)
+        save_content(exported_asset, output)
 
-def _export_to_excel(exported_asset: ExportedAsset, limit: int) -> None:
-    output = io.BytesIO()
 
-    workbook = Workbook()
-    worksheet = workbook.active
+def _export_to_excel(exported_asset: ExportedAsset, limit: int) -> None:
+    # Write-only workbooks write each row to a temporary file as it's appended
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
 
     renderer, all_csv_rows, render_context = _export_to_dict(exported_asset, limit)
 
-    for row_num, row_data in enumerate(renderer.tablize(all_csv_rows, header=render_context.get("header"))):
-        for col_num, value in enumerate(row_data):
-            if value is not None and not isinstance(value, str | int | float | bool):
-                value = str(value)
-            worksheet.cell(row=row_num + 1, column=col_num + 1, value=value)
+    with all_csv_rows, tempfile.TemporaryFile() as output:
+        for row_data in all_csv_rows.tablize(header=render_context.get("header")):
+            worksheet.append(
+                [
+                    str(value) if value is not None and not isinstance(value, str | int | float | bool) else value
+                    for value in row_data
+                ]
+            )
 
-    workbook.save(output)
-    output.seek(0)
-    save_content(exported_asset, output.getvalue())
+        workbook.save(output)
+        output.seek(0)
+        save_content(exported_asset, output)
 
 
 def get_limit_param_key(path: str) -> str:
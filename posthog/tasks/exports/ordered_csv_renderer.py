@@ -1,7 +1,7 @@
 import itertools
 from collections import OrderedDict
 from typing import Any
-from collections.abc import Generator
+from collections.abc import Generator, Iterable
 
 from more_itertools import unique_everseen
 from rest_framework_csv.renderers import CSVRenderer
@@ -29,14 +29,23 @@ class OrderedCsvRenderer(
         # Get the set of all unique headers, and sort them.
         unique_fields = list(unique_everseen(itertools.chain(*(item.keys() for item in data))))
 
+        yield from self.tablize_flat_data(data, unique_fields, header=header, labels=labels)
+
+    def tablize_flat_data(
+        self, data: Iterable[dict], unique_fields: list[str], header: Any = None, labels: Any = None
+    ) -> Generator:
+        """
+        Convert already flattened data into a table, given the unique fields of all of its items in order.
+
+        The data is only iterated once, after yielding the headers, so it can be streamed.
+        """
         ordered_fields: dict[str, Any] = OrderedDict()
-        for item in unique_fields:
-            field = item.split(".")
-            field = field[0]
+        for unique_field in unique_fields:
+            field = unique_field.split(".")[0]
             if field in ordered_fields:
-                ordered_fields[field].append(item)
+                ordered_fields[field].append(unique_field)
             else:
-                ordered_fields[field] = [item]
+                ordered_fields[field] = [unique_field]
 
         flat_ordered_fields = list(itertools.chain(*ordered_fields.values()))
         if not header:
@@ -29,6 +29,7 @@ from posthog.tasks.exports import csv_exporter
 from posthog.tasks.exports.csv_exporter import (
     UnexpectedEmptyJsonResponse,
     _convert_response_to_csv_data,
+    _pin_query_for_paging,
     add_query_params,
 )
 from posthog.test.base import APIBaseTest, _create_event, _create_person, flush_persons_and_events
@@ -461,6 +462,99 @@ class TestCSVExporter(APIBaseTest):
             self.assertEqual(first_row[2], "$pageview")
             self.assertEqual(first_row[5], str(self.team.pk))
 
+    @patch("posthog.tasks.exports.csv_exporter.EXPORT_PAGE_SIZE", 4)
+    @patch("posthog.models.exported_asset.UUIDT")
+    def test_csv_exporter_events_query_runs_a_page_at_a_time(self, mocked_uuidt: Any) -> None:
+        random_uuid = f"RANDOM_TEST_ID::{UUIDT()}"
+        for i in range(15):
+            _create_event(
+                event="$pageview",
+                distinct_id=random_uuid,
+                team=self.team,
+                timestamp=now() - relativedelta(hours=1, minutes=i),
+                properties={"prop": i},
+            )
+        flush_persons_and_events()
+
+        exported_asset = ExportedAsset(
+            team=self.team,
+            export_format=ExportedAsset.ExportFormat.CSV,
+            export_context={
+                "source": {
+                    "kind": "EventsQuery",
+                    "select": ["properties.prop"],
+                    "where": [f"distinct_id = '{random_uuid}'"],
+                    "orderBy": ["timestamp DESC"],
+                    "limit": 10,
+                }
+            },
+        )
+        exported_asset.save()
+        mocked_uuidt.return_value = "a-guid"
+
+        with (
+            self.settings(OBJECT_STORAGE_ENABLED=True, OBJECT_STORAGE_EXPORTS_FOLDER="Test-Exports"),
+            patch(
+                "posthog.tasks.exports.csv_exporter.process_query_dict", wraps=csv_exporter.process_query_dict
+            ) as mocked_process_query_dict,
+        ):
+            csv_exporter.export_tabular(exported_asset)
+            assert exported_asset.content_location is not None
+            content = object_storage.read(exported_asset.content_location)
+
+        self.assertEqual(
+            [
+                (call.kwargs["query_json"]["limit"], call.kwargs["query_json"]["offset"])
+                for call in mocked_process_query_dict.call_args_list
+            ],
+            [(4, 0), (4, 4), (2, 8)],
+        )
+        pinned_queries = [
+            (
+                call.kwargs["query_json"]["before"],
+                call.kwargs["query_json"]["after"],
+                call.kwargs["query_json"]["orderBy"],
+            )
+            for call in mocked_process_query_dict.call_args_list
+        ]
+        self.assertEqual(len(set(map(str, pinned_queries))), 1)
+        self.assertEqual(pinned_queries[0][2], ["timestamp DESC", "uuid ASC"])
+        self.assertEqual((content or "").split("\r\n"), ["properties.prop", *(str(i) for i in range(10)), ""])
+
+    @freeze_time("2024-03-01T12:00:00Z")
+    def test_events_query_pages_use_the_same_dates_and_order(self) -> None:
+        exported_asset = ExportedAsset(team=self.team, export_format=ExportedAsset.ExportFormat.CSV)
+
+        self.assertEqual(
+            _pin_query_for_paging(exported_asset, {"kind": "EventsQuery", "select": ["event", "timestamp"]}),
+            {
+                "kind": "EventsQuery",
+                "select": ["event", "timestamp"],
+                "before": "2024-03-01T12:00:05+00:00",
+                "after": "2024-02-29T12:00:00+00:00",
+                "orderBy": ["timestamp DESC", "uuid ASC"],
+            },
+        )
+        self.assertEqual(
+            _pin_query_for_paging(
+                exported_asset,
+                {"kind": "EventsQuery", "select": ["event -- Event"], "after": "all", "before": "-1d"},
+            ),
+            {
+                "kind": "EventsQuery",
+                "select": ["event -- Event"],
+                "before": "2024-02-29T12:00:00+00:00",
+                "after": "all",
+                "orderBy": ["event ASC", "uuid ASC"],
+            },
+        )
+        aggregated_query = _pin_query_for_paging(
+            exported_asset, {"kind": "EventsQuery", "select": ["event", "count()"], "after": "-7d"}
+        )
+        self.assertEqual(aggregated_query["after"], "2024-02-23T12:00:00+00:00")
+        self.assertNotIn("orderBy", aggregated_query)
+        self.assertEqual(_pin_query_for_paging(exported_asset, {"kind": "ActorsQuery"}), {"kind": "ActorsQuery"})
+
     @patch("posthog.hogql.constants.MAX_SELECT_RETURNED_ROWS", 10)
     @patch("posthog.models.exported_asset.UUIDT")
     def test_csv_exporter_events_query_with_columns(
@@ -213,6 +213,8 @@ def iter_records(
         "team_id": team_id,
         "interval_start": data_interval_start_ch,
         "interval_end": data_interval_end_ch,
+        "full_interval_start": data_interval_start_ch,
+        "full_interval_end": data_interval_end_ch,
         "exclude_events": events_to_exclude_array,
         "include_events": events_to_include_array,
     }
@@ -513,7 +513,6 @@ async def insert_into_redshift_activity(inputs: RedshiftInsertInputs) -> Records
                             "table_columns": schema_columns,
                             "known_json_columns": set(known_super_columns),
                             "use_super": properties_type == "SUPER",
-                            "redshift_client": redshift_client,
                         },
                         multiple_files=True,
                     )
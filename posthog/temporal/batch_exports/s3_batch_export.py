@@ -364,25 +364,32 @@ class S3MultiPartUpload:
 
     async def upload_part(
         self,
-        body: BatchExportTemporaryFile,
+        body: BatchExportTemporaryFile | bytes,
         rewind: bool = True,
         max_attempts: int = 5,
         initial_retry_delay: float | int = 2,
         max_retry_delay: float | int = 32,
         exponential_backoff_coefficient: int = 2,
-    ):
-        """Upload a part of this multi-part upload."""
+    ) -> Part:
+        """Upload a part of this multi-part upload.
+
+        The part number is taken before awaiting anything, so parts uploaded concurrently are numbered in the
+        order their uploads were started.
+        """
         next_part_number = self.part_number + 1
-        part = {"PartNumber": next_part_number, "ETag": ""}
+        part: Part = {"PartNumber": next_part_number, "ETag": ""}
         self.pending_parts.append(part)
 
-        if rewind is True:
-            body.rewind()
+        if isinstance(body, bytes):
+            reader: io.BufferedReader | bytes = body
+        else:
+            if rewind is True:
+                body.rewind()
 
-        # aiohttp is not duck-type friendly and requires a io.IOBase
-        # We comply with the file-like interface of io.IOBase.
-        # So we tell mypy to be nice with us.
-        reader = io.BufferedReader(body)  # type: ignore
+            # aiohttp is not duck-type friendly and requires a io.IOBase
+            # We comply with the file-like interface of io.IOBase.
+            # So we tell mypy to be nice with us.
+            reader = io.BufferedReader(body)  # type: ignore
 
         try:
             etag = await self.upload_part_retryable(
@@ -397,15 +404,17 @@ class S3MultiPartUpload:
             raise
 
         finally:
-            reader.detach()  # BufferedReader closes the file otherwise.
+            if isinstance(reader, io.BufferedReader):
+                reader.detach()  # BufferedReader closes the file otherwise.
 
         self.pending_parts.pop(self.pending_parts.index(part))
         part["ETag"] = etag
         self.parts.append(part)
+        return part
 
     async def upload_part_retryable(
         self,
-        reader: io.BufferedReader,
+        reader: io.BufferedReader | bytes,
         next_part_number: int,
         max_attempts: int = 5,
         initial_retry_delay: float | int = 2,
@@ -527,7 +536,25 @@ class S3HeartbeatDetails(BatchExportRangeHeartbeatDetails):
         self.upload_state = None
 
 
+class PartUpload(typing.NamedTuple):
+    """A part being uploaded in the background, with the progress to track once it's uploaded."""
+
+    task: asyncio.Task[Part]
+    size: int
+    records: int
+    date_range: DateRange
+
+
 class S3Consumer(Consumer):
+    """Consumer for S3 batch exports.
+
+    With `max_concurrent_uploads` over 1, parts that are not the last part of a file are uploaded in the
+    background, while we continue consuming record batches. Their progress is tracked in heartbeat details in the
+    order the parts were flushed, and only once uploaded, so that resuming from a heartbeat re-exports any part
+    that was still in flight. Bytes of parts in flight are reserved in `record_batch_queue`, if provided, so
+    that they count towards the same `max_size_bytes` budget as record batches waiting to be consumed.
+    """
+
     def __init__(
         self,
         heartbeater: Heartbeater,
@@ -536,6 +563,8 @@ class S3Consumer(Consumer):
         data_interval_end: dt.datetime | str,
         writer_format: WriterFormat,
         s3_inputs: S3InsertInputs,
+        max_concurrent_uploads: int = 1,
+        record_batch_queue: RecordBatchQueue | None = None,
     ):
         super().__init__(
             heartbeater=heartbeater,
@@ -549,6 +578,15 @@ class S3Consumer(Consumer):
         self.s3_inputs = s3_inputs
         self.file_number = 0
         self.files_uploaded: list[str] = []
+        self.max_concurrent_uploads = max_concurrent_uploads
+        self.record_batch_queue = record_batch_queue
+        self.part_uploads: collections.deque[PartUpload] = collections.deque()
+
+    async def start(self, *args, **kwargs) -> int:
+        try:
+            return await super().start(*args, **kwargs)
+        finally:
+            await self.cancel_part_uploads()
 
     async def flush(
         self,
@@ -573,6 +611,13 @@ class S3Consumer(Consumer):
         if self.s3_upload is None:
             self.s3_upload = initialize_upload(self.s3_inputs, self.file_number)
 
+        if self.max_concurrent_uploads > 1 and not is_last:
+            await self.start_part_upload(batch_export_file, records_since_last_flush, last_date_range)
+            return
+
+        # The last part completes the upload, so all other parts must be uploaded by then
+        await self.wait_for_part_uploads()
+
         async with self.s3_upload as s3_upload:
             await self.logger.adebug(
                 "Uploading file number %s part %s with upload id %s containing %s records with size %s bytes",
@@ -604,7 +649,83 @@ class S3Consumer(Consumer):
         self.heartbeat_details.records_completed += records_since_last_flush
         self.heartbeat_details.track_done_range(last_date_range, self.data_interval_start)
 
+    async def start_part_upload(
+        self, batch_export_file: BatchExportTemporaryFile, records_since_last_flush: int, last_date_range: DateRange
+    ) -> None:
+        """Start uploading the contents of `batch_export_file` as a part, without waiting for it to finish.
+
+        The file is reset as soon as we return, so its contents are read in memory first. We wait for parts in
+        flight to finish before starting a new one if we have reached `max_concurrent_uploads`, or if there isn't
+        enough space in `record_batch_queue` to reserve the part.
+        """
+        assert self.s3_upload is not None
+        if not self.s3_upload.is_upload_in_progress():
+            await self.s3_upload.start()
+
+        batch_export_file.rewind()
+        body = await asyncio.to_thread(batch_export_file.read)
+
+        while self.part_uploads and (
+            len(self.part_uploads) >= self.max_concurrent_uploads or not self.has_space_for_part(len(body))
+        ):
+            await self.wait_for_next_part_upload()
+
+        await self.logger.adebug(
+            "Uploading file number %s part %s with upload id %s containing %s records with size %s bytes in the background",
+            self.file_number,
+            self.s3_upload.part_number + 1,
+            self.s3_upload.upload_id,
+            records_since_last_flush,
+            len(body),
+        )
+        task = asyncio.create_task(self.s3_upload.upload_part(body))
+        if self.record_batch_queue is not None:
+            self.record_batch_queue.reserve_bytes(len(body))
+        self.part_uploads.append(PartUpload(task, len(body), records_since_last_flush, last_date_range))
+
+    def has_space_for_part(self, size: int) -> bool:
+        """Whether reserving `size` bytes keeps `record_batch_queue` within its maximum size."""
+        if self.record_batch_queue is None or self.record_batch_queue.maxsize <= 0:
+            return True
+        return self.record_batch_queue.qsize() + size <= self.record_batch_queue.maxsize
+
+    async def wait_for_next_part_upload(self) -> None:
+        """Wait for the oldest part in flight to be uploaded, and track it as done."""
+        part_upload = self.part_uploads[0]
+        await asyncio.wait([part_upload.task])
+
+        self.part_uploads.popleft()
+        if self.record_batch_queue is not None:
+            self.record_batch_queue.release_bytes(part_upload.size)
+
+        part = part_upload.task.result()
+
+        assert self.s3_upload is not None and self.s3_upload.upload_id is not None
+        self.heartbeat_details.append_upload_state(S3MultiPartUploadState(self.s3_upload.upload_id, [part]))
+        self.heartbeat_details.records_completed += part_upload.records
+        self.heartbeat_details.track_done_range(part_upload.date_range, self.data_interval_start)
+
+        self.rows_exported_counter.add(part_upload.records)
+        self.bytes_exported_counter.add(part_upload.size)
+
+    async def wait_for_part_uploads(self) -> None:
+        """Wait for all parts in flight to be uploaded."""
+        while self.part_uploads:
+            await self.wait_for_next_part_upload()
+
+    async def cancel_part_uploads(self) -> None:
+        """Cancel any parts in flight, for example when consuming fails."""
+        while self.part_uploads:
+            part_upload = self.part_uploads.popleft()
+            part_upload.task.cancel()
+            await asyncio.gather(part_upload.task, return_exceptions=True)
+
+            if self.record_batch_queue is not None:
+                self.record_batch_queue.release_bytes(part_upload.size)
+
     async def close(self):
+        await self.wait_for_part_uploads()
+
         if self.s3_upload is not None:
             await self.logger.adebug(
                 "Completing multipart upload %s for file number %s", self.s3_upload.upload_id, self.file_number
@@ -781,6 +902,8 @@ async def insert_into_s3_activity(inputs: S3InsertInputs) -> RecordsCompleted:
             data_interval_start=data_interval_start,
             writer_format=WriterFormat.from_str(inputs.file_format, "S3"),
             s3_inputs=inputs,
+            max_concurrent_uploads=settings.BATCH_EXPORT_S3_MAX_CONCURRENT_UPLOADS,
+            record_batch_queue=queue,
         )
         _ = await run_consumer(
             consumer=consumer,
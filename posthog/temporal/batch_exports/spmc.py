@@ -54,7 +54,7 @@ from posthog.temporal.batch_exports.utils import (
     cast_record_batch_json_columns,
     cast_record_batch_schema_json_columns,
 )
-from posthog.temporal.common.clickhouse import get_client
+from posthog.temporal.common.clickhouse import ClickHouseClient, get_client
 from posthog.temporal.common.heartbeat import Heartbeater
 from posthog.temporal.common.logger import get_internal_logger
 from posthog.warehouse.util import database_sync_to_async
@@ -66,6 +66,7 @@ class RecordBatchQueue(asyncio.Queue):
     def __init__(self, max_size_bytes: int = 0) -> None:
         super().__init__(maxsize=max_size_bytes)
         self._bytes_size = 0
+        self._reserved_bytes = 0
         self._schema_set = asyncio.Event()
         self.record_batch_schema: pa.Schema | None = None
         # This is set by `asyncio.Queue.__init__` calling `_init`
@@ -102,13 +103,27 @@ class RecordBatchQueue(asyncio.Queue):
         assert self.record_batch_schema is not None
         return self.record_batch_schema
 
+    def reserve_bytes(self, size: int) -> None:
+        """Count `size` bytes held outside the queue towards its maximum size.
+
+        Consumers use this for data they still hold after getting it from the
+        queue, like file parts being uploaded, so that producers wait for space
+        and the memory used by both stays within the same budget.
+        """
+        self._reserved_bytes += size
+
+    def release_bytes(self, size: int) -> None:
+        """Release bytes reserved with `reserve_bytes`, waking up a waiting producer."""
+        self._reserved_bytes -= size
+        self._wakeup_next(self._putters)  # type: ignore[attr-defined]
+
     def qsize(self) -> int:
-        """Size in bytes of record batches in the queue.
+        """Size in bytes of record batches in the queue, plus any reserved bytes.
 
         This is used to determine when the queue is full, so it returns the
         number of bytes.
         """
-        return self._bytes_size
+        return self._bytes_size + self._reserved_bytes
 
 
 class TaskNotDoneError(Exception):
@@ -931,35 +946,165 @@ class Producer:
         end_at = full_range[1]
         await wait_for_delta_past_data_interval_end(end_at, delta)
 
+        query_ranges = list(generate_query_ranges(full_range, done_ranges))
+        # Ranges are split on `_inserted_at` only: Other filters, like the lookback window on `timestamp`, use the
+        # bounds of the full range, so that late arriving events are not dropped from any of the shards.
+        query_parameters = {**query_parameters, **full_range_query_parameters(full_range)}
+        # Models filter on other fields with the bounds of the range they are given, so they are not split
+        if is_5_min_batch_export(full_range) or isinstance(query_or_model, RecordBatchModel):
+            shards = 1
+        else:
+            shards = settings.BATCH_EXPORT_PRODUCER_SHARDS
+        if shards > 1:
+            query_ranges = [shard for query_range in query_ranges for shard in split_query_range(query_range, shards)]
+
+        if len(query_ranges) > 1 and shards > 1:
+            await self.produce_record_batches_from_shards(
+                query_or_model=query_or_model,
+                query_ranges=query_ranges,
+                queue=queue,
+                query_parameters=query_parameters,
+                team_id=team_id,
+                clickhouse_url=clickhouse_url,
+                max_concurrent_shards=shards,
+                max_record_batch_size_bytes=max_record_batch_size_bytes,
+                min_records_per_batch=min_records_per_batch,
+            )
+            return
+
         async with get_client(team_id=team_id, clickhouse_url=clickhouse_url) as client:
             if not await client.is_alive():
                 raise ConnectionError("Cannot establish connection to ClickHouse")
 
-            for interval_start, interval_end in generate_query_ranges(full_range, done_ranges):
-                if interval_start is not None:
-                    query_parameters["interval_start"] = interval_start.strftime("%Y-%m-%d %H:%M:%S.%f")
-                query_parameters["interval_end"] = interval_end.strftime("%Y-%m-%d %H:%M:%S.%f")
-                query_id = uuid.uuid4()
+            for query_range in query_ranges:
+                await self.produce_record_batches_from_query_range(
+                    client=client,
+                    query_or_model=query_or_model,
+                    query_range=query_range,
+                    queue=queue,
+                    query_parameters=query_parameters,
+                    max_record_batch_size_bytes=max_record_batch_size_bytes,
+                    min_records_per_batch=min_records_per_batch,
+                )
 
-                if isinstance(query_or_model, RecordBatchModel):
-                    query, query_parameters = await query_or_model.as_query_with_parameters(
-                        interval_start, interval_end
-                    )
-                else:
-                    query = query_or_model
+    async def produce_record_batches_from_query_range(
+        self,
+        client: ClickHouseClient,
+        query_or_model: str | RecordBatchModel,
+        query_range: tuple[dt.datetime | None, dt.datetime],
+        queue: RecordBatchQueue,
+        query_parameters: dict[str, typing.Any],
+        max_record_batch_size_bytes: int = 0,
+        min_records_per_batch: int = 100,
+    ):
+        """Stream the record batches of a single query range into `queue`."""
+        interval_start, interval_end = query_range
+        query_parameters = {**query_parameters}
+        if interval_start is not None:
+            query_parameters["interval_start"] = interval_start.strftime("%Y-%m-%d %H:%M:%S.%f")
+        query_parameters["interval_end"] = interval_end.strftime("%Y-%m-%d %H:%M:%S.%f")
+        query_id = uuid.uuid4()
+
+        if isinstance(query_or_model, RecordBatchModel):
+            query, query_parameters = await query_or_model.as_query_with_parameters(interval_start, interval_end)
+        else:
+            query = query_or_model
 
-                try:
-                    async for record_batch in client.astream_query_as_arrow(
-                        query, query_parameters=query_parameters, query_id=str(query_id)
-                    ):
-                        for record_batch_slice in slice_record_batch(
-                            record_batch, max_record_batch_size_bytes, min_records_per_batch
-                        ):
-                            await queue.put(record_batch_slice)
+        try:
+            async for record_batch in client.astream_query_as_arrow(
+                query, query_parameters=query_parameters, query_id=str(query_id)
+            ):
+                for record_batch_slice in slice_record_batch(
+                    record_batch, max_record_batch_size_bytes, min_records_per_batch
+                ):
+                    await queue.put(record_batch_slice)
 
-                except Exception as e:
-                    await self.logger.aexception("Unexpected error occurred while producing record batches", exc_info=e)
-                    raise
+        except Exception as e:
+            await self.logger.aexception("Unexpected error occurred while producing record batches", exc_info=e)
+            raise
+
+    async def produce_record_batches_from_shards(
+        self,
+        query_or_model: str | RecordBatchModel,
+        query_ranges: collections.abc.Sequence[tuple[dt.datetime | None, dt.datetime]],
+        queue: RecordBatchQueue,
+        query_parameters: dict[str, typing.Any],
+        team_id: int,
+        clickhouse_url: str | None,
+        max_concurrent_shards: int,
+        max_record_batch_size_bytes: int = 0,
+        min_records_per_batch: int = 100,
+    ):
+        """Stream up to `max_concurrent_shards` query ranges at the same time, each with its own connection.
+
+        Record batches are still put in `queue` in the order of `query_ranges`, so consumers see them ordered by
+        `_inserted_at` and track done ranges like they would for a single stream: a retried activity resumes from
+        the first range that wasn't exported. Each shard streams into its own buffer, and the buffers share the
+        `queue`'s size limit (or `BATCH_EXPORT_BUFFER_QUEUE_MAX_SIZE_BYTES` if it has none), so a shard that is
+        ahead waits for the ones before it to be consumed.
+        """
+        max_size_bytes = queue.maxsize if queue.maxsize > 0 else settings.BATCH_EXPORT_BUFFER_QUEUE_MAX_SIZE_BYTES
+        shard_max_size_bytes = max(max_size_bytes // max_concurrent_shards, 1)
+
+        async def produce_shard(
+            query_range: tuple[dt.datetime | None, dt.datetime], shard_queue: RecordBatchQueue
+        ) -> None:
+            async with get_client(team_id=team_id, clickhouse_url=clickhouse_url) as client:
+                if not await client.is_alive():
+                    raise ConnectionError("Cannot establish connection to ClickHouse")
+
+                await self.produce_record_batches_from_query_range(
+                    client=client,
+                    query_or_model=query_or_model,
+                    query_range=query_range,
+                    queue=shard_queue,
+                    query_parameters=query_parameters,
+                    max_record_batch_size_bytes=max_record_batch_size_bytes,
+                    min_records_per_batch=min_records_per_batch,
+                )
+
+        await self.logger.adebug("Producing record batches from %s shards", len(query_ranges))
+
+        remaining_ranges = collections.deque(query_ranges)
+        shards: collections.deque[tuple[RecordBatchQueue, asyncio.Task]] = collections.deque()
+
+        def start_next_shard() -> None:
+            query_range = remaining_ranges.popleft()
+            shard_queue = RecordBatchQueue(max_size_bytes=shard_max_size_bytes)
+            shard_task = asyncio.create_task(produce_shard(query_range, shard_queue), name="record_batch_shard")
+            shards.append((shard_queue, shard_task))
+
+        try:
+            while remaining_ranges and len(shards) < max_concurrent_shards:
+                start_next_shard()
+
+            while shards:
+                shard_queue, shard_task = shards[0]
+
+                while True:
+                    get_task = asyncio.create_task(shard_queue.get())
+                    await asyncio.wait([get_task, shard_task], return_when=asyncio.FIRST_COMPLETED)
+
+                    if get_task.done():
+                        await queue.put(get_task.result())
+                        continue
+
+                    get_task.cancel()
+                    while not shard_queue.empty():
+                        await queue.put(shard_queue.get_nowait())
+                    break
+
+                # Raises if the shard failed
+                shard_task.result()
+                shards.popleft()
+
+                if remaining_ranges:
+                    start_next_shard()
+
+        finally:
+            for _, shard_task in shards:
+                shard_task.cancel()
+            await asyncio.gather(*(shard_task for _, shard_task in shards), return_exceptions=True)
 
 
 def slice_record_batch(
@@ -1003,6 +1148,35 @@ def slice_record_batch(
         length = total_rows - yielded_rows
 
 
+def full_range_query_parameters(full_range: tuple[dt.datetime | None, dt.datetime]) -> dict[str, str]:
+    """Return the bounds of the full range of a batch export as query parameters."""
+    full_start_at, full_end_at = full_range
+    query_parameters = {"full_interval_end": full_end_at.strftime("%Y-%m-%d %H:%M:%S.%f")}
+    if full_start_at is not None:
+        query_parameters["full_interval_start"] = full_start_at.strftime("%Y-%m-%d %H:%M:%S.%f")
+    return query_parameters
+
+
+def split_query_range(
+    query_range: tuple[dt.datetime | None, dt.datetime], shards: int
+) -> list[tuple[dt.datetime | None, dt.datetime]]:
+    """Split a query range into `shards` consecutive ranges of the same length.
+
+    Ranges without a start cannot be split, so they are returned as they are.
+    """
+    start_at, end_at = query_range
+    if start_at is None or shards <= 1 or start_at >= end_at:
+        return [query_range]
+
+    shard_length = (end_at - start_at) / shards
+    bounds = [start_at + shard_length * shard for shard in range(shards)] + [end_at]
+    return [
+        (shard_start_at, shard_end_at)
+        for shard_start_at, shard_end_at in zip(bounds, bounds[1:])
+        if shard_start_at < shard_end_at
+    ]
+
+
 def generate_query_ranges(
     remaining_range: tuple[dt.datetime | None, dt.datetime],
     done_ranges: collections.abc.Sequence[tuple[dt.datetime, dt.datetime]],
@@ -244,8 +244,8 @@ FROM (
         AND COALESCE(events.inserted_at, events._timestamp) < {{interval_end:DateTime64}}
     WHERE
         team_id = {{team_id:Int64}}
-        AND events.timestamp >= {{interval_start:DateTime64}} - INTERVAL {{lookback_days:Int32}} DAY
-        AND events.timestamp < {{interval_end:DateTime64}} + INTERVAL 1 DAY
+        AND events.timestamp >= {{full_interval_start:DateTime64}} - INTERVAL {{lookback_days:Int32}} DAY
+        AND events.timestamp < {{full_interval_end:DateTime64}} + INTERVAL 1 DAY
         AND (length({{include_events:Array(String)}}) = 0 OR event IN {{include_events:Array(String)}})
         AND (length({{exclude_events:Array(String)}}) = 0 OR event NOT IN {{exclude_events:Array(String)}})
         $filters
@@ -9,18 +9,20 @@ import datetime as dt
 import enum
 import gzip
 import json
+import math
 import tempfile
 import typing
 
 import brotli
 import orjson
-import psycopg
 import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.parquet as pq
 import structlog
 from psycopg import sql
 
 from posthog.temporal.batch_exports.heartbeat import DateRange
+from posthog.temporal.batch_exports.utils import JsonType
 
 logger = structlog.get_logger()
 
@@ -269,6 +271,175 @@ FlushCallable = collections.abc.Callable[
     collections.abc.Awaitable[None],
 ]
 
+# Characters escaped by orjson with a short escape sequence. Any other control character is escaped as '\u00XX'.
+JSON_STRING_ESCAPES = (
+    ("\\", "\\\\"),
+    ('"', '\\"'),
+    ("\n", "\\n"),
+    ("\r", "\\r"),
+    ("\t", "\\t"),
+    ("\b", "\\b"),
+    ("\f", "\\f"),
+)
+# JSON column values that could be copied to JSONL as they are: Something that looks like a JSON object or array,
+# without unescaped control characters, that would break the line, or escaped surrogates, which may not have a pair.
+# Values that match are still parsed by `_is_valid_json_array`, as only the first and last characters are checked here.
+SPLICEABLE_JSON_PATTERN = r"^[\{\[][^\x00-\x1f]*[\}\]]$"
+ESCAPED_SURROGATE_PATTERN = r"\\u[dD][89a-fA-F]"
+
+
+def _is_valid_json_array(array: pa.Array, candidates: pa.BooleanArray) -> pa.BooleanArray:
+    """Return which values of a large string array, out of those set in the `candidates` mask, are valid JSON.
+
+    Only parsing a value can tell a single JSON value apart from, e.g., `{"a": 1}, {"b": 2}`, and Arrow has no compute
+    function for that. So the candidates are parsed one at a time, straight from the array's data buffer, to at least
+    not copy them into Python strings first.
+    """
+    _, offsets_buffer, data_buffer = array.buffers()
+    if data_buffer is None:
+        return candidates
+
+    offsets = pa.Array.from_buffers(pa.int64(), len(array) + 1, [None, offsets_buffer], offset=array.offset).to_pylist()  # type: ignore
+    data = memoryview(data_buffer)
+    is_valid = []
+    for index, is_candidate in enumerate(candidates.to_pylist()):
+        if is_candidate:
+            try:
+                orjson.loads(data[offsets[index] : offsets[index + 1]])
+            except orjson.JSONDecodeError:
+                is_candidate = False
+        is_valid.append(is_candidate)
+    return pa.array(is_valid, type=pa.bool_())
+
+
+def _large_string_scalar(value: str) -> pa.Scalar:
+    return pa.scalar(value, type=pa.large_string())
+
+
+def _join_large_strings(*values: pa.Array | str, separator: str = "") -> pa.Array:
+    """Concatenate `values` element-wise, where `str` values are repeated for every element."""
+    return pc.binary_join_element_wise(  # type: ignore
+        *(_large_string_scalar(value) if isinstance(value, str) else value for value in values),
+        _large_string_scalar(separator),
+    )
+
+
+def _string_array_to_bytes(array: pa.Array) -> bytes:
+    """Return the contiguous bytes of all the values in a large string array."""
+    _, offsets_buffer, data_buffer = array.buffers()
+    offsets = pa.Array.from_buffers(pa.int64(), len(array) + 1, [None, offsets_buffer], offset=array.offset)  # type: ignore
+    return data_buffer[offsets[0].as_py() : offsets[-1].as_py()].to_pybytes()  # type: ignore
+
+
+def _format_timestamp_array(array: pa.Array, date_time_separator: str) -> pa.Array | None:
+    """Format timestamps as Python's `datetime.isoformat(date_time_separator)` would, if we can do it with Arrow.
+
+    Only timestamps in UTC, or without a time zone, with seconds or microseconds are supported. For others we
+    return `None`.
+    """
+    if array.type.unit not in ("s", "us") or array.type.tz not in (None, "UTC", "Etc/UTC", "+00:00"):
+        return None
+
+    formatted = pc.strftime(array, format=f"%Y-%m-%d{date_time_separator}%H:%M:%S").cast(pa.large_string())  # type: ignore
+    # Python only includes microseconds if they are not 0
+    formatted = pc.replace_substring_regex(formatted, pattern=r"\.000000$", replacement="")
+
+    if array.type.tz is not None:
+        formatted = _join_large_strings(formatted, "+00:00")
+    return formatted
+
+
+def _json_encode_array(array: pa.Array) -> tuple[pa.Array, pa.Array | None]:
+    """Encode each value in `array` as JSON, like `orjson.dumps(value, default=str)` would.
+
+    Values of `JsonType` columns are used as they are, without decoding and encoding them again. Any values
+    we cannot encode are flagged in the returned mask, and they should be encoded one row at a time.
+
+    Returns:
+        An array of encoded values, and a boolean mask of values that couldn't be encoded, if any.
+    """
+    if isinstance(array.type, JsonType):
+        raw_json = array.storage.cast(pa.large_string())  # type: ignore
+        is_empty = pc.fill_null(pc.equal(raw_json, _large_string_scalar("")), True)  # type: ignore
+        looks_spliceable = pc.and_(
+            pc.match_substring_regex(raw_json, SPLICEABLE_JSON_PATTERN),
+            pc.invert(pc.match_substring_regex(raw_json, ESCAPED_SURROGATE_PATTERN)),
+        )
+        is_spliceable = _is_valid_json_array(raw_json, pc.fill_null(looks_spliceable, False))  # type: ignore
+        needs_row_encoding = pc.and_(pc.invert(is_empty), pc.invert(is_spliceable))
+        encoded = pc.if_else(pc.or_(is_empty, needs_row_encoding), _large_string_scalar("null"), raw_json)
+        return encoded, needs_row_encoding if pc.any(needs_row_encoding).as_py() else None
+
+    encoded = None
+    if pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+        if not pc.any(pc.match_substring_regex(array, r"[\x00-\x07\x0b\x0e-\x1f]")).as_py():  # type: ignore
+            escaped = array.cast(pa.large_string())
+            for character, escape in JSON_STRING_ESCAPES:
+                escaped = pc.replace_substring(escaped, pattern=character, replacement=escape)  # type: ignore
+            encoded = _join_large_strings('"', escaped, '"')
+
+    elif pa.types.is_integer(array.type):
+        encoded = array.cast(pa.large_string())
+
+    elif pa.types.is_boolean(array.type):
+        encoded = pc.if_else(array, _large_string_scalar("true"), _large_string_scalar("false"))
+
+    elif pa.types.is_timestamp(array.type):
+        formatted = _format_timestamp_array(array, "T")
+        if formatted is not None:
+            encoded = _join_large_strings('"', formatted, '"')
+
+    if encoded is not None:
+        return pc.fill_null(encoded, _large_string_scalar("null")), None  # type: ignore
+
+    values: list[bytes] = []
+    row_needs_encoding: list[bool] = []
+    for value in array.to_pylist():
+        try:
+            values.append(orjson.dumps(value, default=str))
+            row_needs_encoding.append(False)
+        except orjson.JSONEncodeError:
+            values.append(b"null")
+            row_needs_encoding.append(True)
+
+    return pa.array(values, type=pa.large_string()), pa.array(row_needs_encoding) if any(row_needs_encoding) else None
+
+
+def _str_array(array: pa.Array) -> pa.Array:
+    """Convert each value in `array` to the `str` a `csv.writer` would write for it.
+
+    Lists are written with braces instead of brackets, to support PostgreSQL literal arrays.
+    """
+    if pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+        return array.cast(pa.large_string())
+
+    elif pa.types.is_integer(array.type):
+        return array.cast(pa.large_string())
+
+    elif pa.types.is_boolean(array.type):
+        return pc.if_else(array, _large_string_scalar("True"), _large_string_scalar("False"))
+
+    elif pa.types.is_timestamp(array.type):
+        formatted = _format_timestamp_array(array, " ")
+        if formatted is not None:
+            return formatted
+
+    return pa.array(
+        [
+            None
+            if value is None
+            else str(value).replace("[", "{").replace("]", "}")
+            if isinstance(value, list)
+            else str(value)
+            for value in array.to_pylist()
+        ],
+        type=pa.large_string(),
+    )
+
+
+def _character_class(characters: collections.abc.Iterable[str]) -> str:
+    return "[" + "".join(f"\\x{{{ord(character):x}}}" for character in characters) + "]"
+
 
 class UnsupportedFileFormatError(Exception):
     """Raised when a writer for an unsupported file format is requested."""
@@ -623,12 +794,43 @@ class JSONLBatchExportWriter(BatchExportWriter):
         return n
 
     def _write_record_batch(self, record_batch: pa.RecordBatch) -> None:
-        """Write records to a temporary file as JSONL."""
-        for record_dict in record_batch.to_pylist():
-            if not record_dict:
-                continue
+        """Write records to a temporary file as JSONL.
+
+        Columns are encoded a whole array at a time, and joined into lines that are written all at once. Only rows
+        with values we can't encode this way are written one at a time with `write_dict`.
+        """
+        if record_batch.num_columns == 0 or record_batch.num_rows == 0:
+            return
 
-            self.write_dict(record_dict)
+        line_parts: list[pa.Array | str] = []
+        needs_row_encoding = None
+        for index, (name, array) in enumerate(zip(record_batch.column_names, record_batch.columns)):
+            encoded, column_needs_row_encoding = _json_encode_array(array)
+            if column_needs_row_encoding is not None:
+                needs_row_encoding = (
+                    column_needs_row_encoding
+                    if needs_row_encoding is None
+                    else pc.or_(needs_row_encoding, column_needs_row_encoding)
+                )
+
+            key = orjson.dumps(name).decode("utf-8")
+            line_parts.extend((("{" if index == 0 else ",") + key + ":", encoded))
+        line_parts.append("}\n")
+        lines = _join_large_strings(*line_parts)
+
+        if needs_row_encoding is None:
+            self.batch_export_file.write(_string_array_to_bytes(lines))
+            return
+
+        start = 0
+        for row in pc.indices_nonzero(needs_row_encoding).to_pylist():  # type: ignore
+            if row > start:
+                self.batch_export_file.write(_string_array_to_bytes(lines.slice(start, row - start)))
+            self.write_dict(record_batch.slice(row, 1).to_pylist()[0])
+            start = row + 1
+
+        if start < len(lines):
+            self.batch_export_file.write(_string_array_to_bytes(lines.slice(start)))
 
 
 class CSVBatchExportWriter(BatchExportWriter):
@@ -695,6 +897,10 @@ class CSVBatchExportWriter(BatchExportWriter):
         replacement of [] for {} to support PostgreSQL literal arrays when writing
         a list.
         """
+        if self._can_write_arrays(record_batch):
+            self._write_arrays(record_batch)
+            return
+
         rows = []
         for record in record_batch.to_pylist():
             rows.append(
@@ -702,6 +908,62 @@ class CSVBatchExportWriter(BatchExportWriter):
             )
         self.csv_writer.writerows(rows)
 
+    def _can_write_arrays(self, record_batch: pa.RecordBatch) -> bool:
+        """Whether we can write `record_batch` a whole array at a time, with the same output as `csv.DictWriter`.
+
+        This is the case for quoting `QUOTE_MINIMAL`, and `QUOTE_NONE` with an escape character, with single
+        character delimiters, quote and escape characters, as long as there is more than one field and, if set to
+        raise, no extra fields.
+        """
+        return (
+            (self.quoting == csv.QUOTE_MINIMAL or (self.quoting == csv.QUOTE_NONE and self.escape_char is not None))
+            and len(self.delimiter) == 1
+            and self.quote_char is not None
+            and len(self.quote_char) == 1
+            and (self.escape_char is None or len(self.escape_char) == 1)
+            and len(self.field_names) > 1
+            and record_batch.num_rows > 0
+            and (self.extras_action == "ignore" or set(record_batch.column_names) <= set(self.field_names))
+        )
+
+    def _write_arrays(self, record_batch: pa.RecordBatch) -> None:
+        assert self.quote_char is not None
+
+        special_characters = {self.delimiter, self.quote_char, *self.line_terminator}
+        fields: list[pa.Array | str] = []
+
+        for field_name in self.field_names:
+            if field_name not in record_batch.column_names:
+                fields.append("")
+                continue
+
+            field = _str_array(record_batch.column(field_name))
+
+            if self.quoting == csv.QUOTE_NONE:
+                assert self.escape_char is not None
+                # Escape the escape character first, so we don't escape the escapes we add
+                for character in sorted(special_characters | {self.escape_char}, key=lambda c: c != self.escape_char):
+                    field = pc.replace_substring(field, pattern=character, replacement=self.escape_char + character)  # type: ignore
+
+            else:
+                if self.escape_char is not None:
+                    field = pc.replace_substring(  # type: ignore
+                        field, pattern=self.escape_char, replacement=self.escape_char + self.escape_char
+                    )
+
+                needs_quotes = pc.match_substring_regex(field, _character_class(special_characters))  # type: ignore
+                quoted = _join_large_strings(
+                    self.quote_char,
+                    pc.replace_substring(field, pattern=self.quote_char, replacement=self.quote_char * 2),  # type: ignore
+                    self.quote_char,
+                )
+                field = pc.if_else(needs_quotes, quoted, field)
+
+            fields.append(pc.fill_null(field, _large_string_scalar("")))  # type: ignore
+
+        lines = _join_large_strings(_join_large_strings(*fields, separator=self.delimiter), self.line_terminator)
+        self.batch_export_file.write(_string_array_to_bytes(lines))
+
 
 class ParquetBatchExportWriter(BatchExportWriter):
     """A `BatchExportWriter` for Apache Parquet format.
@@ -780,6 +1042,17 @@ def remove_escaped_whitespace_recursive(value):
     This function is recursive just to be extremely careful and catch any whitespace that
     may be sneaked in a dictionary key or sequence.
     """
+    # Fast paths for the types decoded JSON is made of, as matching the patterns below is comparatively slow.
+    value_type = type(value)
+    if value_type is str:
+        return " ".join(value.replace("\b", " ").split())
+    elif value_type is dict:
+        return {k: remove_escaped_whitespace_recursive(v) for k, v in value.items()}
+    elif value_type is list:
+        return [remove_escaped_whitespace_recursive(sequence_value) for sequence_value in value]
+    elif value is None or value_type in (int, float, bool):
+        return value
+
     match value:
         case str(s):
             return " ".join(s.replace("\b", " ").split())
@@ -803,6 +1076,76 @@ def remove_escaped_whitespace_recursive(value):
             return value
 
 
+def _quote_redshift_string_array(array: pa.Array) -> pa.Array:
+    """Quote each string in `array` as a Redshift string literal, or `NULL`.
+
+    Backslashes and quotes are doubled like psycopg does, but without the E prefix, which Redshift doesn't support.
+    """
+    quoted = array.cast(pa.large_string())
+    quoted = pc.replace_substring(quoted, pattern="\\", replacement="\\\\")  # type: ignore
+    quoted = pc.replace_substring(quoted, pattern="'", replacement="''")  # type: ignore
+    return pc.fill_null(_join_large_strings("'", quoted, "'"), _large_string_scalar("NULL"))  # type: ignore
+
+
+def _redshift_literal(value: typing.Any) -> str:
+    """Encode a Python value as a Redshift SQL literal, with the same casts psycopg would add."""
+    match value:
+        case None:
+            return "NULL"
+        case bool():
+            return "true" if value else "false"
+        case int():
+            return str(value)
+        case float() if math.isfinite(value):
+            return repr(value)
+        case float():
+            return f"'{'NaN' if math.isnan(value) else ('Infinity' if value > 0 else '-Infinity')}'::float8"
+        case dt.datetime() if value.tzinfo is not None:
+            return f"'{value.isoformat(' ')}'::timestamptz"
+        case dt.datetime():
+            return f"'{value.isoformat(' ')}'::timestamp"
+        case dt.date():
+            return f"'{value.isoformat()}'::date"
+        case _:
+            return "'" + str(value).replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def _redshift_literal_array(array: pa.Array) -> pa.Array:
+    """Encode each value in `array` as a Redshift SQL literal.
+
+    Strings, integers, booleans and UTC timestamps are encoded with Arrow, and any other values one at a time.
+    """
+    if pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+        return _quote_redshift_string_array(array)
+
+    encoded = None
+    if pa.types.is_integer(array.type):
+        encoded = array.cast(pa.large_string())
+
+    elif pa.types.is_boolean(array.type):
+        encoded = pc.if_else(array, _large_string_scalar("true"), _large_string_scalar("false"))
+
+    elif pa.types.is_timestamp(array.type):
+        formatted = _format_timestamp_array(array, " ")
+        if formatted is not None:
+            cast = "::timestamptz" if array.type.tz is not None else "::timestamp"
+            encoded = _join_large_strings("'", formatted, "'" + cast)
+
+    if encoded is not None:
+        return pc.fill_null(encoded, _large_string_scalar("NULL"))  # type: ignore
+
+    return pa.array([_redshift_literal(value) for value in array.to_pylist()], type=pa.large_string())
+
+
+def _redshift_json_literal_array(array: pa.Array) -> pa.Array:
+    """Encode each value in `array` as a Redshift string literal of its JSON, without escaped whitespace."""
+    dumped = [
+        None if value is None else json.dumps(remove_escaped_whitespace_recursive(value), ensure_ascii=False)
+        for value in array.to_pylist()
+    ]
+    return _quote_redshift_string_array(pa.array(dumped, type=pa.large_string()))
+
+
 class RedshiftInsertBatchExportWriter(BatchExportWriter):
     """A `BatchExportWriter` for Redshift INSERT queries.
 
@@ -822,7 +1165,6 @@ class RedshiftInsertBatchExportWriter(BatchExportWriter):
         table_columns: collections.abc.Sequence[str],
         known_json_columns: collections.abc.Sequence[str],
         use_super: bool,
-        redshift_client,
     ):
         super().__init__(
             max_bytes=max_bytes,
@@ -835,19 +1177,8 @@ class RedshiftInsertBatchExportWriter(BatchExportWriter):
         self.table_columns = table_columns
         self.known_json_columns = known_json_columns
         self.use_super = use_super
-        self.redshift_client = redshift_client
-        self._cursor: psycopg.AsyncClientCursor | None = None
         self.first = True
 
-        placeholders: list[sql.Composable] = []
-        for column in table_columns:
-            if column in known_json_columns and use_super is True:
-                placeholders.append(sql.SQL("JSON_PARSE({placeholder})").format(placeholder=sql.Placeholder(column)))
-            else:
-                placeholders.append(sql.Placeholder(column))
-
-        self.template = sql.SQL("({})").format(sql.SQL(", ").join(placeholders))
-
     def create_temporary_file(self) -> BatchExportTemporaryFile:
         """On creating a temporary file, write first the start of a query."""
         file = super().create_temporary_file()
@@ -857,50 +1188,52 @@ class RedshiftInsertBatchExportWriter(BatchExportWriter):
         else:
             table_identifier = sql.Identifier(self.redshift_table)
 
-        pre_query_encoded = asyncio.run(self.get_encoded_pre_query(table_identifier))
+        pre_query_encoded = self.get_encoded_pre_query(table_identifier)
         file.write(pre_query_encoded)
 
         return file
 
-    async def get_encoded_pre_query(self, table_identifier: sql.Identifier) -> bytes:
-        """Encode and format the start of an INSERT INTO query."""
+    def get_encoded_pre_query(self, table_identifier: sql.Identifier) -> bytes:
+        """Encode and format the start of an INSERT INTO query.
+
+        Identifiers are quoted by psycopg without a connection, as we only support UTF-8.
+        """
         pre_query = sql.SQL("INSERT INTO {table} ({fields}) VALUES").format(
             table=table_identifier,
             fields=sql.SQL(", ").join(map(sql.Identifier, self.table_columns)),
         )
-
-        async with self.redshift_client.async_client_cursor() as cursor:
-            return pre_query.as_string(cursor).encode("utf-8")
+        return pre_query.as_string(None).encode("utf-8")
 
     def _write_record_batch(self, record_batch: pa.RecordBatch) -> None:
-        """Write records to a temporary file as values in an INSERT query."""
-        for record_dict in record_batch.to_pylist():
-            if not record_dict:
-                continue
+        """Write records to a temporary file as values in an INSERT query.
 
-            record = {}
-            for key, value in record_dict.items():
-                if key not in self.table_columns:
-                    continue
+        Values are encoded as SQL literals a column at a time, without going through a cursor, and all the rows of
+        the record batch are written at once.
+        """
+        if record_batch.num_rows == 0:
+            return
 
-                record[key] = value
+        literals = []
+        for column in self.table_columns:
+            array = record_batch.column(column)
 
-                if value is not None and key in self.known_json_columns:
-                    record[key] = json.dumps(remove_escaped_whitespace_recursive(record[key]), ensure_ascii=False)
+            if column in self.known_json_columns:
+                encoded = _redshift_json_literal_array(array)
+                if self.use_super is True:
+                    encoded = _join_large_strings("JSON_PARSE(", encoded, ")")
+            else:
+                encoded = _redshift_literal_array(array)
 
-            encoded = asyncio.run(self.mogrify_record(record))
+            literals.append(encoded)
 
-            if self.first:
-                self.first = False
-            else:
-                self.batch_export_file.write(",")
+        rows = _join_large_strings(",(", _join_large_strings(*literals, separator=", "), ")")
+        encoded_rows = _string_array_to_bytes(rows)
 
-            self.batch_export_file.write(encoded)
+        if self.first:
+            self.first = False
+            encoded_rows = encoded_rows[1:]
 
-    async def mogrify_record(self, record: dict[str, typing.Any]) -> bytes:
-        """Produce encoded bytes from a record."""
-        async with self.redshift_client.async_client_cursor() as cursor:
-            return cursor.mogrify(self.template, record).encode("utf-8").replace(b" E'", b" '")
+        self.batch_export_file.write(encoded_rows)
 
     async def close_temporary_file(self):
         """Ensure we mark next query as first after closing a file."""
@@ -497,6 +497,7 @@ async def test_insert_into_s3_activity_puts_data_into_s3(
 # Use 0 to test that the file is not split up and 6MB since this is slightly
 # larger than the default 5MB chunk size for multipart uploads.
 @pytest.mark.parametrize("max_file_size_mb", [None, 6])
+@pytest.mark.parametrize("max_concurrent_uploads", [1, 3])
 async def test_insert_into_s3_activity_puts_splitted_files_into_s3(
     clickhouse_client,
     bucket_name,
@@ -504,6 +505,7 @@ async def test_insert_into_s3_activity_puts_splitted_files_into_s3(
     activity_environment,
     compression,
     max_file_size_mb,
+    max_concurrent_uploads,
     exclude_events,
     file_format,
     data_interval_start,
@@ -582,6 +584,7 @@ async def test_insert_into_s3_activity_puts_splitted_files_into_s3(
     with override_settings(
         # 5MB, the minimum for Multipart uploads
         BATCH_EXPORT_S3_UPLOAD_CHUNK_SIZE_BYTES=5 * 1024**2,
+        BATCH_EXPORT_S3_MAX_CONCURRENT_UPLOADS=max_concurrent_uploads,
     ):
         records_exported = await activity_environment.run(insert_into_s3_activity, insert_inputs)
 
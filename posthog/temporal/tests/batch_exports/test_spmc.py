@@ -6,6 +6,7 @@ from collections.abc import Collection
 
 import pyarrow as pa
 import pytest
+from django.test import override_settings
 
 from posthog.batch_exports.service import BackfillDetails
 from posthog.hogql.hogql import ast
@@ -15,6 +16,7 @@ from posthog.temporal.batch_exports.spmc import (
     SessionsRecordBatchModel,
     compose_filters_clause,
     slice_record_batch,
+    split_query_range,
     use_distributed_events_recent_table,
 )
 from posthog.temporal.tests.utils.events import generate_test_events_in_clickhouse
@@ -58,6 +60,30 @@ async def test_record_batch_queue_raises_queue_full():
     assert queue.qsize() == 0
 
 
+async def test_record_batch_queue_counts_reserved_bytes():
+    """Test reserved bytes count towards the size of the queue until they are released."""
+    records = [{"test": 1}, {"test": 2}, {"test": 3}]
+    record_batch = pa.RecordBatch.from_pylist(records)
+    record_batch_size = record_batch.get_total_buffer_size()
+
+    queue = RecordBatchQueue(max_size_bytes=record_batch_size)
+    queue.reserve_bytes(record_batch_size)
+    assert queue.qsize() == record_batch_size
+
+    with pytest.raises(asyncio.QueueFull):
+        queue.put_nowait(record_batch)
+
+    put_task = asyncio.create_task(queue.put(record_batch))
+    await asyncio.sleep(0)
+    assert not put_task.done()
+
+    queue.release_bytes(record_batch_size)
+    await asyncio.wait_for(put_task, timeout=1)
+
+    assert queue.qsize() == record_batch_size
+    assert await queue.get() == record_batch
+
+
 async def test_record_batch_queue_sets_schema():
     """Test `RecordBatchQueue` sets a schema from first `RecordBatch`."""
     records = [{"test": 1}, {"test": 2}, {"test": 3}]
@@ -143,6 +169,121 @@ async def test_record_batch_producer_uses_extra_query_parameters(clickhouse_clie
         assert record["custom_prop"] == expected["properties"]["custom"]
 
 
+async def test_record_batch_producer_produces_shards_in_order(clickhouse_client):
+    """Test RecordBatch Producer streaming shards concurrently produces all records in order."""
+    team_id = random.randint(1, 1000000)
+    data_interval_end = dt.datetime.fromisoformat("2023-04-25T15:00:00.000000+00:00")
+    data_interval_start = dt.datetime.fromisoformat("2023-04-25T14:00:00.000000+00:00")
+
+    (events, _, _) = await generate_test_events_in_clickhouse(
+        client=clickhouse_client,
+        team_id=team_id,
+        start_time=data_interval_start,
+        end_time=data_interval_end,
+        count=100,
+        count_outside_range=0,
+        count_other_team=0,
+        duplicate=False,
+    )
+
+    # A small queue, so that shards that are ahead have to wait for the others
+    queue = RecordBatchQueue(max_size_bytes=1024)
+    producer = Producer()
+
+    with override_settings(BATCH_EXPORT_PRODUCER_SHARDS=4):
+        producer_task = await producer.start(
+            queue=queue,
+            team_id=team_id,
+            is_backfill=False,
+            backfill_details=None,
+            model_name="events",
+            full_range=(data_interval_start, data_interval_end),
+            done_ranges=[],
+            max_record_batch_size_bytes=1024,
+        )
+        records = await get_all_record_batches_from_queue(queue, producer_task)
+
+    assert sorted(record["uuid"] for record in records) == sorted(event["uuid"] for event in events)
+    assert [record["_inserted_at"] for record in records] == sorted(record["_inserted_at"] for record in records)
+
+
+async def test_record_batch_producer_shards_include_late_arriving_events(clickhouse_client):
+    """Test shards filter events by `timestamp` with the lookback window of the full range, not their own."""
+    team_id = random.randint(1, 1000000)
+    data_interval_end = dt.datetime.fromisoformat("2023-04-25T15:00:00.000000+00:00")
+    data_interval_start = dt.datetime.fromisoformat("2023-04-25T14:00:00.000000+00:00")
+
+    (events, _, _) = await generate_test_events_in_clickhouse(
+        client=clickhouse_client,
+        team_id=team_id,
+        start_time=data_interval_start,
+        end_time=data_interval_end,
+        count=10,
+        count_outside_range=0,
+        count_other_team=0,
+        duplicate=False,
+    )
+    # Within the lookback window of the full range, but not of the last shard it's inserted in
+    late_event_timestamp = data_interval_start - dt.timedelta(days=7) + dt.timedelta(minutes=10)
+    (late_events, _, _) = await generate_test_events_in_clickhouse(
+        client=clickhouse_client,
+        team_id=team_id,
+        start_time=late_event_timestamp,
+        end_time=late_event_timestamp + dt.timedelta(minutes=1),
+        count=1,
+        count_outside_range=0,
+        count_other_team=0,
+        inserted_at=data_interval_end - dt.timedelta(minutes=5),
+        duplicate=False,
+    )
+
+    queue = RecordBatchQueue()
+    producer = Producer()
+
+    with override_settings(BATCH_EXPORT_PRODUCER_SHARDS=4, DEFAULT_TIMESTAMP_LOOKBACK_DAYS=7):
+        producer_task = await producer.start(
+            queue=queue,
+            team_id=team_id,
+            is_backfill=False,
+            backfill_details=None,
+            model_name="events",
+            full_range=(data_interval_start, data_interval_end),
+            done_ranges=[],
+        )
+        records = await get_all_record_batches_from_queue(queue, producer_task)
+
+    assert sorted(record["uuid"] for record in records) == sorted(event["uuid"] for event in events + late_events)
+
+
+@pytest.mark.parametrize(
+    "query_range,shards,expected",
+    [
+        (
+            (dt.datetime(2023, 1, 1, tzinfo=dt.UTC), dt.datetime(2023, 1, 1, 1, tzinfo=dt.UTC)),
+            3,
+            [
+                (dt.datetime(2023, 1, 1, tzinfo=dt.UTC), dt.datetime(2023, 1, 1, 0, 20, tzinfo=dt.UTC)),
+                (dt.datetime(2023, 1, 1, 0, 20, tzinfo=dt.UTC), dt.datetime(2023, 1, 1, 0, 40, tzinfo=dt.UTC)),
+                (dt.datetime(2023, 1, 1, 0, 40, tzinfo=dt.UTC), dt.datetime(2023, 1, 1, 1, tzinfo=dt.UTC)),
+            ],
+        ),
+        (
+            (dt.datetime(2023, 1, 1, tzinfo=dt.UTC), dt.datetime(2023, 1, 1, 1, tzinfo=dt.UTC)),
+            1,
+            [(dt.datetime(2023, 1, 1, tzinfo=dt.UTC), dt.datetime(2023, 1, 1, 1, tzinfo=dt.UTC))],
+        ),
+        (
+            (None, dt.datetime(2023, 1, 1, 1, tzinfo=dt.UTC)),
+            3,
+            [(None, dt.datetime(2023, 1, 1, 1, tzinfo=dt.UTC))],
+        ),
+    ],
+)
+def test_split_query_range(query_range, shards, expected):
+    """Test query ranges are split into consecutive shards of the same length."""
+    assert split_query_range(query_range, shards) == expected
+
+
 def test_slice_record_batch_into_single_record_slices():
     """Test we slice a record batch into slices with a single record."""
     n_legs = pa.array([2, 2, 4, 4, 5, 100])
@@ -3,6 +3,7 @@ import datetime as dt
 import io
 import json
 
+import orjson
 import pyarrow as pa
 import pyarrow.parquet as pq
 import pytest
@@ -13,8 +14,10 @@ from posthog.temporal.batch_exports.temporary_file import (
     JSONLBatchExportWriter,
     DateRange,
     ParquetBatchExportWriter,
+    RedshiftInsertBatchExportWriter,
     json_dumps_bytes,
 )
+from posthog.temporal.batch_exports.utils import cast_record_batch_json_columns
 
 
 @pytest.mark.parametrize(
@@ -536,3 +539,204 @@ async def test_jsonl_writer_deals_with_nested_user_events():
     assert date_ranges_seen == [
         (record_batch.column("_inserted_at")[0].as_py(), record_batch.column("_inserted_at")[-1].as_py())
     ]
+
+
+@pytest.mark.asyncio
+async def test_jsonl_writer_copies_json_columns_as_they_are():
+    """Test values of JSON columns are written as they are, unless they are not valid JSON objects or arrays."""
+    in_memory_file_obj = io.BytesIO()
+
+    record_batch = cast_record_batch_json_columns(
+        pa.RecordBatch.from_pydict(
+            {
+                "event": pa.array([f"test-event-{i}" for i in range(6)]),
+                "properties": pa.array(
+                    ['{"b": 1,  "a": [1, 2]}', "", None, '{"emoji": "\\ud83d"}', "not json", '["a", 1]']
+                ),
+                "_inserted_at": pa.array([dt.datetime.fromtimestamp(0)] * 6),
+            }
+        ),
+        json_columns=("properties",),
+    )
+
+    async def store_in_memory_on_flush(
+        batch_export_file,
+        records_since_last_flush,
+        bytes_since_last_flush,
+        flush_counter,
+        last_date_range,
+        is_last,
+        error,
+    ):
+        in_memory_file_obj.write(batch_export_file.read())
+
+    writer = JSONLBatchExportWriter(max_bytes=1, flush_callable=store_in_memory_on_flush)
+
+    async with writer.open_temporary_file():
+        await writer.write_record_batch(record_batch)
+
+    in_memory_file_obj.seek(0)
+    lines = in_memory_file_obj.readlines()
+
+    assert lines[0] == b'{"event":"test-event-0","properties":{"b": 1,  "a": [1, 2]}}\n'
+    assert lines[1] == b'{"event":"test-event-1","properties":null}\n'
+    assert lines[2] == b'{"event":"test-event-2","properties":null}\n'
+    assert [json.loads(line) for line in lines[3:5]] == [
+        {"event": "test-event-3", "properties": {"emoji": "?"}},
+        {"event": "test-event-4", "properties": "not json"},
+    ]
+    assert lines[5] == b'{"event":"test-event-5","properties":["a", 1]}\n'
+    assert len(lines) == 6
+
+    # Looks like a JSON object, but isn't one, so it must be decoded one row at a time, which fails
+    broken_record_batch = cast_record_batch_json_columns(
+        pa.RecordBatch.from_pydict(
+            {
+                "event": pa.array(["test-event-6"]),
+                "properties": pa.array(["{broken}"]),
+                "_inserted_at": pa.array([dt.datetime.fromtimestamp(0)]),
+            }
+        ),
+        json_columns=("properties",),
+    )
+    in_memory_file_obj = io.BytesIO()
+
+    with pytest.raises(orjson.JSONDecodeError):
+        async with writer.open_temporary_file():
+            await writer.write_record_batch(broken_record_batch)
+
+    assert in_memory_file_obj.getvalue() == b""
+
+
+@pytest.mark.parametrize(
+    "writer_kwargs",
+    [
+        {},
+        {"delimiter": "\t", "quoting": csv.QUOTE_MINIMAL, "escape_char": None},
+    ],
+)
+@pytest.mark.asyncio
+async def test_csv_writer_writes_the_same_as_dict_writer(writer_kwargs):
+    """Test record batches are written as `csv.DictWriter` would write them one row at a time."""
+    in_memory_file_obj = io.StringIO()
+
+    record_batch = pa.RecordBatch.from_pydict(
+        {
+            "event": pa.array(["test-event", "", None, 'with "quotes"', "with\ttab", "with\nnewline", "with\\slash"]),
+            "team_id": pa.array([1, 2, 3, None, 5, 6, 7]),
+            "elements": pa.array([["a", "b"], [], None, ["c"], ["d"], ["e"], ["f"]]),
+            "timestamp": pa.array(
+                [
+                    dt.datetime(2024, 1, 1, tzinfo=dt.UTC),
+                    dt.datetime(2024, 1, 1, 0, 0, 0, 123, tzinfo=dt.UTC),
+                    None,
+                    dt.datetime(2024, 1, 1, tzinfo=dt.UTC),
+                    dt.datetime(2024, 1, 1, tzinfo=dt.UTC),
+                    dt.datetime(2024, 1, 1, tzinfo=dt.UTC),
+                    dt.datetime(2024, 1, 1, tzinfo=dt.UTC),
+                ],
+                type=pa.timestamp("us", tz="UTC"),
+            ),
+            "_inserted_at": pa.array([dt.datetime.fromtimestamp(0)] * 7),
+        }
+    )
+
+    async def store_in_memory_on_flush(
+        batch_export_file,
+        records_since_last_flush,
+        bytes_since_last_flush,
+        flush_counter,
+        last_date_range,
+        is_last,
+        error,
+    ):
+        in_memory_file_obj.write(batch_export_file.read().decode("utf-8"))
+
+    field_names = ["event", "team_id", "elements", "timestamp", "missing"]
+    writer = CSVBatchExportWriter(
+        max_bytes=1, field_names=field_names, flush_callable=store_in_memory_on_flush, **writer_kwargs
+    )
+
+    async with writer.open_temporary_file():
+        await writer.write_record_batch(record_batch)
+
+    expected = io.StringIO()
+    dict_writer = csv.DictWriter(
+        expected,
+        fieldnames=field_names,
+        extrasaction="ignore",
+        delimiter=writer.delimiter,
+        quotechar=writer.quote_char,
+        escapechar=writer.escape_char,
+        quoting=writer.quoting,
+        lineterminator=writer.line_terminator,
+    )
+    dict_writer.writerows(
+        {k: str(v).replace("[", "{").replace("]", "}") if isinstance(v, list) else v for k, v in record.items()}
+        for record in record_batch.to_pylist()
+    )
+
+    assert in_memory_file_obj.getvalue() == expected.getvalue()
+
+
+@pytest.mark.parametrize("use_super", [True, False])
+@pytest.mark.asyncio
+async def test_redshift_insert_writer_writes_record_batches_as_values(use_super):
+    """Test record batches are written as the values of an INSERT query, without escaped whitespace in JSON."""
+    queries = []
+
+    record_batch = cast_record_batch_json_columns(
+        pa.RecordBatch.from_pydict(
+            {
+                "event": pa.array(["test-event", "it's", "back\\slash", None]),
+                "team_id": pa.array([1, -2, None, 4]),
+                "properties": pa.array(['{"a": "multiple\\n lines "}', None, '{"b": [1, 2]}', '{"c": "\'"}']),
+                "timestamp": pa.array(
+                    [dt.datetime(2024, 1, 1, 0, 0, 0, 123, tzinfo=dt.UTC)]
+                    + [dt.datetime(2024, 1, 1, tzinfo=dt.UTC)] * 3,
+                    type=pa.timestamp("us", tz="UTC"),
+                ),
+                "_inserted_at": pa.array([dt.datetime.fromtimestamp(0)] * 4),
+            }
+        ),
+        json_columns=("properties",),
+    )
+
+    async def store_in_memory_on_flush(
+        batch_export_file,
+        records_since_last_flush,
+        bytes_since_last_flush,
+        flush_counter,
+        last_date_range,
+        is_last,
+        error,
+    ):
+        queries.append(batch_export_file.read().decode("utf-8"))
+
+    writer = RedshiftInsertBatchExportWriter(
+        max_bytes=1,
+        flush_callable=store_in_memory_on_flush,
+        schema=record_batch.schema,
+        redshift_table="events",
+        redshift_schema="public",
+        table_columns=["event", "team_id", "properties", "timestamp"],
+        known_json_columns=["properties"],
+        use_super=use_super,
+    )
+
+    async with writer.open_temporary_file():
+        await writer.write_record_batch(record_batch, flush=False)
+        await writer.write_record_batch(record_batch.slice(0, 1))
+
+    json_values = ['\'{"a": "multiple lines"}\'', "NULL", "'{\"b\": [1, 2]}'", "'{\"c\": \"''\"}'"]
+    if use_super:
+        json_values = [f"JSON_PARSE({value})" for value in json_values]
+
+    assert queries == [
+        'INSERT INTO "public"."events" ("event", "team_id", "properties", "timestamp") VALUES'
+        f"('test-event', 1, {json_values[0]}, '2024-01-01 00:00:00.000123+00:00'::timestamptz),"
+        f"('it''s', -2, {json_values[1]}, '2024-01-01 00:00:00+00:00'::timestamptz),"
+        f"('back\\\\slash', NULL, {json_values[2]}, '2024-01-01 00:00:00+00:00'::timestamptz),"
+        f"(NULL, 4, {json_values[3]}, '2024-01-01 00:00:00+00:00'::timestamptz),"
+        f"('test-event', 1, {json_values[0]}, '2024-01-01 00:00:00.000123+00:00'::timestamptz)"
+    ]
@@ -1,9 +1,10 @@
 from datetime import timedelta
 from time import sleep
 from typing import Optional
+from unittest import TestCase
 from unittest.mock import Mock
 
-from posthog.cache_utils import cache_for
+from posthog.cache_utils import ColumnarJsonSerializer, OrjsonJsonSerializer, cache_for
 from posthog.test.base import APIBaseTest
 
 mocked_dependency = Mock()
@@ -93,3 +94,47 @@ class TestCacheUtils(APIBaseTest):
             "Background task finished",
             "Post refresh call 1",
         ]
+
+
+class TestColumnarJsonSerializer(TestCase):
+    serializer = ColumnarJsonSerializer({})
+
+    def test_round_trip(self) -> None:
+        days = [f"2024-01-{day:02d}" for day in range(1, 31)]
+        value = {
+            "results": [
+                {"data": list(range(30)), "days": days, "labels": days, "label": "$pageview"},
+                {"data": [float(i) / 3 for i in range(30)], "days": days, "labels": days, "label": "signup"},
+            ],
+            "columns": ["short", "list"],
+            "mixed": [1, 2.5, "three", None, True] * 4,
+            "bools": [True, False] * 10,
+            "big_ints": [2**63] * 20,
+            "non_finite": [float("nan")] + [1.0] * 20,
+            "nested": [[list(range(20))]],
+            "is_cached": False,
+        }
+
+        encoded = self.serializer.dumps(value)
+        assert encoded.startswith(ColumnarJsonSerializer.MAGIC)
+        assert self.serializer.loads(encoded) == OrjsonJsonSerializer({}).loads(OrjsonJsonSerializer({}).dumps(value))
+
+    def test_extracts_lists(self) -> None:
+        days = [f"2024-01-{day:02d}" for day in range(1, 31)]
+        value = {"results": [{"data": list(range(30)), "days": days} for _ in range(10)]}
+
+        encoded = self.serializer.dumps(value)
+        assert len(encoded) < len(OrjsonJsonSerializer({}).dumps(value)) / 2
+
+        decoded = self.serializer.loads(encoded)
+        assert decoded == value
+        # Repeated lists are stored once, but read back as separate lists
+        decoded["results"][0]["days"].append("2024-01-31")
+        assert decoded["results"][1]["days"] == days
+
+    def test_top_level_list(self) -> None:
+        assert self.serializer.loads(self.serializer.dumps(list(range(100)))) == list(range(100))
+
+    def test_reads_plain_json(self) -> None:
+        value = {"results": [{"data": list(range(30))}], "is_cached": False}
+        assert self.serializer.loads(OrjsonJsonSerializer({}).dumps(value)) == value
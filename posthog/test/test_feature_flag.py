@@ -1,10 +1,12 @@
 import concurrent.futures
 from datetime import datetime
 from typing import cast
+from unittest.mock import patch
 
 from django.core.cache import cache
-from django.db import IntegrityError, connection
-from django.test import TransactionTestCase
+from django.db import DatabaseError, IntegrityError, connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from freezegun import freeze_time
 from parameterized import parameterized
@@ -20,6 +22,8 @@ from posthog.models.feature_flag.flag_matching import (
     FlagsMatcherCache,
     get_all_feature_flags,
     get_feature_flag_hash_key_overrides,
+    get_feature_flag_hash_key_overrides_for_distinct_ids,
+    get_feature_flags_for_distinct_ids,
     set_feature_flag_hash_key_overrides,
 )
 from posthog.models.group import Group
@@ -756,6 +760,34 @@ class TestModelCache(BaseTest):
         assert cached_flags is not None
         self.assertEqual(0, len(cached_flags))
 
+    @override_settings(DECIDE_FLAG_DEFINITIONS_CACHE_ENABLED=True)
+    def test_flags_are_kept_in_memory_until_they_change(self):
+        flag = FeatureFlag.objects.create(
+            team=self.team,
+            name="Beta feature",
+            key="test-flag",
+            created_by=self.user,
+            filters={"groups": [{"properties": [], "rollout_percentage": None}]},
+        )
+
+        cached_flags = get_feature_flags_for_team_in_cache(self.team.pk)
+        assert cached_flags is not None
+        self.assertEqual([cached_flag.key for cached_flag in cached_flags], ["test-flag"])
+        self.assertIsNotNone(cached_flags[0].compiled)
+
+        with patch("posthog.models.feature_flag.feature_flag.json.loads") as mock_loads:
+            flags_in_memory = get_feature_flags_for_team_in_cache(self.team.pk)
+            mock_loads.assert_not_called()
+        assert flags_in_memory is not None
+        self.assertIs(flags_in_memory[0], cached_flags[0])
+
+        flag.key = "new-key"
+        flag.save()
+
+        cached_flags = get_feature_flags_for_team_in_cache(self.team.pk)
+        assert cached_flags is not None
+        self.assertEqual([cached_flag.key for cached_flag in cached_flags], ["new-key"])
+
 
 class TestFeatureFlagMatcher(BaseTest, QueryMatchingTest):
     maxDiff = None
@@ -2562,7 +2594,6 @@ class TestFeatureFlagMatcher(BaseTest, QueryMatchingTest):
             FeatureFlagMatch(True, None, FeatureFlagMatchReason.SUPER_CONDITION_VALUE, 0),
         )
 
-    @pytest.mark.skip("TODO: We're going to the database for now, but we should be able to do this in memory.")
     def test_super_condition_with_override_properties_doesnt_make_database_requests(self):
         Person.objects.create(
             team=self.team,
@@ -3421,9 +3452,10 @@ class TestFeatureFlagMatcher(BaseTest, QueryMatchingTest):
                 ]
             }
         )
-        with self.assertNumQueries(8):
+        with self.assertNumQueries(4):
             # None in both because all conditions don't match
-            # and user doesn't exist yet
+            # and user doesn't exist yet. The second one doesn't go to DB,
+            # because the email override is enough to know the condition doesn't match
             self.assertEqual(
                 FeatureFlagMatcher(
                     self.team.id,
@@ -3659,8 +3691,8 @@ class TestFeatureFlagMatcher(BaseTest, QueryMatchingTest):
                 ),
                 FeatureFlagMatch(False, None, FeatureFlagMatchReason.NO_CONDITION_MATCH, 0),
             )
-        # still goes to DB because no company override, and then fails because person doesn't exist
-        with self.assertNumQueries(4):
+        # doesn't go to DB, because the email override is enough to know the condition doesn't match
+        with self.assertNumQueries(0):
             self.assertEqual(
                 FeatureFlagMatcher(
                     self.team.id,
@@ -3708,9 +3740,9 @@ class TestFeatureFlagMatcher(BaseTest, QueryMatchingTest):
                 ),
                 FeatureFlagMatch(True, None, FeatureFlagMatchReason.CONDITION_MATCH, 0),
             )
-        # since not all conditions are available in overrides, goes to DB, but then correctly matches is_not_set condition
-        # using the given override
-        with self.assertNumQueries(4):
+        # doesn't go to DB, because the email override is enough to know the is_not_set condition doesn't match,
+        # even though not all conditions are available in overrides
+        with self.assertNumQueries(0):
             self.assertEqual(
                 FeatureFlagMatcher(
                     self.team.id,
@@ -4333,14 +4365,13 @@ class TestFeatureFlagMatcher(BaseTest, QueryMatchingTest):
                 FeatureFlagMatch(True, None, FeatureFlagMatchReason.CONDITION_MATCH, 0),
             )
 
-    @pytest.mark.skip("This case is not supported yet")
     def test_complex_cohort_filter_with_override_properties(self):
-        # TODO: Currently we don't support this case for persons who haven't been ingested yet
         # The case:
         # - A cohort has multiple conditions
         # - All of which are the _same_ / are true for the same property.
         # Example: email contains .com ; email contains @ ; email contains posthog
         # -> 3 different filters, all of which match neil@posthog.com.
+        # Only the cohorts are fetched, the person doesn't need to be ingested yet.
 
         cohort1 = Cohort.objects.create(
             team=self.team,
@@ -4375,7 +4406,7 @@ class TestFeatureFlagMatcher(BaseTest, QueryMatchingTest):
             filters={"groups": [{"properties": [{"key": "id", "value": cohort1.pk, "type": "cohort"}]}]},
         )
 
-        with self.assertNumQueries(5):
+        with self.assertNumQueries(1):
             self.assertEqual(
                 FeatureFlagMatcher(
                     self.team.id,
@@ -4387,8 +4418,7 @@ class TestFeatureFlagMatcher(BaseTest, QueryMatchingTest):
                 FeatureFlagMatch(True, None, FeatureFlagMatchReason.CONDITION_MATCH, 0),
             )
 
-        with self.assertNumQueries(5):
-            # no local computation because cohort lookup is required
+        with self.assertNumQueries(1):
             self.assertEqual(
                 FeatureFlagMatcher(
                     self.team.id,
@@ -4454,8 +4484,8 @@ class TestFeatureFlagMatcher(BaseTest, QueryMatchingTest):
                 FeatureFlagMatch(True, None, FeatureFlagMatchReason.CONDITION_MATCH, 0),
             )
 
-        with self.assertNumQueries(5):
-            # no local computation because cohort lookup is required
+        with self.assertNumQueries(1):
+            # only the cohorts are fetched, the email override is enough to match the cohort locally
             self.assertEqual(
                 FeatureFlagMatcher(
                     self.team.id,
@@ -5995,6 +6025,30 @@ class TestFeatureFlagHashKeyOverrides(BaseTest, QueryMatchingTest):
 
         self.assertEqual(hash_keys, {"beta-feature": "other_id1", "multivariate-flag": "other_id1"})
 
+    def test_retrieving_hash_key_overrides_for_distinct_ids(self):
+        Person.objects.create(team=self.team, distinct_ids=["1", "2"])
+        Person.objects.create(team=self.team, distinct_ids=["3"])
+        set_feature_flag_hash_key_overrides(team=self.team, distinct_ids=["1"], hash_key_override="other_id1")
+        set_feature_flag_hash_key_overrides(team=self.team, distinct_ids=["example_id"], hash_key_override="other_id")
+
+        with self.assertNumQueries(2):
+            hash_keys = get_feature_flag_hash_key_overrides_for_distinct_ids(
+                self.team.pk, ["example_id", "1", "2", "3", "4"]
+            )
+
+        self.assertEqual(
+            hash_keys,
+            {
+                "example_id": {"beta-feature": "other_id", "multivariate-flag": "other_id"},
+                "1": {"beta-feature": "other_id1", "multivariate-flag": "other_id1"},
+                "2": {"beta-feature": "other_id1", "multivariate-flag": "other_id1"},
+            },
+        )
+        for distinct_id in ["example_id", "1", "2", "3", "4"]:
+            self.assertEqual(
+                hash_keys.get(distinct_id, {}), get_feature_flag_hash_key_overrides(self.team.pk, [distinct_id])
+            )
+
     def test_setting_overrides_doesnt_balk_with_existing_overrides(self):
         all_feature_flags = list(FeatureFlag.objects.filter(team_id=self.team.pk))
 
@@ -6074,6 +6128,204 @@ class TestFeatureFlagHashKeyOverrides(BaseTest, QueryMatchingTest):
         self.assertEqual(payloads, {})
 
 
+class TestBulkFeatureFlagEvaluation(BaseTest):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        GroupTypeMapping.objects.create(
+            team=self.team, project_id=self.team.project_id, group_type="organization", group_type_index=0
+        )
+        Group.objects.create(
+            team=self.team,
+            group_type_index=0,
+            group_key="org:1",
+            group_properties={"plan": "enterprise"},
+            version=0,
+        )
+        cohort = Cohort.objects.create(
+            team=self.team,
+            groups=[
+                {"properties": [{"key": "email", "value": "@posthog.com", "type": "person", "operator": "icontains"}]}
+            ],
+            name="posthog people",
+        )
+        self.create_feature_flag(
+            key="email-flag",
+            filters={"groups": [{"properties": [{"key": "email", "value": "tim@posthog.com", "type": "person"}]}]},
+        )
+        self.create_feature_flag(
+            key="rollout-flag",
+            filters={"groups": [{"properties": [], "rollout_percentage": 50}]},
+            ensure_experience_continuity=True,
+        )
+        self.create_feature_flag(
+            key="cohort-flag",
+            filters={"groups": [{"properties": [{"key": "id", "value": cohort.pk, "type": "cohort"}]}]},
+        )
+        self.create_feature_flag(
+            key="not-set-flag",
+            filters={
+                "groups": [{"properties": [{"key": "email", "type": "person", "operator": "is_not_set"}]}],
+            },
+        )
+        self.create_feature_flag(
+            key="distinct-id-flag",
+            filters={"groups": [{"properties": [{"key": "distinct_id", "value": ["other_1"], "type": "person"}]}]},
+        )
+        self.create_feature_flag(
+            key="mixed-distinct-id-flag",
+            filters={
+                "groups": [
+                    {
+                        "properties": [
+                            {"key": "distinct_id", "value": ["tim", "neil", "anonymous"], "type": "person"},
+                            {"key": "email", "type": "person", "operator": "is_set"},
+                        ]
+                    },
+                    {
+                        "properties": [
+                            {"key": "distinct_id", "value": "tim", "type": "person", "operator": "is_not"},
+                            {"key": "email", "value": "@posthog.com", "type": "person", "operator": "icontains"},
+                        ],
+                    },
+                ]
+            },
+        )
+        distinct_id_cohort = Cohort.objects.create(
+            team=self.team,
+            groups=[
+                {
+                    "properties": [
+                        {"key": "distinct_id", "value": "^tim", "type": "person", "operator": "regex"},
+                        {"key": "email", "value": "tim@posthog.com", "type": "person"},
+                    ]
+                }
+            ],
+            name="tims",
+        )
+        self.create_feature_flag(
+            key="distinct-id-cohort-flag",
+            filters={"groups": [{"properties": [{"key": "id", "value": distinct_id_cohort.pk, "type": "cohort"}]}]},
+        )
+        self.create_feature_flag(
+            key="group-flag",
+            filters={
+                "aggregation_group_type_index": 0,
+                "groups": [
+                    {"properties": [{"key": "plan", "value": "enterprise", "type": "group", "group_type_index": 0}]}
+                ],
+            },
+        )
+        self.create_feature_flag(
+            key="variant-flag",
+            filters={
+                "groups": [{"properties": [], "rollout_percentage": None}],
+                "multivariate": {
+                    "variants": [
+                        {"key": "first-variant", "rollout_percentage": 50},
+                        {"key": "second-variant", "rollout_percentage": 50},
+                    ]
+                },
+                "payloads": {"first-variant": '{"color": "blue"}'},
+            },
+        )
+
+        Person.objects.create(team=self.team, distinct_ids=["tim", "tim_2"], properties={"email": "tim@posthog.com"})
+        Person.objects.create(team=self.team, distinct_ids=["neil"], properties={"email": "neil@example.com"})
+        Person.objects.create(team=self.team, distinct_ids=["anonymous"], properties={})
+        set_feature_flag_hash_key_overrides(team=self.team, distinct_ids=["tim_2"], hash_key_override="other_1")
+
+    def create_feature_flag(self, key: str, **kwargs):
+        return FeatureFlag.objects.create(team=self.team, key=key, created_by=self.user, **kwargs)
+
+    def test_flags_match_the_flags_of_each_distinct_id(self):
+        distinct_ids = ["tim", "tim_2", "neil", "anonymous", "other_1", *[f"unknown_{i}" for i in range(10)]]
+        groups = {"organization": "org:1"}
+
+        results = list(get_feature_flags_for_distinct_ids(self.team, distinct_ids, groups))
+
+        self.assertEqual([result[0] for result in results], distinct_ids)
+        for distinct_id, flags, payloads, errors in results:
+            expected_flags, _, expected_payloads, expected_errors = get_all_feature_flags(
+                self.team, distinct_id, groups
+            )
+            self.assertEqual(flags, expected_flags, distinct_id)
+            self.assertEqual(payloads, expected_payloads, distinct_id)
+            self.assertEqual(errors, expected_errors, distinct_id)
+
+        results_by_distinct_id = {result[0]: result[1] for result in results}
+        self.assertTrue(results_by_distinct_id["tim"]["email-flag"])
+        self.assertTrue(results_by_distinct_id["tim"]["cohort-flag"])
+        self.assertFalse(results_by_distinct_id["neil"]["cohort-flag"])
+        self.assertTrue(results_by_distinct_id["anonymous"]["not-set-flag"])
+        self.assertTrue(results_by_distinct_id["unknown_0"]["not-set-flag"])
+        self.assertTrue(results_by_distinct_id["other_1"]["distinct-id-flag"])
+        self.assertTrue(results_by_distinct_id["unknown_0"]["group-flag"])
+        self.assertEqual(
+            {
+                distinct_id: results_by_distinct_id[distinct_id]["mixed-distinct-id-flag"]
+                for distinct_id in distinct_ids[:4]
+            },
+            {"tim": True, "tim_2": True, "neil": True, "anonymous": False},
+        )
+        self.assertEqual(
+            {
+                distinct_id: results_by_distinct_id[distinct_id]["distinct-id-cohort-flag"]
+                for distinct_id in distinct_ids[:4]
+            },
+            {"tim": True, "tim_2": True, "neil": False, "anonymous": False},
+        )
+
+    def test_flags_can_be_filtered_by_key(self):
+        results = list(get_feature_flags_for_distinct_ids(self.team, ["tim", "neil"], flag_keys=["email-flag"]))
+
+        self.assertEqual(
+            results, [("tim", {"email-flag": True}, {}, False), ("neil", {"email-flag": False}, {}, False)]
+        )
+
+    def test_queries_dont_grow_with_the_number_of_distinct_ids(self):
+        # Load the flags into the cache
+        list(get_feature_flags_for_distinct_ids(self.team, ["tim"]))
+
+        with CaptureQueriesContext(connection) as few_distinct_ids:
+            list(get_feature_flags_for_distinct_ids(self.team, ["tim", "neil"], {"organization": "org:1"}))
+        with CaptureQueriesContext(connection) as many_distinct_ids:
+            list(
+                get_feature_flags_for_distinct_ids(
+                    self.team,
+                    ["tim", "tim_2", "neil", "anonymous", *[f"unknown_{i}" for i in range(50)]],
+                    {"organization": "org:1"},
+                )
+            )
+
+        self.assertEqual(len(many_distinct_ids.captured_queries), len(few_distinct_ids.captured_queries))
+
+    def test_distinct_ids_are_evaluated_in_batches(self):
+        distinct_ids = ["tim", "neil", "anonymous", "unknown"]
+
+        with patch("posthog.models.feature_flag.flag_matching.BULK_FLAG_EVALUATION_BATCH_SIZE", 3):
+            with patch.object(
+                FeatureFlagMatcher,
+                "query_conditions_for_distinct_ids",
+                autospec=True,
+                side_effect=FeatureFlagMatcher.query_conditions_for_distinct_ids,
+            ) as mock_query_conditions:
+                results = list(get_feature_flags_for_distinct_ids(self.team, distinct_ids))
+
+        self.assertEqual([result[0] for result in results], distinct_ids)
+        self.assertEqual(
+            [call.args[1] for call in mock_query_conditions.call_args_list], [["tim", "neil", "anonymous"], ["unknown"]]
+        )
+
+    @patch("posthog.models.feature_flag.flag_matching.FeatureFlagMatcher.query_conditions_for_distinct_ids")
+    def test_errors_are_reported_when_conditions_cant_be_queried(self, mock_query_conditions):
+        mock_query_conditions.side_effect = DatabaseError("statement timeout")
+
+        results = list(get_feature_flags_for_distinct_ids(self.team, ["tim"], flag_keys=["email-flag", "variant-flag"]))
+
+        self.assertEqual(results, [("tim", {"variant-flag": "second-variant"}, {}, True)])
+
+
 class TestHashKeyOverridesRaceConditions(TransactionTestCase, QueryMatchingTest):
     def setUp(self) -> None:
         return super().setUp()
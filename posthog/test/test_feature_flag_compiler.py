@@ -0,0 +1,119 @@
+from django.test import SimpleTestCase
+
+from posthog.constants import PropertyOperatorType
+from posthog.models.cohort import Cohort
+from posthog.models.feature_flag.flag_compiler import (
+    CompiledConditionsCache,
+    _combine,
+    evaluate_properties,
+)
+
+
+class TestFlagCompiler(SimpleTestCase):
+    def setUp(self):
+        self.cache = CompiledConditionsCache(max_size=10)
+
+    def evaluate(self, condition, overrides, cohorts_cache=None):
+        return evaluate_properties(self.cache.get_condition(condition).properties, overrides, cohorts_cache or {})
+
+    def test_combine_is_three_valued(self):
+        self.assertEqual(_combine(PropertyOperatorType.AND, [True, True]), True)
+        self.assertEqual(_combine(PropertyOperatorType.AND, [True, None]), None)
+        self.assertEqual(_combine(PropertyOperatorType.AND, [None, False]), False)
+        self.assertEqual(_combine(PropertyOperatorType.AND, []), True)
+        self.assertEqual(_combine(PropertyOperatorType.OR, [False, False]), False)
+        self.assertEqual(_combine(PropertyOperatorType.OR, [False, None]), None)
+        self.assertEqual(_combine(PropertyOperatorType.OR, [None, True]), True)
+        self.assertEqual(_combine(PropertyOperatorType.OR, []), False)
+
+    def test_condition_is_decided_by_overrides(self):
+        condition = {
+            "properties": [
+                {"key": "email", "type": "person", "value": "posthog.com", "operator": "icontains"},
+                {"key": "plan", "type": "person", "value": "paid"},
+            ]
+        }
+
+        self.assertEqual(self.evaluate(condition, {"email": "neil@posthog.com", "plan": "paid"}), True)
+        # a single non matching property is enough to know the condition doesn't match
+        self.assertEqual(self.evaluate(condition, {"email": "neil@example.com"}), False)
+        # but not to know that it does
+        self.assertEqual(self.evaluate(condition, {"email": "neil@posthog.com"}), None)
+        self.assertEqual(self.evaluate(condition, {}), None)
+
+    def test_negated_and_is_not_set_properties(self):
+        condition = {
+            "properties": [
+                {"key": "email", "type": "person", "operator": "is_not_set"},
+                {"key": "id", "type": "cohort", "value": 1, "negation": True},
+            ]
+        }
+        cohort = Cohort(
+            pk=1,
+            filters={"properties": {"type": "AND", "values": [{"key": "plan", "type": "person", "value": "paid"}]}},
+        )
+
+        self.assertEqual(self.evaluate(condition, {"email": "neil@posthog.com"}, {1: cohort}), False)
+        self.assertEqual(self.evaluate(condition, {"plan": "free"}, {1: cohort}), None)
+        self.assertEqual(self.evaluate(condition, {"plan": "paid"}, {1: cohort}), False)
+
+    def test_cohort_with_or_groups(self):
+        cohort = Cohort(
+            pk=1,
+            filters={
+                "properties": {
+                    "type": "OR",
+                    "values": [
+                        {
+                            "type": "AND",
+                            "values": [
+                                {"key": "email", "type": "person", "value": r"@posthog\.com$", "operator": "regex"}
+                            ],
+                        },
+                        {
+                            "type": "AND",
+                            "values": [
+                                {"key": "country", "type": "person", "value": "UK"},
+                                {"key": "plan", "type": "person", "value": "paid"},
+                            ],
+                        },
+                    ],
+                }
+            },
+        )
+        condition = {"properties": [{"key": "id", "type": "cohort", "value": 1}]}
+
+        self.assertEqual(self.evaluate(condition, {"email": "neil@posthog.com"}, {1: cohort}), True)
+        self.assertEqual(self.evaluate(condition, {"email": "neil@example.com", "country": "US"}, {1: cohort}), False)
+        self.assertEqual(self.evaluate(condition, {"email": "neil@example.com", "country": "UK"}, {1: cohort}), None)
+
+    def test_cohorts_that_need_the_database(self):
+        condition = {"properties": [{"key": "id", "type": "cohort", "value": 1}]}
+        static_cohort = Cohort(pk=1, is_static=True)
+
+        # static cohort membership is only stored in the database
+        self.assertEqual(self.evaluate(condition, {"email": "neil@posthog.com"}, {1: static_cohort}), None)
+        # cohorts that aren't cached are looked up when querying
+        self.assertEqual(self.evaluate(condition, {"email": "neil@posthog.com"}, {}), None)
+        # cohorts that don't exist never match
+        self.assertEqual(self.evaluate(condition, {"email": "neil@posthog.com"}, {1: ""}), False)
+
+    def test_conditions_are_compiled_once(self):
+        condition = {"properties": [{"key": "email", "type": "person", "value": "neil@posthog.com"}]}
+
+        compiled = self.cache.get_condition(condition)
+        self.assertIs(self.cache.get_condition({**condition}), compiled)
+        self.assertEqual(len(self.cache), 1)
+
+        changed = self.cache.get_condition({"properties": [{"key": "email", "type": "person", "value": "x"}]})
+        self.assertIsNot(changed, compiled)
+        self.assertEqual(len(self.cache), 2)
+
+    def test_cohort_properties_are_recompiled_when_the_cohort_changes(self):
+        cohort = Cohort(pk=1, filters={"properties": {"type": "AND", "values": [{"key": "a", "value": "b"}]}})
+
+        properties = self.cache.get_cohort_properties(cohort)
+        self.assertIs(self.cache.get_cohort_properties(cohort), properties)
+
+        cohort.filters = {"properties": {"type": "AND", "values": [{"key": "a", "value": "c"}]}}
+        self.assertIsNot(self.cache.get_cohort_properties(cohort), properties)
@@ -0,0 +1,89 @@
+from django.test import SimpleTestCase
+
+from posthog.models.feature_flag.feature_flag import FeatureFlag
+from posthog.models.feature_flag.flag_compiler import build_variant_lookup_table, get_compiled_condition
+from posthog.models.feature_flag.flag_definitions_cache import FlagDefinitionsCache
+
+
+def make_flag(key: str, **filters) -> FeatureFlag:
+    return FeatureFlag(
+        id=1,
+        team_id=1,
+        key=key,
+        filters={
+            "groups": [{"properties": [{"key": "plan", "type": "person", "value": "paid"}], "rollout_percentage": 50}],
+            **filters,
+        },
+    )
+
+
+class TestFlagDefinitionsCache(SimpleTestCase):
+    def setUp(self):
+        self.cache = FlagDefinitionsCache(max_size=2)
+
+    def test_flags_are_returned_for_the_version_they_were_cached_with(self):
+        flags = self.cache.set(1, "v1", [make_flag("a"), make_flag("b")])
+
+        cached_flags = self.cache.get(1, "v1")
+        assert cached_flags is not None
+        self.assertEqual([flag.key for flag in cached_flags], ["a", "b"])
+        self.assertTrue(all(cached is flag for cached, flag in zip(cached_flags, flags)))
+        self.assertIsNone(self.cache.get(1, "v2"))
+        self.assertIsNone(self.cache.get(1, None))
+        self.assertIsNone(self.cache.get(2, "v1"))
+
+    def test_returned_lists_are_not_shared(self):
+        self.cache.set(1, "v1", [make_flag("a"), make_flag("b")])
+
+        cached_flags = self.cache.get(1, "v1")
+        assert cached_flags is not None
+        cached_flags.pop()
+
+        self.assertEqual(len(self.cache.get(1, "v1") or []), 2)
+
+    def test_least_recently_used_projects_are_evicted(self):
+        self.cache.set(1, "v1", [make_flag("a")])
+        self.cache.set(2, "v1", [make_flag("b")])
+        self.cache.get(1, "v1")
+        self.cache.set(3, "v1", [make_flag("c")])
+
+        self.assertIsNotNone(self.cache.get(1, "v1"))
+        self.assertIsNone(self.cache.get(2, "v1"))
+
+    def test_cached_flags_are_compiled(self):
+        flag = make_flag(
+            "a",
+            multivariate={
+                "variants": [
+                    {"key": "control", "rollout_percentage": 25},
+                    {"key": "test", "rollout_percentage": 75},
+                ]
+            },
+        )
+        self.cache.set(1, "v1", [flag])
+
+        assert flag.compiled is not None
+        self.assertEqual(
+            flag.compiled.variant_lookup_table,
+            [
+                {"value_min": 0, "value_max": 0.25, "key": "control"},
+                {"value_min": 0.25, "value_max": 1.0, "key": "test"},
+            ],
+        )
+        self.assertEqual(flag.compiled.variant_lookup_table, build_variant_lookup_table(flag.variants))
+        self.assertFalse(flag.compiled.uses_cohorts)
+
+        condition = flag.conditions[0]
+        compiled_condition = get_compiled_condition(flag, condition)
+        self.assertIs(compiled_condition, flag.compiled.conditions[id(condition)][1])
+        self.assertEqual([property.key for property in compiled_condition.properties], ["plan"])
+        # An equal condition that isn't the flag's own is still compiled
+        self.assertEqual(get_compiled_condition(flag, {**condition}).properties, compiled_condition.properties)
+
+    def test_flags_that_use_cohorts_are_marked(self):
+        flag = make_flag("a")
+        flag.filters["groups"].append({"properties": [{"key": "id", "type": "cohort", "value": 5}]})
+        self.cache.set(1, "v1", [flag])
+
+        assert flag.compiled is not None
+        self.assertTrue(flag.compiled.uses_cohorts)